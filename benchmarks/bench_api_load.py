@@ -0,0 +1,334 @@
+"""公开 API 压测：按真实查询比例驱动 FastAPI 应用，报告吞吐与延迟分位数
+
+不依赖任何外部服务：
+
+- 请求通过 ``httpx.ASGITransport`` 直接发给进程内的 ``server.api.app``（不触发 startup，后台抓取任务不会运行）；
+- 限流关闭（``RATE_LIMIT_ENABLED=false``）；
+- Supabase 访问层（``load_latest`` / ``fetch_station_metadata`` / ``fetch_all_stations_data`` 等）
+  替换为基于站点目录的内存实现，可用 ``--db-latency`` 模拟同步数据库调用的耗时；
+- ``/ding/webhook`` 的「全部」命令改为经同一个 ASGI 客户端请求 ``/api/status``，钉钉消息不真正发送。
+
+``/api/status`` 的数据来源可选 ``snapshot``（内存已发布快照，后台任务运行后的常态）或
+``latest``（快照为空，回退到 latest 表），默认两者都跑。
+
+结果可用 ``--output`` 保存为 JSON，之后用 ``--compare`` 与新结果逐项对比，用于追踪 server/api.py 的改动。
+
+用法:
+    python -m benchmarks.bench_api_load
+    python -m benchmarks.bench_api_load --requests 5000 --concurrency 32 --stations 10000
+    python -m benchmarks.bench_api_load --output before.json
+    python -m benchmarks.bench_api_load --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.synthetic_catalog import generate_catalog, install_catalog, latest_rows
+from fetcher.station import Station, StationStatus
+from server.config import Config
+
+SNAPSHOT_TIME = "2025-01-01T12:00:00+08:00"
+
+# 查询类型 -> 默认权重
+DEFAULT_MIX = {
+    "full": 30,
+    "provider": 25,
+    "hash_id": 25,
+    "provider_devid": 10,
+    "stations": 5,
+    "ding": 5,
+}
+
+
+class StubSupabase:
+    """基于站点目录的 Supabase 访问层替身（与 db 包中同名函数的签名和返回格式一致）"""
+
+    def __init__(self, stations: List[Station], seed: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.metadata = {
+            station.hash_id: {
+                "hash_id": station.hash_id,
+                "name": station.name,
+                "provider": station.provider,
+                "campus_id": station.campus_id,
+                "campus_name": station.campus_name,
+                "lat": station.lat,
+                "lon": station.lon,
+                "device_ids": station.device_ids,
+                "updated_at": SNAPSHOT_TIME,
+            }
+            for station in stations
+        }
+        self.latest_rows = latest_rows(stations, SNAPSHOT_TIME, seed)
+
+    def _wait(self):
+        # supabase 客户端是同步调用，会阻塞事件循环，这里同样用阻塞的 sleep 模拟
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def load_latest(self) -> Optional[Dict[str, Any]]:
+        self._wait()
+        return {"updated_at": SNAPSHOT_TIME, "rows": [dict(row) for row in self.latest_rows]}
+
+    def fetch_station_metadata(
+        self, station_ids: Optional[List[str]] = None, provider: Optional[str] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        self._wait()
+        keys = station_ids if station_ids else self.metadata.keys()
+        result = {}
+        for key in keys:
+            row = self.metadata.get(key)
+            if row and (provider is None or row["provider"] == provider):
+                result[key] = dict(row)
+        return result
+
+    def fetch_all_stations_data(self, provider: Optional[str] = None) -> List[Dict[str, Any]]:
+        return list(self.fetch_station_metadata(provider=provider).values())
+
+    def install(self, api_module):
+        """替换 server.api 中引用的数据库函数"""
+        api_module.load_latest_cache = self.load_latest
+        api_module.fetch_station_metadata = self.fetch_station_metadata
+        api_module.fetch_all_stations_data = self.fetch_all_stations_data
+        api_module.batch_upsert_stations = lambda stations: True
+        api_module.record_usage_data = lambda *args, **kwargs: True
+
+
+def publish_snapshot(manager, stub: StubSupabase, stations: List[Station]):
+    """用 latest 行数据构造各服务商的已发布快照"""
+    rows = {row["hash_id"]: row for row in stub.latest_rows}
+    by_provider: Dict[str, List[StationStatus]] = defaultdict(list)
+    for station in stations:
+        row = rows[station.hash_id]
+        by_provider[station.provider].append(
+            StationStatus(station, row["free"], row["used"], row["total"], row["error"])
+        )
+    for provider, records in by_provider.items():
+        manager._publish(provider, {"status": "success", "data": records, "error": None})
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, int]:
+    """解析 name=weight,name=weight 形式的查询比例"""
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise SystemExit(f"未知查询类型 {name}，可选: {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+def build_plan(
+    stations: List[Station], mix: Dict[str, int], count: int, seed: int
+) -> List[Tuple[str, str, str, Optional[Dict[str, Any]]]]:
+    """按比例生成 (查询类型, 方法, 路径, JSON 请求体) 列表"""
+    rng = random.Random(seed)
+    providers = sorted({station.provider for station in stations})
+    with_devices = [station for station in stations if station.device_ids]
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+
+    plan = []
+    for kind in rng.choices(kinds, weights=weights, k=count):
+        if kind == "full":
+            plan.append((kind, "GET", "/api/status", None))
+        elif kind == "provider":
+            plan.append((kind, "GET", f"/api/status?provider={rng.choice(providers)}", None))
+        elif kind == "hash_id":
+            plan.append((kind, "GET", f"/api/status?hash_id={rng.choice(stations).hash_id}", None))
+        elif kind == "provider_devid":
+            station = rng.choice(with_devices)
+            devid = rng.choice(station.device_ids)
+            path = f"/api/status?provider={station.provider}&devid={devid}"
+            plan.append((kind, "GET", path, None))
+        elif kind == "stations":
+            plan.append((kind, "GET", "/api/stations", None))
+        else:
+            body = {"msgtype": "text", "text": {"content": "全部"}}
+            plan.append((kind, "POST", "/ding/webhook", body))
+    return plan
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float):
+    """统计每种查询的请求数、吞吐与 p50/p95/p99（毫秒）"""
+    result = {}
+    all_samples = [value for values in samples.values() for value in values]
+    for kind, values in list(samples.items()) + [("all", all_samples)]:
+        if not values:
+            continue
+        p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+        result[kind] = {
+            "requests": len(values),
+            "errors": errors.get(kind, 0) if kind != "all" else sum(errors.values()),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+        }
+    return result
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    plan: List[Tuple[str, str, str, Optional[Dict[str, Any]]]],
+    concurrency: int,
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    cursor = iter(plan)
+
+    async def worker():
+        for kind, method, path, body in cursor:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            samples[kind].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[kind] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, errors, time.perf_counter() - start
+
+
+def print_report(source: str, report: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    header = (
+        f"{'query':>15} | {'requests':>8} | {'errors':>6} | {'req/s':>8} | "
+        f"{'p50(ms)':>8} | {'p95(ms)':>8} | {'p99(ms)':>8}"
+    )
+    print(f"[source={source}]")
+    print(header)
+    print("-" * len(header))
+    for kind, row in report.items():
+        print(
+            f"{kind:>15} | {row['requests']:>8} | {row['errors']:>6} | {row['rps']:>8.1f} | "
+            f"{row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f} | {row['p99_ms']:>8.2f}"
+        )
+        base = (baseline or {}).get(kind)
+        if base:
+            deltas = [
+                f"{(row[key] - base[key]) / base[key]:+.0%}" if base[key] else "n/a"
+                for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+            ]
+            print(
+                f"{'vs baseline':>15} | {'':>8} | {'':>6} | {deltas[0]:>8} | "
+                f"{deltas[1]:>8} | {deltas[2]:>8} | {deltas[3]:>8}"
+            )
+    print()
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # 必须在导入 server.api / ding.webhook 之前关闭限流（两者在导入时根据配置创建限流器）
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    Config.RATE_LIMIT_ENABLED = False
+    import ding.webhook
+    import server.api as api
+    from ding.bot import DingBot
+
+    # server.api 导入时会把根日志级别设为 INFO，这里改回压测指定的级别
+    logging.getLogger().setLevel(args.log_level)
+
+    manager = api.provider_manager
+    catalog = None
+    if args.stations > 0:
+        catalog = generate_catalog(args.stations, args.devices, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="zju-charger-catalog-") as catalog_dir:
+        stations = install_catalog(manager, catalog, Path(catalog_dir))
+    stub = StubSupabase(stations, seed=args.seed, latency=args.db_latency)
+    stub.install(api)
+
+    class SilentDingBot(DingBot):
+        def send_markdown(self, title, text):
+            return True
+
+        def send_text(self, msg, at_mobiles=None):
+            return True
+
+    transport = httpx.ASGITransport(app=api.app)
+    results: Dict[str, Any] = {
+        "config": {
+            "stations": len(stations),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": parse_mix(args.mix),
+            "db_latency": args.db_latency,
+        },
+        "sources": {},
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fp:
+            baseline = json.load(fp).get("sources", {})
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def execute_all_command():
+            response = await client.get("/api/status")
+            return response.json()
+
+        ding.webhook.execute_all_command = execute_all_command
+        ding.webhook.DingBot = SilentDingBot
+
+        for source in args.sources:
+            manager.snapshot.clear()
+            if source == "snapshot":
+                publish_snapshot(manager, stub, stations)
+
+            mix = parse_mix(args.mix)
+            warmup = build_plan(stations, mix, args.warmup, args.seed + 1)
+            await run_load(client, warmup, args.concurrency)
+
+            plan = build_plan(stations, mix, args.requests, args.seed)
+            samples, errors, elapsed = await run_load(client, plan, args.concurrency)
+            report = summarize(samples, errors, elapsed)
+            results["sources"][source] = report
+            print_report(source, report, (baseline or {}).get(source))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="公开 API 压测（进程内，无外部依赖）")
+    parser.add_argument("--requests", type=int, default=2000, help="每个数据来源的请求数")
+    parser.add_argument("--warmup", type=int, default=100, help="预热请求数（不计入结果）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--stations", type=int, default=0, help="合成站点目录的站点数，0 表示仓库自带的目录"
+    )
+    parser.add_argument("--devices", type=int, help="合成目录的设备总数，默认按真实分布抽样")
+    parser.add_argument(
+        "--sources", nargs="+", choices=["snapshot", "latest"], default=["snapshot", "latest"]
+    )
+    parser.add_argument("--mix", help="查询比例，如 full=30,provider=25,hash_id=25")
+    parser.add_argument(
+        "--db-latency", type=float, default=0.0, help="模拟每次数据库调用的耗时（秒）"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="将结果保存为 JSON")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--log-level", default="WARNING", help="压测期间的日志级别")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            json.dump(results, fp, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""抓取周期基准：ProviderManager.fetch_and_format 对本地模拟服务的完整抓取
+
+在当前进程中启动 ``benchmarks.vendor_stub``，通过 ``PROVIDER_*_BASE_URL`` 把所有服务商指向它，
+再用 ``benchmarks.synthetic_catalog`` 生成指定规模的站点目录（0 表示仓库自带的目录），
+测量冷缓存下一个完整抓取周期的耗时，以及每个接口收到的请求数。
+
+用法:
+    python -m benchmarks.bench_fetch_cycle
+    python -m benchmarks.bench_fetch_cycle --stations 0 1000 10000 --cycles 3 --error-rate 0.01
+    python -m benchmarks.bench_fetch_cycle --stations 10000 --devices-per-station 10 --cycles 1
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_catalog import generate_catalog, install_catalog
+from benchmarks.vendor_stub import (
+    ENDPOINTS,
+    add_stub_arguments,
+    base_url_env,
+    build_stub,
+    runner_base_url,
+    start_stub,
+)
+from fetcher.device_cache import device_cache
+from fetcher.provider_manager import ProviderManager
+
+
+async def run(args: argparse.Namespace):
+    stub = build_stub(args)
+    runner = await start_stub(stub)
+    os.environ.update(base_url_env(runner_base_url(runner)))
+
+    manager = ProviderManager()
+    catalog_dir = tempfile.TemporaryDirectory(prefix="zju-charger-catalog-")
+    for prov in manager.providers:
+        # 基准中不读写本地 token 缓存文件
+        token_manager = getattr(prov, "token_manager", None)
+        if token_manager is not None:
+            token_manager.store = None
+
+    header = (
+        f"{'size':>6} | {'stations':>8} | {'devices':>7} | {'cycle(s)':>8} | "
+        f"{'min(s)':>7} | {'requests':>8} | {'req/s':>7} | {'errors':>6}"
+    )
+    try:
+        for size in args.stations:
+            catalog = None
+            if size > 0:
+                devices = None
+                if args.devices_per_station:
+                    devices = round(size * args.devices_per_station)
+                catalog = generate_catalog(size, devices, seed=args.seed)
+            all_stations = install_catalog(manager, catalog, Path(catalog_dir.name))
+            stations = len(all_stations)
+            devices = sum(len(station.device_ids) for station in all_stations)
+
+            durations = []
+            requests = {}
+            for _ in range(args.cycles):
+                # 每个周期都从冷缓存开始，请求数即真实周期的请求数
+                device_cache.invalidate()
+                stub.reset()
+                start = time.perf_counter()
+                result = await manager.fetch_and_format()
+                durations.append(time.perf_counter() - start)
+                assert result is not None and len(result["stations"]) == stations
+                requests = stub.stats()
+
+            total_requests = sum(requests["requests"].values())
+            errors = sum(
+                sum(requests[kind].values()) for kind in ("errors", "timeouts", "throttled")
+            )
+            median = statistics.median(durations)
+            print(header)
+            print("-" * len(header))
+            print(
+                f"{size or 'repo':>6} | {stations:>8} | {devices:>7} | {median:>8.2f} | "
+                f"{min(durations):>7.2f} | {total_requests:>8} | "
+                f"{total_requests / median:>7.0f} | {errors:>6}"
+            )
+            for name in ENDPOINTS:
+                count = requests["requests"].get(name, 0)
+                if count:
+                    print(f"{'':>6}   {name:<22} {count:>8}")
+            print()
+    finally:
+        await manager.close()
+        await runner.cleanup()
+        catalog_dir.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对本地模拟服务执行完整抓取周期的基准")
+    parser.add_argument(
+        "--stations",
+        type=int,
+        nargs="+",
+        default=[0, 1000, 10000],
+        help="站点数，0 表示仓库自带的站点目录",
+    )
+    parser.add_argument(
+        "--devices-per-station", type=float, help="平均每站设备数，默认按真实目录的分布抽样"
+    )
+    parser.add_argument("--cycles", type=int, default=3, help="每个规模的周期数，报告中位数")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""服务与持久化热点函数的微基准（带基线，回归时以非零状态退出）
+
+覆盖的函数：
+
+- ``server.api._build_stations_from_latest_rows``（Supabase 元数据查询替换为内存实现）
+- ``server.api.aggregate_stations_by_id``
+- ``server.api._station_models_from_result``
+- ``server.api._max_updated_at``
+- ``ProviderManager.merge_stations``
+- ``db.usage_repo.build_usage_records``（batch_insert 的行数据构建）
+- ``Station.from_csv_row``
+- ``DingBot.format_status_message``
+
+每个函数按站点数（默认 70 / 1000 / 10000 / 100000）计时。为抵消机器差异和运行时抖动，
+结果以「相对耗时」记录：每轮先跑一段固定的纯 Python 负载（calibration），被测耗时除以同一轮的
+calibration 耗时，取多轮最小值。基线保存在 ``benchmarks/baselines/hot_paths.json``，
+相对耗时超过基线 ``1 + tolerance`` 倍即判为回归，打印 REGRESSION 并以状态码 1 退出；
+站点数少于 ``GATE_MIN_SIZE`` 或单次调用不足 1ms 的结果抖动过大，只报告不判定。
+桩数据库等一次性准备工作在 ``Fixture.install`` 中完成，不计入耗时。
+
+用法:
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_hot_paths --sizes 70 1000 --only merge_stations aggregate_stations_by_id
+    python -m benchmarks.bench_hot_paths --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.bench_api_load import StubSupabase
+from benchmarks.synthetic_catalog import generate_stations
+from db.usage_repo import build_usage_records
+from ding.bot import DingBot
+from fetcher.provider_manager import ProviderManager
+from fetcher.station import Station, StationStatus, status_to_dict
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "hot_paths.json"
+DEFAULT_SIZES = [70, 1000, 10000, 100000]
+SNAPSHOT_TIME = "2025-01-01T12:00:00+08:00"
+MIN_SAMPLE_TIME = 0.02  # 单次采样的最短时长（秒），过短时在一次采样内重复调用
+NOISE_FLOOR = 1e-3  # 单次调用短于该时长（秒）的结果只报告、不判定回归
+GATE_MIN_SIZE = 1000  # 站点数少于该值的结果只报告、不判定回归
+
+
+def _calibration_workload():
+    data = [{"id": i, "name": f"station-{i}", "free": i % 7} for i in range(10_000)]
+    data.sort(key=lambda item: (-item["free"], item["name"]))
+    return sum(item["free"] for item in data)
+
+
+class Fixture:
+    """某个站点规模下所有基准共用的输入数据"""
+
+    def __init__(self, size: int, seed: int = 0):
+        rng = random.Random(seed)
+        self.stations: List[Station] = generate_stations(size, seed=seed)
+        base_time = datetime.fromisoformat(SNAPSHOT_TIME)
+        for station in self.stations:
+            station.updated_at = (base_time - timedelta(seconds=rng.randint(0, 86400))).isoformat()
+        self.stub = StubSupabase(self.stations, seed=seed)
+        for station in self.stations:
+            self.stub.metadata[station.hash_id]["updated_at"] = station.updated_at
+        self.latest_rows = self.stub.latest_rows
+        self.station_rows = list(self.stub.metadata.values())
+        self.records = [
+            StationStatus(station, row["free"], row["used"], row["total"], row["error"])
+            for station, row in zip(self.stations, self.latest_rows)
+        ]
+        self.station_dicts = [status_to_dict(record) for record in self.records]
+        # 每个站点重复一次，模拟多来源合并后需要去重的列表
+        self.duplicated_dicts = self.station_dicts + self.station_dicts[: size // 2]
+        half = len(self.records) // 2
+        self.providers_data = {
+            "fresh": {"status": "success", "data": self.records[:half], "stale": False},
+            "stale": {"status": "success", "data": self.records[half:], "stale": True},
+            "failed": {"status": "error", "data": None, "error": "timeout"},
+        }
+        self.csv_rows = [
+            {
+                "name": station.name,
+                "provider": station.provider,
+                "campus": str(station.campus_id),
+                "lon": str(station.lon),
+                "lat": str(station.lat),
+                "device_ids": json.dumps([int(d) for d in station.device_ids]),
+            }
+            for station in self.stations
+        ]
+        self.status_payload = {"updated_at": SNAPSHOT_TIME, "stations": self.station_dicts}
+
+    def install(self, api):
+        """计时前把本规模的桩数据库装入 server.api"""
+        self.stub.install(api)
+
+
+def build_benchmarks(api) -> Dict[str, Callable[[Fixture], Any]]:
+    """基准名称 -> 以 Fixture 为输入的调用"""
+    manager = ProviderManager(enabled="", disabled="")
+    bot = DingBot(None, None)
+
+    return {
+        "build_stations_from_latest_rows": lambda fx: api._build_stations_from_latest_rows(
+            fx.latest_rows
+        ),
+        "aggregate_stations_by_id": lambda fx: api.aggregate_stations_by_id(fx.duplicated_dicts),
+        "station_models_from_result": lambda fx: api._station_models_from_result(fx.records),
+        "max_updated_at": lambda fx: api._max_updated_at(fx.station_rows),
+        "merge_stations": lambda fx: manager.merge_stations(fx.providers_data),
+        "build_usage_records": lambda fx: build_usage_records(fx.records, SNAPSHOT_TIME),
+        "station_from_csv_row": lambda fx: [Station.from_csv_row(row) for row in fx.csv_rows],
+        "format_status_message": lambda fx: bot.format_status_message(
+            fx.status_payload, show_all=True
+        ),
+    }
+
+
+def _timed(fn: Callable[[], Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Tuple[float, float]:
+    """返回 (单次调用的最佳耗时秒, 最佳相对耗时)
+
+    每轮先跑一次 calibration 负载再跑被测函数，相对耗时 = 被测耗时 / 同一轮的 calibration 耗时，
+    机器整体变慢（降频、邻居进程争抢）时两者同比变化，相对值比绝对耗时稳定得多。
+    与 timeit 一样，计时期间关闭 GC。
+    """
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        first = _timed(fn, 1)
+        number = max(1, int(MIN_SAMPLE_TIME / first)) if first > 0 else 1000
+        calibration_number = max(1, int(MIN_SAMPLE_TIME / _timed(_calibration_workload, 1)))
+
+        best = best_relative = float("inf")
+        for _ in range(repeat):
+            calibration = _timed(_calibration_workload, calibration_number)
+            elapsed = _timed(fn, number)
+            best = min(best, elapsed)
+            best_relative = min(best_relative, elapsed / calibration)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best, best_relative
+
+
+def load_baseline(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="服务与持久化热点函数的微基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", help="只运行指定的基准")
+    parser.add_argument("--repeat", type=int, default=5, help="采样次数，取最佳值")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.0,
+        help="允许慢于基线的比例（默认 1.0，即超过 2 倍判为回归）",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args()
+
+    import server.api as api
+
+    # server.api 导入时会把根日志级别设为 INFO，基准期间只保留警告
+    logging.getLogger().setLevel(logging.WARNING)
+
+    benchmarks = build_benchmarks(api)
+    names = args.only or list(benchmarks)
+    unknown = [name for name in names if name not in benchmarks]
+    if unknown:
+        parser.error(f"未知基准: {', '.join(unknown)}；可选: {', '.join(benchmarks)}")
+
+    baseline = load_baseline(args.baseline).get("results", {})
+
+    header = (
+        f"{'benchmark':<32} | {'stations':>8} | {'time(ms)':>10} | {'relative':>10} | "
+        f"{'baseline':>10} | {'ratio':>6} | status"
+    )
+    print(header)
+    print("-" * len(header))
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    for size in args.sizes:
+        fixture = Fixture(size)
+        fixture.install(api)
+        for name in names:
+            elapsed, relative = measure(partial(benchmarks[name], fixture), args.repeat)
+            results.setdefault(name, {})[str(size)] = round(relative, 6)
+
+            expected = baseline.get(name, {}).get(str(size))
+            row = f"{name:<32} | {size:>8} | {elapsed * 1000:>10.3f} | {relative:>10.4f}"
+            if expected is None:
+                print(f"{row} | {'-':>10} | {'-':>6} | new")
+                continue
+            ratio = relative / expected
+            status = "ok"
+            if size < GATE_MIN_SIZE or elapsed < NOISE_FLOOR:
+                status = "ok (not gated)"
+            elif ratio > 1 + args.tolerance:
+                status = "REGRESSION"
+                regressions.append((name, size, ratio))
+            print(f"{row} | {expected:>10.4f} | {ratio:>6.2f} | {status}")
+
+    if args.update_baseline:
+        for name, by_size in results.items():
+            baseline.setdefault(name, {}).update(by_size)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps({"unit": "calibration", "results": baseline}, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"\n基线已更新: {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} 项慢于基线 {1 + args.tolerance:.2f} 倍以上：", file=sys.stderr)
+        for name, size, ratio in regressions:
+            print(f"  REGRESSION {name} @ {size} stations: {ratio:.2f}x", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
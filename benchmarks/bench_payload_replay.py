@@ -0,0 +1,225 @@
+"""服务商响应解析基准与回归检查：录制原始响应，再全速回放
+
+``record``：开启 ``payload_store`` 录制，跑一个完整抓取周期，把每个设备的原始响应写入录制文件，
+并附上当前解析逻辑的结果快照（``expected``）。默认请求真实服务商（需要配置 token），
+``--stub`` 改为请求进程内的 ``benchmarks.vendor_stub``。
+
+``replay``（默认）：
+
+- 解析：把录制文件中的每条响应直接交给对应的 ``parse_device_payload``，报告每种格式的解析吞吐；
+- 完整周期：``payload_store`` 进入回放模式，``ProviderManager.fetch_and_format`` 不发任何请求，
+  测量冷缓存下解析 + 站点聚合 + 合并的耗时；
+- ``--check``：解析结果与录制时的 ``expected`` 不一致时逐条列出并以状态码 1 退出，
+  用于发现解析逻辑的意外改动或服务商接口格式的变化；``--update-expected`` 刷新快照。
+
+用法:
+    python -m benchmarks.bench_payload_replay record --stub
+    python -m benchmarks.bench_payload_replay record --output captures/2025-01-01.jsonl.gz
+    python -m benchmarks.bench_payload_replay --check
+    python -m benchmarks.bench_payload_replay --fixture captures/2025-01-01.jsonl.gz --cycles 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.vendor_stub import (
+    add_stub_arguments,
+    base_url_env,
+    build_stub,
+    runner_base_url,
+    start_stub,
+)
+from fetcher.device_cache import device_cache
+from fetcher.payload_store import payload_store, read_fixture, write_fixture
+from fetcher.provider_manager import ProviderManager
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "vendor_payloads.jsonl.gz"
+
+Parser = Callable[[Any, str], Dict[str, int]]
+
+
+def build_parsers(manager: ProviderManager) -> Dict[str, Parser]:
+    """scope -> 解析函数（与 payload_store 录制时使用的 scope 一致）"""
+    parsers: Dict[str, Parser] = {}
+    for prov in manager.providers:
+        adapters = getattr(prov, "adapters", None)
+        if adapters:
+            for adapter in adapters.values():
+                parsers[adapter.scope] = adapter.parse_device_payload
+        elif hasattr(prov, "parse_device_payload"):
+            parsers[prov.provider] = prov.parse_device_payload
+    return parsers
+
+
+def parse_record(parser: Parser, record: Dict[str, Any]) -> Dict[str, Any]:
+    """解析一条录制记录；解析失败时以异常类型作为结果，便于与快照比较"""
+    try:
+        return parser(record["payload"], record["device_id"])
+    except Exception as exc:
+        return {"raises": type(exc).__name__}
+
+
+def _token_store_off(manager: ProviderManager):
+    # 录制 / 回放过程中不读写本地 token 缓存文件
+    for prov in manager.providers:
+        token_manager = getattr(prov, "token_manager", None)
+        if token_manager is not None:
+            token_manager.store = None
+
+
+async def record(args: argparse.Namespace) -> int:
+    runner = None
+    if args.stub:
+        runner = await start_stub(build_stub(args))
+        os.environ.update(base_url_env(runner_base_url(runner)))
+
+    manager = ProviderManager()
+    _token_store_off(manager)
+    args.output.unlink(missing_ok=True)
+    payload_store.start_capture(args.output)
+    try:
+        device_cache.invalidate()
+        await manager.fetch_and_format()
+    finally:
+        payload_store.stop_capture()
+        await manager.close()
+        if runner is not None:
+            await runner.cleanup()
+
+    parsers = build_parsers(manager)
+    records = list(read_fixture(args.output))
+    for item in records:
+        item["expected"] = parse_record(parsers[item["scope"]], item)
+    write_fixture(args.output, records)
+
+    counts = defaultdict(int)
+    for item in records:
+        counts[item["scope"]] += 1
+    for scope, count in sorted(counts.items()):
+        print(f"{scope:<24} {count:>6}")
+    print(f"\n共录制 {len(records)} 条响应: {args.output}")
+    return 0
+
+
+def bench_parse(
+    records: List[Dict[str, Any]], parsers: Dict[str, Parser], repeat: int
+) -> Dict[str, float]:
+    """每种格式的最佳单条解析耗时（秒）"""
+    by_scope: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for item in records:
+        by_scope[item["scope"]].append(item)
+
+    results = {}
+    for scope, items in sorted(by_scope.items()):
+        parser = parsers[scope]
+        # 单轮过短时放大轮内次数，避免计时精度不足
+        rounds = max(1, 20_000 // len(items))
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for item in items:
+                    parse_record(parser, item)
+            best = min(best, (time.perf_counter() - start) / (rounds * len(items)))
+        results[scope] = best
+    return results
+
+
+async def replay(args: argparse.Namespace) -> int:
+    records = list(read_fixture(args.fixture))
+    manager = ProviderManager()
+    _token_store_off(manager)
+    parsers = build_parsers(manager)
+    unknown = sorted({item["scope"] for item in records} - set(parsers))
+    if unknown:
+        print(f"录制文件包含未注册的格式: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    status = 0
+    if args.check or args.update_expected:
+        mismatches = []
+        for item in records:
+            actual = parse_record(parsers[item["scope"]], item)
+            if args.update_expected:
+                item["expected"] = actual
+            elif actual != item.get("expected"):
+                mismatches.append((item, actual))
+        if args.update_expected:
+            write_fixture(args.fixture, records)
+            print(f"已刷新 {len(records)} 条解析快照: {args.fixture}\n")
+        elif mismatches:
+            status = 1
+            print(f"{len(mismatches)} 条响应的解析结果与快照不一致：", file=sys.stderr)
+            for item, actual in mismatches[:20]:
+                print(
+                    f"  {item['scope']} {item['device_id']}: "
+                    f"expected={item.get('expected')} actual={actual}",
+                    file=sys.stderr,
+                )
+            print(file=sys.stderr)
+        else:
+            print(f"{len(records)} 条响应的解析结果与快照一致\n")
+
+    header = f"{'format':<24} | {'payloads':>8} | {'us/payload':>10} | {'payloads/s':>10}"
+    print(header)
+    print("-" * len(header))
+    counts = defaultdict(int)
+    for item in records:
+        counts[item["scope"]] += 1
+    for scope, seconds in bench_parse(records, parsers, args.repeat).items():
+        print(f"{scope:<24} | {counts[scope]:>8} | {seconds * 1e6:>10.2f} | {1 / seconds:>10.0f}")
+
+    payload_store.load_replay(args.fixture)
+    try:
+        durations = []
+        result = None
+        for _ in range(args.cycles):
+            device_cache.invalidate()
+            start = time.perf_counter()
+            result = await manager.fetch_and_format()
+            durations.append(time.perf_counter() - start)
+    finally:
+        payload_store.stop_replay()
+        await manager.close()
+
+    stations = len(result["stations"]) if result else 0
+    print(
+        f"\n完整周期（回放，冷缓存）: {stations} 个站点，中位数 "
+        f"{statistics.median(durations) * 1000:.2f} ms，最快 {min(durations) * 1000:.2f} ms"
+    )
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务商响应录制与回放基准")
+    subparsers = parser.add_subparsers(dest="command")
+
+    record_parser = subparsers.add_parser("record", help="录制一个抓取周期的原始响应")
+    record_parser.add_argument("--output", type=Path, default=FIXTURE_PATH)
+    record_parser.add_argument("--stub", action="store_true", help="请求本地模拟服务而非真实服务商")
+    add_stub_arguments(record_parser)
+    record_parser.set_defaults(latency="fixed:0")
+
+    for target in (parser, subparsers.add_parser("replay", help="回放录制文件（默认）")):
+        target.add_argument("--fixture", type=Path, default=FIXTURE_PATH)
+        target.add_argument("--repeat", type=int, default=5, help="解析计时的重复次数，取最佳值")
+        target.add_argument("--cycles", type=int, default=10, help="回放的完整抓取周期数")
+        target.add_argument("--check", action="store_true", help="与录制时的解析快照比较")
+        target.add_argument("--update-expected", action="store_true", help="刷新解析快照")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    command = record if args.command == "record" else replay
+    sys.exit(asyncio.run(command(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""设备号扫描基准：默认号段的逐个扫描 vs 自适应搜索
+
+在进程内启动 ``benchmarks.vendor_stub``（尼普顿设备号按真实目录的分布成簇），分别用
+``generate_ids_by_pattern`` 逐个扫描默认号段，以及 ``scan_search.AdaptiveSearch`` 从默认号段出发搜索，
+报告请求数、发现的设备数、召回率（对照模拟服务的全部设备）与耗时。
+
+用法:
+    python -m benchmarks.bench_scan_search
+    python -m benchmarks.bench_scan_search --coarse-stride 16 --fine-stride 4 --rps 5000
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+from pathlib import Path
+
+from benchmarks.vendor_stub import (
+    _neptune_description,
+    add_stub_arguments,
+    build_stub,
+    runner_base_url,
+    start_stub,
+)
+from fetcher.providers.scan import MID_PARTS, PREFIXES, generate_ids_by_pattern, pattern_scan
+from fetcher.providers.scan_search import AdaptiveSearch
+
+
+def stub_devices(blocks):
+    """模拟服务在给定号段内的全部设备号"""
+    return {
+        f"{block}{suffix:03d}"
+        for block in blocks
+        for suffix in range(1000)
+        if _neptune_description(f"{block}{suffix:03d}")
+    }
+
+
+async def run(args: argparse.Namespace):
+    runner = await start_stub(build_stub(args))
+    base_url = runner_base_url(runner)
+    pattern_blocks = [prefix + mid for prefix in PREFIXES for mid in MID_PARTS]
+    all_blocks = [
+        f"{first}{second}{third}59"
+        for first in "456"
+        for second in "0123456789"
+        for third in "0123456789"
+    ]
+    in_pattern = stub_devices(pattern_blocks)
+    everywhere = stub_devices(all_blocks)
+
+    header = (
+        f"{'mode':<10} | {'requests':>8} | {'found':>6} | {'recall(pattern)':>15} | "
+        f"{'recall(all)':>11} | {'req/found':>9} | {'time(s)':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    try:
+        with tempfile.TemporaryDirectory(prefix="zju-charger-scan-") as tmp:
+            for mode in ("pattern", "adaptive"):
+                search = None
+                if mode == "adaptive":
+                    search = AdaptiveSearch(
+                        pattern_blocks,
+                        coarse_stride=args.coarse_stride,
+                        fine_stride=args.fine_stride,
+                        max_gap=args.max_gap,
+                        max_blocks=args.max_blocks,
+                        rng=random.Random(args.seed),
+                    )
+                found, stats = await pattern_scan(
+                    generate_ids_by_pattern(),
+                    str(Path(tmp) / f"{mode}.csv"),
+                    base_url=base_url,
+                    concurrency=args.concurrency,
+                    rps=args.rps,
+                    progress_interval=3600,
+                    search=search,
+                )
+                found_ids = {info.devid for info in found}
+                print(
+                    f"{mode:<10} | {stats.scanned:>8} | {len(found_ids):>6} | "
+                    f"{len(found_ids & in_pattern) / len(in_pattern):>15.1%} | "
+                    f"{len(found_ids & everywhere) / len(everywhere):>11.1%} | "
+                    f"{stats.scanned / max(1, len(found_ids)):>9.1f} | {stats.elapsed:>7.2f}"
+                )
+                if search is not None:
+                    search.finish()
+                    print(
+                        f"{'':<10}   号段 {search.stats.blocks}（学习 {search.stats.learned}，"
+                        f"剪枝 {search.stats.pruned}）"
+                    )
+    finally:
+        await runner.cleanup()
+    print(f"\n模拟服务共 {len(everywhere)} 个设备，其中默认号段内 {len(in_pattern)} 个")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="设备号扫描：逐个扫描与自适应搜索的对比")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rps", type=float, default=3000.0)
+    parser.add_argument("--coarse-stride", type=int, default=32)
+    parser.add_argument("--fine-stride", type=int, default=8)
+    parser.add_argument("--max-gap", type=int, default=3)
+    parser.add_argument("--max-blocks", type=int, default=300)
+    add_stub_arguments(parser)
+    parser.set_defaults(latency="fixed:0.005")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
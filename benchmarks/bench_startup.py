@@ -0,0 +1,106 @@
+"""冷启动基准：站点目录的加载耗时（直接解析 CSV vs 编译缓存）
+
+对每个站点规模（``0`` 表示仓库自带的目录，其余由 ``benchmarks.synthetic_catalog`` 生成），
+在全新的子进程中导入 ``ProviderManager`` 并加载全部服务商的站点，分别测量：
+
+- ``csv``：不使用缓存（``STATION_CATALOG_CACHE_PATH`` 置空），每次解析 CSV；
+- ``cold``：缓存文件不存在，解析 CSV 并写入缓存（部署后第一个进程）；
+- ``warm``：缓存有效，直接读取缓存（之后的进程与 worker）。
+
+报告站点加载耗时与整个子进程的耗时（含解释器启动与模块导入），取多次运行的中位数。
+
+用法:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --stations 0 10000 50000 --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_catalog import generate_catalog, write_catalog
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MODES = ("csv", "cold", "warm")
+
+
+def child():
+    """子进程：导入并加载全部站点，输出 JSON 计时"""
+    start = time.perf_counter()
+    from fetcher.provider_manager import ProviderManager
+
+    imported = time.perf_counter()
+    manager = ProviderManager()
+    stations = sum(len(prov.station_list) for prov in manager.providers)
+    loaded = time.perf_counter()
+    print(json.dumps({"import": imported - start, "load": loaded - imported, "stations": stations}))
+
+
+def run_child(data_dir: str, cache_path: str) -> dict:
+    env = dict(os.environ, STATION_DATA_DIR=data_dir, STATION_CATALOG_CACHE_PATH=cache_path)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="站点目录冷启动基准")
+    parser.add_argument(
+        "--stations",
+        type=int,
+        nargs="+",
+        default=[0, 1000, 10000],
+        help="站点数，0 表示仓库自带的站点目录",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="每种模式的运行次数，报告中位数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    header = f"{'size':>6} | {'stations':>8} | {'mode':<5} | {'load(ms)':>9} | {'process(ms)':>11}"
+    print(header)
+    print("-" * len(header))
+    with tempfile.TemporaryDirectory(prefix="zju-charger-startup-") as tmp:
+        for size in args.stations:
+            data_dir = ""
+            if size > 0:
+                data_dir = str(Path(tmp) / f"catalog-{size}")
+                write_catalog(generate_catalog(size, seed=args.seed), Path(data_dir))
+            cache_path = str(Path(tmp) / f"cache-{size}.json")
+            for mode in MODES:
+                loads, processes = [], []
+                stations = 0
+                for _ in range(args.runs):
+                    if mode == "cold":
+                        Path(cache_path).unlink(missing_ok=True)
+                    result = run_child(data_dir, "" if mode == "csv" else cache_path)
+                    loads.append(result["load"])
+                    processes.append(result["process"])
+                    stations = result["stations"]
+                print(
+                    f"{size or 'repo':>6} | {stations:>8} | {mode:<5} | "
+                    f"{statistics.median(loads) * 1000:>9.1f} | "
+                    f"{statistics.median(processes) * 1000:>11.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
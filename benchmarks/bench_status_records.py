@@ -0,0 +1,138 @@
+"""状态记录分配基准：旧的逐周期字典流水线 vs StationStatus 记录
+
+模拟一个抓取周期中从服务商产出结果到写库前的全部步骤：
+
+- 旧流水线：服务商为每个站点构造 13 个键的字典 → merge_stations 拼接 →
+  _station_models_from_result 逐条重建 Station（重新计算 md5 hash_id）→ batch_insert 再构造一行字典；
+- 新流水线：服务商为每个站点构造一个 StationStatus（只含计数与 Station 引用）→ 拼接 →
+  直接取 .station → to_usage_row 构造一行字典。
+
+用法:
+    python -m benchmarks.bench_status_records
+    python -m benchmarks.bench_status_records --sizes 70 1000 10000 100000 --repeat 5
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.synthetic_catalog import generate_stations
+from fetcher.station import Station, StationStatus, StationUsage
+
+SNAPSHOT_TIME = "2025-01-01T12:00:00+08:00"
+
+
+def legacy_cycle(stations: List[Station]) -> Tuple[List[Station], List[Dict[str, Any]]]:
+    # 1. 服务商 fetch_status：每个站点一个字典
+    provider_output = [
+        {
+            "provider": station.provider,
+            "hash_id": station.hash_id,
+            "name": station.name,
+            "campus_id": station.campus_id,
+            "campus_name": station.campus_name,
+            "lat": station.lat,
+            "lon": station.lon,
+            "device_ids": station.device_ids,
+            "updated_at": station.updated_at,
+            "free": 3,
+            "used": 2,
+            "total": 6,
+            "error": 1,
+        }
+        for station in stations
+    ]
+    # 2. merge_stations
+    merged: List[Dict[str, Any]] = []
+    merged.extend(provider_output)
+    # 3. _station_models_from_result：重建 Station
+    models = [
+        Station(
+            name=item["name"],
+            provider=item["provider"],
+            campus_id=item["campus_id"],
+            lat=item["lat"],
+            lon=item["lon"],
+            device_ids=item["device_ids"],
+            campus_name=item["campus_name"],
+            updated_at=item["updated_at"],
+            usage=StationUsage(item["free"], item["used"], item["total"], item["error"]),
+        )
+        for item in merged
+    ]
+    # 4. batch_insert：每行一个字典
+    rows = [
+        {
+            "hash_id": item.get("id") or item.get("hash_id"),
+            "snapshot_time": SNAPSHOT_TIME,
+            "free": int(item.get("free", 0)),
+            "used": int(item.get("used", 0)),
+            "total": int(item.get("total", 0)),
+            "error": int(item.get("error", 0)),
+        }
+        for item in merged
+    ]
+    return models, rows
+
+
+def record_cycle(stations: List[Station]) -> Tuple[List[Station], List[Dict[str, Any]]]:
+    # 1. 服务商 fetch_status：每个站点一个 StationStatus
+    provider_output = [StationStatus(station, 3, 2, 6, 1) for station in stations]
+    # 2. merge_stations
+    merged: List[StationStatus] = []
+    merged.extend(provider_output)
+    # 3. 直接复用 Station
+    models = [status.station for status in merged]
+    # 4. batch_insert
+    rows = [status.to_usage_row(SNAPSHOT_TIME) for status in merged]
+    return models, rows
+
+
+def measure(fn: Callable, stations: List[Station], repeat: int) -> Tuple[float, int, int]:
+    """返回 (最佳耗时秒, 周期内峰值内存字节, 周期结束后仍存活的字节)"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(stations)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    result = fn(stations)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StationStatus 记录与旧字典流水线的分配对比")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[70, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数，取最佳值")
+    args = parser.parse_args()
+
+    header = f"{'stations':>9} | {'pipeline':>8} | {'time(ms)':>9} | {'peak(KiB)':>10} | {'retained(KiB)':>13}"
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        stations = generate_stations(size)
+        results = {}
+        for label, fn in (("legacy", legacy_cycle), ("records", record_cycle)):
+            elapsed, peak, retained = measure(fn, stations, args.repeat)
+            results[label] = (elapsed, peak, retained)
+            print(
+                f"{size:>9} | {label:>8} | {elapsed * 1000:>9.2f} | "
+                f"{peak / 1024:>10.1f} | {retained / 1024:>13.1f}"
+            )
+        legacy, records = results["legacy"], results["records"]
+        print(
+            f"{'':>9} | {'saving':>8} | {legacy[0] / records[0]:>8.1f}x | "
+            f"{1 - records[1] / legacy[1]:>9.0%} | {1 - records[2] / legacy[2]:>12.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
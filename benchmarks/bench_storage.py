@@ -0,0 +1,137 @@
+"""本地 SQLite 存储基准：完全离线地测量每轮抓取的写库耗时
+
+用 ``benchmarks.synthetic_catalog`` 生成指定规模的站点，打开临时目录中的 SQLite 主存储
+（``db.sqlite_store``，WAL 模式），依次测量：
+
+- 同步站点信息：``batch_upsert_stations`` 写入全部站点；
+- 抓取周期：每轮随机改变 ``--change-ratio`` 比例站点的计数，调用 ``record_usage_data``
+  写入 latest（只写变化的行 + 心跳）与 usage 历史；
+- usage 批量大小：同样的行数按不同批量写入 usage（对应后写缓冲的 ``USAGE_FLUSH_ROWS``）；
+- 读取：``load_latest`` 与 ``fetch_station_metadata``。
+
+用法:
+    python -m benchmarks.bench_storage
+    python -m benchmarks.bench_storage --stations 1000 10000 --cycles 20 --change-ratio 0.2
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from benchmarks.synthetic_catalog import generate_stations
+from db import pipeline
+from db.sqlite_store import sqlite_store
+from db.station_repo import batch_upsert_stations, fetch_station_metadata
+from db.usage_repo import build_usage_records, insert_usage, load_latest
+
+TZ_UTC_8 = timezone(timedelta(hours=8))
+
+
+def snapshot_times(count: int) -> List[str]:
+    start = datetime(2025, 1, 1, 12, 0, tzinfo=TZ_UTC_8)
+    return [(start + timedelta(minutes=5 * i)).isoformat() for i in range(count)]
+
+
+def mutate(stations: List[Dict], ratio: float, rng: random.Random):
+    """随机改变 ratio 比例站点的 free / used"""
+    for station in rng.sample(stations, int(len(stations) * ratio)):
+        total = station["total"]
+        used = rng.randint(0, total)
+        station["used"], station["free"] = used, total - used
+
+
+def bench_size(size: int, cycles: int, change_ratio: float, batch_sizes: List[int]):
+    rng = random.Random(size)
+    stations = generate_stations(size)
+    rows = []
+    for station in stations:
+        total = max(1, len(station.device_ids)) * 10
+        rows.append(
+            {"hash_id": station.hash_id, "free": total, "used": 0, "total": total, "error": 0}
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_store.open(os.path.join(tmp, "bench.sqlite3"), primary=True)
+        pipeline.latest_state.reset()
+        try:
+            start = time.perf_counter()
+            batch_upsert_stations(stations)
+            upsert_ms = (time.perf_counter() - start) * 1000
+
+            cycle_ms = []
+            for snapshot_time in snapshot_times(cycles):
+                mutate(rows, change_ratio, rng)
+                data = {"updated_at": snapshot_time, "stations": rows}
+                start = time.perf_counter()
+                pipeline.record_usage_data(data, history_mode_enabled=True)
+                cycle_ms.append((time.perf_counter() - start) * 1000)
+
+            # 每种批量写入各自的抓取时间，互不冲突
+            batch_ms = {}
+            all_times = snapshot_times(cycles * (len(batch_sizes) + 1))
+            for index, batch in enumerate(batch_sizes, 1):
+                history = [
+                    record
+                    for snapshot_time in all_times[cycles * index : cycles * (index + 1)]
+                    for record in build_usage_records(rows, snapshot_time)
+                ]
+                start = time.perf_counter()
+                for i in range(0, len(history), batch):
+                    insert_usage(history[i : i + batch])
+                batch_ms[batch] = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            latest = load_latest()
+            metadata = fetch_station_metadata([row["hash_id"] for row in rows])
+            read_ms = (time.perf_counter() - start) * 1000
+            assert latest and len(latest["rows"]) == size and len(metadata) == size
+            db_bytes = sum(
+                os.path.getsize(os.path.join(tmp, name))
+                for name in os.listdir(tmp)
+                if name.startswith("bench.sqlite3")
+            )
+        finally:
+            sqlite_store.close()
+
+    print(
+        f"{size:>8} | {upsert_ms:>11.1f} | {cycle_ms[0]:>11.1f} | "
+        f"{statistics.median(cycle_ms[1:] or cycle_ms):>10.1f} | {read_ms:>8.1f} | "
+        f"{db_bytes / 1024 / 1024:>7.1f}"
+    )
+    rows_total = len(history)
+    results = ", ".join(
+        f"{batch} 行/批 {ms:.0f} ms ({rows_total / ms * 1000:,.0f} 行/秒)"
+        for batch, ms in batch_ms.items()
+    )
+    print(f"{'':>8} | usage 批量写入 {rows_total} 行: {results}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 SQLite 存储的离线写库基准")
+    parser.add_argument("--stations", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--cycles", type=int, default=12, help="模拟的抓取轮数")
+    parser.add_argument(
+        "--change-ratio", type=float, default=0.15, help="每轮计数发生变化的站点比例"
+    )
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    header = (
+        f"{'stations':>8} | {'stations(ms)':>11} | {'cycle1(ms)':>11} | "
+        f"{'cycleN(ms)':>10} | {'read(ms)':>8} | {'db(MiB)':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for size in args.stations:
+        bench_size(size, args.cycles, args.change_ratio, args.batch_sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""合成大规模站点目录与 latest / usage 数据
+
+仓库自带的四个站点 CSV（``fetcher/providers/data``）只有约 70 个站点，规模问题（O(n²) 的处理、
+按站点/设备发起的 I/O）在这个量级上看不出来。本模块以真实目录为样本生成任意规模的目录：
+
+- 服务商、「其他」下各子服务商、校区的占比与真实目录一致；
+- 坐标围绕真实目录中各校区站点的中心按其分布范围随机生成；
+- 每个站点的设备数按真实目录的分布抽样，指定总设备数时按该分布放大；
+- 设备号在服务商内唯一，站点 hash_id 全局唯一。
+
+生成的 CSV 与仓库格式一致，设置 ``STATION_DATA_DIR`` 指向输出目录即可让服务和抓取直接加载；
+配合 ``benchmarks.vendor_stub`` 可以在本地跑通 1 万站点 / 10 万设备的完整抓取周期。
+另外生成与之对应的 latest（每站一行）和 usage（按时间间隔的历史快照）数据，格式与数据库表一致。
+
+用法:
+    python -m benchmarks.synthetic_catalog --stations 10000 --devices 100000 --output build/catalog
+    python -m benchmarks.synthetic_catalog --stations 1000 --usage-snapshots 288 --interval 300
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+import statistics
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fetcher.providers.provider_base import ProviderBase
+from fetcher.station import CAMPUS_NAME_MAP, Station, load_stations_from_csv
+from server.config import Config
+
+SNAPSHOT_TIME = "2025-01-01T12:00:00+08:00"
+CSV_FIELDS = ["name", "provider", "campus", "lon", "lat", "device_ids"]
+
+# 目录键（CSV 文件名前缀）；「其他」服务商的 CSV 中 provider 列是子服务商名称
+CATALOG_KEYS = ["neptune", "neptune_junior", "dlmm", "else"]
+
+# 各目录生成设备号的起始值，保持与真实设备号相近的位数
+DEVICE_ID_BASE = {
+    "neptune": 60_000_000,
+    "neptune_junior": 1_000,
+    "dlmm": 32_000_000,
+    "else": 18_000_000,
+}
+
+LANDMARKS = [
+    "教学楼",
+    "图书馆",
+    "食堂",
+    "体育馆",
+    "学生公寓",
+    "实验楼",
+    "行政楼",
+    "医院",
+    "校门",
+    "停车场",
+]
+SIDES = ["东侧", "西侧", "南侧", "北侧"]
+
+
+@dataclass
+class CatalogProfile:
+    """从真实目录统计出的生成参数"""
+
+    key_weights: Dict[str, int]  # 目录键 -> 站点数
+    vendor_weights: Dict[str, int]  # 「其他」子服务商 -> 站点数
+    campus_weights: Dict[str, Dict[int, int]]  # 目录键 -> 校区 -> 站点数
+    # 校区 -> (lon 中心, lat 中心, lon 标准差, lat 标准差)
+    campus_geo: Dict[int, Tuple[float, float, float, float]]
+    device_counts: List[int]  # 每个站点设备数的经验分布
+
+
+def load_reference_catalog(data_dir: Optional[Path] = None) -> Dict[str, List[Station]]:
+    """读取真实站点目录，返回 目录键 -> 站点列表"""
+    data_dir = data_dir or ProviderBase.DATA_DIR
+    catalog = {}
+    for key in CATALOG_KEYS:
+        path = data_dir / f"{key}_stations.csv"
+        catalog[key] = load_stations_from_csv(path) if path.exists() else []
+    return catalog
+
+
+def build_profile(reference: Dict[str, List[Station]]) -> CatalogProfile:
+    """统计真实目录的服务商、校区、坐标与设备数分布"""
+    key_weights = {key: len(stations) for key, stations in reference.items() if stations}
+    vendor_weights = Counter(station.provider for station in reference.get("else", []))
+    campus_weights = {
+        key: dict(Counter(station.campus_id for station in stations))
+        for key, stations in reference.items()
+        if stations
+    }
+
+    by_campus: Dict[int, List[Station]] = defaultdict(list)
+    for stations in reference.values():
+        for station in stations:
+            by_campus[station.campus_id].append(station)
+    campus_geo = {}
+    for campus_id, stations in by_campus.items():
+        lons = [station.lon for station in stations]
+        lats = [station.lat for station in stations]
+        # 只有一个站点的校区给一个约 300 米的默认范围
+        lon_spread = statistics.pstdev(lons) or 0.003
+        lat_spread = statistics.pstdev(lats) or 0.003
+        campus_geo[campus_id] = (
+            statistics.fmean(lons),
+            statistics.fmean(lats),
+            lon_spread,
+            lat_spread,
+        )
+
+    device_counts = [
+        len(station.device_ids)
+        for stations in reference.values()
+        for station in stations
+        if station.device_ids
+    ]
+    return CatalogProfile(
+        key_weights=key_weights,
+        vendor_weights=dict(vendor_weights),
+        campus_weights=campus_weights,
+        campus_geo=campus_geo,
+        device_counts=device_counts or [1],
+    )
+
+
+def _device_counts(
+    stations: int, devices: Optional[int], profile: CatalogProfile, rng: random.Random
+) -> List[int]:
+    """为每个站点抽样设备数；指定 devices 时总数恰好为 devices，且每个站点至少一个设备"""
+    sampled = rng.choices(profile.device_counts, k=stations)
+    if devices is None:
+        return sampled
+    if devices < stations:
+        raise ValueError(f"设备数 {devices} 少于站点数 {stations}，每个站点至少需要一个设备")
+    counts = [1] * stations
+    # 剩余设备按抽样出的设备数加权分配，保留「少数站点设备很多」的长尾形状
+    for index in rng.choices(range(stations), weights=sampled, k=devices - stations):
+        counts[index] += 1
+    return counts
+
+
+def _station_name(campus_id: int, serial: int, rng: random.Random) -> str:
+    campus = CAMPUS_NAME_MAP.get(campus_id)
+    prefix = campus.removesuffix("校区") if campus else f"校区{campus_id}"
+    return f"{prefix}{rng.choice(LANDMARKS)}{serial}号{rng.choice(SIDES)}"
+
+
+def generate_catalog(
+    stations: int,
+    devices: Optional[int] = None,
+    seed: int = 0,
+    profile: Optional[CatalogProfile] = None,
+) -> Dict[str, List[Station]]:
+    """按真实目录的分布生成 stations 个站点，返回 目录键 -> 站点列表
+
+    Args:
+        stations: 站点总数。
+        devices: 设备总数，为空时按真实目录的每站设备数分布抽样。
+        seed: 随机种子，相同参数生成完全相同的目录。
+        profile: 生成参数，默认由仓库自带的站点目录统计得出。
+    """
+    rng = random.Random(seed)
+    profile = profile or build_profile(load_reference_catalog())
+    keys = list(profile.key_weights)
+    vendors = list(profile.vendor_weights)
+    counts = _device_counts(stations, devices, profile, rng)
+
+    catalog: Dict[str, List[Station]] = {key: [] for key in CATALOG_KEYS}
+    next_device = dict(DEVICE_ID_BASE)
+    seen_hashes = set()
+    for serial, device_count in enumerate(counts, start=1):
+        key = rng.choices(keys, weights=[profile.key_weights[k] for k in keys])[0]
+        campus_weights = profile.campus_weights[key]
+        campus_id = rng.choices(list(campus_weights), weights=list(campus_weights.values()))[0]
+        provider = key
+        if key == "else":
+            provider = rng.choices(vendors, weights=[profile.vendor_weights[v] for v in vendors])[0]
+        lon, lat, lon_spread, lat_spread = profile.campus_geo[campus_id]
+
+        device_ids = []
+        for _ in range(device_count):
+            # 设备号不连续，模拟真实号段中的空洞
+            next_device[key] += rng.randint(1, 3)
+            device_ids.append(str(next_device[key]))
+
+        station = Station(
+            name=_station_name(campus_id, serial, rng),
+            provider=provider,
+            campus_id=campus_id,
+            lat=round(rng.gauss(lat, lat_spread), 6),
+            lon=round(rng.gauss(lon, lon_spread), 6),
+            device_ids=device_ids,
+        )
+        # hash_id 只有 8 位十六进制，10 万站点时约有一次碰撞，碰撞时换一个名字
+        while station.hash_id in seen_hashes:
+            station.name = f"{station.name}{rng.randint(0, 9)}"
+            station.hash_id = station.compute_hash_id()
+        seen_hashes.add(station.hash_id)
+        catalog[key].append(station)
+    return catalog
+
+
+def generate_stations(stations: int, devices: Optional[int] = None, seed: int = 0) -> List[Station]:
+    """generate_catalog 的扁平版本，按目录键顺序拼接并分配全局下标"""
+    flat = [
+        station
+        for stations_of_key in generate_catalog(stations, devices, seed).values()
+        for station in stations_of_key
+    ]
+    for index, station in enumerate(flat):
+        station.index = index
+    return flat
+
+
+def write_catalog(catalog: Dict[str, List[Station]], output_dir: Path) -> List[Path]:
+    """按仓库 CSV 格式写出目录，返回写出的文件路径"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for key, stations in catalog.items():
+        path = output_dir / f"{key}_stations.csv"
+        with path.open("w", encoding="utf-8", newline="") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(CSV_FIELDS)
+            for station in stations:
+                writer.writerow(
+                    [
+                        station.name,
+                        station.provider,
+                        station.campus_id,
+                        station.lon,
+                        station.lat,
+                        json.dumps(
+                            [int(device_id) for device_id in station.device_ids],
+                            separators=(",", ":"),
+                        ),
+                    ]
+                )
+        paths.append(path)
+    return paths
+
+
+def install_catalog(
+    manager, catalog: Optional[Dict[str, List[Station]]], directory: Path
+) -> List[Station]:
+    """让 ProviderManager 的服务商重新加载站点目录，返回按全局下标排列的全部站点
+
+    catalog 非空时先写到 directory，再通过 STATION_DATA_DIR 走正常的 CSV 加载流程；
+    catalog 为空时恢复加载仓库自带的目录。
+    """
+    if catalog is None:
+        Config.STATION_DATA_DIR = ""
+    else:
+        write_catalog(catalog, directory)
+        Config.STATION_DATA_DIR = str(directory)
+    for prov in manager.providers:
+        prov.load_stations()
+    manager._assign_station_indices(manager.providers)
+    return [station for prov in manager.providers for station in prov.station_list]
+
+
+def _occupancy(hour: float, phase: float) -> float:
+    """按一天中的时刻给出占用率：白天高、凌晨低"""
+    return 0.45 + 0.35 * math.sin((hour - 9 + phase) / 24 * 2 * math.pi)
+
+
+def status_row(
+    station: Station, snapshot_time: str, rng: random.Random, occupancy: float = 0.5
+) -> Dict[str, Any]:
+    """生成一个站点的一行 latest / usage 数据（每个设备 10 个端口）"""
+    total = 10 * max(len(station.device_ids), 1)
+    # 约 2% 的端口故障（二项分布的正态近似）
+    error = min(total, max(0, round(rng.gauss(0.02 * total, math.sqrt(0.02 * total)))))
+    used = min(total - error, max(0, round(rng.gauss(occupancy, 0.15) * total)))
+    return {
+        "hash_id": station.hash_id,
+        "snapshot_time": snapshot_time,
+        "free": total - used - error,
+        "used": used,
+        "total": total,
+        "error": error,
+    }
+
+
+def latest_rows(
+    stations: List[Station], snapshot_time: str = SNAPSHOT_TIME, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """生成 latest 表数据：每个站点一行"""
+    rng = random.Random(seed)
+    hour = datetime.fromisoformat(snapshot_time).hour
+    return [
+        status_row(station, snapshot_time, rng, _occupancy(hour, rng.uniform(-1, 1)))
+        for station in stations
+    ]
+
+
+def usage_rows(
+    stations: List[Station],
+    snapshots: int,
+    interval: int = 300,
+    end_time: str = SNAPSHOT_TIME,
+    seed: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """生成 usage 表数据：截至 end_time、间隔 interval 秒的 snapshots 个快照，按时间升序逐行产出"""
+    rng = random.Random(seed)
+    phases = [rng.uniform(-1, 1) for _ in stations]
+    end = datetime.fromisoformat(end_time)
+    for step in range(snapshots - 1, -1, -1):
+        moment = end - timedelta(seconds=step * interval)
+        hour = moment.hour + moment.minute / 60
+        snapshot_time = moment.isoformat()
+        for station, phase in zip(stations, phases):
+            yield status_row(station, snapshot_time, rng, _occupancy(hour, phase))
+
+
+def write_rows(rows, path: Path) -> int:
+    """将 latest / usage 行写为 CSV，返回行数"""
+    fields = ["hash_id", "snapshot_time", "free", "used", "total", "error"]
+    count = 0
+    with path.open("w", encoding="utf-8", newline="") as fp:
+        writer = csv.DictWriter(fp, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成的大规模站点目录与 latest / usage 数据")
+    parser.add_argument("--stations", type=int, default=10000)
+    parser.add_argument("--devices", type=int, help="设备总数，默认按真实目录的每站设备数分布抽样")
+    parser.add_argument("--output", type=Path, default=Path("build/catalog"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--usage-snapshots", type=int, default=12, help="usage 快照个数，0 表示不生成"
+    )
+    parser.add_argument("--interval", type=int, default=300, help="usage 快照间隔（秒）")
+    args = parser.parse_args()
+
+    catalog = generate_catalog(args.stations, args.devices, args.seed)
+    paths = write_catalog(catalog, args.output)
+    stations = [station for stations_of_key in catalog.values() for station in stations_of_key]
+    devices = sum(len(station.device_ids) for station in stations)
+
+    for path, stations_of_key in zip(paths, catalog.values()):
+        print(f"{path}: {len(stations_of_key)} 个站点")
+    latest = write_rows(latest_rows(stations, seed=args.seed), args.output / "latest.csv")
+    print(f"{args.output / 'latest.csv'}: {latest} 行")
+    if args.usage_snapshots > 0:
+        usage = write_rows(
+            usage_rows(stations, args.usage_snapshots, args.interval, seed=args.seed),
+            args.output / "usage.csv",
+        )
+        print(f"{args.output / 'usage.csv'}: {usage} 行")
+    print(f"\n共 {len(stations)} 个站点、{devices} 个设备")
+    print(f"使用该目录启动服务或抓取: STATION_DATA_DIR={args.output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
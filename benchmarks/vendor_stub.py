@@ -0,0 +1,404 @@
+"""服务商接口本地模拟服务（aiohttp）
+
+在本机模拟各服务商的状态查询接口，用于在不访问真实服务商的前提下压测抓取流程：
+
+- 尼普顿 ``POST /wxn/getDeviceInfo``
+- 尼普顿智慧生活 ``GET /api/auth/wx/mp``、``GET /api/charging/pile/listChargingPileDistByArea``（校验 token）
+- 电驴妈妈 ``POST /dlServer/dlmm/getStation``（校验 authorization）
+- 其他服务商：万充科技、超翔科技、电动车充电网、多航科技、嘟嘟换电
+
+每个接口的延迟分布、错误率（返回 HTTP 500）、超时率（挂起 ``hang`` 秒后才响应）和
+限流阈值（超过每秒请求数时返回 HTTP 429）均可配置，端口状态由设备号确定性生成。
+尼普顿接口按真实设备号的分布模拟已登记设备（返回非空的 ``devdescript``）：设备号成簇连续、
+大部分号段为空，且有设备的号段不限于扫描器的默认号段，供设备号扫描器压测。
+服务同时统计每个接口的请求数，可通过 ``GET /__stats`` 读取。
+
+各服务商通过 ``PROVIDER_<ID>_BASE_URL`` / ``PROVIDER_ELSE_PROVIDER_<KEY>_BASE_URL``
+指向本服务，见 ``base_url_env``。
+
+用法:
+    python -m benchmarks.vendor_stub --port 8900
+    python -m benchmarks.vendor_stub --port 8900 --latency lognormal:0.08,0.5 --error-rate 0.01 \\
+        --endpoint-latency neptune=uniform:0.2,0.6 --timeout-rate 0.001 --hang 30
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+
+STUB_TOKEN = "stub-token"
+
+# 接口名称 -> 路径；接口名称同时用作统计键与单独配置的键
+ENDPOINTS = {
+    "neptune": "/wxn/getDeviceInfo",
+    "neptune_junior_auth": "/api/auth/wx/mp",
+    "neptune_junior": "/api/charging/pile/listChargingPileDistByArea",
+    "dlmm": "/dlServer/dlmm/getStation",
+    "wanchong": "/query",
+    "chaoxiang": "/api-device/api/v1/scan/Index",
+    "letfungo": "/api/cabinet/getSiteDetail2",
+    "opencool": "/api/device.device/scan",
+    "dudu": "/sharing-citybike-consumer/site/v2/map/info",
+}
+
+# 需要指向模拟服务的 base URL 环境变量
+BASE_URL_ENVS = (
+    "PROVIDER_NEPTUNE_BASE_URL",
+    "PROVIDER_NEPTUNE_JUNIOR_BASE_URL",
+    "PROVIDER_DLMM_BASE_URL",
+    "PROVIDER_ELSE_PROVIDER_WANCHONG_BASE_URL",
+    "PROVIDER_ELSE_PROVIDER_CHAOXIANG_BASE_URL",
+    "PROVIDER_ELSE_PROVIDER_LETFUNGO_BASE_URL",
+    "PROVIDER_ELSE_PROVIDER_OPENCOOL_BASE_URL",
+    "PROVIDER_ELSE_PROVIDER_DUDU_BASE_URL",
+)
+
+
+def base_url_env(base_url: str) -> Dict[str, str]:
+    """返回将所有服务商指向 base_url 所需的环境变量"""
+    env = {name: base_url for name in BASE_URL_ENVS}
+    # dlmm 的 token 来自环境变量，模拟服务只接受 STUB_TOKEN
+    env["PROVIDER_DLMM_TOKEN"] = STUB_TOKEN
+    return env
+
+
+@dataclass
+class LatencyModel:
+    """响应延迟分布（秒）
+
+    - ``fixed:a``：固定 a 秒
+    - ``uniform:a,b``：[a, b] 均匀分布
+    - ``lognormal:median,sigma``：对数正态分布，中位数 median，形状参数 sigma（长尾）
+    """
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v.strip()] or [0.0]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"未知的延迟分布: {spec}")
+        if kind != "fixed" and len(values) < 2:
+            raise ValueError(f"{kind} 需要两个参数: {spec}")
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(0.0, self.b) * self.a
+        return self.a
+
+
+@dataclass
+class EndpointProfile:
+    """单个接口的故障注入配置"""
+
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    error_rate: float = 0.0  # 返回 HTTP 500 的比例
+    timeout_rate: float = 0.0  # 挂起 hang 秒的比例，用于触发客户端超时
+    hang: float = 30.0
+    rate_limit: float = 0.0  # 每秒允许的请求数，超出返回 HTTP 429；0 表示不限流
+
+
+def _ports(device_id: str, count: int, rng: random.Random) -> str:
+    """按设备号确定性生成端口数量，再随机生成本次的端口状态（0 空闲 / 1 占用 / 3 故障）"""
+    digest = hashlib.md5(str(device_id).encode("utf-8")).digest()
+    size = count or 8 + digest[0] % 5
+    return "".join(rng.choices("0013", weights=(45, 45, 1, 9), k=size))
+
+
+def _neptune_description(device_id: str) -> str:
+    """模拟已登记设备的描述，无设备返回空字符串
+
+    只有形如 ``[4-6]??59???`` 的 8 位设备号可能有设备，其中约一半的号段（前五位）启用；
+    启用的号段内每 50 个设备号为一段，约 1/8 的段含一串 4~30 个连续设备，同属一个模拟站点。
+    """
+    if not (len(device_id) == 8 and device_id.isdigit()):
+        return ""
+    if device_id[0] not in "456" or device_id[3:5] != "59":
+        return ""
+    block, suffix = device_id[:5], int(device_id[5:])
+    if hashlib.md5(block.encode("utf-8")).digest()[0] >= 128:
+        return ""
+    segment = suffix // 50
+    digest = hashlib.md5(f"{block}:{segment}".encode()).digest()
+    if digest[0] >= 32:
+        return ""
+    start = segment * 50 + digest[1] % 20
+    if not start <= suffix < start + 4 + digest[2] % 27:
+        return ""
+    return f"模拟站点{digest[3] % 200}号"
+
+
+class VendorStub:
+    """模拟服务，``app`` 为 aiohttp 应用"""
+
+    def __init__(
+        self,
+        default: Optional[EndpointProfile] = None,
+        profiles: Optional[Dict[str, EndpointProfile]] = None,
+        seed: int = 0,
+    ):
+        self.default = default or EndpointProfile()
+        self.profiles = profiles or {}
+        self.rng = random.Random(seed)
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.timeouts: Counter = Counter()
+        self.throttled: Counter = Counter()
+        # 接口名称 -> (剩余令牌, 上次补充时间)，用于限流
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.app = web.Application()
+        handlers: Dict[str, Callable] = {
+            "neptune": self.neptune,
+            "neptune_junior_auth": self.neptune_junior_auth,
+            "neptune_junior": self.neptune_junior,
+            "dlmm": self.dlmm,
+            "wanchong": self.wanchong,
+            "chaoxiang": self.chaoxiang,
+            "letfungo": self.letfungo,
+            "opencool": self.opencool,
+            "dudu": self.dudu,
+        }
+        for name, path in ENDPOINTS.items():
+            self.app.router.add_route("*", path, self._wrap(name, handlers[name]))
+        self.app.router.add_get("/__stats", self.stats_handler)
+        self.app.router.add_post("/__reset", self.reset_handler)
+
+    def _wrap(self, name: str, handler: Callable):
+        async def wrapped(request: web.Request) -> web.StreamResponse:
+            self.requests[name] += 1
+            # 先读完请求体：客户端在注入的延迟期间超时断开时，不会再读到已关闭的连接
+            await request.read()
+            profile = self.profiles.get(name, self.default)
+            if profile.rate_limit > 0 and not self._take_token(name, profile.rate_limit):
+                self.throttled[name] += 1
+                return web.json_response({"msg": "too many requests"}, status=429)
+            roll = self.rng.random()
+            if roll < profile.timeout_rate:
+                self.timeouts[name] += 1
+                await asyncio.sleep(profile.hang)
+            else:
+                await asyncio.sleep(profile.latency.sample(self.rng))
+            if self.rng.random() < profile.error_rate:
+                self.errors[name] += 1
+                return web.json_response({"msg": "stub injected error"}, status=500)
+            return await handler(request)
+
+        return wrapped
+
+    def _take_token(self, name: str, rate: float) -> bool:
+        """令牌桶：容量为一秒的请求数"""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(name, (rate, now))
+        tokens = min(rate, tokens + (now - last) * rate)
+        if tokens < 1:
+            self._buckets[name] = (tokens, now)
+            return False
+        self._buckets[name] = (tokens - 1, now)
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """每个接口的请求 / 注入错误 / 注入超时计数"""
+        return {
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "timeouts": dict(self.timeouts),
+            "throttled": dict(self.throttled),
+        }
+
+    def reset(self):
+        self.requests.clear()
+        self.errors.clear()
+        self.timeouts.clear()
+        self.throttled.clear()
+        self._buckets.clear()
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def reset_handler(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"ok": True})
+
+    # --- 各服务商接口 ---
+
+    async def neptune(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        device_id = str(form.get("devaddress", ""))
+        return web.json_response(
+            {
+                "success": True,
+                "obj": {
+                    "devaddress": device_id,
+                    "devdescript": _neptune_description(device_id),
+                    "portstatur": _ports(device_id, 0, self.rng),
+                },
+            }
+        )
+
+    async def neptune_junior_auth(self, request: web.Request) -> web.Response:
+        return web.json_response({"code": 200, "data": {"token": STUB_TOKEN}})
+
+    async def neptune_junior(self, request: web.Request) -> web.Response:
+        if request.headers.get("REQ-NPD-TOKEN") != STUB_TOKEN:
+            return web.json_response({"code": 401, "msg": "token invalid"})
+        ports = _ports(request.query.get("chargingAreaId", ""), 0, self.rng) * 3
+        return web.json_response(
+            {
+                "code": 200,
+                "data": {
+                    "totalPileNumber": len(ports),
+                    "totalFreeNumber": ports.count("0"),
+                    "totalTroubleNumber": ports.count("3"),
+                    "totalBookingNumber": 0,
+                    "totalUpgradeNumber": 0,
+                },
+            }
+        )
+
+    async def dlmm(self, request: web.Request) -> web.Response:
+        if request.headers.get("authorization") != STUB_TOKEN:
+            return web.json_response({"code": 401, "msg": "unauthorized"})
+        payload = await request.json()
+        ports = _ports(payload.get("stationNo", ""), 10, self.rng)
+        return web.json_response(
+            {"code": 200, "data": {"socketArray": [{"status": int(p)} for p in ports]}}
+        )
+
+    async def wanchong(self, request: web.Request) -> web.Response:
+        ports = _ports(request.query.get("device_num", ""), 10, self.rng)
+        states = {"0": 0, "1": 2, "3": 5}
+        return web.json_response({"data": {"port": [{"state": states[p]} for p in ports]}})
+
+    async def chaoxiang(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        ports = _ports(form.get("DeviceNumber", ""), 10, self.rng)
+        states = {"0": 1, "1": 2, "3": 4}
+        return web.json_response({"data": {"DeviceWays": [{"State": states[p]} for p in ports]}})
+
+    async def letfungo(self, request: web.Request) -> web.Response:
+        ports = _ports(request.query.get("siteId", ""), 12, self.rng)
+        return web.json_response(
+            {
+                "data": {
+                    "charger_true": ports.count("0"),
+                    "charger_false": len(ports) - ports.count("0"),
+                }
+            }
+        )
+
+    async def opencool(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        ports = _ports(payload.get("sn", ""), 10, self.rng)
+        texts = {"0": "空闲", "1": "使用中", "3": "故障"}
+        return web.json_response(
+            {"data": {"port_list": [{"status_text": texts[p]} for p in ports]}}
+        )
+
+    async def dudu(self, request: web.Request) -> web.Response:
+        ports = _ports(request.query.get("id", ""), 12, self.rng)
+        upload = {
+            "storeNull": ports.count("1"),
+            "storeLowPowerBatteryCharge": ports.count("3"),
+            "storeSoftLock": 0,
+            "storeCount": len(ports),
+        }
+        return web.json_response(
+            {
+                "code": 200,
+                "data": {
+                    "storeTake": ports.count("0"),
+                    "cbExchangeVOList": [{"cbExchangeUploadVO": upload}],
+                },
+            }
+        )
+
+
+async def start_stub(stub: VendorStub, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+    """在当前事件循环中启动模拟服务，返回 runner（port=0 时随机端口，见 runner_base_url）"""
+    runner = web.AppRunner(stub.app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
+
+
+def runner_base_url(runner: web.AppRunner) -> str:
+    host, port = runner.addresses[0][:2]
+    return f"http://{host}:{port}"
+
+
+def build_stub(args: argparse.Namespace) -> VendorStub:
+    """由命令行参数构建模拟服务"""
+
+    def profile(latency: LatencyModel) -> EndpointProfile:
+        return EndpointProfile(
+            latency, args.error_rate, args.timeout_rate, args.hang, args.rate_limit
+        )
+
+    profiles = {}
+    for item in args.endpoint_latency or []:
+        name, _, spec = item.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"未知接口 {name}，可选: {', '.join(ENDPOINTS)}")
+        profiles[name] = profile(LatencyModel.parse(spec))
+    return VendorStub(profile(LatencyModel.parse(args.latency)), profiles, seed=args.seed)
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    """注册模拟服务的故障注入参数（供基准脚本复用）"""
+    parser.add_argument("--latency", default="lognormal:0.05,0.5", help="默认延迟分布")
+    parser.add_argument(
+        "--endpoint-latency",
+        action="append",
+        metavar="NAME=SPEC",
+        help=f"单个接口的延迟分布，可重复；接口: {', '.join(ENDPOINTS)}",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 500 的比例")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="挂起不响应的比例")
+    parser.add_argument("--hang", type=float, default=30.0, help="挂起时长（秒）")
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="每个接口每秒允许的请求数，超出返回 429"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+async def _serve(args: argparse.Namespace):
+    runner = await start_stub(build_stub(args), args.host, args.port)
+    base_url = runner_base_url(runner)
+    print(f"模拟服务已启动: {base_url}")
+    print("将服务商指向模拟服务：")
+    for name, value in base_url_env(base_url).items():
+        print(f"  export {name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务商接口本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
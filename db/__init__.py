@@ -16,6 +16,7 @@ from .client import (
 from .station_repo import (
     upsert_station,
     batch_upsert_stations,
+    upsert_station_rows,  # 写入已构建的 stations 行
     fetch_station_metadata,
     fetch_all_stations_data,  # 低耦合查询接口，返回 List[Dict]
 )
@@ -24,11 +25,21 @@ from .station_repo import (
 from .usage_repo import (
     insert,  # 单条插入接口
     batch_insert,  # 批量插入接口
+    build_usage_records,  # 站点状态 -> 行数据
+    upsert_latest,  # 只写入给定的 latest 行
+    insert_usage,  # 批量插入已构建的 usage 行
+    write_latest_heartbeat,  # 确认 latest 其余行仍然有效
     load_latest,  # 读取最新缓存接口
 )
 
 # --- 3. 业务管道 (核心写入逻辑) ---
-from .pipeline import record_usage_data
+from .pipeline import record_usage_data, latest_state, usage_buffer, OUTBOX_WRITERS
+
+# --- 4. 写入失败的本地 outbox ---
+from .outbox import write_outbox
+
+# --- 5. 本地 SQLite 存储（主存储或 Supabase 前的本地缓存） ---
+from .sqlite_store import sqlite_store
 
 # 统一导出所有公共接口
 __all__ = [
@@ -39,12 +50,24 @@ __all__ = [
     # station_repo
     "upsert_station",
     "batch_upsert_stations",
+    "upsert_station_rows",
     "fetch_station_metadata",
     "fetch_all_stations_data",
     # usage_repo
     "insert",
     "batch_insert",
+    "build_usage_records",
+    "upsert_latest",
+    "insert_usage",
+    "write_latest_heartbeat",
     "load_latest",
     # pipeline
     "record_usage_data",
+    "latest_state",
+    "usage_buffer",
+    "OUTBOX_WRITERS",
+    # outbox
+    "write_outbox",
+    # sqlite_store
+    "sqlite_store",
 ]
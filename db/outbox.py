@@ -0,0 +1,266 @@
+"""
+写入失败的本地 outbox：Supabase 写入失败的批次追加到本地 JSON Lines 文件，恢复后按退避间隔重放
+
+文件只追加两种行：
+- 批次：{"id": 序号, "table": 表名, "at": 入队时间, "rows": [...]}
+- 确认：{"ack": 序号}，表示该批次已重放成功
+
+启动时读取文件，未确认的批次即为待重放的 outbox；确认行累积到 COMPACT_AFTER 条、或全部批次都已确认时，
+把未确认的批次写入临时文件再原子替换，完成压缩。进程在写入中途退出时，最后一行可能不完整，读取时跳过。
+
+usage 表的写入按 UNIQUE (hash_id, snapshot_time) upsert 并忽略重复行，stations 表按主键 upsert，
+因此同一批次被重放多次（如写入成功但响应丢失）也不会产生重复数据。
+latest 表只保存最新状态，失败后由下一轮抓取覆盖，不进入 outbox。
+
+stations 表每轮同步都会写入全部站点，Supabase 长时间不可用时逐轮追加会让 outbox 无限增长。
+COALESCE_KEYS 中的表只保留一个待重放批次：新批次并入最早的同表批次，按主键去重、后写入的行覆盖先写入的，
+并立即压缩文件。并入最早的批次而不是最新的，保证 stations 仍先于引用它的 usage 批次重放。
+"""
+
+# db/outbox.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Writer = Callable[[List[Dict[str, Any]]], bool]
+
+# 累积多少条确认行后压缩文件
+COMPACT_AFTER = 256
+# 表名 -> 主键：这些表的待重放批次合并为一个，同一主键只保留最后写入的行
+COALESCE_KEYS = {"stations": "hash_id"}
+
+
+class WriteOutbox:
+    """追加写入的本地 outbox，append 与 replay 可以在不同线程中调用"""
+
+    def __init__(self):
+        self.path = ""
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 1
+        self._acked_lines = 0
+        # 正在重放的批次，不参与合并（重放线程已把它的行交给写入函数）
+        self._replaying: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.spooled = 0
+        self.replayed = 0
+        self.failures = 0
+        self.next_retry_at: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def open(self, path: str):
+        """指定 outbox 文件并加载其中未确认的批次；path 为空表示关闭"""
+        with self._lock:
+            self.path = path
+            self._pending.clear()
+            self._acked_lines = 0
+            if not path:
+                return
+            self._load()
+            self._coalesce()
+            self._compact()
+        if self._pending:
+            logger.warning(
+                "outbox 中有 %d 个待重放的批次（%d 行）：%s", len(self._pending), self.rows(), path
+            )
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        acked = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning("跳过 outbox 第 %d 行（不完整或已损坏）", line_no)
+                    continue
+                if "ack" in entry:
+                    acked.add(entry["ack"])
+                    self._acked_lines += 1
+                elif "id" in entry:
+                    self._pending[entry["id"]] = entry
+                    self._next_id = max(self._next_id, entry["id"] + 1)
+        for batch_id in acked:
+            self._pending.pop(batch_id, None)
+
+    def _write_lines(self, entries: List[Dict[str, Any]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _coalesce(self) -> bool:
+        """把 COALESCE_KEYS 中每张表的待重放批次并入最早的一个，有批次被合并时返回 True"""
+        first: Dict[str, Dict[str, Any]] = {}
+        merged = False
+        for batch_id, entry in list(self._pending.items()):
+            key = COALESCE_KEYS.get(entry["table"])
+            if key is None or batch_id == self._replaying:
+                continue
+            target = first.get(entry["table"])
+            if target is None:
+                first[entry["table"]] = entry
+                continue
+            rows = {row[key]: row for row in target["rows"]}
+            rows.update((row[key], row) for row in entry["rows"])
+            target["rows"] = list(rows.values())
+            del self._pending[batch_id]
+            merged = True
+        return merged
+
+    def _compact(self):
+        """只保留未确认的批次，写入临时文件后原子替换"""
+        if not os.path.exists(self.path):
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._pending.values():
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._acked_lines = 0
+
+    def append(self, table: str, rows: List[Dict[str, Any]]) -> bool:
+        """把写入失败的批次追加到 outbox；未开启或写文件失败时返回 False"""
+        if not self.enabled or not rows:
+            return False
+        with self._lock:
+            entry = {"id": self._next_id, "table": table, "at": time.time(), "rows": rows}
+            try:
+                self._write_lines([entry])
+            except OSError as exc:
+                logger.error("写入 outbox 失败，%d 行 %s 数据丢失: %s", len(rows), table, exc)
+                return False
+            self._pending[entry["id"]] = entry
+            self._next_id += 1
+            self.spooled += 1
+            if entry["table"] in COALESCE_KEYS and self._coalesce():
+                try:
+                    self._compact()
+                except OSError as exc:
+                    # 文件中仍有完整的各批次，重新加载时会再次合并
+                    logger.error("压缩 outbox 文件失败: %s", exc)
+        logger.warning("%s 写入失败，%d 行已存入 outbox 等待重放。", table, len(rows))
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def replay(self, writers: Dict[str, Writer]) -> bool:
+        """按入队顺序重放未确认的批次，遇到第一次失败即停止；全部成功时返回 True"""
+        with self._lock:
+            entries = list(self._pending.values())
+        for entry in entries:
+            with self._lock:
+                if entry["id"] not in self._pending:
+                    continue  # 已并入更早的批次
+                self._replaying = entry["id"]
+            try:
+                writer = writers.get(entry["table"])
+                if writer is None:
+                    logger.error(
+                        "outbox 中的批次 %d 指向未知的表 %s，已丢弃", entry["id"], entry["table"]
+                    )
+                elif not writer(entry["rows"]):
+                    return False
+            finally:
+                with self._lock:
+                    self._replaying = None
+            with self._lock:
+                self._pending.pop(entry["id"], None)
+                try:
+                    self._write_lines([{"ack": entry["id"]}])
+                    self._acked_lines += 1
+                    if not self._pending or self._acked_lines >= COMPACT_AFTER:
+                        self._compact()
+                except OSError as exc:
+                    logger.error("更新 outbox 文件失败: %s", exc)
+            self.replayed += 1
+        return True
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def rows(self) -> int:
+        with self._lock:
+            return sum(len(entry["rows"]) for entry in self._pending.values())
+
+    async def _run(self, writers: Dict[str, Writer], retry_min: float, retry_max: float):
+        delay = retry_min
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                self.next_retry_at = None
+                await self._wakeup.wait()
+                delay = retry_min
+            # 新的失败刚发生时 Supabase 大概率仍不可用，先等待再重放
+            self.next_retry_at = time.monotonic() + delay
+            await asyncio.sleep(delay)
+            if await asyncio.to_thread(self.replay, writers):
+                logger.info("outbox 已全部重放完成")
+                delay = retry_min
+                continue
+            self.failures += 1
+            delay = min(delay * 2, retry_max)
+            logger.warning(
+                "outbox 重放失败，剩余 %d 个批次，%.0f 秒后重试", len(self._pending), delay
+            )
+
+    def start(self, writers: Dict[str, Writer], retry_min: float = 30, retry_max: float = 1800):
+        """启动后台重放任务（需在 async 上下文中调用）"""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        if self._pending:
+            self._wakeup.set()
+        retry_min = max(1.0, retry_min)
+        self._task = asyncio.create_task(self._run(writers, retry_min, max(retry_min, retry_max)))
+        logger.info("outbox 重放任务已启动：%s", self.path)
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "depth": self.depth(),
+            "rows": self.rows(),
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "failures": self.failures,
+            "next_retry_in": (
+                round(max(0.0, self.next_retry_at - time.monotonic()), 1)
+                if self.next_retry_at is not None
+                else None
+            ),
+        }
+
+
+# 所有写入共享的 outbox，由服务启动时指定文件并启动重放任务
+write_outbox = WriteOutbox()
@@ -5,23 +5,307 @@
 
 # db/pipeline.py
 
+import asyncio
 import logging
-from typing import Dict, Any, List
+import time
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple
 
 # 导入 usage_repo 中实现的批量插入函数
-from .usage_repo import batch_insert
+from .outbox import write_outbox
+from .station_repo import upsert_station_rows
+from .usage_repo import (
+    USAGE_TABLE_NAME,
+    build_usage_records,
+    insert_usage,
+    upsert_latest,
+    write_latest_heartbeat,
+)
 
 logger = logging.getLogger(__name__)
 
+Counts = Tuple[int, int, int, int]
 
-def record_usage_data(data: Dict[str, Any], history_mode_enabled: bool = False) -> bool:
+
+class LatestWriteState:
+    """
+    进程内记录上一次成功写入 latest 表的各站点计数，用于只写入计数变化的行。
+
+    进程重启后为空，第一轮会完整写入；距上一次完整写入超过 full_write_interval 秒时也完整写入一次，
+    以修正 latest 表被外部修改或某次写入部分失败造成的偏差。
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, Counts] = {}
+        self.full_written_at = float("-inf")
+
+    @staticmethod
+    def _counts(record: Dict[str, Any]) -> Counts:
+        return (record["free"], record["used"], record["total"], record["error"])
+
+    def full_write_due(self, full_write_interval: float) -> bool:
+        return not self.counts or time.monotonic() - self.full_written_at >= full_write_interval
+
+    def changed(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """计数与上一次写入不同（或从未写入）的行"""
+        counts = self.counts
+        return [r for r in records if counts.get(r["hash_id"]) != self._counts(r)]
+
+    def commit(self, records: List[Dict[str, Any]], full: bool = False):
+        for record in records:
+            self.counts[record["hash_id"]] = self._counts(record)
+        if full:
+            self.full_written_at = time.monotonic()
+
+    def reset(self):
+        self.counts.clear()
+        self.full_written_at = float("-inf")
+
+
+# 后台抓取与管理操作共享的 latest 写入状态
+latest_state = LatestWriteState()
+
+
+def _write_latest(
+    records: List[Dict[str, Any]],
+    snapshot_time: str,
+    change_only: bool,
+    full_write_interval: float,
+) -> bool:
+    """写入 latest：只 upsert 计数变化的行，再用 latest_heartbeat 单行表确认其余行仍然有效"""
+    full = not change_only or latest_state.full_write_due(full_write_interval)
+    rows = records if full else latest_state.changed(records)
+
+    if not upsert_latest(rows):
+        return False
+    latest_state.commit(rows, full=full)
+
+    heartbeat_ok = write_latest_heartbeat(snapshot_time, len(records))
+    if full:
+        logger.info("latest 完整写入 %d 行。", len(rows))
+        return True
+    if not heartbeat_ok:
+        # 尚未创建 latest_heartbeat 表等情况：退回完整写入，保证每行的 snapshot_time 都是最新的
+        logger.warning("latest_heartbeat 更新失败，本轮退回完整写入 latest。")
+        if not upsert_latest(records):
+            return False
+        latest_state.commit(records, full=True)
+        return True
+
+    logger.info("latest 写入 %d/%d 个变化的站点，其余由心跳确认。", len(rows), len(records))
+    return True
+
+
+class UsageWriteBuffer:
+    """
+    usage 历史表的后写缓冲：抓取周期只把行数据放入有界队列，由独立的写入任务跨周期合并后批量插入。
+
+    - 累积行数达到 batch_rows，或最早一行等待超过 flush_interval 秒时写入，每次请求最多 batch_rows 行；
+    - 队列最多保留 queue_size 轮抓取，满时丢弃最旧的一轮并记录错误，抓取周期永远不会等待写入；
+    - 写入失败的批次存入 outbox（db/outbox.py）由其重放；outbox 未开启或不可写时保留已取出的行，
+      暂停消费队列，flush_interval 秒（至少 5 秒）后重试；
+    - close() 在服务关闭时取出队列中剩余的行并写入最后一次，未写完的行存入 outbox。
+
+    Supabase 客户端是同步的，插入放在线程中执行，不阻塞事件循环；
+    submit 可以在工作线程中调用（record_usage_data 整体在线程中执行），行数据交回事件循环入队。
+    """
+
+    def __init__(self):
+        self.batch_rows = 5000
+        self.flush_interval = 600.0
+        self.queue_size = 64
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._deadline = 0.0
+        self._failing = False
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.spooled_rows = 0
+        self.dropped_rows = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, batch_rows: int = 5000, flush_interval: float = 600, queue_size: int = 64):
+        """在事件循环中启动写入任务（需在 async 上下文中调用）"""
+        if self.running:
+            return
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval = max(0.0, flush_interval)
+        self.queue_size = max(1, queue_size)
+        # 队列本身不设上限，由 submit 控制轮数，保证关闭信号总能放入
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "usage 后写缓冲已启动：每批最多 %d 行，最长等待 %.0f 秒，队列上限 %d 轮。",
+            self.batch_rows,
+            self.flush_interval,
+            self.queue_size,
+        )
+
+    def submit(self, records: List[Dict[str, Any]]) -> bool:
+        """放入一轮抓取的行数据，不等待写入；写入任务未运行时返回 False"""
+        if not self.running or self._stopping.is_set():
+            return False
+        if not records:
+            return True
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._enqueue(records)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, records)
+        return True
+
+    def _enqueue(self, records: List[Dict[str, Any]]):
+        if self._stopping.is_set():
+            # 从线程提交时，入队前服务已开始关闭：写入任务不再消费队列，直接存入 outbox
+            if not write_outbox.append(USAGE_TABLE_NAME, records):
+                self.dropped_rows += len(records)
+            return
+        if self._queue.qsize() >= self.queue_size:
+            oldest = self._queue.get_nowait()
+            self.dropped_rows += len(oldest)
+            logger.error(
+                "usage 写入队列已满（%d 轮），丢弃最旧的 %d 行。", self.queue_size, len(oldest)
+            )
+        self._queue.put_nowait(records)
+
+    async def _flush(self, full_batches_only: bool = False) -> bool:
+        """写出缓冲中的行；full_batches_only 时只写满 batch_rows 的批次，余下的继续等待"""
+        pending = self._pending
+        min_rows = self.batch_rows if full_batches_only else 1
+        while len(pending) >= min_rows:
+            chunk = pending[: self.batch_rows]
+            if not await asyncio.to_thread(insert_usage, chunk, False):
+                if write_outbox.append(USAGE_TABLE_NAME, chunk):
+                    del pending[: len(chunk)]
+                    self.spooled_rows += len(chunk)
+                    continue
+                self._failing = True
+                self.failed_flushes += 1
+                retry = max(self.flush_interval, 5.0)
+                self._deadline = time.monotonic() + retry
+                logger.warning(
+                    "usage 批量写入失败，%d 行留在缓冲中，%.0f 秒后重试。", len(pending), retry
+                )
+                return False
+            del pending[: len(chunk)]
+            self.flushes += 1
+            self.flushed_rows += len(chunk)
+        self._failing = False
+        return True
+
+    async def _wait_stopping(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout)
+        except TimeoutError:
+            pass
+
+    async def _run(self):
+        pending = self._pending
+        while True:
+            if self._failing:
+                # 写入失败期间不再取出新数据，新的轮次留在有界队列中
+                await self._wait_stopping(max(0.0, self._deadline - time.monotonic()))
+                if self._stopping.is_set():
+                    break
+                await self._flush()
+                continue
+
+            timeout = max(0.0, self._deadline - time.monotonic()) if pending else None
+            try:
+                records = await asyncio.wait_for(self._queue.get(), timeout)
+            except TimeoutError:
+                await self._flush()
+                continue
+            if records is None:
+                break
+            if not pending:
+                self._deadline = time.monotonic() + self.flush_interval
+            pending.extend(records)
+            if len(pending) >= self.batch_rows:
+                await self._flush(full_batches_only=True)
+
+        self._drain_queue()
+        if not await self._flush():
+            self._drop_pending("服务关闭时 usage 缓冲写入失败")
+
+    def _drain_queue(self):
+        while not self._queue.empty():
+            records = self._queue.get_nowait()
+            if records:
+                self._pending.extend(records)
+
+    def _drop_pending(self, reason: str):
+        pending = self._pending
+        logger.error("%s，丢弃 %d 行。", reason, len(pending))
+        self.dropped_rows += len(pending)
+        pending.clear()
+
+    async def close(self, timeout: float = 30):
+        """停止写入任务并写出缓冲中剩余的行，最多等待 timeout 秒"""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._queue.put_nowait(None)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except TimeoutError:
+            # 正在进行的写入可能已经成功，重放时按唯一约束忽略重复行
+            self._drain_queue()
+            if not write_outbox.append(USAGE_TABLE_NAME, list(self._pending)):
+                self._drop_pending(f"usage 缓冲在 {timeout:.0f} 秒内未写完")
+            self._pending.clear()
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued_cycles": self._queue.qsize() if self._queue is not None else 0,
+            "pending_rows": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+            "spooled_rows": self.spooled_rows,
+            "dropped_rows": self.dropped_rows,
+        }
+
+
+# 后台抓取共享的 usage 写入缓冲，由服务启动 / 关闭事件控制生命周期
+usage_buffer = UsageWriteBuffer()
+
+# outbox 中各表批次的重放方式；重放失败时不再重复存入 outbox
+OUTBOX_WRITERS = {
+    USAGE_TABLE_NAME: partial(insert_usage, spool=False),
+    "stations": partial(upsert_station_rows, spool=False),
+}
+
+
+def record_usage_data(
+    data: Dict[str, Any],
+    history_mode_enabled: bool = False,
+    latest_change_only: bool = True,
+    latest_full_write_interval: float = 3600,
+) -> bool:
     """
     核心数据管道：根据模式参数，决定是只更新 latest 缓存，还是同时记录 usage 历史。
 
     Args:
         data: 包含 'stations' (List[Dict]) 和 'updated_at' (str) 的字典。
               'updated_at' 字段是强制性的，作为所有记录的 snapshot_time。
-        history_mode_enabled: 是否开启历史记录模式。
+        history_mode_enabled: 是否开启历史记录模式。usage_buffer 运行时只放入缓冲，由写入任务批量插入。
+        latest_change_only: latest 是否只写入计数变化的行（未变化的行由 latest_heartbeat 确认）。
+        latest_full_write_interval: 只写变化行时，两次完整写入 latest 的最短间隔（秒）。
 
     Returns:
         是否成功完成所有必要操作。
@@ -47,8 +331,10 @@ def record_usage_data(data: Dict[str, Any], history_mode_enabled: bool = False)
     )
 
     # --- 2. 写入 latest 缓存表 (必须执行) ---
-    # 调用 usage_repo.batch_insert 写入 latest 表
-    success_cache = batch_insert(data, sheet_name="latest")
+    records = build_usage_records(stations_data, snapshot_time)
+    success_cache = _write_latest(
+        records, snapshot_time, latest_change_only, latest_full_write_interval
+    )
 
     if not success_cache:
         logger.error("更新 latest 缓存表失败，流程中断。")
@@ -61,8 +347,10 @@ def record_usage_data(data: Dict[str, Any], history_mode_enabled: bool = False)
     if history_mode_enabled:
         logger.debug("历史记录模式开启。开始归档 usage 历史数据。")
 
-        # 调用 usage_repo.batch_insert 写入 usage 表
-        success_archive = batch_insert(data, sheet_name="usage")
+        if usage_buffer.submit(records):
+            logger.debug("已放入 usage 写入缓冲 %d 行。", len(records))
+        else:
+            success_archive = insert_usage(records)
 
         if not success_archive:
             logger.error("写入 usage 历史表失败。")
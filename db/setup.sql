@@ -56,4 +56,12 @@ CREATE TABLE public.latest (
     used integer NOT NULL DEFAULT 0,
     total integer NOT NULL DEFAULT 0,
     error integer NOT NULL DEFAULT 0
-);
\ No newline at end of file
+);
+
+-- 4. Latest 心跳表 (单行)
+-- latest 只写入计数变化的行；每轮抓取更新这一行，表示 latest 中其余行截至 snapshot_time 仍然有效
+CREATE TABLE public.latest_heartbeat (
+    id smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    snapshot_time timestamptz NOT NULL,
+    stations integer NOT NULL DEFAULT 0
+);
@@ -0,0 +1,259 @@
+"""
+本地 SQLite 存储：与 usage_repo / station_repo 相同的读写操作，落在本地的 WAL 模式数据库中
+
+两种用法（由服务端 STORAGE_BACKEND 选择，见 server/api.py）：
+- primary：SQLite 是唯一的存储，不访问 Supabase，整个服务可以完全离线运行和做基准测试；
+- cache：先写本地 SQLite 再写 Supabase，读取 latest / stations 时优先读本地，本地为空才查询 Supabase。
+
+表结构与 db/setup.sql 一致（时间以 ISO 字符串保存，device_ids 以 JSON 文本保存）。
+每次写入是一个事务，多行写入用 executemany 一次提交；WAL 模式下读取不会被写入阻塞。
+连接在线程间共享（usage 后写缓冲在线程中写入），所有操作由同一把锁串行化。
+"""
+
+# db/sqlite_store.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    hash_id TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    name TEXT NOT NULL,
+    campus_id INTEGER,
+    campus_name TEXT,
+    lat REAL,
+    lon REAL,
+    device_ids TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stations_provider_idx ON stations (provider);
+
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY,
+    hash_id TEXT NOT NULL,
+    snapshot_time TEXT NOT NULL,
+    free INTEGER NOT NULL DEFAULT 0,
+    used INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    error INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (hash_id, snapshot_time)
+);
+CREATE INDEX IF NOT EXISTS usage_time_idx ON usage (snapshot_time);
+
+CREATE TABLE IF NOT EXISTS latest (
+    hash_id TEXT PRIMARY KEY,
+    snapshot_time TEXT NOT NULL,
+    free INTEGER NOT NULL DEFAULT 0,
+    used INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    error INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS latest_heartbeat (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    snapshot_time TEXT NOT NULL,
+    stations INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# 单条查询中 IN 列表的最大长度（旧版 SQLite 的参数上限为 999）
+QUERY_CHUNK = 500
+
+USAGE_COLUMNS = ("hash_id", "snapshot_time", "free", "used", "total", "error")
+STATION_COLUMNS = (
+    "hash_id",
+    "provider",
+    "name",
+    "campus_id",
+    "campus_name",
+    "lat",
+    "lon",
+    "device_ids",
+    "updated_at",
+)
+
+
+def _upsert_sql(table: str, columns: tuple, key: str, ignore: bool = False) -> str:
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) ON CONFLICT ({key}) "
+    if ignore:
+        return sql + "DO NOTHING"
+    updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col not in key.split(", "))
+    return sql + f"DO UPDATE SET {updates}"
+
+
+INSERT_USAGE_SQL = _upsert_sql("usage", USAGE_COLUMNS, "hash_id, snapshot_time", ignore=True)
+UPSERT_LATEST_SQL = _upsert_sql("latest", USAGE_COLUMNS, "hash_id")
+UPSERT_STATION_SQL = _upsert_sql("stations", STATION_COLUMNS, "hash_id")
+UPSERT_HEARTBEAT_SQL = _upsert_sql("latest_heartbeat", ("id", "snapshot_time", "stations"), "id")
+
+
+class SQLiteStore:
+    """本地 SQLite 数据库；未打开时 enabled 为 False，各仓库函数直接走 Supabase"""
+
+    def __init__(self):
+        self.path = ""
+        self.primary = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def open(self, path: str, primary: bool = True) -> bool:
+        """打开（必要时创建）数据库文件并建表；primary 为 False 时作为 Supabase 前面的本地缓存"""
+        self.close()
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL 模式下 NORMAL 只在检查点时 fsync，断电最多丢失最近的事务，不会损坏数据库
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.row_factory = sqlite3.Row
+        except (OSError, sqlite3.Error) as exc:
+            logger.error("打开 SQLite 数据库失败 %s: %s", path, exc, exc_info=True)
+            return False
+
+        self._conn, self.path, self.primary = conn, path, primary
+        logger.info("SQLite 存储已打开（%s）：%s", "主存储" if primary else "本地缓存", path)
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _executemany(self, sql: str, params: List[tuple]) -> bool:
+        if not params:
+            return True
+        with self._lock:
+            if self._conn is None:
+                return False
+            try:
+                with self._conn:
+                    self._conn.executemany(sql, params)
+                return True
+            except sqlite3.Error as exc:
+                logger.error("SQLite 写入失败: %s", exc, exc_info=True)
+                return False
+
+    def _query(self, sql: str, params: tuple = ()) -> Optional[List[sqlite3.Row]]:
+        with self._lock:
+            if self._conn is None:
+                return None
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as exc:
+                logger.error("SQLite 查询失败: %s", exc, exc_info=True)
+                return None
+
+    # --- 写入：与 usage_repo / station_repo 的行数据格式一致 ---
+
+    def insert_usage(self, records: List[Dict[str, Any]]) -> bool:
+        """写入 usage 行，已存在的 (hash_id, snapshot_time) 保持不变"""
+        return self._executemany(
+            INSERT_USAGE_SQL, [tuple(r[col] for col in USAGE_COLUMNS) for r in records]
+        )
+
+    def upsert_latest(self, records: List[Dict[str, Any]]) -> bool:
+        return self._executemany(
+            UPSERT_LATEST_SQL, [tuple(r[col] for col in USAGE_COLUMNS) for r in records]
+        )
+
+    def write_latest_heartbeat(self, snapshot_time: str, station_count: int) -> bool:
+        return self._executemany(UPSERT_HEARTBEAT_SQL, [(1, snapshot_time, station_count)])
+
+    def upsert_station_rows(self, rows: List[Dict[str, Any]]) -> bool:
+        params = []
+        for row in rows:
+            values = {**row, "device_ids": json.dumps(row.get("device_ids") or [])}
+            params.append(tuple(values.get(col) for col in STATION_COLUMNS))
+        return self._executemany(UPSERT_STATION_SQL, params)
+
+    def write(self, table: str, rows: List[Dict[str, Any]]) -> bool:
+        """按表名写入行数据（usage / latest / stations）"""
+        writers = {
+            "usage": self.insert_usage,
+            "latest": self.upsert_latest,
+            "stations": self.upsert_station_rows,
+        }
+        writer = writers.get(table)
+        if writer is None:
+            logger.error("SQLite 存储不支持的表: %s", table)
+            return False
+        return writer(rows)
+
+    # --- 读取：返回格式与 Supabase 查询结果一致 ---
+
+    def load_latest(self) -> Optional[Dict[str, Any]]:
+        """latest 表的全部行，updated_at 取各行 snapshot_time 与心跳中的较新者；表为空时返回 None"""
+        rows = self._query(f"SELECT {', '.join(USAGE_COLUMNS)} FROM latest")
+        if not rows:
+            return None
+        heartbeat = self._query("SELECT snapshot_time FROM latest_heartbeat WHERE id = 1")
+        timestamps = [row["snapshot_time"] for row in rows]
+        if heartbeat:
+            timestamps.append(heartbeat[0]["snapshot_time"])
+        return {"updated_at": max(timestamps), "rows": [dict(row) for row in rows]}
+
+    def fetch_station_metadata(
+        self,
+        station_ids: Optional[List[str]] = None,
+        provider: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """hash_id -> 站点行；station_ids 按 QUERY_CHUNK 分批查询，避免超出 SQLite 的参数个数上限"""
+        if station_ids:
+            chunks = [
+                station_ids[i : i + QUERY_CHUNK] for i in range(0, len(station_ids), QUERY_CHUNK)
+            ]
+        else:
+            chunks = [None]
+
+        metadata = {}
+        for chunk in chunks:
+            sql = f"SELECT {', '.join(STATION_COLUMNS)} FROM stations"
+            conditions, params = [], []
+            if chunk:
+                conditions.append(f"hash_id IN ({', '.join('?' for _ in chunk)})")
+                params.extend(chunk)
+            if provider:
+                conditions.append("provider = ?")
+                params.append(provider)
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+
+            for row in self._query(sql, tuple(params)) or []:
+                item = dict(row)
+                item["device_ids"] = json.loads(item["device_ids"] or "[]")
+                metadata[item["hash_id"]] = item
+        return metadata
+
+
+# 服务端按 STORAGE_BACKEND 打开的本地数据库
+sqlite_store = SQLiteStore()
+
+
+def write_local(table: str, rows: List[Dict[str, Any]]) -> Optional[bool]:
+    """
+    写入本地 SQLite（已打开时）。
+
+    Returns:
+        SQLite 为主存储时返回写入结果，调用方不再写 Supabase；否则返回 None，调用方继续写 Supabase。
+    """
+    if not sqlite_store.enabled:
+        return None
+    ok = sqlite_store.write(table, rows)
+    return ok if sqlite_store.primary else None
@@ -21,6 +21,8 @@ from typing import List, Dict, Any, Optional
 
 # 移除对 Station 类的依赖
 from .client import get_supabase_client
+from .outbox import write_outbox
+from .sqlite_store import sqlite_store, write_local
 
 logger = logging.getLogger(__name__)
 
@@ -42,16 +44,37 @@ def upsert_station(
     为了降低耦合，理想情况是此函数接受 Dict 而非 Station 对象，
     但为保留数据写入的原结构，暂保持原样。
     """
+    station_id = getattr(station, "hash_id", None)
+    if not station_id:
+        logger.error("站点信息缺少 hash_id 字段")
+        return False
+    station_data = build_station_rows([station])[0]
+
+    local = write_local("stations", [station_data])
+    if local is not None:
+        return local
     client = get_supabase_client()
     if client is None:
         return False
 
     try:
-        # 假设 station 对象有 hash_id, name, provider 等属性
+        # 执行 upsert 操作
+        client.table("stations").upsert(station_data).execute()
+        logger.debug(f"成功插入/更新站点: {station_id}")
+        return True
+    except Exception as e:
+        logger.error(f"插入/更新站点失败: {e}", exc_info=True)
+        return False
+
+
+def build_station_rows(stations: List[Any]) -> List[Dict[str, Any]]:
+    """将 Station 对象转换为 stations 表的行数据（跳过缺少 hash_id 的站点）"""
+    station_data_list = []
+    for station in stations:
         station_id = getattr(station, "hash_id", None)
         if not station_id:
-            logger.error("站点信息缺少 hash_id 字段")
-            return False
+            logger.warning(f"跳过缺少 hash_id 的站点: {getattr(station, 'name', 'unknown')}")
+            continue
 
         station_data = {
             "hash_id": station_id,
@@ -64,69 +87,64 @@ def upsert_station(
             "device_ids": getattr(station, "device_ids", []),
             "updated_at": getattr(station, "updated_at", None),
         }
+        station_data_list.append(station_data)
+    return station_data_list
 
-        # 执行 upsert 操作
-        client.table("stations").upsert(station_data).execute()
-        logger.debug(f"成功插入/更新站点: {station_id}")
-        return True
-    except Exception as e:
-        logger.error(f"插入/更新站点失败: {e}", exc_info=True)
-        return False
 
+def upsert_station_rows(rows: List[Dict[str, Any]], spool: bool = True) -> bool:
+    """
+    按主键 upsert 已构建好的 stations 行数据。
 
-def batch_upsert_stations(stations: List[Any]) -> bool:  # 类型改为 List[Any]
-    """批量插入或更新站点基础信息 (stations 表)"""
+    Args:
+        rows: build_station_rows 产出的行数据。
+        spool: 写入失败时是否存入 outbox（db/outbox.py）等待重放。
+    """
+    if not rows:
+        return True
+    local = write_local("stations", rows)
+    if local is not None:
+        return local
     client = get_supabase_client()
     if client is None:
         return False
 
-    if not stations:
-        logger.warning("站点列表为空，跳过批量插入")
-        return True
-
     try:
-        # 将 Station 对象转换为字典列表
-        station_data_list = []
-        for station in stations:
-            station_id = getattr(station, "hash_id", None)
-            if not station_id:
-                logger.warning(f"跳过缺少 hash_id 的站点: {getattr(station, 'name', 'unknown')}")
-                continue
-
-            station_data = {
-                "hash_id": station_id,
-                "name": getattr(station, "name", None),
-                "provider": getattr(station, "provider", None),
-                "campus_id": getattr(station, "campus_id", None),
-                "campus_name": getattr(station, "campus_name", None),
-                "lat": getattr(station, "lat", None),
-                "lon": getattr(station, "lon", None),
-                "device_ids": getattr(station, "device_ids", []),
-                "updated_at": getattr(station, "updated_at", None),
-            }
-            station_data_list.append(station_data)
-
-        if not station_data_list:
-            logger.warning("没有有效的站点数据可插入")
-            return True
-
-        # 执行批量 upsert
-        client.table("stations").upsert(station_data_list).execute()
-        logger.info(f"成功批量插入/更新 {len(station_data_list)} 个站点")
+        client.table("stations").upsert(rows).execute()
+        logger.info(f"成功批量插入/更新 {len(rows)} 个站点")
         return True
     except Exception as e:
         logger.error(f"批量插入/更新站点失败: {e}", exc_info=True)
+        if spool:
+            write_outbox.append("stations", rows)
         return False
 
 
+def batch_upsert_stations(stations: List[Any]) -> bool:  # 类型改为 List[Any]
+    """批量插入或更新站点基础信息 (stations 表)，失败的批次存入 outbox 等待重放"""
+    if not stations:
+        logger.warning("站点列表为空，跳过批量插入")
+        return True
+
+    station_data_list = build_station_rows(stations)
+    if not station_data_list:
+        logger.warning("没有有效的站点数据可插入")
+        return True
+
+    return upsert_station_rows(station_data_list)
+
+
 def fetch_station_metadata(
     station_ids: Optional[List[str]] = None,
     provider: Optional[str] = None,
 ) -> Dict[str, Dict[str, Any]]:
     """
     读取站点基础信息，返回 hash_id -> metadata 的映射 (原始数据库字典格式)。
-    这是 DB 层的最底层查询接口。
+    这是 DB 层的最底层查询接口。启用本地 SQLite 时优先读取本地，本地没有结果才查询 Supabase。
     """
+    if sqlite_store.enabled:
+        metadata = sqlite_store.fetch_station_metadata(station_ids, provider)
+        if metadata or sqlite_store.primary:
+            return metadata
     client = get_supabase_client()
     if client is None:
         return {}
@@ -21,6 +21,14 @@ free,integer,可用数量,stations[*].free,NOT NULL
 used,integer,已用数量,stations[*].used,NOT NULL
 total,integer,总数,stations[*].total,NOT NULL
 error,integer,故障数量,stations[*].error,NOT NULL
+
+
+latest_heartbeat 表（单行）
+
+字段名,数据类型 (PostgreSQL),描述,对应 Fetcher 字段,约束
+id,smallint,固定为 1,N/A,Primary Key
+snapshot_time,timestamptz,最近一次完整确认 latest 的抓取时间,updated_at,NOT NULL
+stations,integer,本次确认的站点数,len(stations),NOT NULL
 """
 
 # db/usage_repo.py
@@ -29,16 +37,32 @@ import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from .client import get_supabase_client
+from .outbox import write_outbox
+from .sqlite_store import sqlite_store, write_local
 
 logger = logging.getLogger(__name__)
 
 LATEST_TABLE_NAME = "latest"
 USAGE_TABLE_NAME = "usage"
+# latest 只写入计数变化的行，未变化的行由这张单行表的 snapshot_time 统一表示「仍然有效」
+HEARTBEAT_TABLE_NAME = "latest_heartbeat"
 DEFAULT_RETURNING = "minimal"
+# usage 表的唯一约束 UNIQUE (hash_id, snapshot_time)：按它 upsert 并忽略重复行，重放同一批次不会产生重复记录
+USAGE_CONFLICT_COLUMNS = "hash_id,snapshot_time"
 
 # --- 公共接口实现 ---
 
 
+def _write_usage_rows(client: Any, records: List[Dict[str, Any]]):
+    """幂等写入 usage 行：已存在的 (hash_id, snapshot_time) 保持不变"""
+    client.table(USAGE_TABLE_NAME).upsert(
+        records,
+        on_conflict=USAGE_CONFLICT_COLUMNS,
+        ignore_duplicates=True,
+        returning=DEFAULT_RETURNING,
+    ).execute()
+
+
 def insert(data: Dict[str, Any], sheet_name: str) -> bool:
     """
     插入单条使用情况记录。
@@ -47,10 +71,6 @@ def insert(data: Dict[str, Any], sheet_name: str) -> bool:
         data: 包含单个站点信息的字典。
         sheet_name: 目标表单名称 ('latest' 或 'usage')。
     """
-    client = get_supabase_client()
-    if client is None:
-        return False
-
     table_name = sheet_name.lower()
     if table_name not in [LATEST_TABLE_NAME, USAGE_TABLE_NAME]:
         logger.error(f"无效的表名: {sheet_name}")
@@ -75,6 +95,13 @@ def insert(data: Dict[str, Any], sheet_name: str) -> bool:
         logger.warning("跳过单条插入：缺少 hash_id")
         return False
 
+    local = write_local(table_name, [record])
+    if local is not None:
+        return local
+    client = get_supabase_client()
+    if client is None:
+        return False
+
     # 必要的 try-catch 块，用于处理数据库交互错误
     try:
         if table_name == LATEST_TABLE_NAME:
@@ -83,8 +110,8 @@ def insert(data: Dict[str, Any], sheet_name: str) -> bool:
                 [record], on_conflict="hash_id", returning=DEFAULT_RETURNING
             ).execute()
         else:
-            # 针对 usage 表使用 insert (单条)
-            client.table(table_name).insert([record], returning=DEFAULT_RETURNING).execute()
+            # 针对 usage 表按唯一约束幂等写入 (单条)
+            _write_usage_rows(client, [record])
 
         logger.debug(f"成功插入/更新 {table_name} 单条记录。")
         return True
@@ -94,18 +121,47 @@ def insert(data: Dict[str, Any], sheet_name: str) -> bool:
         return False
 
 
+def build_usage_records(stations: List[Any], snapshot_time: str) -> List[Dict[str, Any]]:
+    """
+    将站点状态列表转换为 latest / usage 表的行数据（跳过缺少 hash_id 的记录）。
+
+    Args:
+        stations: StationStatus 或字典列表。
+        snapshot_time: 本批记录的抓取时间。
+    """
+    usage_records = []
+    for station in stations:
+        # 状态记录（fetcher.station.StationStatus）直接产出行数据，无需逐字段读取
+        to_usage_row = getattr(station, "to_usage_row", None)
+        if to_usage_row is not None:
+            usage_records.append(to_usage_row(snapshot_time))
+            continue
+
+        station_id = station.get("id") or station.get("hash_id")
+        if not station_id:
+            continue  # 跳过缺少 id 的记录
+
+        usage_records.append(
+            {
+                "hash_id": station_id,
+                "snapshot_time": snapshot_time,
+                "free": int(station.get("free", 0)),
+                "used": int(station.get("used", 0)),
+                "total": int(station.get("total", 0)),
+                "error": int(station.get("error", 0)),
+            }
+        )
+    return usage_records
+
+
 def batch_insert(data: Dict[str, Any], sheet_name: str) -> bool:
     """
     批量插入使用情况记录。
 
     Args:
-        data: 包含 'stations' (List[Dict]) 和 'updated_at' (str) 的字典。
+        data: 包含 'stations' (List[StationStatus] 或 List[Dict]) 和 'updated_at' (str) 的字典。
         sheet_name: 目标表单名称 ('latest' 或 'usage')。
     """
-    client = get_supabase_client()
-    if client is None:
-        return False
-
     table_name = sheet_name.lower()
     if table_name not in [LATEST_TABLE_NAME, USAGE_TABLE_NAME]:
         logger.error(f"无效的表名: {sheet_name}")
@@ -122,31 +178,22 @@ def batch_insert(data: Dict[str, Any], sheet_name: str) -> bool:
         logger.warning(f"站点列表为空，跳过批量插入 {table_name}。")
         return True
 
-    usage_records = []
-    # 准备批量插入的数据
-    for station in stations:
-        station_id = station.get("id") or station.get("hash_id")
-        if not station_id:
-            continue  # 跳过缺少 id 的记录
-
-        usage_records.append(
-            {
-                "hash_id": station_id,
-                "snapshot_time": snapshot_time,
-                "free": int(station.get("free", 0)),
-                "used": int(station.get("used", 0)),
-                "total": int(station.get("total", 0)),
-                "error": int(station.get("error", 0)),
-            }
-        )
+    usage_records = build_usage_records(stations, snapshot_time)
 
     if not usage_records:
         logger.warning(f"没有有效的使用情况记录可插入 {table_name} 表。")
         return True
 
+    local = write_local(table_name, usage_records)
+    if local is not None:
+        return local
+    client = get_supabase_client()
+    if client is None:
+        return False
+
     # 必要的 try-catch 块
     try:
-        # 针对 latest 表使用 upsert，针对 usage 表使用 insert
+        # 针对 latest 表使用 upsert，针对 usage 表按唯一约束幂等写入
         if table_name == LATEST_TABLE_NAME:
             client.table(table_name).upsert(
                 usage_records,
@@ -155,7 +202,7 @@ def batch_insert(data: Dict[str, Any], sheet_name: str) -> bool:
             ).execute()
             action = "更新/插入"
         else:
-            client.table(table_name).insert(usage_records, returning=DEFAULT_RETURNING).execute()
+            _write_usage_rows(client, usage_records)
             action = "插入"
 
         logger.info(f"成功批量 {action} {table_name} {len(usage_records)} 条记录。")
@@ -163,14 +210,116 @@ def batch_insert(data: Dict[str, Any], sheet_name: str) -> bool:
 
     except Exception as e:
         logger.error(f"批量数据库操作失败: {e}", exc_info=True)
+        if table_name == USAGE_TABLE_NAME:
+            write_outbox.append(USAGE_TABLE_NAME, usage_records)
+        return False
+
+
+def upsert_latest(records: List[Dict[str, Any]]) -> bool:
+    """
+    将已构建好的行数据 upsert 到 latest 表（用于只写入变化的行）。
+
+    Args:
+        records: build_usage_records 产出的行数据。
+    """
+    if not records:
+        return True
+    local = write_local(LATEST_TABLE_NAME, records)
+    if local is not None:
+        return local
+    client = get_supabase_client()
+    if client is None:
         return False
 
+    try:
+        client.table(LATEST_TABLE_NAME).upsert(
+            records, on_conflict="hash_id", returning=DEFAULT_RETURNING
+        ).execute()
+        logger.info(f"成功批量 更新/插入 {LATEST_TABLE_NAME} {len(records)} 条记录。")
+        return True
+    except Exception as e:
+        logger.error(f"批量更新 latest 失败: {e}", exc_info=True)
+        return False
+
+
+def insert_usage(records: List[Dict[str, Any]], spool: bool = True) -> bool:
+    """
+    将已构建好的行数据一次性插入 usage 历史表（可包含多轮抓取的行），重复的行会被忽略。
+
+    Args:
+        records: build_usage_records 产出的行数据。
+        spool: 写入失败时是否存入 outbox（db/outbox.py）等待重放。
+    """
+    if not records:
+        return True
+    local = write_local(USAGE_TABLE_NAME, records)
+    if local is not None:
+        return local
+    client = get_supabase_client()
+    if client is None:
+        return False
+
+    try:
+        _write_usage_rows(client, records)
+        logger.info(f"成功批量 插入 {USAGE_TABLE_NAME} {len(records)} 条记录。")
+        return True
+    except Exception as e:
+        logger.error(f"批量插入 usage 失败: {e}", exc_info=True)
+        if spool:
+            write_outbox.append(USAGE_TABLE_NAME, records)
+        return False
+
+
+def write_latest_heartbeat(snapshot_time: str, station_count: int) -> bool:
+    """
+    更新 latest_heartbeat 单行表：表示 latest 中所有行截至 snapshot_time 仍然有效。
+
+    Args:
+        snapshot_time: 本次抓取时间。
+        station_count: 本次确认的站点数。
+    """
+    if sqlite_store.enabled:
+        local_ok = sqlite_store.write_latest_heartbeat(snapshot_time, station_count)
+        if sqlite_store.primary:
+            return local_ok
+    client = get_supabase_client()
+    if client is None:
+        return False
+
+    try:
+        client.table(HEARTBEAT_TABLE_NAME).upsert(
+            [{"id": 1, "snapshot_time": snapshot_time, "stations": station_count}],
+            on_conflict="id",
+            returning=DEFAULT_RETURNING,
+        ).execute()
+        return True
+    except Exception as e:
+        logger.warning(f"更新 {HEARTBEAT_TABLE_NAME} 失败: {e}")
+        return False
+
+
+def _load_heartbeat(client: Any) -> Optional[str]:
+    """读取 latest_heartbeat 的时间（表不存在或为空时返回 None）"""
+    try:
+        response = client.table(HEARTBEAT_TABLE_NAME).select("snapshot_time").execute()
+    except Exception as exc:
+        logger.debug(f"读取 {HEARTBEAT_TABLE_NAME} 失败: {exc}")
+        return None
+    rows = response.data or []
+    return rows[0].get("snapshot_time") if rows else None
+
 
 def load_latest() -> Optional[Dict[str, Any]]:
     """
-    从 Supabase latest 表读取缓存数据。
+    从 Supabase latest 表读取缓存数据（启用本地 SQLite 时优先读取本地）。
     返回格式: {"updated_at": latest_snapshot_time (str), "rows": List[Dict]}
+
+    latest 只写入变化的行，因此 updated_at 取各行 snapshot_time 与 latest_heartbeat 中的较新者。
     """
+    if sqlite_store.enabled:
+        cached = sqlite_store.load_latest()
+        if cached is not None or sqlite_store.primary:
+            return cached
     client = get_supabase_client()
     if client is None:
         return None
@@ -188,6 +337,9 @@ def load_latest() -> Optional[Dict[str, Any]]:
             return None
 
         timestamps = [row.get("snapshot_time") for row in rows if row.get("snapshot_time")]
+        heartbeat = _load_heartbeat(client)
+        if heartbeat:
+            timestamps.append(heartbeat)
         latest_timestamp = max(timestamps) if timestamps else None
         return {"updated_at": latest_timestamp, "rows": rows}
 
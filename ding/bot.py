@@ -3,6 +3,8 @@
 from dingtalkchatbot.chatbot import DingtalkChatbot
 from datetime import datetime, timezone, timedelta
 
+from fetcher.columnar import ColumnarSnapshot
+
 
 class DingBot:
     def __init__(self, webhook, secret):
@@ -19,7 +21,8 @@ class DingBot:
         """格式化状态消息
 
         Args:
-            data: API 响应数据，格式为 {"updated_at": "...", "stations": [...]}
+            data: API 响应数据，格式为 {"updated_at": "...", "stations": [...]}；
+                stations 可以是 API 返回的字典，也可以是直接来自抓取结果的 StationStatus 记录
             show_all: 是否显示所有站点（包括无空闲的）
 
         Returns:
@@ -28,52 +31,36 @@ class DingBot:
         if not data or not data.get("stations"):
             return "暂无数据"
 
-        stations = data["stations"]
         updated_at = data.get("updated_at", self._get_timestamp())
+        snapshot = ColumnarSnapshot.from_records(data["stations"])
 
-        # 过滤站点
-        if not show_all:
-            # 只显示有空闲的站点
-            stations = [s for s in stations if s.get("free", 0) > 0]
+        # 过滤站点：默认只显示有空闲的站点
+        mask = None if show_all else snapshot.free > 0
+        # 按空闲数量排序
+        order = snapshot.top_free(limit=snapshot.size, mask=mask)
 
-        if not stations:
+        if not order:
             return f"当前时间：{updated_at}\n\n暂无可用充电桩"
 
-        # 按空闲数量排序
-        stations.sort(key=lambda x: x.get("free", 0), reverse=True)
-
         message = f"> 当前空闲情况（{updated_at}）\n\n"
 
-        total_free = 0
-        total_used = 0
-        total_error = 0
-        total_total = 0
-
-        for station in stations:
-            name = station.get("name", "未知站点")
-            free = station.get("free", 0)
-            used = station.get("used", 0)
-            error = station.get("error", 0)
-            total = station.get("total", 0)
-
-            total_free += free
-            total_used += used
-            total_error += error
-            total_total += total
-
+        for position in order:
+            name = snapshot.records[position].get("name", "未知站点")
+            free = int(snapshot.free[position])
             if free > 0:
                 message += f"[可用 {free}] {name}\n"
             else:
                 message += f"[可用 0] {name}（无空闲）\n"
 
+        totals = snapshot.totals(mask)
         message += f"\n##### **总计**\n"
-        message += f"**{total_free}**可用/"
-        message += f"**{total_used}**已用/"
-        message += f"**{total_error}**错误/"
-        message += f"**{total_total}**总端口\n"
+        message += f"**{totals['free']}**可用/"
+        message += f"**{totals['used']}**已用/"
+        message += f"**{totals['error']}**错误/"
+        message += f"**{totals['total']}**总端口\n"
 
-        if total_total - total_error > 0:
-            usage_rate = (total_used / (total_total - total_error)) * 100
+        if totals["total"] - totals["error"] > 0:
+            usage_rate = totals["usage_rate"] * 100
             message += f"\n使用率: **{usage_rate:.2f}%**\n"
 
         return message
@@ -0,0 +1,212 @@
+"""站点目录的编译缓存
+
+解析站点 CSV 需要逐行 ``csv.DictReader``、对每个 ``device_ids`` 单元格 ``json.loads``、
+为每个站点计算 md5 ``hash_id``，每个进程（包括每个 worker）启动时都要重做一遍。
+本模块把解析结果（每个站点一个字段列表）连同源文件的大小、mtime 与 sha256
+写入一个 JSON 缓存文件（默认 ``.cache/station_catalog.json``，多个 worker 共享）：
+
+- 进程内第一次加载站点时一次读入整个缓存文件，之后各服务商的加载都不再读盘；
+- 源文件的大小与 mtime 未变时直接使用缓存；变化了但内容 sha256 相同（如重新 checkout）时
+  也使用缓存，只更新记录的 mtime；内容变化时重新解析 CSV 并重写缓存（临时文件 + 原子替换）；
+- 缓存格式或 ``Station`` 字段变化时整个缓存失效。
+
+缓存只保存数据（JSON），不使用 pickle：缓存目录可被其他用户写入时，读取缓存也不会执行任意代码；
+内容不符合预期结构的缓存条目按未命中处理，重新解析 CSV。
+
+每次加载都从缓存的字段重新构建独立的 ``Station`` 对象，与直接解析 CSV 一样可以各自修改。
+构建时跳过 ``__init__`` / ``__post_init__``（缓存中的字段已是规范化后的值，``hash_id`` 无需重算），
+``updated_at`` 设为加载时刻，与解析 CSV 时的默认值一致。
+"""
+
+import dataclasses
+import hashlib
+import logging
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fetcher.station import Station, StationUsage, _now_ts, load_stations_from_csv
+from server.config import Config
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+# 缓存中每个站点保存的字段；其余字段（updated_at / usage / index）在加载时取默认值
+CACHED_FIELDS = (
+    "name",
+    "provider",
+    "campus_id",
+    "campus_name",
+    "lat",
+    "lon",
+    "device_ids",
+    "hash_id",
+)
+# Station 字段变化时旧缓存失效；新增了未知字段时不再使用缓存，避免构建出缺字段的对象
+_STATION_FIELDS = tuple(f.name for f in dataclasses.fields(Station))
+_SUPPORTED = set(_STATION_FIELDS) == set(CACHED_FIELDS) | {"updated_at", "usage", "index"}
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _station_rows(stations: List[Station]) -> List[List[Any]]:
+    return [
+        [
+            s.name,
+            s.provider,
+            s.campus_id,
+            s.campus_name,
+            s.lat,
+            s.lon,
+            list(s.device_ids),
+            s.hash_id,
+        ]
+        for s in stations
+    ]
+
+
+def _valid_entry(entry: Any) -> bool:
+    """缓存条目是否符合预期结构（源文件信息与各站点行的字段个数、类型）"""
+    if not (
+        isinstance(entry, dict)
+        and isinstance(entry.get("size"), int)
+        and isinstance(entry.get("mtime_ns"), int)
+        and isinstance(entry.get("sha256"), str)
+    ):
+        return False
+    rows = entry.get("stations")
+    return isinstance(rows, list) and all(
+        isinstance(row, list)
+        and len(row) == len(CACHED_FIELDS)
+        and isinstance(row[0], str)
+        and isinstance(row[1], str)
+        and isinstance(row[6], list)
+        and isinstance(row[7], str)
+        for row in rows
+    )
+
+
+def _build_stations(rows: List[List[Any]]) -> List[Station]:
+    """由字段列表直接构建 Station（绕过 dataclass 构造，约为解析 CSV 的 1/4 耗时）"""
+    now = _now_ts()
+    new = object.__new__
+    stations = []
+    for name, provider, campus_id, campus_name, lat, lon, device_ids, hash_id in rows:
+        usage = new(StationUsage)
+        usage.__dict__ = {"free": 0, "used": 0, "total": 0, "error": 0}
+        station = new(Station)
+        station.__dict__ = {
+            "name": name,
+            "provider": provider,
+            "campus_id": campus_id,
+            "campus_name": campus_name,
+            "lat": lat,
+            "lon": lon,
+            "device_ids": list(device_ids),
+            "updated_at": now,
+            "hash_id": hash_id,
+            "usage": usage,
+            "index": -1,
+        }
+        stations.append(station)
+    return stations
+
+
+class StationCatalogCache:
+    """站点 CSV 的编译缓存，路径为空时不缓存、直接解析 CSV"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path and _SUPPORTED else None
+        if path and not _SUPPORTED:
+            logger.warning("Station 字段与站点目录缓存不一致，已停用缓存，请更新 CACHED_FIELDS")
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """读入整个缓存文件（每个进程只读一次）"""
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if self.path is None or not self.path.exists():
+            return self._entries
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("读取站点目录缓存失败，将重新解析 CSV: %s", exc)
+            return self._entries
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != CACHE_VERSION
+            or data.get("fields") != list(_STATION_FIELDS)
+            or not isinstance(data.get("entries"), dict)
+        ):
+            logger.info("站点目录缓存格式已变化，将重新解析 CSV")
+            return self._entries
+        self._entries = data["entries"]
+        return self._entries
+
+    def _write(self):
+        if self.path is None:
+            return
+        # 顺带清理已不存在的源文件（如基准生成的临时目录）
+        entries = {key: entry for key, entry in self._entries.items() if Path(key).exists()}
+        data = {"version": CACHE_VERSION, "fields": list(_STATION_FIELDS), "entries": entries}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(
+                json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8"
+            )
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logger.warning("写入站点目录缓存失败: %s", exc)
+
+    def load(self, csv_path: Path) -> List[Station]:
+        """加载一个站点 CSV，语义与 ``load_stations_from_csv`` 相同"""
+        if self.path is None:
+            return load_stations_from_csv(csv_path)
+
+        entries = self._read()
+        key = str(csv_path.resolve())
+        stat = csv_path.stat()
+        entry = entries.get(key)
+        if entry is not None and not _valid_entry(entry):
+            logger.warning("站点目录缓存条目格式不正确，将重新解析 CSV: %s", csv_path)
+            entry = None
+        if entry is not None and (entry["size"], entry["mtime_ns"]) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            if entry["sha256"] == _sha256(csv_path):
+                entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                self._write()
+            else:
+                entry = None
+
+        if entry is None:
+            self.misses += 1
+            digest = _sha256(csv_path)
+            stations = load_stations_from_csv(csv_path)
+            entries[key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest,
+                "stations": _station_rows(stations),
+            }
+            self._write()
+            return stations
+
+        self.hits += 1
+        return _build_stations(entry["stations"])
+
+    def invalidate(self):
+        """丢弃进程内已读入的缓存，下次加载时重新读取缓存文件"""
+        self._entries = None
+
+
+# 所有服务商共享的站点目录缓存
+station_catalog = StationCatalogCache(Config.STATION_CATALOG_CACHE_PATH)
@@ -0,0 +1,161 @@
+"""快照的列式（NumPy）表示
+
+把一次快照中的站点状态按站点全局下标（``Station.index``）摊平成若干等长数组：
+free / used / total / error 计数、服务商编码、校区编码和过期标记。
+校区 / 服务商汇总、筛选、排序都变成对整列的向量化运算，不再逐条遍历字典。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from fetcher.station import CAMPUS_NAME_MAP
+
+COUNT_FIELDS = ("free", "used", "total", "error")
+
+
+def _usage_rate(used: np.ndarray, total: np.ndarray, error: np.ndarray) -> np.ndarray:
+    """使用率 = used / (total - error)，可用端口为 0 时为 0"""
+    usable = total - error
+    return np.divide(used, usable, out=np.zeros(usable.shape, dtype=np.float64), where=usable > 0)
+
+
+class ColumnarSnapshot:
+    """按站点下标对齐的列式快照
+
+    Attributes:
+        free / used / total / error: int32 计数数组
+        provider_code: int16 服务商编码，对应 ``provider_names`` 中的下标
+        campus_id: int16 校区 ID
+        stale: 该站点数据是否为过期保留数据
+        present: 该下标在本次快照中是否有数据（目录中存在但尚未抓到的站点为 False）
+        hash_ids: 下标 -> hash_id
+        records: 下标 -> 原始记录（用于取回名称等非数值字段）
+    """
+
+    def __init__(self, size: int, provider_names: List[str]):
+        self.size = size
+        self.provider_names = provider_names
+        self.free = np.zeros(size, dtype=np.int32)
+        self.used = np.zeros(size, dtype=np.int32)
+        self.total = np.zeros(size, dtype=np.int32)
+        self.error = np.zeros(size, dtype=np.int32)
+        self.provider_code = np.full(size, -1, dtype=np.int16)
+        self.campus_id = np.zeros(size, dtype=np.int16)
+        self.stale = np.zeros(size, dtype=bool)
+        self.present = np.zeros(size, dtype=bool)
+        self.hash_ids: List[Optional[str]] = [None] * size
+        self.records: List[Any] = [None] * size
+        # 聚合结果缓存：同一快照只计算一次
+        self._aggregates: Dict[str, List[Dict[str, Any]]] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any], size: Optional[int] = None) -> "ColumnarSnapshot":
+        """由状态记录（StationStatus 或同键字典）构建列式快照
+
+        带有非负 ``index`` 的记录放到对应下标，其余记录依次追加在后面。
+        """
+        records = list(records)
+        indices = [record.get("index") for record in records]
+        indices = [i if isinstance(i, int) and i >= 0 else -1 for i in indices]
+        max_index = max((i for i in indices if i >= 0), default=-1)
+        next_free = max(max_index + 1, size or 0)
+        positions = []
+        for i in indices:
+            if i < 0:
+                i = next_free
+                next_free += 1
+            positions.append(i)
+
+        provider_names: List[str] = []
+        provider_lookup: Dict[str, int] = {}
+        snapshot = cls(next_free, provider_names)
+
+        pos = np.asarray(positions, dtype=np.int64)
+        for name in COUNT_FIELDS:
+            values = [int(record.get(name, 0) or 0) for record in records]
+            getattr(snapshot, name)[pos] = values
+
+        provider_codes = []
+        for record in records:
+            provider = record.get("provider") or ""
+            code = provider_lookup.get(provider)
+            if code is None:
+                code = provider_lookup[provider] = len(provider_names)
+                provider_names.append(provider)
+            provider_codes.append(code)
+        snapshot.provider_code[pos] = provider_codes
+        snapshot.campus_id[pos] = [int(record.get("campus_id", 0) or 0) for record in records]
+        snapshot.stale[pos] = [bool(record.get("stale")) for record in records]
+        snapshot.present[pos] = True
+        for position, record in zip(positions, records):
+            snapshot.hash_ids[position] = record.get("hash_id")
+            snapshot.records[position] = record
+        return snapshot
+
+    # --- 向量化查询 ---
+
+    def totals(self, mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """全部（或 mask 选中）站点的合计与使用率"""
+        selected = self.present if mask is None else (self.present & mask)
+        sums = {name: int(getattr(self, name)[selected].sum()) for name in COUNT_FIELDS}
+        usable = sums["total"] - sums["error"]
+        sums["usage_rate"] = sums["used"] / usable if usable > 0 else 0.0
+        sums["stations"] = int(selected.sum())
+        return sums
+
+    def usage_rate(self) -> np.ndarray:
+        """逐站点使用率"""
+        return _usage_rate(self.used, self.total, self.error)
+
+    def _group(self, codes: np.ndarray, labels: Dict[int, Any], key: str) -> List[Dict[str, Any]]:
+        present = self.present
+        codes = codes[present].astype(np.int64)
+        if codes.size == 0:
+            return []
+        offset = int(codes.min())
+        shifted = codes - offset
+        length = int(shifted.max()) + 1
+        counts = np.bincount(shifted, minlength=length)
+        sums = {
+            name: np.bincount(shifted, weights=getattr(self, name)[present], minlength=length)
+            for name in COUNT_FIELDS
+        }
+        stale = np.bincount(shifted, weights=self.stale[present], minlength=length)
+        rates = _usage_rate(sums["used"], sums["total"], sums["error"])
+
+        groups = []
+        for slot in np.nonzero(counts)[0]:
+            code = int(slot) + offset
+            group = {key: labels.get(code, code)}
+            group.update({name: int(sums[name][slot]) for name in COUNT_FIELDS})
+            group["usage_rate"] = round(float(rates[slot]), 4)
+            group["stations"] = int(counts[slot])
+            group["stale_stations"] = int(stale[slot])
+            groups.append(group)
+        return groups
+
+    def aggregate_by_campus(self) -> List[Dict[str, Any]]:
+        """按校区汇总（结果在本快照内缓存）"""
+        if "campus" not in self._aggregates:
+            groups = self._group(self.campus_id, {}, "campus_id")
+            for group in groups:
+                group["campus_name"] = CAMPUS_NAME_MAP.get(group["campus_id"], "")
+            self._aggregates["campus"] = groups
+        return self._aggregates["campus"]
+
+    def aggregate_by_provider(self) -> List[Dict[str, Any]]:
+        """按服务商汇总（结果在本快照内缓存）"""
+        if "provider" not in self._aggregates:
+            labels = dict(enumerate(self.provider_names))
+            self._aggregates["provider"] = self._group(self.provider_code, labels, "provider")
+        return self._aggregates["provider"]
+
+    def top_free(self, limit: int = 10, mask: Optional[np.ndarray] = None) -> List[int]:
+        """按空闲数降序返回前 limit 个站点下标"""
+        selected = self.present if mask is None else (self.present & mask)
+        candidates = np.nonzero(selected)[0]
+        if candidates.size == 0:
+            return []
+        order = np.argsort(-self.free[candidates], kind="stable")[:limit]
+        return [int(i) for i in candidates[order]]
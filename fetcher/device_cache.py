@@ -0,0 +1,152 @@
+"""设备级抓取结果缓存：TTL 过期 + 进行中请求去重
+
+同一个设备（或 neptune_junior 的区域 ID）可能同时出现在多个站点中，也可能刚被后台任务抓取过
+又被 ``/api/status`` 的实时抓取再次请求。本模块以 ``(服务商, 设备 ID)`` 为键缓存单个设备的
+抓取结果，并保证同一个键在同一时刻只有一个请求在飞，后来者直接等待该请求的结果。
+
+进行中的请求运行在发起方的 aiohttp 会话上，会话关闭后请求必然失败。发起方在关闭会话前调用
+``cancel_inflight(session)`` 取消该会话上的请求；已加入这些请求的其他等待者用自己的 fetch 重新请求，
+不会收到「Session is closed」错误。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from server.config import Config
+
+logger = logging.getLogger(__name__)
+
+DeviceResult = Tuple[Optional[Dict[str, Any]], Optional[Exception]]
+DeviceKey = Tuple[str, str]
+
+
+class DeviceResultCache:
+    """按 (服务商, 设备 ID) 缓存设备结果，后台任务与实时请求共享同一个实例
+
+    - 只缓存成功的结果（无异常且数据非空），失败结果不缓存，下次调用会重新请求；
+    - ``ttl <= 0`` 时不保留结果，但仍会合并同一时刻的重复请求；
+    - 条目数超过 ``max_entries`` 时优先清理过期条目，再按写入顺序淘汰最旧的条目。
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (过期时间戳, 结果)
+        self._entries: Dict[DeviceKey, Tuple[float, DeviceResult]] = {}
+        # key -> (进行中的请求任务, 请求所用的会话)
+        self._inflight: Dict[DeviceKey, Tuple[asyncio.Future, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: DeviceKey) -> Optional[DeviceResult]:
+        """返回未过期的缓存结果，不存在或已过期时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return result
+
+    def put(self, key: DeviceKey, result: DeviceResult):
+        """写入一条结果（失败结果与 ttl<=0 时忽略）"""
+        data, exc = result
+        if self.ttl <= 0 or exc is not None or data is None:
+            return
+        # 重新插入以维持按写入时间排序，便于淘汰最旧条目
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        if len(self._entries) > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            for key in list(self._entries)[:overflow]:
+                del self._entries[key]
+
+    def invalidate(self, key: Optional[DeviceKey] = None):
+        """清除指定键或全部缓存"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def _run(self, key: DeviceKey, fetch: Callable[[], Awaitable[DeviceResult]]):
+        try:
+            result = await fetch()
+        except Exception as exc:
+            result = (None, exc)
+        self.put(key, result)
+        return result
+
+    async def get_or_fetch(
+        self,
+        key: DeviceKey,
+        fetch: Callable[[], Awaitable[DeviceResult]],
+        owner: Any = None,
+    ) -> DeviceResult:
+        """命中缓存直接返回；同键请求进行中则等待其结果；否则发起请求并写入缓存
+
+        Args:
+            owner: fetch 所用的会话，关闭前通过 cancel_inflight 取消其上的请求
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                task = inflight[0]
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                # 请求在独立任务中执行：发起方被取消（如服务商超时）时不会连带取消其他等待者
+                task = asyncio.ensure_future(self._run(key, fetch))
+                self._inflight[key] = (task, owner)
+                task.add_done_callback(lambda t, k=key: self._discard(k, t))
+
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if not task.cancelled() or (current is not None and current.cancelling()):
+                    raise
+                # 加入的请求因其会话关闭被取消，而本调用方未被取消：用自己的 fetch 重新请求
+
+    def _discard(self, key: DeviceKey, task: asyncio.Future):
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] is task:
+            del self._inflight[key]
+
+    def cancel_inflight(self, owner: Any) -> int:
+        """取消在 owner（即将关闭的会话）上进行中的请求，返回取消的请求数"""
+        keys = [key for key, (_, task_owner) in self._inflight.items() if task_owner is owner]
+        for key in keys:
+            task, _ = self._inflight.pop(key)
+            task.cancel()
+        return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中 / 未命中 / 合并请求计数和当前条目数"""
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+# 全进程共享的设备结果缓存，后台抓取与 /api/status 实时抓取共用
+device_cache = DeviceResultCache(ttl=Config.DEVICE_CACHE_TTL, max_entries=Config.DEVICE_CACHE_SIZE)
@@ -0,0 +1,113 @@
+"""设备原始响应的指纹：响应与上一次完全相同时跳过解析，并把站点标记为未变化
+
+大多数设备在相邻两轮抓取之间返回的原始 JSON 完全相同。服务商拿到原始响应后经
+``payload_fingerprints.parse`` 解析：以 ``(scope, 设备 ID)`` 为键记住上一次响应的 blake2b 指纹与解析结果，
+指纹相同时直接复用上一次的计数。
+站点下全部设备都未变化时，服务商产出的 ``StationStatus.unchanged`` 为 True，下游可据此跳过该站点。
+
+「未变化」按抓取周期判定：``ProviderManager.fetch_all_providers`` 每轮开始时调用 ``begin_cycle``，
+设备结果的 ``"unchanged"`` 表示本次响应与「上一轮」最后一次响应的指纹相同，并带上所属周期 ``"cycle"``。
+因此同一轮中被多个站点共用、解析了多次的设备每次得到相同的标记；设备结果缓存中上一轮的结果
+在本轮命中时不算未变化（见 ``results_unchanged``）。
+
+指纹只在进程内存中保存，每个设备一条；解析失败的响应不会更新记录。
+"""
+
+import hashlib
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from server.config import Config
+
+FingerprintKey = Tuple[str, str]
+DeviceResult = Tuple[Optional[Dict[str, Any]], Optional[Exception]]
+
+
+def fingerprint(payload: Any) -> bytes:
+    """原始响应的 16 字节指纹
+
+    按 ``repr`` 计算：JSON 解码结果只含 dict / list / str / 数字 / None，repr 是确定的，
+    且比 ``json.dumps`` 快约 2.5 倍。键顺序与服务商返回的一致，顺序变化视为响应变化。
+    """
+    return hashlib.blake2b(repr(payload).encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def results_unchanged(results: Iterable[DeviceResult]) -> bool:
+    """一个站点的设备结果是否全部成功、都在本轮解析且都与上一轮的响应相同"""
+    seen = False
+    for data, exc in results:
+        if exc is not None or data is None or not data.get("unchanged"):
+            return False
+        if data.get("cycle") != payload_fingerprints.cycle:
+            return False
+        seen = True
+    return seen
+
+
+class PayloadFingerprints:
+    """按 (scope, 设备 ID) 记录上一次响应的指纹与解析结果"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # key -> (最近一次解析所在周期, 上一轮的指纹, 最近一次的指纹, 最近一次的解析结果)
+        self._entries: Dict[FingerprintKey, Tuple[int, Optional[bytes], bytes, Dict[str, Any]]] = {}
+        self.cycle = 0
+        self.changed = 0
+        self.unchanged = 0
+
+    def begin_cycle(self) -> int:
+        """开始新一轮抓取，此后的解析与本轮之前的最后一次响应比较"""
+        self.cycle += 1
+        return self.cycle
+
+    def parse(
+        self,
+        scope: str,
+        device_id: str,
+        payload: Any,
+        parse: Callable[[Any, str], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """解析原始响应，返回带 ``unchanged`` 与 ``cycle`` 标记的新字典；指纹与上一次相同时不再调用 parse"""
+        if not self.enabled:
+            return {**parse(payload, device_id), "unchanged": False, "cycle": self.cycle}
+
+        key = (scope, str(device_id))
+        digest = fingerprint(payload)
+        entry = self._entries.get(key)
+        if entry is None:
+            baseline = None
+        elif entry[0] == self.cycle:
+            # 本轮已解析过（设备被多个站点共用或单独刷新）：仍与上一轮的指纹比较
+            baseline = entry[1]
+        else:
+            baseline = entry[2]
+
+        if entry is not None and entry[2] == digest:
+            counts = entry[3]
+        else:
+            counts = parse(payload, device_id)
+        self._entries[key] = (self.cycle, baseline, digest, counts)
+
+        unchanged = digest == baseline
+        if unchanged:
+            self.unchanged += 1
+        else:
+            self.changed += 1
+        return {**counts, "unchanged": unchanged, "cycle": self.cycle}
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """累计的未变化 / 变化响应数与当前记录的设备数"""
+        seen = self.changed + self.unchanged
+        return {
+            "enabled": self.enabled,
+            "devices": len(self._entries),
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "unchanged_ratio": round(self.unchanged / seen, 4) if seen else 0.0,
+        }
+
+
+# 所有服务商共享的响应指纹
+payload_fingerprints = PayloadFingerprints(enabled=Config.PAYLOAD_FINGERPRINT_ENABLED)
@@ -0,0 +1,123 @@
+"""服务商原始响应的录制与回放
+
+每个服务商把「单个设备的请求」拆成两步：发请求拿到原始 JSON（尼普顿的 ``portstatur`` 对象、
+电驴妈妈的 ``socketArray``、多航的 ``port_list``、嘟嘟的 ``cbExchangeVOList`` ……），
+再由 ``parse_device_payload`` 解析为 ``{"total", "free", "used", "error"}``。
+请求一步统一经过本模块的 ``payload_store.fetch``：
+
+- 录制模式（``PAYLOAD_CAPTURE_PATH``）：照常请求，并把原始响应追加写入 gzip 压缩的 JSON Lines 文件，
+  同一进程内每个 ``(scope, 设备 ID)`` 只录制一次；
+- 回放模式（``PAYLOAD_REPLAY_PATH``）：不发请求，直接返回录制文件中的响应，解析与聚合代码照常运行，
+  录制文件中没有的设备抛出 ``LookupError``（按请求失败处理）。
+
+录制文件每行一条记录：``{"scope", "device_id", "payload"}``，可选 ``expected`` 为解析结果的快照，
+供 ``benchmarks.bench_payload_replay --check`` 检测解析逻辑或接口格式的变化。
+"""
+
+import gzip
+import json
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from server.config import Config
+
+logger = logging.getLogger(__name__)
+
+PayloadKey = Tuple[str, str]
+
+
+def read_fixture(path: Path) -> Iterator[Dict[str, Any]]:
+    """逐条读取录制文件（兼容多次追加写入产生的多段 gzip）"""
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_fixture(path: Path, records: List[Dict[str, Any]]):
+    """整体重写录制文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as fp:
+        for record in records:
+            fp.write(json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n")
+
+
+class PayloadStore:
+    """设备原始响应的录制 / 回放开关，所有服务商共享同一个实例"""
+
+    def __init__(self, capture_path: Optional[str] = None, replay_path: Optional[str] = None):
+        self.capture_path = Path(capture_path) if capture_path else None
+        self._captured: Set[PayloadKey] = set()
+        self._capture_fp = None
+        self._replay: Optional[Dict[PayloadKey, Any]] = None
+        if replay_path:
+            self.load_replay(Path(replay_path))
+
+    @property
+    def replaying(self) -> bool:
+        return self._replay is not None
+
+    def load_replay(self, path: Path) -> int:
+        """进入回放模式，返回载入的记录数（同一设备有多条记录时以最后一条为准）"""
+        self._replay = {
+            (record["scope"], str(record["device_id"])): record["payload"]
+            for record in read_fixture(path)
+        }
+        logger.info("已载入 %d 条服务商响应录制，进入回放模式: %s", len(self._replay), path)
+        return len(self._replay)
+
+    def stop_replay(self):
+        self._replay = None
+
+    def start_capture(self, path: Path):
+        """开始录制到 path（追加写入）"""
+        self.close()
+        self.capture_path = path
+        self._captured.clear()
+
+    def stop_capture(self):
+        self.close()
+        self.capture_path = None
+
+    def close(self):
+        """关闭录制文件（之后再有录制会重新以追加方式打开）"""
+        if self._capture_fp is not None:
+            self._capture_fp.close()
+            self._capture_fp = None
+
+    async def fetch(self, scope: str, device_id: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        """返回单个设备的原始响应
+
+        Args:
+            scope: 响应格式的归属（服务商标识，「其他」下的子服务商为 ``其他:<子服务商>``）。
+            device_id: 设备 ID。
+            request: 真正发请求并返回原始 JSON 的协程函数，失败时抛出异常。
+        """
+        device_id = str(device_id)
+        if self._replay is not None:
+            try:
+                return self._replay[(scope, device_id)]
+            except KeyError:
+                raise LookupError(f"录制文件中没有 {scope} 设备 {device_id} 的响应") from None
+
+        payload = await request()
+        if self.capture_path is not None and (scope, device_id) not in self._captured:
+            self._captured.add((scope, device_id))
+            self._append({"scope": scope, "device_id": device_id, "payload": payload})
+        return payload
+
+    def _append(self, record: Dict[str, Any]):
+        try:
+            if self._capture_fp is None:
+                self.capture_path.parent.mkdir(parents=True, exist_ok=True)
+                self._capture_fp = gzip.open(self.capture_path, "at", encoding="utf-8")
+            self._capture_fp.write(json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n")
+            # 每条记录都刷新到磁盘，进程被杀时已录制的部分仍可读取
+            self._capture_fp.flush()
+        except OSError as exc:
+            logger.warning("写入服务商响应录制失败: %s", exc)
+
+
+# 所有服务商共享的录制 / 回放实例
+payload_store = PayloadStore(Config.PAYLOAD_CAPTURE_PATH, Config.PAYLOAD_REPLAY_PATH)
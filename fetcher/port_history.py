@@ -0,0 +1,198 @@
+"""端口级状态记录：每个设备的端口状态按 2 bit 打包，只在变化时追加历史
+
+尼普顿的 ``portstatur``、电驴妈妈的 ``socketArray``、多航的 ``port_list`` 都给出了每个端口的状态，
+``parse_device_payload`` 只统计出四个计数。开启 ``PORT_HISTORY_ENABLED`` 后，服务商在真实请求
+（未命中设备结果缓存）之后把端口状态交给本模块：
+
+- 每个端口 2 bit（0 空闲 / 1 使用中 / 2 故障 / 3 未知），4 个端口一个字节，10 口的设备只需 3 字节；
+- 以 ``(scope, 设备 ID)`` 为键保存当前状态，历史只在状态变化时追加，
+  每个设备最多保留 ``PORT_HISTORY_SIZE`` 条（``deque`` 自动淘汰最旧的）；
+- 故障端口由打包字节直接按位算出（高位 1 且低位 0），只对故障集合发生变化的端口更新「故障起始时间」，
+  持续故障超过 ``PORT_BROKEN_AFTER`` 秒的端口即为长期损坏。
+
+``scope`` 与设备结果缓存的命名空间一致：尼普顿 / 电驴妈妈为服务商标识，其他服务商为 ``其他:<子服务商>``。
+记录只保存在进程内存中，重启后从空开始。
+"""
+
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from server.config import Config
+
+PORT_FREE = 0
+PORT_USED = 1
+PORT_ERROR = 2
+PORT_UNKNOWN = 3
+STATE_NAMES = ("free", "used", "error", "unknown")
+
+PortKey = Tuple[str, str]
+# 历史条目：(记录时间, 端口数, 打包后的端口状态)
+HistoryEntry = Tuple[float, int, bytes]
+
+_TZ_UTC_8 = timezone(timedelta(hours=8))
+
+
+def pack_states(states: Sequence[int]) -> bytes:
+    """把端口状态序列打包为字节串，第 i 个端口位于第 i // 4 字节的第 (i % 4) * 2 位"""
+    packed = bytearray((len(states) + 3) // 4)
+    for port, state in enumerate(states):
+        packed[port >> 2] |= (state & 3) << ((port & 3) << 1)
+    return bytes(packed)
+
+
+def unpack_states(packed: bytes, count: int) -> List[int]:
+    """``pack_states`` 的逆操作"""
+    return [(packed[port >> 2] >> ((port & 3) << 1)) & 3 for port in range(count)]
+
+
+def error_mask(packed: bytes, count: int) -> int:
+    """故障端口的位掩码：第 i 个端口故障时第 2i 位为 1"""
+    value = int.from_bytes(packed, "little")
+    low_bits = int("01" * count, 2) if count else 0
+    return (value >> 1) & ~value & low_bits
+
+
+def _mask_ports(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield (low.bit_length() - 1) >> 1
+        mask ^= low
+
+
+def format_ts(ts: float) -> str:
+    """时间戳转为 UTC+8 的 ISO 字符串，与站点 updated_at 的格式一致"""
+    return datetime.fromtimestamp(ts, _TZ_UTC_8).isoformat()
+
+
+class DevicePorts:
+    """单个设备的当前端口状态与变化历史"""
+
+    __slots__ = ("count", "packed", "changed_at", "checked_at", "history", "error_since")
+
+    def __init__(self, history_size: int):
+        self.count = 0
+        self.packed = b""
+        self.changed_at = 0.0
+        self.checked_at = 0.0
+        self.history: Deque[HistoryEntry] = deque(maxlen=history_size)
+        # 端口序号 -> 持续故障的起始时间
+        self.error_since: Dict[int, float] = {}
+
+    def states(self) -> List[int]:
+        return unpack_states(self.packed, self.count)
+
+
+class PortHistory:
+    """按 (scope, 设备 ID) 记录端口状态，后台任务与实时请求共享同一个实例"""
+
+    def __init__(self, enabled: bool, history_size: int = 288, broken_after: float = 86400):
+        self.enabled = enabled
+        self.history_size = max(1, history_size)
+        self.broken_after = broken_after
+        self._devices: Dict[PortKey, DevicePorts] = {}
+
+    def record(self, scope: str, device_id: str, states: Sequence[int], ts: Optional[float] = None):
+        """记录一次请求得到的端口状态；未开启时直接返回"""
+        if not self.enabled:
+            return
+        now = time.time() if ts is None else ts
+        key = (scope, str(device_id))
+        device = self._devices.get(key)
+        if device is None:
+            device = self._devices[key] = DevicePorts(self.history_size)
+
+        device.checked_at = now
+        packed = pack_states(states)
+        count = len(states)
+        if device.history and packed == device.packed and count == device.count:
+            return
+
+        old_errors = error_mask(device.packed, device.count)
+        new_errors = error_mask(packed, count)
+        for port in _mask_ports(old_errors & ~new_errors):
+            device.error_since.pop(port, None)
+        for port in _mask_ports(new_errors & ~old_errors):
+            device.error_since[port] = now
+
+        device.count, device.packed, device.changed_at = count, packed, now
+        device.history.append((now, count, packed))
+
+    def touch(self, scope: str, device_id: str, ts: Optional[float] = None):
+        """只更新检查时间（端口状态与上一次相同）"""
+        device = self._devices.get((scope, str(device_id)))
+        if device is not None:
+            device.checked_at = time.time() if ts is None else ts
+
+    def observe(
+        self,
+        scope: str,
+        device_id: str,
+        unchanged: bool,
+        parse_states: Callable[[], Optional[Sequence[int]]],
+    ):
+        """服务商每次真实请求后调用；原始响应与上一次相同（见 fetcher/fingerprints.py）时不再解析端口"""
+        if not self.enabled:
+            return
+        if unchanged:
+            self.touch(scope, device_id)
+            return
+        states = parse_states()
+        if states is not None:
+            self.record(scope, device_id, states)
+
+    def get(self, scope: str, device_id: str) -> Optional[DevicePorts]:
+        return self._devices.get((scope, str(device_id)))
+
+    def describe(
+        self, scope: str, device_id: str, history_limit: int = 0
+    ) -> Optional[Dict[str, Any]]:
+        """单个设备的端口状态（端口序号从 1 开始），history_limit > 0 时附带最近的变化历史"""
+        device = self.get(scope, device_id)
+        if device is None:
+            return None
+        now = time.time()
+        ports = []
+        for port, state in enumerate(device.states()):
+            entry: Dict[str, Any] = {"port": port + 1, "state": STATE_NAMES[state]}
+            since = device.error_since.get(port)
+            if since is not None:
+                entry["error_since"] = format_ts(since)
+                entry["broken"] = now - since >= self.broken_after
+            ports.append(entry)
+        result: Dict[str, Any] = {
+            "device_id": str(device_id),
+            "ports": ports,
+            "changed_at": format_ts(device.changed_at),
+            "checked_at": format_ts(device.checked_at),
+        }
+        if history_limit > 0:
+            recent = list(device.history)[-history_limit:]
+            result["history"] = [
+                {"at": format_ts(ts), "states": "".join(str(s) for s in unpack_states(p, n))}
+                for ts, n, p in reversed(recent)
+            ]
+        return result
+
+    def broken(self, min_duration: Optional[float] = None) -> List[Tuple[PortKey, int, float]]:
+        """持续故障超过 min_duration 秒（默认 PORT_BROKEN_AFTER）的端口：[((scope, 设备 ID), 端口序号, 起始时间)]"""
+        threshold = time.time() - (self.broken_after if min_duration is None else min_duration)
+        return [
+            (key, port, since)
+            for key, device in self._devices.items()
+            for port, since in device.error_since.items()
+            if since <= threshold
+        ]
+
+    def clear(self):
+        self._devices.clear()
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+
+# 所有服务商共享的端口状态记录
+port_history = PortHistory(
+    Config.PORT_HISTORY_ENABLED, Config.PORT_HISTORY_SIZE, Config.PORT_BROKEN_AFTER
+)
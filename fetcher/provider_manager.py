@@ -2,19 +2,71 @@
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 
 import aiohttp
+from server.config import Config
 from fetcher.providers.provider_base import ProviderBase
-from fetcher.providers.neptune import NeptuneProvider
-from fetcher.providers.neptune_junior import NeptuneJuniorProvider
-from fetcher.providers.dlmm import DlmmProvider
-from fetcher.providers.else_provider import ElseProvider
+from fetcher.station import Station, StationStatus, station_definition
+from fetcher.columnar import ColumnarSnapshot
+from fetcher.device_cache import device_cache
+from fetcher.fingerprints import payload_fingerprints
+from fetcher.payload_store import payload_store
+from fetcher.provider_registry import (
+    discover_provider_specs,
+    load_provider_class,
+    select_provider_specs,
+)
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class StationChanges:
+    """一个服务商热重载站点 CSV 前后的差异（站点以 hash_id 区分，改名视为删除 + 新增）"""
+
+    provider: str
+    added: List[Station] = field(default_factory=list)
+    removed: List[Station] = field(default_factory=list)
+    changed: List[Station] = field(default_factory=list)
+
+    @property
+    def upserts(self) -> List[Station]:
+        """需要写入 stations 表的站点"""
+        return self.added + self.changed
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "added": [station.hash_id for station in self.added],
+            "removed": [station.hash_id for station in self.removed],
+            "changed": [station.hash_id for station in self.changed],
+        }
+
+
+@asynccontextmanager
+async def _client_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """抓取用的会话；关闭前取消设备结果缓存中仍在该会话上进行的请求（如超时服务商留下的）"""
+    async with aiohttp.ClientSession() as session:
+        try:
+            yield session
+        finally:
+            device_cache.cancel_inflight(session)
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 class ProviderManager:
     """服务商管理器
 
@@ -22,35 +74,176 @@ class ProviderManager:
     职责：初始化、管理生命周期、并发调度、结果合并与格式化。
     """
 
-    def __init__(self):
-        """初始化服务商管理器"""
-        self.providers: List[ProviderBase] = []
-        self._register_providers()
-
-    def _register_providers(self):
-        """注册所有可用服务商"""
-        neptune = NeptuneProvider()
-        neptune_junior = NeptuneJuniorProvider()
-        dlmm = DlmmProvider()
-        else_provider = ElseProvider()
-        try:
-            neptune.load_stations()
-            neptune_junior.load_stations()
-            dlmm.load_stations()
-            else_provider.load_stations()
-        except Exception as exc:
-            logger.error("加载 %s 站点失败: %s", neptune.provider, exc, exc_info=True)
-            logger.error("加载 %s 站点失败: %s", neptune_junior.provider, exc, exc_info=True)
-            logger.error("加载 %s 站点失败: %s", dlmm.provider, exc, exc_info=True)
-            logger.error("加载 %s 站点失败: %s", else_provider.provider, exc, exc_info=True)
-        self.providers.append(neptune)
-        logger.info(f"已注册服务商: {neptune.provider}")
-        self.providers.append(neptune_junior)
-        logger.info(f"已注册服务商: {neptune_junior.provider}")
-        self.providers.append(dlmm)
-        logger.info(f"已注册服务商: {dlmm.provider}")
-        self.providers.append(else_provider)
-        logger.info(f"已注册服务商: {else_provider.provider}")
+    def __init__(self, enabled: Optional[str] = None, disabled: Optional[str] = None):
+        """初始化服务商管理器
+
+        构造时只解析插件注册表，不导入服务商模块、不加载站点 CSV；
+        首次访问 ``providers`` 时才按需导入并实例化已启用的服务商。
+
+        Args:
+            enabled: 逗号分隔的启用服务商名称，默认读取 ENABLED_PROVIDERS（为空表示全部）
+            disabled: 逗号分隔的禁用服务商名称，默认读取 DISABLED_PROVIDERS
+        """
+        self.provider_specs: Dict[str, str] = select_provider_specs(
+            discover_provider_specs(),
+            enabled=Config.ENABLED_PROVIDERS if enabled is None else enabled,
+            disabled=Config.DISABLED_PROVIDERS if disabled is None else disabled,
+        )
+        self._providers: Optional[List[ProviderBase]] = None
+        # 已发布快照：provider -> {"status", "data", "error", "updated_at", "stale"}
+        # stale 条目另有 "fresh"：条目过期后经单站点刷新得到新数据的 hash_id 集合（见 _merge_station）
+        # 每个服务商完成抓取后立即替换自己的条目，API 可随时读取当前最新的合并结果
+        self.snapshot: Dict[str, Dict[str, Any]] = {}
+        # 快照版本号：每次发布递增，合并结果与列式结果按版本缓存，同一快照只计算一次
+        self._snapshot_version = 0
+        self._merged_cache: Optional[Tuple[int, List[StationStatus]]] = None
+        self._columnar_cache: Optional[Tuple[int, ColumnarSnapshot]] = None
+        # 各服务商最近一次成功抓取的站点数与未变化站点数（StationStatus.unchanged）
+        self.cycle_stats: Dict[str, Dict[str, Any]] = {}
+        # 各服务商最近一次成功发布、各站点最近一次单独刷新的时刻（time.monotonic()）
+        self._published_at: Dict[str, float] = {}
+        self._station_refreshed_at: Dict[str, float] = {}
+        # 进行中的单站点刷新：hash_id -> 任务，同一站点的并发刷新共用一次请求
+        self._station_inflight: Dict[str, asyncio.Future] = {}
+        # hash_id -> (服务商, 站点) 的索引，与构建时各服务商的 station_list 对象绑定
+        self._station_lookup: Optional[Tuple[List[List[Station]], Dict[str, Any]]] = None
+        # 各服务商站点 CSV 加载时的 (mtime_ns, size)，热重载时据此跳过未变化的文件
+        self._station_sources: Dict[str, Optional[Tuple[int, int]]] = {}
+        logger.info("已启用服务商插件: %s", ", ".join(self.provider_specs) or "无")
+
+    @property
+    def providers(self) -> List[ProviderBase]:
+        """已注册的服务商实例列表（首次访问时才导入并加载）"""
+        if self._providers is None:
+            self._providers = self._register_providers()
+        return self._providers
+
+    @providers.setter
+    def providers(self, value: List[ProviderBase]):
+        self._providers = list(value)
+
+    def _register_providers(self) -> List[ProviderBase]:
+        """导入、实例化已启用的服务商并加载其站点数据"""
+        providers: List[ProviderBase] = []
+        for name, spec in self.provider_specs.items():
+            try:
+                prov = load_provider_class(spec)()
+            except Exception as exc:
+                logger.error("导入服务商插件 %s (%s) 失败: %s", name, spec, exc, exc_info=True)
+                continue
+
+            try:
+                self._station_sources[prov.provider] = _file_signature(prov.station_csv_path)
+                prov.load_stations()
+            except Exception as exc:
+                logger.error("加载 %s 站点失败: %s", prov.provider, exc, exc_info=True)
+
+            providers.append(prov)
+            logger.info(f"已注册服务商: {prov.provider}")
+
+        self._assign_station_indices(providers)
+        return providers
+
+    @staticmethod
+    def _assign_station_indices(providers: List[ProviderBase]):
+        """按注册顺序为所有站点分配全局稳定下标，供状态记录与列式快照定位"""
+        index = 0
+        for prov in providers:
+            for station in prov.station_list:
+                station.index = index
+                index += 1
+
+    def reload_stations(self, force: bool = False) -> List[StationChanges]:
+        """重新加载有变化的站点 CSV，逐个服务商原子替换 station_list
+
+        - 未变化的站点沿用原有 Station 对象（下标、已发布的状态记录都不受影响）；
+        - 定义变化的站点换成新对象并沿用原下标，新增站点分配新下标，删除的站点下标空出；
+        - 已发布快照中删除的站点被移除，变化的站点改为引用新对象，下一轮抓取前 API 即反映新定义。
+
+        整个过程没有 await，不会与抓取或 API 请求交错。返回有变化的服务商的差异。
+
+        Args:
+            force: 为 True 时忽略文件 mtime / 大小，重新加载全部服务商。
+        """
+        providers = self.providers
+        next_index = 1 + max(
+            (station.index for prov in providers for station in prov.station_list), default=-1
+        )
+        results: List[StationChanges] = []
+        for prov in providers:
+            signature = _file_signature(prov.station_csv_path)
+            if not force and signature == self._station_sources.get(prov.provider):
+                continue
+            previous = prov.station_list
+            try:
+                loaded = prov.load_stations()
+            except Exception as exc:
+                logger.error("重新加载 %s 站点失败: %s", prov.provider, exc, exc_info=True)
+                prov.station_list = previous
+                continue
+            self._station_sources[prov.provider] = signature
+
+            changes = StationChanges(prov.provider)
+            old_by_id = {station.hash_id: station for station in previous}
+            stations: List[Station] = []
+            for station in loaded:
+                old = old_by_id.pop(station.hash_id, None)
+                if old is None:
+                    station.index = next_index
+                    next_index += 1
+                    changes.added.append(station)
+                elif station_definition(old) == station_definition(station):
+                    station = old
+                else:
+                    station.index = old.index
+                    changes.changed.append(station)
+                stations.append(station)
+            changes.removed = list(old_by_id.values())
+            prov.station_list = stations
+
+            if changes.added or changes.removed or changes.changed:
+                self._rebind_snapshot(prov.provider, stations)
+                results.append(changes)
+                logger.info(
+                    "已重新加载 %s 站点: 新增 %d，删除 %d，变化 %d",
+                    prov.provider,
+                    len(changes.added),
+                    len(changes.removed),
+                    len(changes.changed),
+                )
+        return results
+
+    def _rebind_snapshot(self, provider_key: str, stations: List[Station]):
+        """让已发布快照中该服务商的状态记录与新的站点目录一致"""
+        entry = self.snapshot.get(provider_key)
+        if not entry or not isinstance(entry.get("data"), list):
+            return
+        current = {station.hash_id: station for station in stations}
+        data = []
+        for status in entry["data"]:
+            station = current.get(status.hash_id)
+            if station is None:
+                continue
+            if station is not status.station:
+                status = StationStatus(
+                    station,
+                    status.free,
+                    status.used,
+                    status.total,
+                    status.error,
+                    stale=status.stale,
+                    unchanged=status.unchanged,
+                )
+            data.append(status)
+        self.snapshot[provider_key] = {**entry, "data": data}
+        self._snapshot_version += 1
+
+    async def close(self):
+        """关闭所有服务商持有的连接资源（尚未加载时无需处理）"""
+        if self._providers is None:
+            return
+        await asyncio.gather(*(prov.close() for prov in self._providers), return_exceptions=True)
+        payload_store.close()
 
     def list_providers(self) -> List[Dict[str, str]]:
         """返回当前已注册的服务商列表"""
@@ -71,59 +264,295 @@ class ProviderManager:
 
     # --- 核心调度和合并 ---
 
-    async def fetch_all_providers(self) -> Dict[str, Any]:
-        """并发获取所有服务商的数据"""
+    def _build_result(self, provider_key: str, result: Any) -> Dict[str, Any]:
+        """将单个服务商的抓取结果（或异常）整理为统一的结果条目"""
+        if isinstance(result, asyncio.TimeoutError):
+            logger.error(f"服务商 {provider_key} 抓取超时")
+            return {"status": "error", "data": None, "error": "抓取超时"}
+        if isinstance(result, Exception):
+            logger.error(f"服务商 {provider_key} 获取数据失败: {result}", exc_info=True)
+            return {"status": "error", "data": None, "error": str(result)}
+        if result is None:
+            return {"status": "error", "data": None, "error": "抓取失败或返回空数据"}
+        return {"status": "success", "data": result, "error": None}
+
+    def _publish(self, provider_key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """将单个服务商的结果合并到已发布快照
+
+        抓取失败或超时时，如果该服务商已有上一轮的成功结果，则保留旧数据并标记为 stale。
+        此前单独刷新过的站点同样早于本轮，因此 fresh 集合清空，全部记录一并视为过期。
+        """
+        now = self._get_timestamp()
+        if entry["status"] == "success":
+            published = {**entry, "updated_at": now, "stale": False}
+            self._published_at[provider_key] = time.monotonic()
+            self._record_cycle(provider_key, entry["data"], now)
+        else:
+            previous = self.snapshot.get(provider_key)
+            if previous and previous.get("data") is not None:
+                logger.warning(f"服务商 {provider_key} 本轮无新数据，保留上一轮结果并标记为过期")
+                published = {
+                    **previous,
+                    "error": entry["error"],
+                    "stale": True,
+                    "fresh": frozenset(),
+                }
+            else:
+                published = {**entry, "updated_at": now, "stale": False}
+
+        self.snapshot[provider_key] = published
+        self._snapshot_version += 1
+        return published
+
+    def _record_cycle(self, provider_key: str, data: List[StationStatus], now: str):
+        unchanged = sum(1 for status in data if status.unchanged)
+        self.cycle_stats[provider_key] = {
+            "stations": len(data),
+            "unchanged": unchanged,
+            "unchanged_ratio": round(unchanged / len(data), 4) if data else 0.0,
+            "updated_at": now,
+        }
+        logger.info("服务商 %s 本轮 %d/%d 个站点未变化", provider_key, unchanged, len(data))
+
+    def unchanged_ratio(self) -> float:
+        """各服务商最近一轮抓取中未变化站点的总体比例"""
+        stations = sum(stats["stations"] for stats in self.cycle_stats.values())
+        unchanged = sum(stats["unchanged"] for stats in self.cycle_stats.values())
+        return unchanged / stations if stations else 0.0
+
+    async def _fetch_provider(
+        self, prov: ProviderBase, session: aiohttp.ClientSession, timeout: Optional[float]
+    ) -> Tuple[ProviderBase, Any]:
+        """抓取单个服务商，返回 (服务商, 结果)；超时或异常时结果为异常对象而非抛出"""
+        try:
+            if timeout:
+                return prov, await asyncio.wait_for(prov.fetch_status(session), timeout)
+            return prov, await prov.fetch_status(session)
+        except Exception as exc:
+            return prov, exc
+
+    async def fetch_all_providers(self, streaming: Optional[bool] = None) -> Dict[str, Any]:
+        """并发获取所有服务商的数据
+
+        Args:
+            streaming: 是否逐个发布模式；为 None 时读取 PROVIDER_STREAMING_ENABLED。
+                逐个发布模式下，每个服务商完成后立即合并进已发布快照，
+                超过 PROVIDER_FETCH_TIMEOUT 仍未完成的服务商保留上一轮结果并标记为过期。
+        """
+        if streaming is None:
+            streaming = Config.PROVIDER_STREAMING_ENABLED
+        timeout = Config.PROVIDER_FETCH_TIMEOUT if streaming else None
+        payload_fingerprints.begin_cycle()
+
         results = {}
 
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-
-            for prov in self.providers:
-                # fetch_status 负责返回 List[Dict] 且 Dict 已规范化
-                tasks.append(prov.fetch_status(session))
-
-            fetch_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # 处理结果
-            for prov, result in zip(self.providers, fetch_results):
-                provider_key = prov.provider
-                if isinstance(result, Exception):
-                    logger.error(f"服务商 {provider_key} 获取数据失败: {result}", exc_info=True)
-                    results[provider_key] = {
-                        "status": "error",
-                        "data": None,
-                        "error": str(result),
-                    }
-                elif result is None:
-                    results[provider_key] = {
-                        "status": "error",
-                        "data": None,
-                        "error": "抓取失败或返回空数据",
-                    }
-                else:
-                    results[provider_key] = {
-                        "status": "success",
-                        "data": result,
-                        "error": None,
-                    }
+        async with _client_session() as session:
+            tasks = [self._fetch_provider(prov, session, timeout) for prov in self.providers]
+
+            if streaming:
+                # 谁先完成谁先发布，不再等待最慢的服务商
+                for future in asyncio.as_completed(tasks):
+                    prov, result = await future
+                    provider_key = prov.provider
+                    results[provider_key] = self._publish(
+                        provider_key, self._build_result(provider_key, result)
+                    )
+                    logger.info(f"服务商 {provider_key} 结果已发布")
+            else:
+                for prov, result in await asyncio.gather(*tasks):
+                    provider_key = prov.provider
+                    results[provider_key] = self._publish(
+                        provider_key, self._build_result(provider_key, result)
+                    )
 
         return results
 
-    def merge_stations(self, providers_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """合并多个服务商的站点数据到统一格式"""
-        all_stations = []
+    def merge_stations(self, providers_data: Dict[str, Any]) -> List[StationStatus]:
+        """合并多个服务商的站点状态记录"""
+        all_stations: List[StationStatus] = []
 
         for result in providers_data.values():
             if result["status"] == "success" and result["data"] is not None:
                 data = result["data"]
 
-                # 假设 fetch_status 严格返回 List[Dict[str, Any]]
+                # fetch_status 严格返回 List[StationStatus]
                 if isinstance(data, list):
-                    # 无需再进行规范化，直接扩展列表
-                    all_stations.extend(data)
+                    if result.get("stale"):
+                        # 保留的上一轮结果：逐条标记为过期，便于下游区分；单独刷新过的站点除外
+                        fresh = result.get("fresh", frozenset())
+                        all_stations.extend(
+                            status if status.hash_id in fresh else status.with_stale()
+                            for status in data
+                        )
+                    else:
+                        # 无需再进行规范化，直接扩展列表
+                        all_stations.extend(data)
 
         return all_stations
 
+    def _merged_stations(self) -> List[StationStatus]:
+        """当前快照的合并结果（按快照版本缓存）"""
+        cache = self._merged_cache
+        if cache is None or cache[0] != self._snapshot_version:
+            cache = (self._snapshot_version, self.merge_stations(self.snapshot))
+            self._merged_cache = cache
+        return cache[1]
+
+    def get_columnar_snapshot(self) -> Optional[ColumnarSnapshot]:
+        """当前快照的列式表示（按快照版本缓存），尚无任何服务商发布时返回 None"""
+        if not any(entry.get("data") is not None for entry in self.snapshot.values()):
+            return None
+        cache = self._columnar_cache
+        if cache is None or cache[0] != self._snapshot_version:
+            size = sum(len(prov.station_list) for prov in self.providers)
+            cache = (
+                self._snapshot_version,
+                ColumnarSnapshot.from_records(self._merged_stations(), size=size),
+            )
+            self._columnar_cache = cache
+        return cache[1]
+
+    def get_published_snapshot(self) -> Optional[Dict[str, Any]]:
+        """返回当前已发布快照的合并结果，尚无任何服务商发布时返回 None
+
+        返回格式与 fetch_and_format 一致（stations 为 StationStatus 列表），并额外包含每个服务商的发布状态。
+        """
+        if not any(entry.get("data") is not None for entry in self.snapshot.values()):
+            return None
+
+        timestamps = [
+            entry["updated_at"] for entry in self.snapshot.values() if entry.get("updated_at")
+        ]
+        return {
+            "updated_at": max(timestamps) if timestamps else self._get_timestamp(),
+            "stations": self._merged_stations(),
+            "providers": {
+                key: {
+                    "status": entry["status"],
+                    "stale": entry.get("stale", False),
+                    "updated_at": entry.get("updated_at"),
+                    "error": entry.get("error"),
+                }
+                for key, entry in self.snapshot.items()
+            },
+        }
+
+    # --- 单站点实时刷新 ---
+
+    def find_station(self, hash_id: str) -> Optional[Tuple[ProviderBase, Station]]:
+        """按 hash_id 查找站点及其服务商（索引在 station_list 被替换后自动重建）"""
+        lists = [prov.station_list for prov in self.providers]
+        cache = self._station_lookup
+        if (
+            cache is None
+            or len(cache[0]) != len(lists)
+            or any(old is not new for old, new in zip(cache[0], lists))
+        ):
+            lookup = {
+                station.hash_id: (prov, station)
+                for prov in self.providers
+                for station in prov.station_list
+            }
+            cache = self._station_lookup = (lists, lookup)
+        return cache[1].get(hash_id)
+
+    def station_age(self, provider_key: str, hash_id: str) -> Optional[float]:
+        """站点数据距最近一次抓取（服务商整体发布或单独刷新）的秒数，从未抓取时返回 None"""
+        times = [
+            t
+            for t in (
+                self._published_at.get(provider_key),
+                self._station_refreshed_at.get(hash_id),
+            )
+            if t is not None
+        ]
+        return time.monotonic() - max(times) if times else None
+
+    def _published_status(self, provider_key: str, hash_id: str) -> Optional[StationStatus]:
+        entry = self.snapshot.get(provider_key)
+        if not entry or not isinstance(entry.get("data"), list):
+            return None
+        for status in entry["data"]:
+            if status.hash_id == hash_id:
+                if entry.get("stale") and hash_id not in entry.get("fresh", frozenset()):
+                    return status.with_stale()
+                return status
+        return None
+
+    async def refresh_station(
+        self, hash_id: str, min_age: Optional[float] = None
+    ) -> Optional[Tuple[StationStatus, bool]]:
+        """实时刷新单个站点并合并进已发布快照，返回 (状态记录, 是否实际发起了刷新)
+
+        - 站点数据距上次抓取不足 ``min_age`` 秒（默认 STATION_REFRESH_MIN_AGE）且快照中已有该站点时，
+          直接返回快照中的记录；
+        - 同一站点的并发刷新共用一次请求；
+        - 刷新前清除该站点设备在设备结果缓存中的条目，确保向服务商重新请求；
+        - 抓取失败（包括站点的设备全部失败）时抛出异常，已发布快照与站点的刷新时间保持不变。
+
+        站点不存在时返回 None。
+        """
+        found = self.find_station(hash_id)
+        if found is None:
+            return None
+        prov, station = found
+        if min_age is None:
+            min_age = Config.STATION_REFRESH_MIN_AGE
+
+        age = self.station_age(prov.provider, hash_id)
+        current = self._published_status(prov.provider, hash_id)
+        if current is not None and age is not None and age < min_age:
+            return current, False
+
+        task = self._station_inflight.get(hash_id)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh_station(prov, station))
+            self._station_inflight[hash_id] = task
+            task.add_done_callback(lambda _t: self._station_inflight.pop(hash_id, None))
+        # 发起方被取消（如客户端断开）时不连带取消其他等待者
+        return await asyncio.shield(task), True
+
+    async def _refresh_station(self, prov: ProviderBase, station: Station) -> StationStatus:
+        scope = prov.device_scope(station)
+        for device_id in station.device_ids:
+            device_cache.invalidate((scope, str(device_id)))
+
+        async with _client_session() as session:
+            status_dict, exc = await prov.fetch_station_status(station, session)
+        # 设备全部失败时服务商返回异常（见 ProviderBase.all_devices_failed），不能把 0 计数合并进快照
+        if exc is not None or status_dict is None:
+            raise exc or RuntimeError(f"站点 {station.hash_id} 刷新失败")
+
+        status = StationStatus(
+            station,
+            free=status_dict["free"],
+            used=status_dict["used"],
+            total=status_dict["total"],
+            error=status_dict["error"],
+            unchanged=status_dict.get("unchanged", False),
+        )
+        self._station_refreshed_at[station.hash_id] = time.monotonic()
+        self._merge_station(prov.provider, status)
+        return status
+
+    def _merge_station(self, provider_key: str, status: StationStatus):
+        """把单个站点的新状态替换进该服务商的已发布条目（尚未发布过的服务商不合并）
+
+        条目为 stale 时，刷新得到的记录比条目中其余数据新：它的 hash_id 记入条目的 fresh 集合，
+        合并结果中该站点不标记为过期，直到服务商下一次发布（成功则整体替换，失败则清空 fresh）。
+        """
+        entry = self.snapshot.get(provider_key)
+        if not entry or not isinstance(entry.get("data"), list):
+            return
+        data = [status if s.hash_id == status.hash_id else s for s in entry["data"]]
+        if not any(s is status for s in data):
+            data.append(status)
+        merged = {**entry, "data": data}
+        if entry.get("stale"):
+            merged["fresh"] = entry.get("fresh", frozenset()) | {status.hash_id}
+        self.snapshot[provider_key] = merged
+        self._snapshot_version += 1
+
     # --- 时间戳和格式化方法 ---
 
     def _get_timestamp(self) -> str:
@@ -132,7 +561,10 @@ class ProviderManager:
         return datetime.now(tz_utc_8).isoformat()
 
     async def fetch_and_format(self, provider: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """获取数据并格式化为 API 响应格式"""
+        """获取数据并格式化为 {"updated_at", "stations": List[StationStatus]}
+
+        stations 中是状态记录对象，需要 JSON 序列化时在出口处调用 ``to_dict()``。
+        """
 
         if provider:
             provider_obj = next(
@@ -142,12 +574,14 @@ class ProviderManager:
                 logger.error(f"未找到服务商: {provider}")
                 return None
 
-            async with aiohttp.ClientSession() as session:
+            async with _client_session() as session:
                 stations = await provider_obj.fetch_status(session)
 
                 if stations is None:
                     return None
 
+                self._publish(provider, self._build_result(provider, stations))
+
                 # 直接返回单个服务商的结果
                 return {"updated_at": self._get_timestamp(), "stations": stations}
 
@@ -0,0 +1,82 @@
+"""服务商插件注册表：发现、按需导入服务商适配器
+
+服务商以 ``名称 -> "模块路径:类名"`` 的形式登记，来源有两处：
+
+1. 内置服务商 ``BUILTIN_PROVIDERS``；
+2. 已安装包通过 ``zju_charger.providers`` entry point 组声明的第三方服务商（同名时覆盖内置项）。
+
+登记阶段只记录字符串，不导入任何服务商模块；真正用到某个服务商时才导入并实例化，
+部署时可通过 ``ENABLED_PROVIDERS`` / ``DISABLED_PROVIDERS`` 只启用需要的服务商。
+"""
+
+import importlib
+import logging
+from importlib.metadata import entry_points
+from typing import Dict, Iterable, List, Optional, Type
+
+from fetcher.providers.provider_base import ProviderBase
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "zju_charger.providers"
+
+BUILTIN_PROVIDERS: Dict[str, str] = {
+    "neptune": "fetcher.providers.neptune:NeptuneProvider",
+    "neptune_junior": "fetcher.providers.neptune_junior:NeptuneJuniorProvider",
+    "dlmm": "fetcher.providers.dlmm:DlmmProvider",
+    "else_provider": "fetcher.providers.else_provider:ElseProvider",
+}
+
+
+def _parse_names(value: Optional[str]) -> List[str]:
+    """解析逗号分隔的服务商名称列表"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def discover_provider_specs() -> Dict[str, str]:
+    """返回所有可用服务商的 名称 -> "模块:类" 映射（内置 + entry points）"""
+    specs = dict(BUILTIN_PROVIDERS)
+    try:
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            specs[ep.name] = ep.value
+    except Exception as exc:
+        logger.warning("读取服务商 entry points 失败: %s", exc)
+    return specs
+
+
+def select_provider_specs(
+    specs: Dict[str, str],
+    enabled: Optional[str] = None,
+    disabled: Optional[str] = None,
+) -> Dict[str, str]:
+    """按部署配置筛选服务商
+
+    Args:
+        specs: 全部可用服务商
+        enabled: 逗号分隔的启用列表，为空表示全部启用；列表顺序即注册顺序
+        disabled: 逗号分隔的禁用列表，优先级高于 enabled
+    """
+    enabled_names = _parse_names(enabled)
+    disabled_names = set(_parse_names(disabled))
+
+    if enabled_names:
+        unknown = [name for name in enabled_names if name not in specs]
+        for name in unknown:
+            logger.error("未知的服务商插件: %s（可用: %s）", name, ", ".join(specs))
+        names: Iterable[str] = [name for name in enabled_names if name in specs]
+    else:
+        names = specs.keys()
+
+    return {name: specs[name] for name in names if name not in disabled_names}
+
+
+def load_provider_class(spec: str) -> Type[ProviderBase]:
+    """导入 "模块:类" 形式的服务商类"""
+    module_name, _, attr = spec.partition(":")
+    module = importlib.import_module(module_name)
+    provider_cls = getattr(module, attr)
+    if not (isinstance(provider_cls, type) and issubclass(provider_cls, ProviderBase)):
+        raise TypeError(f"{spec} 不是 ProviderBase 的子类")
+    return provider_cls
@@ -4,36 +4,79 @@ import asyncio
 import logging
 import os
 from dataclasses import dataclass
+from functools import partial
 from typing import Any, Dict, List, Optional, Tuple
 
 import aiohttp
 
 from .provider_base import ProviderBase
-from fetcher.station import Station
+from fetcher.fingerprints import payload_fingerprints, results_unchanged
+from fetcher.payload_store import payload_store
+from fetcher.port_history import PORT_ERROR, PORT_FREE, PORT_USED, port_history
+from fetcher.station import Station, StationStatus
+from fetcher.token_manager import AuthError, TokenManager, token_store
 from server.config import Config
 
 logger = logging.getLogger(__name__)
 
+STATION_PATH = "/dlServer/dlmm/getStation"
+
 
 @dataclass
 class DlmmProvider(ProviderBase):
     """Adapter for the DLMM charging pile provider."""
 
+    DEFAULT_BASE_URL = "https://dlmmplususer.dianlvmama.com"
+
     def __post_init__(self):
-        """Load the auth token from the environment."""
-        self.token = self.generate_auth_token()
+        """Create the token manager; the token itself is resolved lazily on first use."""
+        self.token_manager = TokenManager(
+            self.provider,
+            self._request_token,
+            store=token_store,
+            default_ttl=Config.PROVIDER_TOKEN_TTL,
+            refresh_margin=Config.PROVIDER_TOKEN_REFRESH_MARGIN,
+            # the token comes from PROVIDER_DLMM_TOKEN; a rotated value overrides the cached one
+            configured_token=self.generate_auth_token,
+        )
 
     @property
     def provider(self) -> str:
         return "dlmm"
 
+    @property
+    def token(self) -> str:
+        return self.token_manager.token
+
     def generate_auth_token(self) -> str:
         """
         Placeholder for generating the auth token via login or another API.
-        The current implementation relies on the DLMM_AUTH environment variable.
+        The current implementation relies on the PROVIDER_DLMM_TOKEN environment variable.
         """
         return Config.get_provider_config_value("dlmm", "token", "")
 
+    async def _request_token(self, session: aiohttp.ClientSession) -> Tuple[str, Optional[float]]:
+        """Token source for the TokenManager; expiry is taken from the JWT when present."""
+        return self.generate_auth_token(), None
+
+    async def _request_station(
+        self, session: aiohttp.ClientSession, device_id: str, token: str
+    ) -> Dict[str, Any]:
+        """POST getStation with the given token, raising AuthError on auth failures."""
+        payload = {"stationNo": f"{device_id}"}
+        async with session.post(
+            self.endpoint(STATION_PATH),
+            headers={"authorization": token, "tenant-id": "1"},
+            json=payload,
+        ) as response:
+            if response.status in (401, 403):
+                raise AuthError(f"HTTP {response.status}")
+            response.raise_for_status()
+            result = await response.json()
+        if result.get("code") in (401, 403):
+            raise AuthError(result.get("msg") or str(result.get("code")))
+        return result
+
     # --- ProviderBase abstract method implementations ---
     async def fetch_station_list(
         self, session: aiohttp.ClientSession
@@ -41,34 +84,56 @@ class DlmmProvider(ProviderBase):
         """Station listing API is not available yet."""
         return None
 
+    async def request_device_payload(
+        self, session: aiohttp.ClientSession, device_id: str
+    ) -> Dict[str, Any]:
+        """Return the raw getStation response, refreshing the token on auth failures."""
+        return await self.token_manager.call_with_auth(
+            session, partial(self._request_station, session, device_id)
+        )
+
+    def parse_device_payload(self, payload: Dict[str, Any], device_id: str) -> Dict[str, int]:
+        """Count socket states in a getStation response (0 free, 1 in use, anything else error)."""
+        if payload.get("code") != 200 or "data" not in payload:
+            raise ValueError(f"Unexpected DLMM response for device {device_id}: {payload}")
+
+        socket_array = payload["data"].get("socketArray", []) or []
+        total = len(socket_array)
+        free = sum(1 for socket in socket_array if socket.get("status") == 0)
+        used = sum(1 for socket in socket_array if socket.get("status") == 1)
+        error = sum(1 for socket in socket_array if socket.get("status") not in (0, 1))
+
+        return {"total": total, "free": free, "used": used, "error": error}
+
+    def parse_port_states(self, payload: Dict[str, Any]) -> List[int]:
+        """Per-socket states of a validated getStation response, in socketArray order."""
+        socket_array = payload["data"].get("socketArray", []) or []
+        states = {0: PORT_FREE, 1: PORT_USED}
+        return [states.get(socket.get("status"), PORT_ERROR) for socket in socket_array]
+
     async def fetch_device_status(
         self, session: aiohttp.ClientSession, device_id: str
     ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
-        payload = {"stationNo": f"{device_id}"}
-        url = "https://dlmmplususer.dianlvmama.com/dlServer/dlmm/getStation"
         try:
-            async with session.post(
-                url, headers={"authorization": self.token, "tenant-id": "1"}, json=payload
-            ) as response:
-                response.raise_for_status()
-                result = await response.json()
+            payload = await payload_store.fetch(
+                self.provider, device_id, partial(self.request_device_payload, session, device_id)
+            )
         except Exception as exc:
             logger.warning("DLMM request failed for device %s: %s", device_id, exc)
             return None, exc
 
-        if result.get("code") != 200 or "data" not in result:
-            err = ValueError(f"Unexpected DLMM response for device {device_id}: {result}")
+        try:
+            data = payload_fingerprints.parse(
+                self.provider, device_id, payload, self.parse_device_payload
+            )
+        except ValueError as err:
             logger.warning(str(err))
             return None, err
 
-        socket_array = result["data"].get("socketArray", []) or []
-        # logger.info(socket_array)
-        total = len(socket_array)
-        free = sum(1 for socket in socket_array if socket.get("status") == 0)
-        used = sum(1 for socket in socket_array if socket.get("status") == 1)
-        error = sum(1 for socket in socket_array if socket.get("status") not in (0, 1))
-
-        return {"total": total, "free": free, "used": used, "error": error}, None
+        port_history.observe(
+            self.provider, device_id, data["unchanged"], partial(self.parse_port_states, payload)
+        )
+        return data, None
 
     async def fetch_station_status(
         self, station: Station, session: aiohttp.ClientSession
@@ -76,8 +141,16 @@ class DlmmProvider(ProviderBase):
         if not station.device_ids:
             return {"total": 0, "free": 0, "used": 0, "error": 0}, None
 
-        tasks = [self.fetch_device_status(session, device_id) for device_id in station.device_ids]
+        tasks = [
+            self.fetch_device_cached(
+                device_id, partial(self.fetch_device_status, session, device_id), session=session
+            )
+            for device_id in station.device_ids
+        ]
         results = await asyncio.gather(*tasks)
+        failure = self.all_devices_failed(results)
+        if failure is not None:
+            return None, failure
 
         total = free = used = error = 0
 
@@ -90,55 +163,39 @@ class DlmmProvider(ProviderBase):
             used += data["used"]
             error += data["error"]
 
-        return {"total": total, "free": free, "used": used, "error": error}, None
-
-    async def fetch_status(self, session: aiohttp.ClientSession) -> Optional[List[Dict[str, Any]]]:
-        if not self.station_list:
+        return {
+            "total": total,
+            "free": free,
+            "used": used,
+            "error": error,
+            "unchanged": results_unchanged(results),
+        }, None
+
+    async def fetch_status(self, session: aiohttp.ClientSession) -> Optional[List[StationStatus]]:
+        stations = self.station_list
+        if not stations:
             return []
 
-        tasks = [self.fetch_station_status(station, session) for station in self.station_list]
+        tasks = [self.fetch_station_status(station, session) for station in stations]
         results = await asyncio.gather(*tasks)
 
-        final_list: List[Dict[str, Any]] = []
+        final_list: List[StationStatus] = []
 
-        for station, (status, exc) in zip(self.station_list, results):
+        for station, (status, exc) in zip(stations, results):
             if exc or status is None:
                 logger.warning("DLMM station %s failed, fallback zeros", station.name)
-                final_list.append(
-                    {
-                        "provider": self.provider,
-                        "hash_id": station.hash_id,
-                        "name": station.name,
-                        "campus_id": station.campus_id,
-                        "campus_name": station.campus_name,
-                        "lat": station.lat,
-                        "lon": station.lon,
-                        "device_ids": station.device_ids,
-                        "updated_at": station.updated_at,
-                        "free": 0,
-                        "used": 0,
-                        "total": 0,
-                        "error": 0,
-                    }
-                )
+                final_list.append(StationStatus(station))
                 continue
 
             final_list.append(
-                {
-                    "provider": self.provider,
-                    "hash_id": station.hash_id,
-                    "name": station.name,
-                    "campus_id": station.campus_id,
-                    "campus_name": station.campus_name,
-                    "lat": station.lat,
-                    "lon": station.lon,
-                    "device_ids": station.device_ids,
-                    "updated_at": station.updated_at,
-                    "free": status["free"],
-                    "used": status["used"],
-                    "total": status["total"],
-                    "error": status["error"],
-                }
+                StationStatus(
+                    station,
+                    free=status["free"],
+                    used=status["used"],
+                    total=status["total"],
+                    error=status["error"],
+                    unchanged=status.get("unchanged", False),
+                )
             )
 
         return final_list
@@ -0,0 +1,289 @@
+"""其他服务商（ElseProvider）下的子服务商适配器注册表
+
+每个子服务商（万充科技、超翔科技、多航科技……）对应一个 ``VendorAdapter`` 子类，按
+``station.provider`` 的名称注册到 ``VENDOR_ADAPTERS``，ElseProvider 通过字典查找分发请求。
+每个适配器持有独立的 ``aiohttp.ClientSession``（独立连接池、超时与并发上限），
+同一子服务商的所有设备复用同一组连接。
+
+新增子服务商时只需继承 ``VendorAdapter`` 实现 ``request_payload``（发请求取原始 JSON）与
+``parse_device_payload``（解析为端口计数），并用 ``@register_vendor`` 注册；
+响应带逐个端口状态的子服务商可再实现 ``parse_port_states``，供端口级状态记录使用。
+"""
+
+import asyncio
+import logging
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+import aiohttp
+
+from fetcher.fingerprints import payload_fingerprints
+from fetcher.payload_store import payload_store
+from fetcher.port_history import PORT_ERROR, PORT_FREE, PORT_USED, port_history
+from server.config import Config
+
+logger = logging.getLogger(__name__)
+
+DeviceResult = Tuple[Optional[Dict[str, Any]], Optional[Exception]]
+
+# 子服务商名称（即 CSV 中的 provider 列）-> 适配器类
+VENDOR_ADAPTERS: Dict[str, Type["VendorAdapter"]] = {}
+
+
+def _zero() -> Dict[str, int]:
+    return {"total": 0, "free": 0, "used": 0, "error": 0}
+
+
+def register_vendor(*names: str) -> Callable[[Type["VendorAdapter"]], Type["VendorAdapter"]]:
+    """类装饰器：将适配器注册到一个或多个子服务商名称下"""
+
+    def decorator(cls: Type["VendorAdapter"]) -> Type["VendorAdapter"]:
+        for name in names:
+            VENDOR_ADAPTERS[name] = cls
+        return cls
+
+    return decorator
+
+
+class VendorAdapter:
+    """子服务商适配器基类
+
+    类属性给出默认连接参数，可通过环境变量按 ``key`` 覆盖：
+    ``PROVIDER_ELSE_PROVIDER_<KEY>_TIMEOUT`` / ``_CONCURRENCY`` / ``_POOL_SIZE`` / ``_BASE_URL``。
+    """
+
+    key: str = ""  # ASCII 标识，用于配置项命名
+    timeout: float = 5.0  # 单次请求总超时（秒）
+    concurrency: int = 10  # 同时在飞的请求上限
+    pool_size: int = 10  # 连接池大小
+    base_url: str = ""  # 接口根地址（不含结尾的 /）
+
+    def __init__(self, vendor: str):
+        self.vendor = vendor
+        self.timeout = float(self._config("timeout", self.timeout))
+        self.concurrency = int(self._config("concurrency", self.concurrency))
+        self.pool_size = int(self._config("pool_size", self.pool_size))
+        self.base_url = (self._config("base_url", "") or self.base_url).rstrip("/")
+        # 录制 / 回放使用的响应归属，与 ElseProvider 的设备缓存键一致
+        self.scope = f"其他:{vendor}"
+        # 会话与并发信号量都绑定创建时的事件循环，换了事件循环（如每次 asyncio.run）时一并重建
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _config(self, name: str, default: Any) -> Any:
+        if not self.key:
+            return default
+        return Config.get_provider_config_value("else_provider", f"{self.key}_{name}", default)
+
+    def _get_session(self) -> Tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        """懒创建当前事件循环中本子服务商专用的会话与并发信号量（必须在事件循环中调用）"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                # 旧会话属于另一个事件循环，无法在当前循环中 await close，只能解除并丢弃
+                logger.debug("%s 的会话属于另一个事件循环，重新创建", self.vendor)
+                self._session.detach()
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._session, self._semaphore
+
+    async def fetch(self, device_id: str) -> DeviceResult:
+        """在并发上限内请求单个设备"""
+        session, semaphore = self._get_session()
+        async with semaphore:
+            return await self.request(session, device_id)
+
+    async def request(self, session: aiohttp.ClientSession, device_id: str) -> DeviceResult:
+        """取原始响应（经 payload_store，可录制 / 回放）并解析为 {"total", "free", "used", "error"}"""
+        try:
+            payload = await payload_store.fetch(
+                self.scope, device_id, partial(self.request_payload, session, device_id)
+            )
+            data = payload_fingerprints.parse(
+                self.scope, device_id, payload, self.parse_device_payload
+            )
+            port_history.observe(
+                self.scope, device_id, data["unchanged"], partial(self.parse_port_states, payload)
+            )
+            return data, None
+        except Exception as exc:
+            return _zero(), exc
+
+    async def request_payload(self, session: aiohttp.ClientSession, device_id: str) -> Any:
+        """发起请求并返回原始 JSON，由子类实现"""
+        raise NotImplementedError
+
+    def parse_device_payload(self, payload: Any, device_id: str) -> Dict[str, int]:
+        """将原始 JSON 解析为 {"total", "free", "used", "error"}，由子类实现"""
+        raise NotImplementedError
+
+    def parse_port_states(self, payload: Any) -> Optional[List[int]]:
+        """逐个端口的状态（见 fetcher/port_history.py），响应中没有端口明细时返回 None"""
+        return None
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+
+
+@register_vendor("河狸物联", "威可迪换电", "待补充")
+class PlaceholderVendor(VendorAdapter):
+    """暂无可用接口的子服务商，固定返回全 0（不是响应解析结果，因此不标记为未变化）"""
+
+    async def fetch(self, device_id: str) -> DeviceResult:
+        return {**_zero(), "unchanged": False}, None
+
+
+@register_vendor("万充科技")
+class WanchongVendor(VendorAdapter):
+    key = "wanchong"
+    base_url = "https://websocket.wanzhuangkj.com"
+
+    def __init__(self, vendor: str):
+        super().__init__(vendor)
+        self.token = Config.get_provider_config_value("else_provider", "wanchong_token", "")
+
+    async def request_payload(self, session: aiohttp.ClientSession, device_id: str) -> Any:
+        url = f"{self.base_url}/query?company_id=29&device_num={device_id}"
+        async with session.get(url, headers={"authorization": self.token}) as resp:
+            resp.raise_for_status()
+            return await resp.json(content_type=None)
+
+    def parse_device_payload(self, payload: Any, device_id: str) -> Dict[str, int]:
+        ports = payload.get("data", {}).get("port", [])
+        state = [port.get("state") for port in ports]
+        free = state.count(0)
+        used = state.count(2)
+        return {
+            "total": len(state),
+            "free": free,
+            "used": used,
+            "error": len(state) - free - used,
+        }
+
+
+@register_vendor("超翔科技")
+class ChaoxiangVendor(VendorAdapter):
+    key = "chaoxiang"
+    base_url = "https://api2.hzchaoxiang.cn"
+
+    async def request_payload(self, session: aiohttp.ClientSession, device_id: str) -> Any:
+        url = f"{self.base_url}/api-device/api/v1/scan/Index"
+        async with session.post(url, data={"DeviceNumber": device_id}) as resp:
+            return await resp.json()
+
+    def parse_device_payload(self, payload: Any, device_id: str) -> Dict[str, int]:
+        device_ways = payload.get("data", {}).get("DeviceWays", [])
+        sta = [way.get("State") for way in device_ways]
+        free = sta.count(1)
+        used = sta.count(2)
+        return {
+            "total": len(device_ways),
+            "free": free,
+            "used": used,
+            "error": len(device_ways) - free - used,
+        }
+
+
+@register_vendor("电动车充电网")
+class LetfungoVendor(VendorAdapter):
+    key = "letfungo"
+    base_url = "https://app.letfungo.com"
+
+    def __init__(self, vendor: str):
+        super().__init__(vendor)
+        self.token = Config.get_provider_config_value("else_provider", "letfungo_token", "")
+
+    async def request_payload(self, session: aiohttp.ClientSession, device_id: str) -> Any:
+        url = f"{self.base_url}/api/cabinet/getSiteDetail2"
+        params = {"siteId": device_id, "token": self.token}
+        async with session.post(url, params=params) as resp:
+            return await resp.json(content_type=None)
+
+    def parse_device_payload(self, payload: Any, device_id: str) -> Dict[str, int]:
+        device = payload.get("data", {})
+        used = device.get("charger_false")
+        free = device.get("charger_true")
+        return {"total": free + used, "free": free, "used": used, "error": 0}
+
+
+@register_vendor("多航科技")
+class OpencoolVendor(VendorAdapter):
+    key = "opencool"
+    timeout = 10.0
+    base_url = "https://mini.opencool.top"
+
+    def __init__(self, vendor: str):
+        super().__init__(vendor)
+        self.token = Config.get_provider_config_value("else_provider", "opentool_token", "")
+
+    async def request_payload(self, session: aiohttp.ClientSession, device_id: str) -> Any:
+        url = f"{self.base_url}/api/device.device/scan"
+        headers = {
+            "Content-Type": "application/json",
+            "token": self.token,
+        }
+        data = {
+            "sn": f"GD1B{device_id}",
+            "_sn": f"GD1B{device_id}",
+            "is_check": 0,
+            "new_rule": 1,
+        }
+        async with session.post(url, headers=headers, json=data) as resp:
+            return await resp.json()
+
+    def parse_device_payload(self, payload: Any, device_id: str) -> Dict[str, int]:
+        port_list = payload.get("data", {}).get("port_list", [])
+
+        free = used = total = error = 0
+        for port in port_list:
+            if port.get("status_text") == "使用中":
+                used += 1
+            elif port.get("status_text") == "空闲":
+                free += 1
+            else:
+                error += 1
+        total = free + used + error
+        return {"total": total, "free": free, "used": used, "error": error}
+
+    def parse_port_states(self, payload: Any) -> Optional[List[int]]:
+        states = {"使用中": PORT_USED, "空闲": PORT_FREE}
+        port_list = payload.get("data", {}).get("port_list", [])
+        return [states.get(port.get("status_text"), PORT_ERROR) for port in port_list]
+
+
+@register_vendor("嘟嘟换电")
+class DuduVendor(VendorAdapter):
+    key = "dudu"
+    timeout = 10.0
+    base_url = "https://api.dudugxcd.com"
+
+    async def request_payload(self, session: aiohttp.ClientSession, device_id: str) -> Any:
+        url = f"{self.base_url}/sharing-citybike-consumer/site/v2/map/info?id={device_id}"
+        async with session.get(url, headers={"oem_code": "citybike"}) as resp:
+            return await resp.json()
+
+    def parse_device_payload(self, payload: Any, device_id: str) -> Dict[str, int]:
+        if payload.get("code") != 200:
+            raise Exception(payload.get("message", "Unknown API Error"))
+        exchange_vo = payload.get("data", {}).get("cbExchangeVOList")
+        # 这里没有弄清楚其能用的标准是什么，free就不按照一个电站进行统计了，经过了验证
+        free = payload.get("data", {}).get("storeTake")
+        used = error = total = 0
+        if exchange_vo and isinstance(exchange_vo, list):  # 按电站来计算
+            for device in exchange_vo:
+                upload_vo = device.get("cbExchangeUploadVO", {}) if isinstance(device, dict) else {}
+                used += upload_vo.get("storeNull", 0)  # 这个是对的
+                error += upload_vo.get("storeLowPowerBatteryCharge", 0) + upload_vo.get(
+                    "storeSoftLock", 0
+                )  # 这个不一定是对的
+                total += upload_vo.get("storeCount", 0)  # 这个是对的
+        return {"total": total, "free": free, "used": used, "error": error}
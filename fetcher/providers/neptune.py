@@ -4,12 +4,16 @@ import aiohttp
 import asyncio
 import json
 import logging
+from functools import partial
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, List, Tuple
 
 # 假设这些类和函数已定义或可导入
 from .provider_base import ProviderBase
-from fetcher.station import Station
+from fetcher.fingerprints import payload_fingerprints, results_unchanged
+from fetcher.payload_store import payload_store
+from fetcher.port_history import PORT_ERROR, PORT_FREE, PORT_UNKNOWN, PORT_USED, port_history
+from fetcher.station import Station, StationStatus
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +21,17 @@ logger = logging.getLogger(__name__)
 ClientSession = aiohttp.ClientSession
 TIMEOUT = aiohttp.ClientTimeout(total=5)
 MAX_RETRIES = 5
+DEVICE_INFO_PATH = "/wxn/getDeviceInfo"
+# portstatur 中每个字符对应一个端口
+PORT_STATES = {"0": PORT_FREE, "1": PORT_USED, "3": PORT_ERROR}
 
 
 @dataclass
 class NeptuneProvider(ProviderBase):
     """尼普顿充电桩服务商适配器"""
 
+    DEFAULT_BASE_URL = "http://www.szlzxn.cn"
+
     @property
     def provider(self) -> str:
         return "neptune"
@@ -35,11 +44,11 @@ class NeptuneProvider(ProviderBase):
 
         return None
 
-    async def fetch_device_status(
-        self, station: Station, device_id: str, session: ClientSession
-    ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
-        """获取单个设备状态数据。通过 getStationList 接口并过滤 device_id。"""
-        api_address: str = "http://www.szlzxn.cn/wxn/getDeviceInfo"
+    async def request_device_payload(
+        self, device_id: str, session: ClientSession
+    ) -> Dict[str, Any]:
+        """请求 getDeviceInfo 接口，返回原始 JSON（网络错误时重试）"""
+        api_address: str = self.endpoint(DEVICE_INFO_PATH)
 
         for attempt in range(MAX_RETRIES):
             try:
@@ -49,33 +58,63 @@ class NeptuneProvider(ProviderBase):
                     timeout=TIMEOUT,
                 ) as response:
                     response.raise_for_status()
-                    json_data = await response.json()
-                    if json_data.get("success") is not True:
-                        return None, ValueError(
-                            f"API failed for device {device_id}: {json_data.get('msg')}"
-                        )
-
-                    # 遍历返回的站点列表，找到匹配 device_id 的设备
-                    item = json_data["obj"]
-                    if str(item.get("devaddress")) == str(device_id):
-                        # 返回包含 portstatur 的原始数据
-                        return item, None
-
-                    # 找到了API，但没找到设备
-                    return None, ValueError(
-                        f"Device {device_id} not found in API response. {json_data}"
-                    )
+                    return await response.json()
 
             except (
                 TimeoutError,
                 aiohttp.ClientError,
                 json.JSONDecodeError,
-            ) as e:
+            ):
                 if attempt == MAX_RETRIES - 1:
-                    return None, e
+                    raise
                 await asyncio.sleep(1)
-                continue
-        return None, Exception("Reached max retries fetching device status.")
+        raise Exception("Reached max retries fetching device status.")
+
+    def parse_device_payload(self, payload: Dict[str, Any], device_id: str) -> Dict[str, int]:
+        """从 getDeviceInfo 响应的 portstatur 字符串统计端口状态（0 空闲 / 1 使用中 / 3 故障）"""
+        if payload.get("success") is not True:
+            raise ValueError(f"API failed for device {device_id}: {payload.get('msg')}")
+
+        item = payload["obj"]
+        if str(item.get("devaddress")) != str(device_id):
+            # 找到了API，但没找到设备
+            raise ValueError(f"Device {device_id} not found in API response. {payload}")
+
+        portstatus = str(item.get("portstatur", ""))
+        if not portstatus:
+            logger.warning("Device %s status data has no 'portstatur' string.", device_id)
+        return {
+            "free": portstatus.count("0"),
+            "used": portstatus.count("1"),
+            "error": portstatus.count("3"),
+            "total": len(portstatus),
+        }
+
+    def parse_port_states(self, payload: Dict[str, Any]) -> List[int]:
+        """逐个端口解析 portstatur（需先经 parse_device_payload 校验），未知字符记为未知状态"""
+        portstatus = str(payload["obj"].get("portstatur", ""))
+        return [PORT_STATES.get(char, PORT_UNKNOWN) for char in portstatus]
+
+    async def fetch_device_status(
+        self, station: Station, device_id: str, session: ClientSession
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+        """获取单个设备的端口统计（请求经 payload_store，可录制 / 回放）"""
+        try:
+            payload = await payload_store.fetch(
+                self.provider, device_id, partial(self.request_device_payload, device_id, session)
+            )
+            data = payload_fingerprints.parse(
+                self.provider, device_id, payload, self.parse_device_payload
+            )
+            port_history.observe(
+                self.provider,
+                device_id,
+                data["unchanged"],
+                partial(self.parse_port_states, payload),
+            )
+            return data, None
+        except Exception as e:
+            return None, e
 
     async def fetch_station_status(
         self, station: Station, session: ClientSession
@@ -84,7 +123,11 @@ class NeptuneProvider(ProviderBase):
 
         # 尼普顿模式下，我们必须对每个 device_id 执行一次 API 调用并聚合结果
         tasks = [
-            self.fetch_device_status(station, device_id, session)
+            self.fetch_device_cached(
+                device_id,
+                partial(self.fetch_device_status, station, device_id, session),
+                session=session,
+            )
             for device_id in station.device_ids
         ]
 
@@ -97,22 +140,14 @@ class NeptuneProvider(ProviderBase):
 
         exceptions = []
 
-        for device_id, (device_data, exc) in zip(station.device_ids, results):
+        for device_data, exc in results:
             if exc or device_data is None:
                 exceptions.append(exc or ValueError("No device data"))
                 continue
-
-            # 提取并聚合 portstatur 核心逻辑 (保持不变)
-            portstatus = str(device_data.get("portstatur", ""))
-
-            if not portstatus:
-                logger.warning("Device %s status data has no 'portstatur' string.", device_id)
-                continue
-            # print(portstatus)
-            free += portstatus.count("0")
-            used += portstatus.count("1")
-            error += portstatus.count("3")
-            total += len(portstatus)
+            free += device_data["free"]
+            used += device_data["used"]
+            error += device_data["error"]
+            total += device_data["total"]
 
         # 站点聚合状态数据
         aggregated_status = {
@@ -126,6 +161,7 @@ class NeptuneProvider(ProviderBase):
             "lat": station.lat,
             "lon": station.lon,
             "device_ids": station.device_ids,
+            "unchanged": results_unchanged(results),
         }
 
         # 仅在所有任务都失败时才返回异常
@@ -134,56 +170,36 @@ class NeptuneProvider(ProviderBase):
 
         return aggregated_status, None
 
-    async def fetch_status(self, session: ClientSession) -> Optional[List[Dict[str, Any]]]:
+    async def fetch_status(self, session: ClientSession) -> Optional[List[StationStatus]]:
         """获取供应商所有 station 的状态数据并转换为统一格式。"""
 
-        if not self.station_list:
+        stations = self.station_list
+        if not stations:
             return []
 
-        tasks = [self.fetch_station_status(station, session) for station in self.station_list]
+        tasks = [self.fetch_station_status(station, session) for station in stations]
 
         results = await asyncio.gather(*tasks)
-        final_list: List[Dict[str, Any]] = []
+        final_list: List[StationStatus] = []
 
-        for station, (status_dict, exc) in zip(self.station_list, results):
+        for station, (status_dict, exc) in zip(stations, results):
             # 失败处理：返回全故障条目
             if exc or status_dict is None:
                 total_ports = sum(len(d) for d in station.device_ids)  # 粗略估计端口总数
-                final_list.append(
-                    {
-                        "provider": self.provider,
-                        "hash_id": station.hash_id,
-                        "name": station.name,
-                        "campus_id": station.campus_id,
-                        "campus_name": station.campus_name,
-                        "lat": station.lat,
-                        "lon": station.lon,
-                        "device_ids": station.device_ids,
-                        "updated_at": station.updated_at,
-                        "free": 0,
-                        "used": 0,
-                        "total": (status_dict.get("total", 0) if status_dict else total_ports),
-                        "error": (status_dict.get("total", 0) if status_dict else total_ports),
-                    }
-                )
+                total = status_dict.get("total", 0) if status_dict else total_ports
+                final_list.append(StationStatus(station, total=total, error=total))
                 continue
 
-            # 成功获取：合并元数据和状态数据
-            formatted_item = {
-                "provider": status_dict["provider"],
-                "hash_id": status_dict["hash_id"],
-                "name": status_dict["name"],
-                "campus_id": station.campus_id,
-                "campus_name": station.campus_name,
-                "lat": status_dict["lat"],
-                "lon": status_dict["lon"],
-                "device_ids": status_dict["device_ids"],
-                "updated_at": station.updated_at,
-                "free": status_dict["free"],
-                "used": status_dict["used"],
-                "total": status_dict["total"],
-                "error": status_dict["error"],
-            }
-            final_list.append(formatted_item)
+            # 成功获取：状态记录直接引用站点元数据
+            final_list.append(
+                StationStatus(
+                    station,
+                    free=status_dict["free"],
+                    used=status_dict["used"],
+                    total=status_dict["total"],
+                    error=status_dict["error"],
+                    unchanged=status_dict["unchanged"],
+                )
+            )
 
         return final_list
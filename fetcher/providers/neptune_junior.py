@@ -2,45 +2,60 @@ import aiohttp
 import asyncio
 import json
 import logging
+from functools import partial
 from dataclasses import dataclass
 from typing import Dict, Any, Optional, List, Tuple
 
 from .provider_base import ProviderBase
-from fetcher.station import Station
+from fetcher.fingerprints import payload_fingerprints, results_unchanged
+from fetcher.payload_store import payload_store
+from fetcher.station import Station, StationStatus
+from fetcher.token_manager import AuthError, TokenManager, token_store
 from server.config import Config
 
 logger = logging.getLogger(__name__)
 
+AUTH_PATH = "/api/auth/wx/mp"
+AREA_PATH = "/api/charging/pile/listChargingPileDistByArea"
+
 
 @dataclass
 class NeptuneJuniorProvider(ProviderBase):
     """尼普顿智慧生活公众号服务商适配器"""
 
-    token: str = ""
+    DEFAULT_BASE_URL = "https://gateway.hzxwwl.com"
 
     def __post_init__(self):
-        """初始化时从配置读取 openid 和 unionid"""
+        """初始化时从配置读取 openid 和 unionid，并创建 token 管理器"""
         self.openid = Config.get_provider_config_value("neptune_junior", "openid", "")
         self.unionid = Config.get_provider_config_value("neptune_junior", "unionid", "")
+        self.token_manager = TokenManager(
+            self.provider,
+            self._request_token,
+            store=token_store,
+            default_ttl=Config.PROVIDER_TOKEN_TTL,
+            refresh_margin=Config.PROVIDER_TOKEN_REFRESH_MARGIN,
+        )
 
     @property
     def provider(self) -> str:
         return "neptune_junior"
 
-    async def ensure_token(self, session: aiohttp.ClientSession):
-        """如果 token 为空 → 请求一次"""
-        if self.token:
-            return self.token
-
-        url = (
-            f"https://gateway.hzxwwl.com/api/auth/wx/mp?openid={self.openid}&unionid={self.unionid}"
-        )
+    @property
+    def token(self) -> str:
+        return self.token_manager.token
 
-        async with session.get(url) as response:
+    async def _request_token(self, session: aiohttp.ClientSession) -> Tuple[str, Optional[float]]:
+        """请求鉴权接口获取新 token（过期时间由 TokenManager 从 JWT 解析或按默认有效期计算）"""
+        params = {"openid": self.openid, "unionid": self.unionid}
+        async with session.get(self.endpoint(AUTH_PATH), params=params) as response:
             response.raise_for_status()
             data = await response.json()
-            self.token = data.get("data", {}).get("token", "")
-            return self.token
+            return (data.get("data") or {}).get("token", ""), None
+
+    async def ensure_token(self, session: aiohttp.ClientSession):
+        """返回有效 token，缺失或临近过期时自动刷新"""
+        return await self.token_manager.get_token(session)
 
     # --- 抽象方法实现 ---
     async def fetch_station_list(
@@ -49,35 +64,58 @@ class NeptuneJuniorProvider(ProviderBase):
         """TODO: 获取站点列表"""
         return None
 
+    async def _request_area(
+        self, device_id: str, session: aiohttp.ClientSession, token: str
+    ) -> Dict[str, Any]:
+        """携带 token 请求单个充电区域的统计数据，鉴权失败时抛出 AuthError"""
+        async with session.get(
+            self.endpoint(AREA_PATH),
+            params={"chargingAreaId": device_id},
+            headers={"REQ-NPD-TOKEN": token},
+        ) as res:
+            if res.status in (401, 403):
+                raise AuthError(f"HTTP {res.status}")
+            res.raise_for_status()
+            resp = await res.json()
+            if resp.get("code") in (401, 403):
+                raise AuthError(resp.get("msg") or resp.get("message") or str(resp.get("code")))
+            return resp
+
+    async def request_device_payload(
+        self, device_id: str, session: aiohttp.ClientSession
+    ) -> Dict[str, Any]:
+        """携带 token 请求充电区域统计，返回原始 JSON（token 失效时自动刷新重试）"""
+        return await self.token_manager.call_with_auth(
+            session, partial(self._request_area, device_id, session)
+        )
+
+    def parse_device_payload(self, payload: Dict[str, Any], device_id: str) -> Dict[str, int]:
+        """解析 listChargingPileDistByArea 响应中的区域汇总计数"""
+        data = payload.get("data", {})
+        total = data.get("totalPileNumber", 0)
+        free = data.get("totalFreeNumber", 0)
+        error = data.get("totalTroubleNumber", 0)
+        booking = data.get("totalBookingNumber", 0)
+        upgrade = data.get("totalUpgradeNumber", 0)
+        used = total - free - error - booking - upgrade
+        return {
+            "total": total,
+            "free": free,
+            "used": used,
+            "error": error,
+            "booking": booking,
+        }
+
     async def fetch_device_status(
         self, device_id: str, session: aiohttp.ClientSession
     ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
         try:
-            await self.ensure_token(session)
-
-            url = (
-                "https://gateway.hzxwwl.com/api/charging/pile/"
-                f"listChargingPileDistByArea?chargingAreaId={device_id}"
+            payload = await payload_store.fetch(
+                self.provider, device_id, partial(self.request_device_payload, device_id, session)
             )
-
-            async with session.get(url, headers={"REQ-NPD-TOKEN": self.token}) as res:
-                res.raise_for_status()
-                resp = await res.json()
-
-                data = resp.get("data", {})
-                total = data.get("totalPileNumber", 0)
-                free = data.get("totalFreeNumber", 0)
-                error = data.get("totalTroubleNumber", 0)
-                booking = data.get("totalBookingNumber", 0)
-                upgrade = data.get("totalUpgradeNumber", 0)
-                used = total - free - error - booking - upgrade
-                return {
-                    "total": total,
-                    "free": free,
-                    "used": used,
-                    "error": error,
-                    "booking": booking,
-                }, None
+            return payload_fingerprints.parse(
+                self.provider, device_id, payload, self.parse_device_payload
+            ), None
 
         except Exception as e:
             return None, e
@@ -85,8 +123,16 @@ class NeptuneJuniorProvider(ProviderBase):
     async def fetch_station_status(
         self, station: Station, session: aiohttp.ClientSession
     ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
-        tasks = [self.fetch_device_status(device_id, session) for device_id in station.device_ids]
+        tasks = [
+            self.fetch_device_cached(
+                device_id, partial(self.fetch_device_status, device_id, session), session=session
+            )
+            for device_id in station.device_ids
+        ]
         results = await asyncio.gather(*tasks)
+        failure = self.all_devices_failed(results)
+        if failure is not None:
+            return None, failure
 
         total = free = used = error = booking = 0
 
@@ -105,54 +151,33 @@ class NeptuneJuniorProvider(ProviderBase):
             "used": used,
             "error": error,
             "booking": booking,
+            "unchanged": results_unchanged(results),
         }, None
 
-    async def fetch_status(self, session: aiohttp.ClientSession) -> Optional[List[Dict[str, Any]]]:
-        if not self.station_list:
+    async def fetch_status(self, session: aiohttp.ClientSession) -> Optional[List[StationStatus]]:
+        stations = self.station_list
+        if not stations:
             return []
 
-        tasks = [self.fetch_station_status(station, session) for station in self.station_list]
+        tasks = [self.fetch_station_status(station, session) for station in stations]
         results = await asyncio.gather(*tasks)
 
-        final_list = []
+        final_list: List[StationStatus] = []
 
-        for station, (status, exc) in zip(self.station_list, results):
+        for station, (status, exc) in zip(stations, results):
             if exc or status is None:
-                final_list.append(
-                    {
-                        "provider": self.provider,
-                        "hash_id": station.hash_id,
-                        "name": station.name,
-                        "campus_id": station.campus_id,
-                        "campus_name": station.campus_name,
-                        "lat": station.lat,
-                        "lon": station.lon,
-                        "device_ids": station.device_ids,
-                        "updated_at": station.updated_at,
-                        "free": 0,
-                        "used": 0,
-                        "total": 0,
-                        "error": 0,
-                    }
-                )
+                final_list.append(StationStatus(station))
                 continue
 
             final_list.append(
-                {
-                    "provider": self.provider,
-                    "hash_id": station.hash_id,
-                    "name": station.name,
-                    "campus_id": station.campus_id,
-                    "campus_name": station.campus_name,
-                    "lat": station.lat,
-                    "lon": station.lon,
-                    "device_ids": station.device_ids,
-                    "updated_at": station.updated_at,
-                    "free": status["free"],
-                    "used": status["used"],
-                    "total": status["total"],
-                    "error": status["error"],
-                }
+                StationStatus(
+                    station,
+                    free=status["free"],
+                    used=status["used"],
+                    total=status["total"],
+                    error=status["error"],
+                    unchanged=status["unchanged"],
+                )
             )
 
         return final_list
@@ -2,11 +2,14 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 
 from pathlib import Path
 
-from fetcher.station import Station, load_stations_from_csv
+from fetcher.station import Station, StationStatus
+from fetcher.catalog_cache import station_catalog
+from fetcher.device_cache import device_cache
+from server.config import Config
 
 import aiohttp
 
@@ -23,6 +26,9 @@ class ProviderBase(ABC):
     SCRIPT_DIR = Path(__file__).parent
     DATA_DIR = SCRIPT_DIR / "data"
 
+    # 服务商接口的默认根地址，可通过 PROVIDER_<ID>_BASE_URL 覆盖（如指向本地模拟服务）
+    DEFAULT_BASE_URL = ""
+
     station_list: List[Station] = field(default_factory=list)
 
     @property
@@ -31,17 +37,36 @@ class ProviderBase(ABC):
         """服务商标识（如 'neptune'）"""
         raise NotImplementedError
 
+    @property
+    def base_url(self) -> str:
+        """服务商接口根地址（不含结尾的 /）"""
+        override = Config.get_provider_config_value(self.provider, "base_url", "")
+        return (override or self.DEFAULT_BASE_URL).rstrip("/")
+
+    def endpoint(self, path: str) -> str:
+        """拼接接口完整地址"""
+        return f"{self.base_url}{path}"
+
+    @property
+    def data_dir(self) -> Path:
+        """站点 CSV 所在目录，配置了 STATION_DATA_DIR 时使用该目录"""
+        return Path(Config.STATION_DATA_DIR) if Config.STATION_DATA_DIR else self.DATA_DIR
+
+    @property
+    def station_csv_path(self) -> Path:
+        """站点 CSV 路径，如 neptune -> data/neptune_stations.csv"""
+        return self.data_dir / f"{self.provider}_stations.csv"
+
     def load_station_from_csv(self) -> List[Station]:
-        csv_filename = f"{self.provider}_stations.csv"
-        csv_path = self.DATA_DIR / csv_filename
+        csv_path = self.station_csv_path
 
         if not csv_path.exists():
             print(f"Warning: Station file not found for provider '{self.provider}' at {csv_path}")
             self.station_list = []
             return []
 
-        # 使用通用的加载函数
-        self.station_list = load_stations_from_csv(csv_path)
+        # 经编译缓存加载，CSV 未变化时不再重新解析
+        self.station_list = station_catalog.load(csv_path)
         return self.station_list
 
     def load_station_from_db(self) -> List[Station]:
@@ -61,6 +86,49 @@ class ProviderBase(ABC):
         """
         return self.load_station_from_csv()
 
+    def device_scope(self, station: Station) -> str:
+        """站点下设备所属的命名空间（设备结果缓存与端口状态记录的键），默认为服务商标识"""
+        return self.provider
+
+    async def fetch_device_cached(
+        self,
+        device_id: str,
+        fetch: Callable[[], Awaitable[Tuple[Optional[Dict[str, Any]], Optional[Exception]]]],
+        scope: Optional[str] = None,
+        session: Optional[ClientSession] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+        """通过共享的设备结果缓存获取单个设备状态
+
+        Args:
+            device_id: 设备 ID（neptune_junior 中为区域 ID）
+            fetch: 实际发起请求的无参协程函数，通常为 partial(self.fetch_device_status, ...)
+            scope: 缓存键的命名空间，默认为 self.provider；同一服务商下不同接口需区分时传入
+            session: fetch 所用的会话，会话关闭时其上进行中的请求被取消（见 DeviceResultCache）
+        """
+        return await device_cache.get_or_fetch(
+            (scope or self.provider, str(device_id)), fetch, owner=session
+        )
+
+    @staticmethod
+    def all_devices_failed(
+        results: List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]],
+    ) -> Optional[Exception]:
+        """站点的设备结果全部失败时返回第一个异常，否则返回 None
+
+        聚合时跳过失败的设备只适用于部分失败；全部失败时必须作为错误上报，
+        否则 0/0/0/0 的聚合结果会被当作真实状态发布或缓存。
+        """
+        if not results:
+            return None
+        exceptions = [
+            exc or ValueError("No device data") for data, exc in results if exc or data is None
+        ]
+        return exceptions[0] if len(exceptions) == len(results) else None
+
+    async def close(self):
+        """释放服务商持有的长连接等资源，默认无操作"""
+        return None
+
     # 其余抽象方法保持不变
     @abstractmethod
     async def fetch_station_list(self, session: ClientSession) -> Optional[List[Dict[str, Any]]]:
@@ -82,6 +150,10 @@ class ProviderBase(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def fetch_status(self, session: ClientSession) -> Optional[List[Dict[str, Any]]]:
-        """获取供应商所有 station 的状态数据并转换为统一格式。"""
+    async def fetch_status(self, session: ClientSession) -> Optional[List[StationStatus]]:
+        """获取供应商所有 station 的状态数据，每个站点产出一条 StationStatus 记录。
+
+        station_list 可能在抓取过程中被热重载整体替换（见 ProviderManager.reload_stations），
+        实现时应在开头取一次引用，之后只使用该引用。
+        """
         raise NotImplementedError
@@ -1,143 +1,320 @@
-# 扫描尼普顿设备信息
-import requests
-import json
+"""扫描尼普顿设备号段，找出有效设备并按设备描述聚合（asyncio + aiohttp）
+
+- 设备号由生成器按需产出，经有界队列分发给固定数量的 worker，内存占用与扫描规模无关；
+- 所有请求复用同一个连接池，令牌桶限制每秒请求数；收到 HTTP 429 时把速率减半，
+  之后每次成功请求逐步恢复，避免触发服务商限流；
+- 超时、连接错误与 429 / 5xx 按指数退避重试；
+- 每发现一个有效设备立即追加写入明细 CSV，扫描结束后再写出按描述聚合的 CSV；
+- 扫描状态（``--state``，见 ``scan_state``）定期落盘：中断后再次运行会从断点续扫；
+  已确认无效的设备号记录在位图中，之后的扫描只按 ``--recheck-invalid`` 的比例抽查；
+  扫描完成后与站点目录对比，输出新增 / 消失 / 改名设备（``--diff-output``），
+  新增设备按描述聚合为站点目录格式的行（``--merge-output``），人工确认后即可合并。
+
+接口地址默认与 NeptuneProvider 一致，可用 ``PROVIDER_NEPTUNE_BASE_URL`` 或 ``--base-url`` 覆盖
+（例如指向 ``benchmarks.vendor_stub``）。
+
+用法:
+    python -m fetcher.providers.scan
+    python -m fetcher.providers.scan --concurrency 64 --rps 200 --output devices.csv
+    python -m fetcher.providers.scan --restart --recheck-invalid 1   # 忽略断点与位图，全量扫描
+    python -m fetcher.providers.scan --adaptive   # 自适应搜索，见 scan_search
+"""
+
 import argparse
+import asyncio
 import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Any, Generator, Tuple, Dict
-from tqdm import tqdm
+import json
+import random
+import time
 from collections import defaultdict
-
-
-# --- 核心抓取函数（返回所有详细数据） ---
-def get_device_info(address: str) -> Tuple[str, str, int, int, int] | None:
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from fetcher.providers.provider_base import ProviderBase
+from fetcher.providers.scan_search import AdaptiveSearch
+from fetcher.providers.scan_state import (
+    DeviceInfo,
+    ScanState,
+    catalog_devices,
+    diff_against_catalog,
+    load_catalog,
+    new_station_rows,
+    plan_ids,
+    write_diff,
+)
+from server.config import Config
+
+DEFAULT_BASE_URL = "http://www.szlzxn.cn"
+DEVICE_INFO_PATH = "/wxn/getDeviceInfo"
+RAW_FIELDS = list(DeviceInfo._fields)
+
+
+class RetryableError(Exception):
+    """可重试的请求失败（限流、服务端错误）"""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class RateLimiter:
+    """令牌桶限速器，支持 AIMD 调整：被限流时速率减半，成功时线性恢复到上限"""
+
+    def __init__(self, rate: float, min_rate: float = 1.0):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """等待直到可以发出下一个请求"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                # 桶容量为 1 秒的请求数，空闲一段时间后允许短暂突发
+                self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def slow_down(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = min(self._tokens, 1.0)
+
+    def speed_up(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+@dataclass
+class ScanStats:
+    scanned: int = 0
+    found: int = 0
+    failed: int = 0
+    retries: int = 0
+    throttled: int = 0
+    elapsed: float = 0.0
+
+
+# --- 响应解析 ---
+def parse_device_info(address: str, data: Dict[str, Any]) -> Optional[DeviceInfo]:
     """
-    通过 POST 请求获取指定设备地址 (address) 的详细信息。
-    成功获取到有效描述则返回 (devid, devdescript, 可用, 已用, 总数) 元组，否则返回 None。
+    解析 getDeviceInfo 的响应。
+    成功获取到有效描述则返回 DeviceInfo（含接口给出的经纬度，可能为空），否则返回 None。
     """
-    try:
-        response = requests.post(
-            "http://www.szlzxn.cn/wxn/getDeviceInfo",
-            data={"areaId": 6, "devaddress": address},
-            timeout=5,
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        obj = data.get("obj")
-
-        # 验证是否为有效设备：存在 obj 且 devdescript 不为空
-        if obj and obj.get("devdescript"):
-            dev_description = obj.get("devdescript", "未知设备").strip()
-            # 如果描述是空字符串，也视为无效，避免聚合出现空描述的分组
-            if not dev_description:
-                return None
+    obj = data.get("obj") if isinstance(data, dict) else None
 
-            port_status = obj.get("portstatur", "")
-            available_count = port_status.count("0")
-            used_count = port_status.count("1")
-            total_count = len(port_status)
-
-            # 返回结果元组 (devid, devdescript, ...)
-            return (address, dev_description, available_count, used_count, total_count)
-
-        return None
-
-    except requests.exceptions.RequestException:
+    # 有效设备：存在 obj 且 devdescript 非空（空白描述也视为无效，避免聚合出现空描述的分组）
+    if not obj:
         return None
-    except json.JSONDecodeError:
+    dev_description = (obj.get("devdescript") or "").strip()
+    if not dev_description:
         return None
 
+    port_status = obj.get("portstatur", "") or ""
+    available_count = port_status.count("0")
+    used_count = port_status.count("1")
+    total_count = len(port_status)
+    return DeviceInfo(
+        address,
+        dev_description,
+        available_count,
+        used_count,
+        total_count,
+        str(obj.get("longitude") or ""),
+        str(obj.get("latitude") or ""),
+    )
+
 
-# --- ID 生成器函数（与之前相同） ---
-def generate_ids_by_pattern() -> Generator[str, None, None]:
+# --- 核心抓取函数 ---
+async def get_device_info(
+    session: aiohttp.ClientSession,
+    url: str,
+    address: str,
+    limiter: RateLimiter,
+    stats: ScanStats,
+    retries: int = 3,
+) -> Tuple[Optional[DeviceInfo], bool]:
+    """请求单个设备号；限流、5xx、超时与连接错误按指数退避重试
+
+    返回 (设备信息, 是否得到响应)：无效设备为 (None, True)，重试耗尽为 (None, False)。
+    """
+    for attempt in range(retries + 1):
+        await limiter.acquire()
+        try:
+            async with session.post(url, data={"areaId": 6, "devaddress": address}) as response:
+                if response.status == 429 or response.status >= 500:
+                    raise RetryableError(response.status)
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+            limiter.speed_up()
+            return parse_device_info(address, data), True
+        except RetryableError as exc:
+            if exc.status == 429:
+                stats.throttled += 1
+                limiter.slow_down()
+        except (TimeoutError, aiohttp.ClientError, json.JSONDecodeError):
+            pass
+        if attempt < retries:
+            stats.retries += 1
+            await asyncio.sleep(0.5 * 2**attempt)
+    stats.failed += 1
+    return None, False
+
+
+# --- ID 生成器函数 ---
+PREFIXES = ["40", "50", "60"]
+MID_PARTS = ["459", "559", "659", "759", "859", "959"]
+
+
+def generate_ids_by_pattern() -> Iterable[str]:
     """
     根据用户定义的模式生成 8 位设备 ID 字符串。
     """
-    prefixes = ["40", "50", "60"]
-    mid_parts = ["459", "559", "659", "759", "859", "959"]
-
-    for prefix in prefixes:
-        for mid in mid_parts:
+    for prefix in PREFIXES:
+        for mid in MID_PARTS:
             full_prefix = prefix + mid
             for suffix_int in range(1000):
                 suffix_str = f"{suffix_int:03d}"
                 yield full_prefix + suffix_str
 
 
-# --- 扫描主逻辑（与之前相同，只是返回值类型不同） ---
-def pattern_scan(
-    ids_generator: Generator[str, None, None], max_workers: int = 50
-) -> List[Tuple[str, str, int, int, int]]:
-    """
-    接收 ID 生成器，并使用多线程和 tqdm 进行扫描。
+# --- 扫描主逻辑 ---
+async def pattern_scan(
+    ids: Iterable[str],
+    raw_output: str,
+    base_url: str = "",
+    concurrency: int = 50,
+    rps: float = 100.0,
+    timeout: float = 5.0,
+    retries: int = 3,
+    progress_interval: float = 2.0,
+    state: Optional[ScanState] = None,
+    checkpoint_interval: float = 10.0,
+    search: Optional[AdaptiveSearch] = None,
+) -> Tuple[List[DeviceInfo], ScanStats]:
     """
-    all_ids = list(ids_generator)
-    total_ids = len(all_ids)
-
-    if total_ids == 0:
-        print("❌ 未生成任何设备 ID。")
-        return []
-
-    print(f"✅ 根据模式共生成 {total_ids} 个 ID，开始并发扫描...")
-
-    found_results = []
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_address = {
-            executor.submit(get_device_info, address): address for address in all_ids
-        }
-
-        with tqdm(total=total_ids, desc="扫描进度") as pbar:
-            for future in as_completed(future_to_address):
-                pbar.update(1)
+    并发扫描设备号，发现的设备逐条写入 raw_output（CSV），返回全部发现的设备与统计。
 
+    设备号通过容量为 2 * concurrency 的队列交给 worker，生成器只在队列有空位时才继续产出。
+    传入 state 时（需已调用 ``state.begin``）逐个记录结果，每 checkpoint_interval 秒及退出时
+    （包括被中断）保存；续扫时明细 CSV 追加写入，返回值包含之前已发现的设备。
+    传入 search 时忽略 ids，待请求的设备号由 search 根据已有结果逐个产出。
+    """
+    url = f"{(base_url or DEFAULT_BASE_URL).rstrip('/')}{DEVICE_INFO_PATH}"
+    limiter = RateLimiter(rps)
+    stats = ScanStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+    found: List[DeviceInfo] = list(state.run.found.values()) if state else []
+    start = time.perf_counter()
+    append = bool(found) and Path(raw_output).exists()
+
+    with open(raw_output, "a" if append else "w", newline="", encoding="utf-8") as fp:
+        writer = csv.writer(fp)
+        if not append:
+            writer.writerow(RAW_FIELDS)
+
+        async def worker(session: aiohttp.ClientSession):
+            while True:
+                address = await queue.get()
+                if address is None:
+                    return
                 try:
-                    result = future.result()
+                    result, probed = await get_device_info(
+                        session, url, address, limiter, stats, retries
+                    )
+                    stats.scanned += 1
+                    if state is not None:
+                        state.record(address, result, probed)
+                    if search is not None:
+                        search.observe(address, result, probed)
                     if result:
-                        found_results.append(result)
-                        pbar.set_postfix_str(f"发现: {len(found_results)}")
-                except Exception:
-                    pass
-
-    print("\n✅ 所有模式匹配 ID 扫描完成。")
-    return found_results
+                        stats.found += 1
+                        found.append(result)
+                        writer.writerow(result)
+                        fp.flush()
+                finally:
+                    queue.task_done()
+
+        async def report_progress():
+            last_checkpoint = time.perf_counter()
+            while True:
+                await asyncio.sleep(progress_interval)
+                now = time.perf_counter()
+                if state is not None and now - last_checkpoint >= checkpoint_interval:
+                    state.save()
+                    last_checkpoint = now
+                elapsed = now - start
+                print(
+                    f"\r扫描进度: {stats.scanned} 个，发现 {stats.found}，失败 {stats.failed}，"
+                    f"{stats.scanned / elapsed:.0f} 个/秒（限速 {limiter.rate:.0f}/秒）",
+                    end="",
+                    flush=True,
+                )
+
+        connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+            workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+            reporter = asyncio.create_task(report_progress())
+            try:
+                if search is None:
+                    for address in ids:
+                        await queue.put(address)
+                else:
+                    while True:
+                        address = search.next_id()
+                        if address is None:
+                            # 暂无可请求的设备号：等在途请求的结果，再看是否产生了新的待请求设备号
+                            await queue.join()
+                            address = search.next_id()
+                            if address is None:
+                                break
+                        await queue.put(address)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                reporter.cancel()
+                for task in workers:
+                    task.cancel()
+                if state is not None:
+                    state.save()
+
+    stats.elapsed = time.perf_counter() - start
+    print()
+    return found, stats
 
 
 # --- 核心聚合逻辑 ---
 def aggregate_results(
-    results: List[Tuple[str, str, int, int, int]],
+    results: List[DeviceInfo],
 ) -> List[Dict[str, Any]]:
     """
-    按设备描述 (devdescript) 聚合设备 ID，并保留其他信息。
+    按设备描述 (devdescript) 聚合设备 ID。
 
     Args:
         results: 原始扫描结果列表。
 
     Returns:
-        按 devdescript 聚合后的列表。
+        按 devdescript 聚合后的列表，设备 ID 按数值排序。
     """
-    aggregated_data = defaultdict(lambda: {"devids": [], "available": 0, "used": 0, "total": 0})
+    aggregated_data = defaultdict(list)
+    for info in results:
+        aggregated_data[info.devdescript].append(info.devid)
 
-    # 第一次遍历：聚合 ID 和端口信息
-    for devid, devdescript, _available, _used, _total in results:
-        group = aggregated_data[devdescript]
-        group["devids"].append(devid)
-        # 这里仅聚合 ID，端口信息我们不进行累加，以第一次出现的为准，但为了简化，我们只输出 ID
-        # 如果需要保留端口信息，需要更复杂的逻辑来决定保留哪个设备的端口数据
-
-    # 第二次遍历：格式化最终输出列表
     final_output = []
-    for devdescript, data in aggregated_data.items():
-        # 将 ID 列表转换为所需的字符串形式 "[id1,id2,id3]"
-        devids_str = f"[{','.join(data['devids'])}]"
-
-        final_output.append(
-            {
-                "devdescript": devdescript,
-                "device_ids": devids_str,
-            }
-        )
+    for devdescript, devids in aggregated_data.items():
+        # 并发扫描的完成顺序不固定，排序后输出保持稳定；ID 列表转换为 "[id1,id2,id3]"
+        devids_str = f"[{','.join(sorted(devids, key=int))}]"
+        final_output.append({"devdescript": devdescript, "device_ids": devids_str})
 
     return final_output
 
@@ -155,43 +332,174 @@ def write_to_csv(
         print("🚫 无有效设备数据，不生成 CSV 文件。")
         return
 
-    # 定义 CSV 表头
     fieldnames = ["devdescript", "device_ids"]
 
     try:
         with open(output_filename, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
-
-            writer.writeheader()  # 写入表头
-            writer.writerows(aggregated_results)  # 写入数据行
+            writer.writeheader()
+            writer.writerows(aggregated_results)
 
         print(f"\n🎉 成功将 {len(aggregated_results)} 组设备信息写入文件: **{output_filename}**")
     except Exception as e:
         print(f"\n❌ 写入 CSV 文件失败: {e}")
 
 
-if __name__ == "__main__":
+def main():
     parser = argparse.ArgumentParser(
         description="根据特定模式扫描设备信息，按描述聚合 ID 并输出 CSV。"
     )
-    parser.add_argument("--workers", type=int, default=50, help="并发线程数 (默认: 50)")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数 (默认: 50)")
+    parser.add_argument("--rps", type=float, default=100.0, help="每秒请求数上限 (默认: 100)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="单次请求超时秒数 (默认: 5)")
+    parser.add_argument("--retries", type=int, default=3, help="失败重试次数 (默认: 3)")
+    parser.add_argument("--base-url", default="", help="接口根地址，默认同 NeptuneProvider")
     parser.add_argument(
         "--output",
         type=str,
         default="aggregated_device_results.csv",
         help="CSV 输出文件名 (默认: aggregated_device_results.csv)",
     )
-
+    parser.add_argument(
+        "--raw-output",
+        type=str,
+        default="scanned_devices.csv",
+        help="逐条写入发现设备的明细 CSV (默认: scanned_devices.csv)",
+    )
+    parser.add_argument(
+        "--state",
+        type=str,
+        default="scan_state.json",
+        help="扫描状态文件，用于断点续扫与跳过已知无效设备号，空字符串表示不保存 "
+        "(默认: scan_state.json)",
+    )
+    parser.add_argument("--restart", action="store_true", help="放弃未完成的扫描，重新开始")
+    parser.add_argument(
+        "--recheck-invalid",
+        type=float,
+        default=0.05,
+        help="已知无效设备号的抽查比例，1 表示全部重新请求 (默认: 0.05)",
+    )
+    parser.add_argument(
+        "--catalog",
+        type=str,
+        default=str(ProviderBase.DATA_DIR / "neptune_stations.csv"),
+        help="用于对比的站点目录 CSV，目录中的设备号总会被请求 (默认: 仓库自带的尼普顿目录)",
+    )
+    parser.add_argument(
+        "--diff-output",
+        type=str,
+        default="scan_diff.csv",
+        help="新增 / 消失 / 改名设备的 CSV (默认: scan_diff.csv)",
+    )
+    parser.add_argument(
+        "--merge-output",
+        type=str,
+        default="scan_new_stations.csv",
+        help="新增设备聚合成的站点目录行 (默认: scan_new_stations.csv)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="自适应搜索：稀疏抽样、命中附近加密、剪枝空号段并学习新号段（见 scan_search）",
+    )
+    parser.add_argument(
+        "--coarse-stride", type=int, default=32, help="自适应搜索粗扫的抽样间隔 (默认: 32)"
+    )
+    parser.add_argument(
+        "--fine-stride", type=int, default=8, help="自适应搜索细扫的抽样间隔 (默认: 8)"
+    )
+    parser.add_argument(
+        "--max-gap", type=int, default=3, help="簇扩展时允许的连续无效设备号个数 (默认: 3)"
+    )
+    parser.add_argument(
+        "--max-blocks", type=int, default=300, help="自适应搜索最多探索的号段数 (默认: 300)"
+    )
     args = parser.parse_args()
 
-    # 1. 生成 ID
-    ids_to_scan = generate_ids_by_pattern()
-
-    # 2. 扫描 (获取所有详细数据)
-    found_devices_detail = pattern_scan(ids_to_scan, args.workers)
+    state = ScanState.load(Path(args.state) if args.state else None)
+    resumed = state.begin(restart=args.restart)
+    stations = load_catalog(Path(args.catalog))
+    catalog_ids = set(catalog_devices(stations))
+    if resumed:
+        print(f"⏯️ 从断点续扫：已完成 {len(state.run.done)} 个，已发现 {len(state.run.found)} 个")
+    if len(state.invalid):
+        print(f"⏭️ 已知无效设备号 {len(state.invalid)} 个，按 {args.recheck_invalid:.0%} 抽查")
+
+    base_url = args.base_url or Config.get_provider_config_value("neptune", "base_url", "")
+    search = None
+    ids: Iterable[str] = ()
+    if args.adaptive:
+        search = AdaptiveSearch(
+            [prefix + mid for prefix in PREFIXES for mid in MID_PARTS],
+            must_probe=catalog_ids | set(state.known),
+            state=state,
+            recheck_ratio=args.recheck_invalid,
+            coarse_stride=args.coarse_stride,
+            fine_stride=args.fine_stride,
+            max_gap=args.max_gap,
+            max_blocks=args.max_blocks,
+        )
+    else:
+        ids = plan_ids(
+            generate_ids_by_pattern(), state, catalog_ids, args.recheck_invalid, random.Random()
+        )
+    try:
+        found, stats = asyncio.run(
+            pattern_scan(
+                ids,
+                args.raw_output,
+                base_url=base_url,
+                concurrency=args.concurrency,
+                rps=args.rps,
+                timeout=args.timeout,
+                retries=args.retries,
+                state=state,
+                search=search,
+            )
+        )
+    except KeyboardInterrupt:
+        print(f"\n⏸️ 扫描已中断，状态已保存，再次运行即可续扫: {args.state}")
+        return
+    print(
+        f"✅ 扫描完成: {stats.scanned} 个设备号，发现 {stats.found} 个，失败 {stats.failed}，"
+        f"重试 {stats.retries} 次（其中限流 {stats.throttled} 次），耗时 {stats.elapsed:.1f} 秒"
+    )
+    if search is not None:
+        search.finish()
+        print(
+            f"🔎 自适应搜索: 探索 {search.stats.blocks} 个号段（学习到 {search.stats.learned} 个，"
+            f"剪枝 {search.stats.pruned} 个），按扫描状态跳过 {search.stats.resolved} 个设备号"
+        )
+    write_to_csv(aggregate_results(found), args.output)
+
+    # 目录中的设备只有本次确实得到「无效」响应才算消失，请求失败的不算
+    probed_invalid = {
+        device_id
+        for device_id in catalog_ids
+        if device_id in state.run.done and device_id in state.invalid
+    }
+    previous = state.known
+    found_by_id = state.finish()
+    state.save()
+    changes = diff_against_catalog(found_by_id, stations, probed_invalid, previous)
+    write_diff(changes, Path(args.diff_output))
+    counts = {
+        kind: sum(change.change == kind for change in changes)
+        for kind in ("new", "vanished", "renamed")
+    }
+    print(
+        f"📋 与站点目录对比: 新增 {counts['new']}，消失 {counts['vanished']}，"
+        f"改名 {counts['renamed']}，明细: {args.diff_output}"
+    )
+    rows = new_station_rows(changes, found_by_id, stations)
+    if rows:
+        with open(args.merge_output, "w", newline="", encoding="utf-8") as fp:
+            writer = csv.DictWriter(fp, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"🧩 {len(rows)} 个新站点的目录行（需人工确认校区与坐标）: {args.merge_output}")
 
-    # 3. 聚合结果 (按 devdescript 分组)
-    aggregated_data = aggregate_results(found_devices_detail)
 
-    # 4. 写入 CSV 文件
-    write_to_csv(aggregated_data, args.output)
+if __name__ == "__main__":
+    main()
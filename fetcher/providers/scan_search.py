@@ -0,0 +1,180 @@
+"""设备号的自适应搜索：稀疏抽样、命中附近加密、空号段剪枝、从命中学习新号段
+
+尼普顿的有效设备号成簇分布：同一站点的设备号通常连续（如 ``50359156`` ~ ``50359173``），
+大部分号段（设备号去掉末三位，下称「块」）完全为空。自适应搜索不再逐个请求每块的 1000 个设备号：
+
+1. 粗扫：每块按 ``coarse_stride`` 间隔抽样（随机起点），全部落空的块即被剪枝；
+2. 细扫：块内第一次命中后，按 ``fine_stride`` 间隔补充抽样，找出块内其余的簇；
+3. 扩展：每个命中向两侧逐个请求，连续 ``max_gap`` 个无效后停止，把整簇设备号补全；
+4. 学习：块内第一次命中后，把「前缀」（前两位）与「中段」（第三至五位）加入已知模式，
+   生成已知前缀 × 已知中段的组合，以及前三位数字各 ±1 的相邻块，作为新的粗扫对象
+   （总块数不超过 ``max_blocks``）。
+
+请求顺序为扩展 > 细扫 > 粗扫，优先把已发现的簇补全。搜索由结果驱动，``next_id`` 暂时无事可做
+（等待在途请求的结果）时返回 None，由调用方等在途请求全部完成后再询问，仍为 None 即搜索结束。
+
+代价是召回率：短于抽样间隔、且所在块没有其他命中的孤立设备可能被漏掉，
+站点目录与上次扫描已知的设备号（``must_probe``）总会请求，以此兜底。
+"""
+
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple
+
+from fetcher.providers.scan_state import DeviceInfo, ScanState, should_probe
+
+BLOCK_SIZE = 1000
+
+
+@dataclass
+class SearchStats:
+    blocks: int = 0
+    pruned: int = 0
+    learned: int = 0
+    resolved: int = 0  # 按扫描状态直接得出结果、未发请求的设备号
+
+
+class AdaptiveSearch:
+    """按结果逐步产出待请求设备号的搜索器，配合 ``scan.pattern_scan(search=...)`` 使用"""
+
+    def __init__(
+        self,
+        blocks: Iterable[str],
+        must_probe: Iterable[str] = (),
+        state: Optional[ScanState] = None,
+        recheck_ratio: float = 0.05,
+        coarse_stride: int = 32,
+        fine_stride: int = 8,
+        max_gap: int = 3,
+        max_blocks: int = 300,
+        rng: Optional[random.Random] = None,
+    ):
+        self.state = state
+        self.must_probe = set(must_probe)
+        self.recheck_ratio = recheck_ratio
+        self.coarse_stride = coarse_stride
+        self.fine_stride = fine_stride
+        self.max_gap = max_gap
+        self.max_blocks = max_blocks
+        self.rng = rng or random.Random()
+        self.stats = SearchStats()
+
+        self._seen: Set[str] = set()
+        self._hit_blocks: Set[str] = set()
+        self._blocks: Set[str] = set()
+        self._prefixes: Set[str] = set()
+        self._mids: Set[str] = set()
+        # 扩展队列的元素为 (设备号, 方向, 已连续无效个数)，方向为 0 表示必须请求的种子
+        self._expand: Deque[Tuple[str, int, int]] = deque()
+        self._fine: Deque[str] = deque()
+        self._coarse: Deque[str] = deque()
+        self._pending: Dict[str, Tuple[int, int]] = {}
+
+        for device_id in sorted(self.must_probe):
+            self._push_expand(device_id, 0, 0)
+        for block in blocks:
+            self._add_block(block)
+        for device_id in self.must_probe:
+            self._add_block(device_id[:-3])
+
+    # --- 调度 ---
+    def _add_block(self, block: str) -> bool:
+        if block in self._blocks or len(self._blocks) >= self.max_blocks:
+            return False
+        self._blocks.add(block)
+        self.stats.blocks += 1
+        phase = self.rng.randrange(self.coarse_stride)
+        self._coarse.extend(
+            f"{block}{suffix:03d}" for suffix in range(phase, BLOCK_SIZE, self.coarse_stride)
+        )
+        return True
+
+    def _push_expand(self, device_id: str, direction: int, misses: int):
+        if device_id not in self._seen:
+            self._seen.add(device_id)
+            self._expand.append((device_id, direction, misses))
+
+    def _step(self, device_id: str, direction: int) -> Optional[str]:
+        suffix = int(device_id[-3:]) + direction
+        if 0 <= suffix < BLOCK_SIZE:
+            return f"{device_id[:-3]}{suffix:03d}"
+        return None
+
+    def _on_block_hit(self, block: str):
+        self._hit_blocks.add(block)
+        phase = self.rng.randrange(self.fine_stride)
+        self._fine.extend(
+            f"{block}{suffix:03d}" for suffix in range(phase, BLOCK_SIZE, self.fine_stride)
+        )
+        self._learn(block)
+
+    def _learn(self, block: str):
+        prefix, mid = block[:2], block[2:]
+        new_prefix = prefix not in self._prefixes
+        new_mid = mid not in self._mids
+        self._prefixes.add(prefix)
+        self._mids.add(mid)
+        candidates = []
+        if new_prefix:
+            candidates.extend(prefix + known_mid for known_mid in sorted(self._mids))
+        if new_mid:
+            candidates.extend(known_prefix + mid for known_prefix in sorted(self._prefixes))
+        for position in range(3):
+            digit = int(block[position])
+            for neighbor in (digit - 1, digit + 1):
+                if 0 <= neighbor <= 9 and not (position == 0 and neighbor == 0):
+                    candidates.append(f"{block[:position]}{neighbor}{block[position + 1 :]}")
+        for candidate in candidates:
+            if self._add_block(candidate):
+                self.stats.learned += 1
+
+    # --- 对外接口 ---
+    def next_id(self) -> Optional[str]:
+        """下一个需要请求的设备号；按扫描状态即可得出结果的设备号在这里直接处理、不返回"""
+        while True:
+            if self._expand:
+                device_id, direction, misses = self._expand.popleft()
+            elif self._fine or self._coarse:
+                from_coarse = not self._fine
+                device_id = (self._fine or self._coarse).popleft()
+                # 已进入细扫的块，粗扫抽样由细扫覆盖
+                if device_id in self._seen or (from_coarse and device_id[:-3] in self._hit_blocks):
+                    continue
+                self._seen.add(device_id)
+                direction, misses = 0, 0
+            else:
+                return None
+
+            if self.state is not None and not should_probe(
+                device_id, self.state, self.must_probe, self.recheck_ratio, self.rng
+            ):
+                self.stats.resolved += 1
+                known = self.state.run.found.get(device_id)
+                self._pending[device_id] = (direction, misses)
+                self.observe(device_id, known, True)
+                continue
+            self._pending[device_id] = (direction, misses)
+            return device_id
+
+    def observe(self, device_id: str, info: Optional[DeviceInfo], probed: bool):
+        """记录 next_id 返回的设备号的结果；请求失败（probed 为 False）时不据此扩展或剪枝"""
+        direction, misses = self._pending.pop(device_id, (0, 0))
+        if not probed:
+            return
+        if info is not None:
+            block = device_id[:-3]
+            if block not in self._hit_blocks:
+                self._on_block_hit(block)
+            for step in (-1, 1):
+                neighbor = self._step(device_id, step)
+                if neighbor is not None:
+                    self._push_expand(neighbor, step, 0)
+        elif direction and misses + 1 < self.max_gap:
+            neighbor = self._step(device_id, direction)
+            if neighbor is not None:
+                self._push_expand(neighbor, direction, misses + 1)
+
+    def finish(self):
+        """统计剪枝的块数（搜索结束后调用）"""
+        self.stats.pruned = len(self._blocks - self._hit_blocks)
@@ -0,0 +1,307 @@
+"""设备号扫描的持久化状态：断点续扫、已知无效设备号位图与增量 diff
+
+状态文件（JSON，原子替换写入）包含：
+
+- ``invalid``：已确认无效的设备号。按 ``设备号[:-3]`` 分块，每块 1000 位的位图（base64），
+  整个 18000 个设备号的号段约 2.3 KB；
+- ``known``：上次完整扫描时各有效设备的 ``devdescript``，用于识别改名；
+- ``run``：进行中的扫描（已完成的设备号位图 + 已发现的设备），扫描中断后据此续扫，完成后清空。
+"""
+
+import base64
+import csv
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from fetcher.station import Station, load_stations_from_csv
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1000
+STATE_VERSION = 1
+
+
+class DeviceInfo(NamedTuple):
+    devid: str
+    devdescript: str
+    available: int
+    used: int
+    total: int
+    lon: str = ""
+    lat: str = ""
+
+
+class IdBitmap:
+    """数字设备号集合：按末三位分块的位图，序列化为 {块前缀: base64}"""
+
+    def __init__(self, blocks: Optional[Dict[str, bytearray]] = None):
+        self._blocks: Dict[str, bytearray] = blocks or {}
+
+    @staticmethod
+    def _locate(device_id: str) -> Tuple[str, int]:
+        return device_id[:-3], int(device_id[-3:])
+
+    def __contains__(self, device_id: str) -> bool:
+        prefix, offset = self._locate(device_id)
+        block = self._blocks.get(prefix)
+        return block is not None and bool(block[offset >> 3] & (1 << (offset & 7)))
+
+    def add(self, device_id: str):
+        prefix, offset = self._locate(device_id)
+        block = self._blocks.get(prefix)
+        if block is None:
+            block = self._blocks[prefix] = bytearray(BLOCK_SIZE // 8)
+        block[offset >> 3] |= 1 << (offset & 7)
+
+    def discard(self, device_id: str):
+        prefix, offset = self._locate(device_id)
+        block = self._blocks.get(prefix)
+        if block is not None:
+            block[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+
+    def __len__(self) -> int:
+        return sum(bin(byte).count("1") for block in self._blocks.values() for byte in block)
+
+    def to_json(self) -> Dict[str, str]:
+        return {
+            prefix: base64.b64encode(bytes(block)).decode("ascii")
+            for prefix, block in sorted(self._blocks.items())
+            if any(block)
+        }
+
+    @classmethod
+    def from_json(cls, data: Optional[Dict[str, str]]) -> "IdBitmap":
+        return cls(
+            {prefix: bytearray(base64.b64decode(value)) for prefix, value in (data or {}).items()}
+        )
+
+
+@dataclass
+class ScanRun:
+    """一次进行中的扫描"""
+
+    started_at: float
+    done: IdBitmap
+    found: Dict[str, DeviceInfo]
+
+
+class ScanState:
+    """扫描状态，load / save 对应一个 JSON 文件（路径为空时只保存在内存中）"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.invalid = IdBitmap()
+        self.known: Dict[str, str] = {}
+        self.run: Optional[ScanRun] = None
+
+    @classmethod
+    def load(cls, path: Optional[Path]) -> "ScanState":
+        state = cls(path)
+        if path is None or not path.exists():
+            return state
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("读取扫描状态失败，将从头开始: %s", exc)
+            return state
+        if data.get("version") != STATE_VERSION:
+            logger.warning("扫描状态版本不匹配，将从头开始: %s", path)
+            return state
+        state.invalid = IdBitmap.from_json(data.get("invalid"))
+        state.known = dict(data.get("known") or {})
+        run = data.get("run")
+        if run:
+            state.run = ScanRun(
+                started_at=run["started_at"],
+                done=IdBitmap.from_json(run.get("done")),
+                found={item[0]: DeviceInfo(*item) for item in run.get("found", [])},
+            )
+        return state
+
+    def save(self):
+        """临时文件 + 原子替换，写到一半被中断也不会损坏已有状态"""
+        if self.path is None:
+            return
+        data: Dict[str, Any] = {
+            "version": STATE_VERSION,
+            "invalid": self.invalid.to_json(),
+            "known": dict(sorted(self.known.items())),
+            "run": None,
+        }
+        if self.run is not None:
+            data["run"] = {
+                "started_at": self.run.started_at,
+                "done": self.run.done.to_json(),
+                "found": [list(info) for info in self.run.found.values()],
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def begin(self, restart: bool = False) -> bool:
+        """开始一次扫描；存在未完成的扫描且未要求重新开始时续扫，返回是否为续扫"""
+        if self.run is not None and not restart:
+            return True
+        self.run = ScanRun(started_at=time.time(), done=IdBitmap(), found={})
+        return False
+
+    def record(self, device_id: str, info: Optional[DeviceInfo], probed: bool):
+        """记录一个设备号的扫描结果；probed 为 False 表示请求失败，结果未知"""
+        run = self.run
+        if probed:
+            run.done.add(device_id)
+            if info is None:
+                self.invalid.add(device_id)
+            else:
+                self.invalid.discard(device_id)
+                run.found[device_id] = info
+        # 请求失败的设备号不计入已完成，续扫时会重新请求
+
+    def finish(self) -> Dict[str, DeviceInfo]:
+        """结束扫描：以本次结果更新 known，返回本次发现的全部设备"""
+        found = self.run.found
+        self.known = {device_id: info.devdescript for device_id, info in found.items()}
+        self.run = None
+        return found
+
+
+def should_probe(
+    device_id: str,
+    state: ScanState,
+    must_probe: Set[str],
+    recheck_ratio: float,
+    rng: random.Random,
+) -> bool:
+    """设备号是否需要请求
+
+    - 本次扫描已完成的设备号跳过（续扫）；
+    - must_probe（站点目录中已有的设备号）总是请求；
+    - 已知无效的设备号只按 recheck_ratio 的比例抽查。
+    """
+    if device_id in state.run.done:
+        return False
+    if device_id in must_probe:
+        return True
+    return device_id not in state.invalid or rng.random() < recheck_ratio
+
+
+def plan_ids(
+    candidates: Iterable[str],
+    state: ScanState,
+    must_probe: Set[str],
+    recheck_ratio: float,
+    rng: random.Random,
+) -> Iterable[str]:
+    """按状态过滤待扫描的设备号（规则见 should_probe），must_probe 中不在号段内的追加在最后"""
+    remaining = set(must_probe)
+    for device_id in candidates:
+        remaining.discard(device_id)
+        if should_probe(device_id, state, must_probe, recheck_ratio, rng):
+            yield device_id
+    for device_id in sorted(remaining):
+        if should_probe(device_id, state, must_probe, recheck_ratio, rng):
+            yield device_id
+
+
+# --- 与站点目录的 diff ---
+class DeviceChange(NamedTuple):
+    change: str  # new / vanished / renamed
+    devid: str
+    devdescript: str
+    previous: str
+    station: str
+
+
+def catalog_devices(stations: List[Station]) -> Dict[str, Station]:
+    """设备号 -> 所在站点"""
+    return {device_id: station for station in stations for device_id in station.device_ids}
+
+
+def diff_against_catalog(
+    found: Dict[str, DeviceInfo],
+    stations: List[Station],
+    probed_invalid: Set[str],
+    previous: Dict[str, str],
+) -> List[DeviceChange]:
+    """对比本次扫描与站点目录
+
+    - new：扫描到但不在目录中的设备；
+    - vanished：目录中的设备本次请求成功但已无效（请求失败的不算）；
+    - renamed：设备的 devdescript 与上次扫描记录的不同。
+    """
+    by_device = catalog_devices(stations)
+    changes: List[DeviceChange] = []
+    for device_id, info in sorted(found.items()):
+        station = by_device.get(device_id)
+        if station is None:
+            changes.append(DeviceChange("new", device_id, info.devdescript, "", ""))
+            continue
+        old = previous.get(device_id)
+        if old and old != info.devdescript:
+            changes.append(DeviceChange("renamed", device_id, info.devdescript, old, station.name))
+    for device_id in sorted(set(by_device) & probed_invalid):
+        changes.append(
+            DeviceChange(
+                "vanished", device_id, "", previous.get(device_id, ""), by_device[device_id].name
+            )
+        )
+    return changes
+
+
+def write_diff(changes: List[DeviceChange], path: Path):
+    with path.open("w", newline="", encoding="utf-8") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(DeviceChange._fields)
+        writer.writerows(changes)
+
+
+def new_station_rows(
+    changes: List[DeviceChange], found: Dict[str, DeviceInfo], stations: List[Station]
+) -> List[Dict[str, Any]]:
+    """把新增设备按 devdescript 聚合成站点目录 CSV 格式的行
+
+    坐标取接口返回的经纬度（组内第一个有坐标的设备），校区取目录中距离最近的站点的校区，
+    无坐标时留空，合并前需要人工确认。
+    """
+    groups: Dict[str, List[DeviceInfo]] = {}
+    for change in changes:
+        if change.change == "new":
+            groups.setdefault(change.devdescript, []).append(found[change.devid])
+
+    rows = []
+    for name, infos in groups.items():
+        located = next((info for info in infos if info.lon and info.lat), None)
+        lon = lat = ""
+        campus: Any = ""
+        if located is not None:
+            lon, lat = located.lon, located.lat
+            nearest = min(
+                stations,
+                key=lambda s: (s.lon - float(lon)) ** 2 + (s.lat - float(lat)) ** 2,
+                default=None,
+            )
+            campus = nearest.campus_id if nearest else ""
+        rows.append(
+            {
+                "name": name,
+                "provider": "neptune",
+                "campus": campus,
+                "lon": lon,
+                "lat": lat,
+                "device_ids": json.dumps(
+                    sorted(int(info.devid) for info in infos), separators=(",", ":")
+                ),
+            }
+        )
+    return rows
+
+
+def load_catalog(path: Path) -> List[Station]:
+    return load_stations_from_csv(path) if path.exists() else []
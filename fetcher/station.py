@@ -10,7 +10,7 @@ import json
 from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Dict, Iterable, List, Optional
 
 # 校园 ID 映射，定义在外部，作为常量
 CAMPUS_NAME_MAP = {1: "玉泉校区", 2: "紫金港校区", 3: "华家池校区", 4: "西溪校区", 5: "之江校区"}
@@ -55,6 +55,9 @@ class Station:
     hash_id: str = field(init=False, default="")  # 标记 init=False 优化，使其不出现在 __init__ 中
     usage: StationUsage = field(default_factory=StationUsage)
 
+    # 站点在全局目录中的稳定下标，由 ProviderManager 注册服务商时分配；-1 表示未分配
+    index: int = field(default=-1, repr=False, compare=False)
+
     def compute_hash_id(self) -> str:
         """计算站点的唯一哈希 ID"""
         base = f"{self.provider}:{self.name}".strip().lower()
@@ -107,6 +110,136 @@ class Station:
         )
 
 
+# StationStatus.get 支持的字典键：直接取自 Station 的字段，以及兼容旧字典格式的别名
+_STATION_KEYS = frozenset(
+    (
+        "provider",
+        "hash_id",
+        "name",
+        "campus_id",
+        "campus_name",
+        "lat",
+        "lon",
+        "device_ids",
+        "updated_at",
+        "index",
+    )
+)
+_STATUS_KEYS = frozenset(("free", "used", "total", "error", "stale", "unchanged"))
+_KEY_ALIASES = {"id": "hash_id", "devids": "device_ids"}
+
+
+class StationStatus:
+    """站点单次抓取的状态记录
+
+    由服务商在 fetch_status 中直接产出，只保存四个计数和对 Station 的引用，
+    API、持久化和钉钉机器人都直接消费该对象，不再在每个周期反复构造字典 / Station。
+    为兼容仍按字典读取的代码，提供只读的 ``get`` / ``__getitem__``。
+
+    ``unchanged`` 为 True 表示站点下所有设备的原始响应都与上一次相同（见 fetcher/fingerprints.py），
+    计数必然与上一轮一致，下游可直接跳过该站点。
+    """
+
+    __slots__ = ("station", "free", "used", "total", "error", "stale", "unchanged")
+
+    def __init__(
+        self,
+        station: Station,
+        free: int = 0,
+        used: int = 0,
+        total: int = 0,
+        error: int = 0,
+        stale: bool = False,
+        unchanged: bool = False,
+    ):
+        self.station = station
+        self.free = free
+        self.used = used
+        self.total = total
+        self.error = error
+        self.stale = stale
+        self.unchanged = unchanged
+
+    def __repr__(self) -> str:
+        return (
+            f"StationStatus({self.station.hash_id}, free={self.free}, used={self.used}, "
+            f"total={self.total}, error={self.error}, stale={self.stale})"
+        )
+
+    @property
+    def hash_id(self) -> str:
+        return self.station.hash_id
+
+    @property
+    def provider(self) -> str:
+        return self.station.provider
+
+    @property
+    def index(self) -> int:
+        return self.station.index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """按旧字典格式的键读取字段"""
+        key = _KEY_ALIASES.get(key, key)
+        if key in _STATUS_KEYS:
+            return getattr(self, key)
+        if key in _STATION_KEYS:
+            return getattr(self.station, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        key = _KEY_ALIASES.get(key, key)
+        if key in _STATUS_KEYS or key in _STATION_KEYS:
+            return self.get(key)
+        raise KeyError(key)
+
+    def with_stale(self) -> StationStatus:
+        """返回标记为过期的副本（共享同一个 Station）"""
+        return StationStatus(self.station, self.free, self.used, self.total, self.error, True)
+
+    def to_usage_row(self, snapshot_time: str) -> Dict[str, Any]:
+        """转换为 latest / usage 表的一行"""
+        return {
+            "hash_id": self.station.hash_id,
+            "snapshot_time": snapshot_time,
+            "free": self.free,
+            "used": self.used,
+            "total": self.total,
+            "error": self.error,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为 API 响应中的站点字典（仅在序列化出口调用）"""
+        station = self.station
+        data = {
+            "provider": station.provider,
+            "hash_id": station.hash_id,
+            "id": station.hash_id,
+            "name": station.name,
+            "campus_id": station.campus_id,
+            "campus_name": station.campus_name,
+            "lat": station.lat,
+            "lon": station.lon,
+            "device_ids": station.device_ids,
+            "devids": station.device_ids,
+            "updated_at": station.updated_at,
+            "free": self.free,
+            "used": self.used,
+            "total": self.total,
+            "error": self.error,
+        }
+        if self.stale:
+            data["stale"] = True
+        return data
+
+
+def status_to_dict(status: Any) -> Dict[str, Any]:
+    """将 StationStatus 或旧格式字典统一转换为 API 字典"""
+    if isinstance(status, StationStatus):
+        return status.to_dict()
+    return dict(status)
+
+
 def load_stations_from_csv(csv_path: Path) -> List[Station]:
     """从 CSV 文件加载所有站点信息"""
     with csv_path.open("r", encoding="utf-8") as fp:
@@ -118,6 +251,19 @@ def load_stations_from_csv(csv_path: Path) -> List[Station]:
     return [s for s in stations if s.device_ids]
 
 
+def station_definition(station: Station) -> tuple:
+    """站点的静态定义（stations 表中除 updated_at 外的字段），用于判断站点定义是否变化"""
+    return (
+        station.name,
+        station.provider,
+        station.campus_id,
+        station.campus_name,
+        station.lat,
+        station.lon,
+        tuple(station.device_ids),
+    )
+
+
 def _data_to_station(data: Dict[str, Any]) -> Station:
     """
     【数据适配器】
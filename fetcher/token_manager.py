@@ -0,0 +1,268 @@
+"""服务商鉴权 token 管理
+
+- 缓存 token 及其过期时间，在过期前 ``refresh_margin`` 秒内主动刷新；
+- 同一进程内并发刷新只发起一次请求（asyncio.Lock），多个 worker 之间通过文件锁串行化刷新；
+- token 持久化到本地 JSON 文件，进程重启或其他 worker 可直接复用，避免频繁请求鉴权接口；
+- ``call_with_auth`` 在请求返回鉴权失败时作废当前 token，刷新后重试一次；
+  被作废的 token 在下次刷新时（持有文件锁）从本地文件中删除，仅当文件中仍是该 token 时才删除；
+- token 来自静态配置（如环境变量）时，配置的 token 与本地文件中的不同即视为已轮换，不再使用文件中的旧 token。
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import aiohttp
+
+from server.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为仅进程内加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# fetch_token 的返回值：(token, 过期时间戳)；过期时间未知时返回 None，由 default_ttl 兜底
+TokenFetcher = Callable[[aiohttp.ClientSession], Awaitable[Tuple[str, Optional[float]]]]
+
+
+class AuthError(Exception):
+    """服务商接口返回鉴权失败（token 过期或无效）"""
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """尝试从 JWT 的 payload 中解析 exp 字段，非 JWT 或无 exp 时返回 None"""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class TokenStore:
+    """基于本地 JSON 文件的 token 持久化存储，多个 worker 共享同一个文件"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self._lock_path = self.path.with_name(self.path.name + ".lock") if self.path else None
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """读取指定服务商的 token 记录"""
+        if self.path is None or not self.path.exists():
+            return None
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("读取 token 缓存文件失败: %s", exc)
+            return None
+        entry = data.get(name)
+        return entry if isinstance(entry, dict) and entry.get("token") else None
+
+    def save(self, name: str, token: str, expires_at: float, locked: bool = False):
+        """写入指定服务商的 token 记录
+
+        Args:
+            locked: 调用方是否已持有 acquire 返回的文件锁；否则在本方法内加锁，
+                保证「读取 - 合并 - 替换」整体不会覆盖其他 worker 同时写入的记录。
+        """
+        self._update(name, {"token": token, "expires_at": expires_at}, locked=locked)
+
+    def delete(self, name: str, token: Optional[str] = None, locked: bool = False):
+        """删除指定服务商的 token 记录；传入 token 时仅当文件中仍是该 token 才删除"""
+        self._update(name, None, expected=token, locked=locked)
+
+    def _update(
+        self,
+        name: str,
+        entry: Optional[Dict[str, Any]],
+        expected: Optional[str] = None,
+        locked: bool = False,
+    ):
+        if self.path is None:
+            return
+        handle = None if locked else self._acquire()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            data: Dict[str, Any] = {}
+            if self.path.exists():
+                try:
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+                except json.JSONDecodeError:
+                    data = {}
+            if entry is not None:
+                data[name] = entry
+            else:
+                current = data.get(name)
+                if current is None:
+                    return
+                if expected is not None and (
+                    not isinstance(current, dict) or current.get("token") != expected
+                ):
+                    return
+                del data[name]
+            # 临时文件 + 原子替换
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logger.warning("写入 token 缓存文件失败: %s", exc)
+        finally:
+            self._release(handle)
+
+    def _acquire(self):
+        if self._lock_path is None or fcntl is None:
+            return None
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fp = self._lock_path.open("a")
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        return fp
+
+    @staticmethod
+    def _release(fp):
+        if fp is None:
+            return
+        fcntl.flock(fp, fcntl.LOCK_UN)
+        fp.close()
+
+    async def acquire(self):
+        """获取跨进程文件锁（在线程中阻塞等待，不阻塞事件循环）"""
+        return await asyncio.to_thread(self._acquire)
+
+    def release(self, handle):
+        """释放 acquire 返回的文件锁"""
+        self._release(handle)
+
+
+class TokenManager:
+    """单个服务商的 token 管理器"""
+
+    def __init__(
+        self,
+        name: str,
+        fetch_token: TokenFetcher,
+        store: Optional[TokenStore] = None,
+        default_ttl: float = 3600,
+        refresh_margin: float = 300,
+        configured_token: Optional[Callable[[], str]] = None,
+    ):
+        """
+        Args:
+            configured_token: token 来自静态配置时返回当前配置的 token；与本地文件中的不同时，
+                文件中的记录视为已轮换掉的旧 token，不再加载。
+        """
+        self.name = name
+        self.fetch_token = fetch_token
+        self.store = store
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.configured_token = configured_token
+        self.token: str = ""
+        self.expires_at: float = 0.0
+        # 最近一次被服务商拒绝的 token，不再从本地文件加载，并在下次刷新时从文件中删除
+        self._rejected: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return time.time() < expires_at - self.refresh_margin
+
+    def _load_from_store(self) -> bool:
+        if self.store is None:
+            return False
+        entry = self.store.load(self.name)
+        if not entry or entry["token"] == self._rejected:
+            return False
+        configured = self.configured_token() if self.configured_token else ""
+        if configured and entry["token"] != configured:
+            logger.info("%s 配置的 token 已变更，忽略本地缓存中的旧 token", self.name)
+            return False
+        if self._is_fresh(float(entry.get("expires_at", 0))):
+            self.token = entry["token"]
+            self.expires_at = float(entry["expires_at"])
+            return True
+        return False
+
+    async def get_token(self, session: aiohttp.ClientSession) -> str:
+        """返回有效 token，临近过期或缺失时刷新（并发调用只刷新一次）"""
+        if self.token and self._is_fresh(self.expires_at):
+            return self.token
+
+        async with self._lock:
+            # 等锁期间可能已被其他协程刷新
+            if self.token and self._is_fresh(self.expires_at):
+                return self.token
+            if self._load_from_store():
+                logger.debug("从本地缓存加载 %s token", self.name)
+                return self.token
+
+            handle = await self.store.acquire() if self.store else None
+            try:
+                # 等文件锁期间可能已被其他 worker 刷新并写入文件
+                if self._load_from_store():
+                    return self.token
+                if self.store and self._rejected:
+                    self.store.delete(self.name, self._rejected, locked=True)
+                await self._refresh(session)
+            finally:
+                if self.store:
+                    self.store.release(handle)
+        return self.token
+
+    async def _refresh(self, session: aiohttp.ClientSession):
+        token, expires_at = await self.fetch_token(session)
+        if not token:
+            raise AuthError(f"{self.name} 获取 token 失败：返回为空")
+        if expires_at is None:
+            expires_at = jwt_expiry(token) or time.time() + self.default_ttl
+        self.token = token
+        self.expires_at = expires_at
+        self._rejected = None
+        if self.store:
+            # 只在 get_token 持有文件锁时调用
+            self.store.save(self.name, token, expires_at, locked=True)
+        logger.info("%s token 已刷新，有效期至 %s", self.name, time.ctime(expires_at))
+
+    def invalidate(self, token: Optional[str] = None):
+        """作废 token；传入 token 时仅当它仍是当前 token 才作废，避免误伤刚刷新的新 token
+
+        本地文件中的记录不在这里删除（需要文件锁，不能阻塞事件循环），由下一次 get_token 刷新时处理。
+        """
+        if token is None or token == self.token:
+            if self.token:
+                self._rejected = self.token
+            self.token = ""
+            self.expires_at = 0.0
+
+    async def call_with_auth(
+        self, session: aiohttp.ClientSession, request: Callable[[str], Awaitable[T]]
+    ) -> T:
+        """携带 token 执行请求；遇到 AuthError 时刷新 token 并重试一次
+
+        刷新得到的仍是被拒绝的 token 时（如 dlmm 只能从配置读取 token）不再重试，直接抛出 AuthError。
+        """
+        token = await self.get_token(session)
+        try:
+            return await request(token)
+        except AuthError as exc:
+            self.invalidate(token)
+            refreshed = await self.get_token(session)
+            if refreshed == token:
+                logger.error("%s 鉴权失败，且没有可替换的新 token: %s", self.name, exc)
+                raise
+            logger.warning("%s 鉴权失败，已刷新 token 后重试: %s", self.name, exc)
+            return await request(refreshed)
+
+
+# 所有服务商共享的 token 持久化文件
+token_store = TokenStore(Config.PROVIDER_TOKEN_CACHE_PATH)
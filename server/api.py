@@ -1,9 +1,10 @@
 """FastAPI 主服务"""
 
-from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi import FastAPI, Header, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
+import hmac
 import json
 import sys
 import logging
@@ -25,13 +26,21 @@ logger = logging.getLogger(__name__)
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from fetcher.device_cache import device_cache
+from fetcher.fingerprints import payload_fingerprints
+from fetcher.port_history import format_ts, port_history
 from fetcher.provider_manager import ProviderManager
-from fetcher.station import Station
+from fetcher.station import Station, StationStatus, StationUsage, status_to_dict
 from server.config import Config
+from server.polling import AdaptiveIntervalController, load_holiday_calendar
 from db import (
     initialize_supabase_config,
     load_latest as load_latest_cache,
     record_usage_data,
+    usage_buffer,
+    write_outbox,
+    OUTBOX_WRITERS,
+    sqlite_store,
     batch_upsert_stations,
     fetch_station_metadata,
     fetch_all_stations_data,
@@ -44,7 +53,14 @@ app = FastAPI(title="ZJU Charger API", version="1.0.0")
 
 logger.info("初始化 FastAPI 应用")
 
-if Config.SUPABASE_URL and Config.SUPABASE_KEY:
+if Config.STORAGE_BACKEND not in ("supabase", "sqlite", "sqlite+supabase"):
+    logger.error("未知的 STORAGE_BACKEND=%s，只使用 Supabase", Config.STORAGE_BACKEND)
+elif Config.STORAGE_BACKEND != "supabase":
+    sqlite_store.open(Config.SQLITE_PATH, primary=Config.STORAGE_BACKEND == "sqlite")
+
+if Config.STORAGE_BACKEND == "sqlite":
+    logger.info("使用本地 SQLite 作为唯一存储，不访问 Supabase")
+elif Config.SUPABASE_URL and Config.SUPABASE_KEY:
     initialize_supabase_config(Config.SUPABASE_URL, Config.SUPABASE_KEY)
 else:
     logger.warning("Supabase URL/KEY 未配置，将无法访问云端缓存和历史数据。")
@@ -94,6 +110,31 @@ def _sync_stations_from_providers(manager: ProviderManager):
         logger.error("同步服务商站点定义到数据库失败")
 
 
+def _reload_stations(force: bool = False) -> List[Dict[str, Any]]:
+    """热重载有变化的站点 CSV，只把新增 / 变化的站点写入 stations 表
+
+    删除的站点只从内存中移除，stations 表中的行保留（latest / usage 对其级联删除，会丢失历史）。
+    """
+    changes = provider_manager.reload_stations(force=force)
+    upserts = [station for change in changes for station in change.upserts]
+    if upserts:
+        if batch_upsert_stations(upserts):
+            logger.info("已同步 %d 条变化的站点信息到数据库", len(upserts))
+        else:
+            logger.error("同步变化的站点信息到数据库失败")
+    return [change.summary() for change in changes]
+
+
+async def station_reload_task():
+    """定期检查站点 CSV 的 mtime / 大小，变化时热重载"""
+    while True:
+        await asyncio.sleep(Config.STATION_RELOAD_INTERVAL)
+        try:
+            _reload_stations()
+        except Exception as exc:
+            logger.error("热重载站点 CSV 异常: %s", exc, exc_info=True)
+
+
 def _coerce_int(value: Any, default: int = 0) -> int:
     try:
         if value is None or value == "":
@@ -172,19 +213,25 @@ def _station_dict_to_model(station: Dict[str, Any]) -> Optional[Station]:
             device_ids=device_ids,
             campus_name=station.get("campus_name", ""),
             updated_at=updated_at,
-            free=_coerce_int(station.get("free")),
-            used=_coerce_int(station.get("used")),
-            total=_coerce_int(station.get("total")),
-            error=_coerce_int(station.get("error")),
+            usage=StationUsage(
+                free=_coerce_int(station.get("free")),
+                used=_coerce_int(station.get("used")),
+                total=_coerce_int(station.get("total")),
+                error=_coerce_int(station.get("error")),
+            ),
         )
     except Exception as exc:
         logger.debug("构建 Station 模型失败: %s", exc)
         return None
 
 
-def _station_models_from_result(stations: List[Dict[str, Any]]) -> List[Station]:
+def _station_models_from_result(stations: List[Any]) -> List[Station]:
+    """取出抓取结果对应的 Station；状态记录直接复用其引用的 Station，旧格式字典才需转换"""
     models = []
     for station in stations:
+        if isinstance(station, StationStatus):
+            models.append(station.station)
+            continue
         model = _station_dict_to_model(station)
         if model:
             models.append(model)
@@ -202,6 +249,12 @@ async def startup_event():
     logger.info(f"配置信息：")
     logger.info(f"  - API 地址: {Config.API_HOST}:{Config.API_PORT}")
     logger.info(f"  - 后端定时抓取间隔: {Config.BACKEND_FETCH_INTERVAL} 秒")
+    if Config.ADAPTIVE_POLLING_ENABLED:
+        logger.info(
+            f"  - 自适应抓取间隔: 已启用（{Config.POLL_MIN_INTERVAL}-{Config.POLL_MAX_INTERVAL} 秒）"
+        )
+    else:
+        logger.info(f"  - 自适应抓取间隔: 已禁用")
     if Config.RATE_LIMIT_ENABLED:
         logger.info(f"  - 接口限流: 已启用")
         logger.info(f"    - 默认限流规则: {Config.RATE_LIMIT_DEFAULT}")
@@ -209,15 +262,40 @@ async def startup_event():
     else:
         logger.info(f"  - 接口限流: 已禁用")
 
-    _sync_stations_from_providers(provider_manager)
+    # 先加载上次未重放完的 outbox，启动期间写入失败的批次也会存入其中
+    write_outbox.open(Config.WRITE_OUTBOX_PATH)
+    write_outbox.start(OUTBOX_WRITERS, Config.OUTBOX_RETRY_MIN, Config.OUTBOX_RETRY_MAX)
+
+    await asyncio.to_thread(_sync_stations_from_providers, provider_manager)
 
     # 启动后台定时抓取任务
     asyncio.create_task(background_fetch_task())
-    logger.info(f"已启动后台定时抓取任务，间隔: {Config.BACKEND_FETCH_INTERVAL} 秒")
+    logger.info(f"已启动后台定时抓取任务，初始间隔: {Config.BACKEND_FETCH_INTERVAL} 秒")
+
+    if Config.SUPABASE_HISTORY_ENABLED and Config.USAGE_WRITE_BUFFER_ENABLED:
+        usage_buffer.start(
+            batch_rows=Config.USAGE_FLUSH_ROWS,
+            flush_interval=Config.USAGE_FLUSH_INTERVAL,
+            queue_size=Config.USAGE_QUEUE_SIZE,
+        )
+
+    if Config.STATION_RELOAD_INTERVAL > 0:
+        asyncio.create_task(station_reload_task())
+        logger.info(f"已启动站点 CSV 热重载检查，间隔: {Config.STATION_RELOAD_INTERVAL} 秒")
 
     logger.info("=" * 60)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """服务器关闭时写出 usage 缓冲、关闭本地数据库并释放服务商连接"""
+    await usage_buffer.close()
+    await write_outbox.close()
+    sqlite_store.close()
+    await provider_manager.close()
+    logger.info("服务商连接已关闭")
+
+
 # 添加 CORS 支持（必须在路由之前）
 app.add_middleware(
     CORSMiddleware,
@@ -399,6 +477,40 @@ def _build_cached_response(
     }
 
 
+def _build_snapshot_response(
+    provider: Optional[str] = None,
+    station_id: Optional[str] = None,
+    devid: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """尝试从服务商管理器的内存已发布快照构建 API 响应"""
+
+    snapshot = provider_manager.get_published_snapshot()
+    if not snapshot:
+        return None
+
+    stations = snapshot["stations"]
+    if station_id:
+        stations = [s for s in stations if s.get("hash_id") == station_id]
+    if provider:
+        stations = [s for s in stations if _station_provider(s) == provider]
+    if devid:
+        stations = [s for s in stations if _matches_devid(s, devid)]
+    if not stations:
+        return None
+
+    # 只在响应出口把命中的状态记录转换为字典
+    stations = [status_to_dict(s) for s in stations]
+
+    if not station_id:
+        stations = aggregate_stations_by_id(stations)
+
+    return {
+        "updated_at": snapshot["updated_at"],
+        "stations": stations,
+        "providers": snapshot["providers"],
+    }
+
+
 @app.get("/api")
 @apply_rate_limit(Config.RATE_LIMIT_DEFAULT)
 async def api_info(request: Request):
@@ -411,6 +523,8 @@ async def api_info(request: Request):
             "GET /api/providers": "返回可用服务商列表",
             "GET /api/config": "返回前端配置信息（包括抓取间隔等）",
             "GET /api/stations": "返回站点基础信息（id、名称、坐标、服务商）",
+            "GET /api/aggregates/campus": "按校区汇总当前快照的空闲 / 已用 / 故障端口与使用率",
+            "GET /api/aggregates/provider": "按服务商汇总当前快照的空闲 / 已用 / 故障端口与使用率",
         },
     }
 
@@ -458,6 +572,78 @@ async def get_station_catalog(request: Request):
         raise HTTPException(status_code=503, detail="站点信息不可用")
 
 
+@app.post("/api/admin/reload-stations")
+async def reload_stations(
+    request: Request,
+    force: bool = Query(False, description="忽略文件 mtime，重新加载全部服务商的站点 CSV"),
+    x_admin_token: str = Header("", alias="X-Admin-Token"),
+):
+    """热重载站点 CSV，返回每个有变化的服务商新增 / 删除 / 变化的站点 hash_id"""
+    if not Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="未配置 ADMIN_TOKEN，管理接口不可用")
+    if not hmac.compare_digest(x_admin_token.encode(), Config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="管理令牌无效")
+
+    logger.info("收到 /api/admin/reload-stations 请求（force=%s）", force)
+    try:
+        changes = _reload_stations(force=force)
+    except Exception as exc:
+        logger.error("热重载站点 CSV 失败: %s", exc, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"热重载站点失败: {exc}")
+    return {"updated_at": _get_timestamp(), "providers": changes}
+
+
+def _build_aggregate_response(by: str) -> Dict[str, Any]:
+    """从当前快照的列式表示构建汇总响应（每个快照只计算一次）"""
+    columnar = provider_manager.get_columnar_snapshot()
+    if columnar is None:
+        raise HTTPException(status_code=503, detail="暂无已发布的快照数据")
+
+    groups = columnar.aggregate_by_campus() if by == "campus" else columnar.aggregate_by_provider()
+    totals = columnar.totals()
+    totals["usage_rate"] = round(totals["usage_rate"], 4)
+    snapshot = provider_manager.get_published_snapshot()
+    return {
+        "updated_at": snapshot["updated_at"] if snapshot else _get_timestamp(),
+        "totals": totals,
+        "groups": groups,
+    }
+
+
+@app.get("/api/aggregates/campus")
+@apply_rate_limit(Config.RATE_LIMIT_DEFAULT)
+async def get_campus_aggregates(request: Request):
+    """按校区汇总当前快照"""
+    logger.info("收到 /api/aggregates/campus 请求")
+    return _build_aggregate_response("campus")
+
+
+@app.get("/api/aggregates/provider")
+@apply_rate_limit(Config.RATE_LIMIT_DEFAULT)
+async def get_provider_aggregates(request: Request):
+    """按服务商汇总当前快照"""
+    logger.info("收到 /api/aggregates/provider 请求")
+    return _build_aggregate_response("provider")
+
+
+@app.get("/api/metrics")
+@apply_rate_limit(Config.RATE_LIMIT_DEFAULT)
+async def get_metrics(request: Request):
+    """抓取遥测：各服务商最近一轮未变化站点的比例、响应指纹、设备结果缓存、usage 写入缓冲与 outbox 深度"""
+    logger.info("收到 /api/metrics 请求")
+    return {
+        "updated_at": _get_timestamp(),
+        "cycle": {
+            "unchanged_ratio": round(provider_manager.unchanged_ratio(), 4),
+            "providers": provider_manager.cycle_stats,
+        },
+        "fingerprints": payload_fingerprints.stats(),
+        "device_cache": device_cache.stats(),
+        "usage_buffer": usage_buffer.stats(),
+        "outbox": write_outbox.stats(),
+    }
+
+
 @app.get("/api/status")
 @apply_rate_limit(Config.RATE_LIMIT_STATUS)
 async def get_status(
@@ -466,7 +652,7 @@ async def get_status(
     hash_id: Optional[str] = Query(None),
     devid: Optional[str] = Query(None, alias="devid"),
 ):
-    """查询所有站点状态（优先从缓存读取）
+    """查询所有站点状态（优先从内存快照读取，其次是 latest 缓存，最后实时抓取）
 
     Args:
         provider: 可选，服务商标识（如 'neptune'），如果指定则只返回该服务商的数据
@@ -484,6 +670,16 @@ async def get_status(
         raise HTTPException(status_code=400, detail="查询 devid 时必须同时提供 provider 参数")
 
     try:
+        snapshot_response = _build_snapshot_response(
+            provider=provider, station_id=station_id, devid=devid
+        )
+        if snapshot_response is not None:
+            logger.info(
+                "使用内存快照返回 %d 个站点",
+                len(snapshot_response.get("stations", [])),
+            )
+            return snapshot_response
+
         cached_response = _build_cached_response(
             provider=provider, station_id=station_id, devid=devid
         )
@@ -532,6 +728,7 @@ async def get_status(
                 "stations": [],
             }
 
+        filtered = [status_to_dict(s) for s in filtered]
         if not station_id:
             filtered = aggregate_stations_by_id(filtered)
             logger.info("聚合后，共 %d 个站点", len(filtered))
@@ -545,118 +742,222 @@ async def get_status(
         raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
 
 
+@app.post("/api/status/refresh")
+@apply_rate_limit(Config.RATE_LIMIT_REFRESH)
+async def refresh_station_status(
+    request: Request,
+    hash_id: str = Query(..., description="站点唯一标识"),
+):
+    """实时刷新单个站点（只请求该站点的设备）并合并进内存快照
+
+    站点数据距上次抓取不足 STATION_REFRESH_MIN_AGE 秒时直接返回快照中的记录（refreshed 为 false），
+    同一站点的并发刷新共用一次请求。
+    """
+    logger.info("收到 /api/status/refresh 请求，hash_id=%s", hash_id)
+    # 服务商在刷新前取出：刷新期间热重载可能删除该站点，之后再查找会得到 None
+    found = provider_manager.find_station(hash_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"站点不存在: {hash_id}")
+    prov, _ = found
+    try:
+        result = await provider_manager.refresh_station(hash_id)
+    except Exception as exc:
+        logger.warning("站点 %s 实时刷新失败: %s", hash_id, exc)
+        raise HTTPException(status_code=502, detail=f"站点刷新失败: {exc}")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"站点不存在: {hash_id}")
+
+    status, refreshed = result
+    age = provider_manager.station_age(prov.provider, hash_id)
+    return {
+        "updated_at": _get_timestamp(),
+        "refreshed": refreshed,
+        "age": round(age, 1) if age is not None else None,
+        "station": status.to_dict(),
+    }
+
+
+def _require_port_history():
+    if not port_history.enabled:
+        raise HTTPException(
+            status_code=503, detail="未开启端口级状态记录（PORT_HISTORY_ENABLED=true）"
+        )
+
+
+@app.get("/api/ports")
+@apply_rate_limit(Config.RATE_LIMIT_DEFAULT)
+async def get_station_ports(
+    request: Request,
+    hash_id: str = Query(..., description="站点唯一标识"),
+    history: int = Query(0, ge=0, le=Config.PORT_HISTORY_SIZE, description="附带最近的变化次数"),
+):
+    """返回站点下每个设备的逐端口状态（端口序号从 1 开始），可附带状态变化历史"""
+    logger.info("收到 /api/ports 请求，hash_id=%s, history=%d", hash_id, history)
+    _require_port_history()
+
+    found = provider_manager.find_station(hash_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"站点不存在: {hash_id}")
+    prov, station = found
+    scope = prov.device_scope(station)
+    devices = []
+    for device_id in station.device_ids:
+        record = port_history.describe(scope, device_id, history)
+        devices.append(record or {"device_id": str(device_id), "ports": []})
+    free_ports = sum(1 for device in devices for port in device["ports"] if port["state"] == "free")
+    return {
+        "updated_at": _get_timestamp(),
+        "hash_id": station.hash_id,
+        "name": station.name,
+        "provider": prov.provider,
+        "free_ports": free_ports,
+        "devices": devices,
+    }
+
+
+@app.get("/api/ports/broken")
+@apply_rate_limit(Config.RATE_LIMIT_DEFAULT)
+async def get_broken_ports(
+    request: Request,
+    min_hours: Optional[float] = Query(
+        None, ge=0, description="持续故障的最短时长（小时），默认为 PORT_BROKEN_AFTER"
+    ),
+):
+    """列出持续故障的端口（长期损坏），按故障起始时间从早到晚排序"""
+    logger.info("收到 /api/ports/broken 请求，min_hours=%s", min_hours)
+    _require_port_history()
+
+    owners: Dict[tuple, List[Station]] = {}
+    for prov in provider_manager.providers:
+        for station in prov.station_list:
+            scope = prov.device_scope(station)
+            for device_id in station.device_ids:
+                owners.setdefault((scope, str(device_id)), []).append(station)
+
+    min_duration = None if min_hours is None else min_hours * 3600
+    ports = []
+    for key, port, since in sorted(port_history.broken(min_duration), key=lambda item: item[2]):
+        stations = owners.get(key, [])
+        ports.append(
+            {
+                "scope": key[0],
+                "device_id": key[1],
+                "port": port + 1,
+                "error_since": format_ts(since),
+                "stations": [{"hash_id": s.hash_id, "name": s.name} for s in stations],
+            }
+        )
+    return {"updated_at": _get_timestamp(), "count": len(ports), "ports": ports}
+
+
+def _build_polling_controller() -> AdaptiveIntervalController:
+    """根据配置创建自适应抓取间隔控制器"""
+    return AdaptiveIntervalController(
+        base_interval=Config.BACKEND_FETCH_INTERVAL,
+        min_interval=Config.POLL_MIN_INTERVAL,
+        max_interval=Config.POLL_MAX_INTERVAL,
+        night_start=Config.POLL_NIGHT_START,
+        night_end=Config.POLL_NIGHT_END,
+        night_factor=Config.POLL_NIGHT_FACTOR,
+        holiday_factor=Config.POLL_HOLIDAY_FACTOR,
+        holidays=load_holiday_calendar(Config.POLL_HOLIDAY_FILE),
+        target_change_ratio=Config.POLL_TARGET_CHANGE_RATIO,
+        window=Config.POLL_VOLATILITY_WINDOW,
+        min_fresh_ratio=Config.POLL_MIN_FRESH_RATIO,
+        enabled=Config.ADAPTIVE_POLLING_ENABLED,
+    )
+
+
+polling_controller = _build_polling_controller()
+
+
 def is_night_time():
-    """检查当前时间是否在夜间暂停时段（0:10-5:50）"""
-    tz_utc_8 = timezone(timedelta(hours=8))
-    now = datetime.now(tz_utc_8)
-    current_time = now.time()
+    """检查当前时间是否在夜间低频时段（默认 0:10-5:50，可通过 POLL_NIGHT_START/END 配置）"""
+    return polling_controller.is_night_time()
 
-    # 定义夜间暂停时段：0:10 到 5:50
-    night_start = datetime.strptime("00:10", "%H:%M").time()
-    night_end = datetime.strptime("05:50", "%H:%M").time()
-    return False
-    # 检查是否在夜间时段（0:10 到 5:50 之间）
-    # 由于这个时间段在同一天内，可以直接比较
-    if night_start <= current_time <= night_end:
-        return True
 
-    return False
+async def _fetch_and_record(label: str) -> Optional[Dict[str, Any]]:
+    """执行一次完整的抓取 + 同步站点信息 + 写入 Supabase 流程，返回抓取结果
 
+    抓取过程中每个服务商完成后即已发布到内存快照，这里只负责周期结束后的持久化。
+    Supabase 客户端与本地 SQLite 都是同步调用，站点同步和 latest / usage 写入放在线程中执行，不阻塞事件循环。
+    """
+    result = await provider_manager.fetch_and_format()
 
-async def background_fetch_task():
-    """后台定时抓取任务，定期从供应商API抓取数据并保存到缓存"""
-    fetch_interval = Config.BACKEND_FETCH_INTERVAL
+    if result is None:
+        logger.error("%s数据失败：返回 None", label)
+        return None
 
-    # 启动时先执行一次，确保有初始缓存（但需要检查时间）
-    logger.info("执行首次后台抓取任务，初始化缓存...")
-    if not is_night_time():
-        try:
-            result = await provider_manager.fetch_and_format()
+    stations = result.get("stations", [])
+    logger.info("%s未变化站点比例: %.1f%%", label, provider_manager.unchanged_ratio() * 100)
+    station_models = _station_models_from_result(stations)
 
-            if result is None:
-                logger.error("首次后台抓取数据失败：返回 None")
+    if station_models:
+        try:
+            if await asyncio.to_thread(batch_upsert_stations, station_models):
+                logger.info("%s已同步 %d 条站点基础信息", label, len(station_models))
             else:
-                stations = result.get("stations", [])
-                station_models = _station_models_from_result(stations)
-
-                if station_models:
-                    try:
-                        if batch_upsert_stations(station_models):
-                            logger.info(
-                                f"首次后台抓取数据已同步站点基础信息，共 {len(station_models)} 条"
-                            )
-                        else:
-                            logger.warning("首次后台抓取数据同步站点基础信息失败")
-                    except Exception as exc:
-                        logger.error("首次后台抓取同步站点信息发生异常: %s", exc, exc_info=True)
-
-                snapshot_time = result.get("updated_at", _get_timestamp())
-                if not snapshot_time:
-                    snapshot_time = _get_timestamp()
-                    result["updated_at"] = snapshot_time
-
-                history_enabled = Config.SUPABASE_HISTORY_ENABLED
-                if record_usage_data(result, history_mode_enabled=history_enabled):
-                    logger.info(
-                        "首次后台抓取数据成功写入 Supabase（history=%s），共 %d 个站点",
-                        history_enabled,
-                        len(stations),
-                    )
-                else:
-                    logger.error("首次后台抓取数据写入 Supabase 失败")
-        except Exception as e:
-            logger.error(f"首次后台抓取任务发生异常: {str(e)}", exc_info=True)
+                logger.warning("%s同步站点基础信息失败", label)
+        except Exception as exc:
+            logger.error("%s同步站点基础信息异常: %s", label, exc, exc_info=True)
+
+    snapshot_time = result.get("updated_at", _get_timestamp())
+    if not snapshot_time:
+        snapshot_time = _get_timestamp()
+        result["updated_at"] = snapshot_time
+
+    # 超时服务商保留的上一轮数据只用于对外展示，不重复写入 latest / usage
+    fresh_stations = [s for s in stations if not s.get("stale")]
+    if len(fresh_stations) != len(stations):
+        logger.warning(
+            "%s有 %d 个站点数据已过期，跳过写入", label, len(stations) - len(fresh_stations)
+        )
+
+    history_enabled = Config.SUPABASE_HISTORY_ENABLED
+    if await asyncio.to_thread(
+        record_usage_data,
+        {**result, "stations": fresh_stations},
+        history_mode_enabled=history_enabled,
+        latest_change_only=Config.LATEST_CHANGE_ONLY_ENABLED,
+        latest_full_write_interval=Config.LATEST_FULL_WRITE_INTERVAL,
+    ):
+        logger.info(
+            "%s数据成功写入 Supabase（history=%s），共 %d 个站点",
+            label,
+            history_enabled,
+            len(fresh_stations),
+        )
     else:
-        logger.info("当前处于夜间暂停时段（0:10-5:50），跳过首次抓取")
+        logger.error("%s数据写入 Supabase 失败", label)
+
+    return result
+
 
-    # 然后按间隔定时执行
+async def background_fetch_task():
+    """后台定时抓取任务，按自适应间隔从供应商API抓取数据并保存到缓存"""
+
+    # 启动时先执行一次，确保有初始缓存（夜间同样执行，夜间只降低频率而不暂停）
+    logger.info("执行首次后台抓取任务，初始化缓存...")
+    try:
+        result = await _fetch_and_record("首次后台抓取")
+        if result is not None:
+            polling_controller.observe(result.get("stations", []))
+    except Exception as e:
+        logger.error(f"首次后台抓取任务发生异常: {str(e)}", exc_info=True)
+
+    # 然后按自适应间隔定时执行
     while True:
         try:
+            fetch_interval = polling_controller.next_interval()
+            logger.info(
+                "下一次后台抓取将在 %d 秒后执行: %s", fetch_interval, polling_controller.describe()
+            )
             await asyncio.sleep(fetch_interval)
 
-            # 检查是否在夜间暂停时段
-            if is_night_time():
-                tz_utc_8 = timezone(timedelta(hours=8))
-                current_time_str = datetime.now(tz_utc_8).strftime("%H:%M")
-                logger.info(
-                    f"当前时间 {current_time_str} 处于夜间暂停时段（0:10-5:50），跳过本次抓取"
-                )
-                continue
-
             logger.info(f"开始后台定时抓取数据（间隔: {fetch_interval}秒）...")
-
-            result = await provider_manager.fetch_and_format()
-
-            if result is None:
-                logger.error("后台抓取数据失败：返回 None")
-                continue
-
-            stations = result.get("stations", [])
-            station_models = _station_models_from_result(stations)
-
-            if station_models:
-                try:
-                    if batch_upsert_stations(station_models):
-                        logger.info("后台抓取已同步 %d 条站点基础信息", len(station_models))
-                    else:
-                        logger.warning("后台抓取同步站点基础信息失败")
-                except Exception as exc:
-                    logger.error("后台抓取同步站点基础信息异常: %s", exc, exc_info=True)
-
-            snapshot_time = result.get("updated_at", _get_timestamp())
-            if not snapshot_time:
-                snapshot_time = _get_timestamp()
-                result["updated_at"] = snapshot_time
-
-            history_enabled = Config.SUPABASE_HISTORY_ENABLED
-            if record_usage_data(result, history_mode_enabled=history_enabled):
-                logger.info(
-                    "后台抓取数据成功写入 Supabase（history=%s），共 %d 个站点",
-                    history_enabled,
-                    len(stations),
-                )
-            else:
-                logger.error("后台抓取数据写入 Supabase 失败")
+            result = await _fetch_and_record("后台抓取")
+            if result is not None:
+                polling_controller.observe(result.get("stations", []))
         except Exception as e:
             logger.error(f"后台抓取任务发生异常: {str(e)}", exc_info=True)
             # 发生异常时等待一段时间再继续，避免频繁重试
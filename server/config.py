@@ -22,6 +22,86 @@ class Config:
     BACKEND_FETCH_INTERVAL = int(
         os.getenv("BACKEND_FETCH_INTERVAL", "300")
     )  # 后端定时抓取间隔（秒），默认300秒（5分钟）
+    FETCH_INTERVAL = int(os.getenv("FETCH_INTERVAL", "60"))  # 前端自动刷新间隔（秒）
+
+    # 自适应抓取间隔配置
+    # 开启后以 BACKEND_FETCH_INTERVAL 为起点，根据站点计数变化频率、夜间时段和节假日动态调整
+    ADAPTIVE_POLLING_ENABLED = os.getenv("ADAPTIVE_POLLING_ENABLED", "true").lower() == "true"
+    POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL", "60"))  # 间隔下限（秒）
+    POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL", "1800"))  # 间隔上限（秒）
+    POLL_NIGHT_START = os.getenv("POLL_NIGHT_START", "00:10")  # 夜间低频时段开始（UTC+8）
+    POLL_NIGHT_END = os.getenv("POLL_NIGHT_END", "05:50")  # 夜间低频时段结束（UTC+8）
+    POLL_NIGHT_FACTOR = float(os.getenv("POLL_NIGHT_FACTOR", "4"))  # 夜间间隔放大倍数
+    POLL_HOLIDAY_FACTOR = float(os.getenv("POLL_HOLIDAY_FACTOR", "2"))  # 节假日间隔放大倍数
+    POLL_HOLIDAY_FILE = os.getenv("POLL_HOLIDAY_FILE", "")  # 节假日日历文件，每行一个 YYYY-MM-DD
+    POLL_TARGET_CHANGE_RATIO = float(
+        os.getenv("POLL_TARGET_CHANGE_RATIO", "0.2")
+    )  # 期望每次抓取之间发生变化的站点比例
+    POLL_VOLATILITY_WINDOW = int(
+        os.getenv("POLL_VOLATILITY_WINDOW", "12")
+    )  # 统计站点变化率使用的最近快照数
+    POLL_MIN_FRESH_RATIO = float(
+        os.getenv("POLL_MIN_FRESH_RATIO", "0.5")
+    )  # 未过期站点低于该比例时本次不调整间隔
+
+    # 服务商插件配置（逗号分隔的插件名，如 neptune,dlmm；内置插件见 fetcher/provider_registry.py）
+    ENABLED_PROVIDERS = os.getenv("ENABLED_PROVIDERS", "")  # 为空表示启用全部
+    DISABLED_PROVIDERS = os.getenv("DISABLED_PROVIDERS", "")  # 优先级高于 ENABLED_PROVIDERS
+    # 站点 CSV 所在目录，为空时使用 fetcher/providers/data（可指向合成的大规模站点目录）
+    STATION_DATA_DIR = os.getenv("STATION_DATA_DIR", "")
+    STATION_CATALOG_CACHE_PATH = os.getenv(
+        "STATION_CATALOG_CACHE_PATH", ".cache/station_catalog.json"
+    )  # 站点 CSV 的编译缓存（见 fetcher/catalog_cache.py），多个 worker 共享；置空则每次解析 CSV
+    STATION_RELOAD_INTERVAL = float(
+        os.getenv("STATION_RELOAD_INTERVAL", "30")
+    )  # 检查站点 CSV 是否变化的间隔（秒），变化后热重载；0 表示只能通过管理接口重载
+
+    STATION_REFRESH_MIN_AGE = float(
+        os.getenv("STATION_REFRESH_MIN_AGE", "15")
+    )  # 单站点实时刷新的最小间隔（秒），站点数据比这更新时直接返回快照
+
+    # 管理接口（/api/admin/*）的访问令牌，请求头 X-Admin-Token 须与之一致；为空时管理接口不可用
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+    # 服务商抓取发布配置
+    # 开启后每个服务商完成即发布到内存快照，不再等待最慢的服务商
+    PROVIDER_STREAMING_ENABLED = os.getenv("PROVIDER_STREAMING_ENABLED", "true").lower() == "true"
+    PROVIDER_FETCH_TIMEOUT = float(
+        os.getenv("PROVIDER_FETCH_TIMEOUT", "90")
+    )  # 单个服务商的抓取超时（秒），超时后保留上一轮结果并标记为过期
+
+    # 设备级结果缓存配置
+    DEVICE_CACHE_TTL = float(
+        os.getenv("DEVICE_CACHE_TTL", "30")
+    )  # 单个设备抓取结果的缓存时间（秒），0 表示只合并同时发生的重复请求
+    DEVICE_CACHE_SIZE = int(os.getenv("DEVICE_CACHE_SIZE", "100000"))  # 最多缓存的设备条目数
+
+    # 设备原始响应指纹（见 fetcher/fingerprints.py）：响应与上一次相同时复用解析结果，站点标记为未变化
+    PAYLOAD_FINGERPRINT_ENABLED = os.getenv("PAYLOAD_FINGERPRINT_ENABLED", "true").lower() == "true"
+
+    # 端口级状态记录（见 fetcher/port_history.py），仅尼普顿 / 电驴妈妈 / 多航科技的响应带端口明细
+    PORT_HISTORY_ENABLED = os.getenv("PORT_HISTORY_ENABLED", "false").lower() == "true"
+    PORT_HISTORY_SIZE = int(
+        os.getenv("PORT_HISTORY_SIZE", "288")
+    )  # 每个设备保留的端口状态变化次数（只在状态变化时记录）
+    PORT_BROKEN_AFTER = float(
+        os.getenv("PORT_BROKEN_AFTER", "86400")
+    )  # 端口持续故障超过该时长（秒）视为长期损坏
+
+    # 服务商原始响应录制 / 回放（gzip 压缩的 JSON Lines 文件，见 fetcher/payload_store.py）
+    PAYLOAD_CAPTURE_PATH = os.getenv("PAYLOAD_CAPTURE_PATH", "")  # 非空时录制每个设备的原始响应
+    PAYLOAD_REPLAY_PATH = os.getenv("PAYLOAD_REPLAY_PATH", "")  # 非空时不发请求，从该文件回放
+
+    # 服务商鉴权 token 配置
+    PROVIDER_TOKEN_CACHE_PATH = os.getenv(
+        "PROVIDER_TOKEN_CACHE_PATH", ".cache/provider_tokens.json"
+    )  # token 持久化文件，多个 worker 共享；置空则不持久化
+    PROVIDER_TOKEN_TTL = int(
+        os.getenv("PROVIDER_TOKEN_TTL", "7200")
+    )  # 无法从 token 中解析过期时间时使用的默认有效期（秒）
+    PROVIDER_TOKEN_REFRESH_MARGIN = int(
+        os.getenv("PROVIDER_TOKEN_REFRESH_MARGIN", "300")
+    )  # 距离过期多少秒内主动刷新
 
     # 限流配置
     RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
@@ -31,6 +111,14 @@ class Config:
     RATE_LIMIT_STATUS = os.getenv(
         "RATE_LIMIT_STATUS", "3/minute"
     )  # /api/status 端点限流规则，允许前端60秒刷新+容错
+    RATE_LIMIT_REFRESH = os.getenv(
+        "RATE_LIMIT_REFRESH", "20/minute"
+    )  # /api/status/refresh（单站点实时刷新）限流规则
+
+    # 存储后端（见 db/sqlite_store.py）：supabase（默认）/ sqlite（本地 SQLite 为唯一存储，可完全离线运行）/
+    # sqlite+supabase（先写本地 SQLite 再写 Supabase，读取优先本地）
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+    SQLITE_PATH = os.getenv("SQLITE_PATH", ".cache/zju_charger.sqlite3")  # 本地 SQLite 数据库文件
 
     # Supabase 配置
     # 注意：建议使用 Service Role Key（服务端密钥），它会绕过 RLS 策略
@@ -38,6 +126,28 @@ class Config:
     SUPABASE_URL = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")  # 应使用 Service Role Key，而非 anon key
     SUPABASE_HISTORY_ENABLED = os.getenv("SUPABASE_HISTORY_ENABLED", "true").lower() == "true"
+    # latest 表只写入计数变化的行，其余行由 latest_heartbeat 单行表统一确认（需先建表，见 db/setup.sql）
+    LATEST_CHANGE_ONLY_ENABLED = os.getenv("LATEST_CHANGE_ONLY_ENABLED", "true").lower() == "true"
+    LATEST_FULL_WRITE_INTERVAL = float(
+        os.getenv("LATEST_FULL_WRITE_INTERVAL", "3600")
+    )  # 只写变化行时，两次完整写入 latest 的最短间隔（秒）
+    # usage 历史表后写缓冲（见 db/pipeline.py）：跨多轮抓取合并为更大的批次，由独立任务写入
+    USAGE_WRITE_BUFFER_ENABLED = os.getenv("USAGE_WRITE_BUFFER_ENABLED", "true").lower() == "true"
+    USAGE_FLUSH_ROWS = int(
+        os.getenv("USAGE_FLUSH_ROWS", "5000")
+    )  # 累积到该行数即写入，也是单次请求上限
+    USAGE_FLUSH_INTERVAL = float(
+        os.getenv("USAGE_FLUSH_INTERVAL", "600")
+    )  # 缓冲中最早一行的最长等待时间（秒）
+    USAGE_QUEUE_SIZE = int(
+        os.getenv("USAGE_QUEUE_SIZE", "64")
+    )  # 等待写入的最多抓取轮数，超出时丢弃最旧的一轮
+    # 写入失败的本地 outbox（见 db/outbox.py）：usage / stations 写入失败的批次落盘，恢复后重放；置空则不落盘
+    WRITE_OUTBOX_PATH = os.getenv("WRITE_OUTBOX_PATH", ".cache/write_outbox.jsonl")
+    OUTBOX_RETRY_MIN = float(os.getenv("OUTBOX_RETRY_MIN", "30"))  # 首次重放前的等待时间（秒）
+    OUTBOX_RETRY_MAX = float(
+        os.getenv("OUTBOX_RETRY_MAX", "1800")
+    )  # 重放连续失败时，等待时间逐次翻倍的上限（秒）
 
     # 服务商配置
     # 格式：PROVIDER_<PROVIDER_ID>_<CONFIG_KEY>=<value>
@@ -0,0 +1,229 @@
+"""自适应抓取间隔控制
+
+根据最近几次快照中各站点计数的实际变化频率（波动率）、时段（夜间）和节假日日历，
+动态计算后台抓取任务的下一次等待时间，并始终限制在 [最小间隔, 最大间隔] 之内。
+"""
+
+import logging
+from collections import deque
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TZ_UTC_8 = timezone(timedelta(hours=8))
+
+# 单次调整的最大缩放倍数，避免间隔剧烈抖动
+MAX_STEP_FACTOR = 2.0
+
+
+def _parse_clock(value: str, default: str) -> time:
+    """解析 HH:MM 格式的时刻，格式错误时使用默认值"""
+    try:
+        return datetime.strptime(value.strip(), "%H:%M").time()
+    except (AttributeError, ValueError):
+        logger.warning("无法解析时刻 %r，使用默认值 %s", value, default)
+        return datetime.strptime(default, "%H:%M").time()
+
+
+def load_holiday_calendar(path: Optional[str]) -> Set[date]:
+    """从文本文件加载节假日日历
+
+    文件每行一个 YYYY-MM-DD 日期，支持以 # 开头的注释和空行。
+    文件不存在或为空路径时返回空集合。
+    """
+    if not path:
+        return set()
+
+    calendar_path = Path(path)
+    if not calendar_path.exists():
+        logger.warning("节假日日历文件不存在: %s", calendar_path)
+        return set()
+
+    holidays: Set[date] = set()
+    for line in calendar_path.read_text(encoding="utf-8").splitlines():
+        item = line.split("#", 1)[0].strip()
+        if not item:
+            continue
+        try:
+            holidays.add(date.fromisoformat(item))
+        except ValueError:
+            logger.warning("忽略无法解析的节假日日期: %s", item)
+    return holidays
+
+
+class AdaptiveIntervalController:
+    """自适应抓取间隔控制器
+
+    - 每次抓取后调用 ``observe`` 记录快照，统计每个站点最近 ``window`` 次快照中计数发生变化的比例；
+    - 站点平均变化率高于 ``target_change_ratio`` 时缩短间隔（高峰），低于时拉长间隔（低谷）；
+    - 过期（stale，服务商本轮抓取失败而保留的上一轮结果）的站点计数不会变化，不参与统计；
+      未过期站点不足 ``min_fresh_ratio`` 时本次不调整间隔，避免服务商故障被误判为低谷；
+    - 夜间时段与节假日在此基础上再乘以对应的放大系数；
+    - 最终结果始终夹在 ``min_interval`` 与 ``max_interval`` 之间。
+    """
+
+    def __init__(
+        self,
+        base_interval: int,
+        min_interval: int,
+        max_interval: int,
+        night_start: str = "00:10",
+        night_end: str = "05:50",
+        night_factor: float = 4.0,
+        holiday_factor: float = 2.0,
+        holidays: Optional[Iterable[date]] = None,
+        target_change_ratio: float = 0.2,
+        window: int = 12,
+        min_fresh_ratio: float = 0.5,
+        enabled: bool = True,
+    ):
+        if min_interval > max_interval:
+            min_interval, max_interval = max_interval, min_interval
+
+        self.min_interval = max(1, int(min_interval))
+        self.max_interval = max(self.min_interval, int(max_interval))
+        self.fixed_interval = max(1, int(base_interval))
+        self.base_interval = self._clamp(base_interval)
+        self.night_start = _parse_clock(night_start, "00:10")
+        self.night_end = _parse_clock(night_end, "05:50")
+        self.night_factor = max(1.0, float(night_factor))
+        self.holiday_factor = max(1.0, float(holiday_factor))
+        self.holidays: Set[date] = set(holidays or [])
+        self.target_change_ratio = max(0.01, float(target_change_ratio))
+        self.window = max(2, int(window))
+        self.min_fresh_ratio = min(1.0, max(0.0, float(min_fresh_ratio)))
+        self.enabled = enabled
+
+        # 当前的"日间工作日"间隔，随波动率逐步调整
+        self._interval: float = float(self.base_interval)
+        # hash_id -> 上一次快照的计数
+        self._last_counts: Dict[str, Tuple[int, int, int, int]] = {}
+        # hash_id -> 最近若干次快照的"是否变化"标记
+        self._change_history: Dict[str, Deque[bool]] = {}
+
+    # --- 时段判断 ---
+
+    def _now(self, now: Optional[datetime] = None) -> datetime:
+        if now is None:
+            return datetime.now(TZ_UTC_8)
+        if now.tzinfo is None:
+            return now.replace(tzinfo=TZ_UTC_8)
+        return now.astimezone(TZ_UTC_8)
+
+    def is_night_time(self, now: Optional[datetime] = None) -> bool:
+        """当前时间是否处于夜间低频时段（支持跨零点的时段）"""
+        current = self._now(now).time()
+        if self.night_start <= self.night_end:
+            return self.night_start <= current <= self.night_end
+        return current >= self.night_start or current <= self.night_end
+
+    def is_holiday(self, now: Optional[datetime] = None) -> bool:
+        """当前日期是否在节假日日历中"""
+        return self._now(now).date() in self.holidays
+
+    # --- 波动率统计 ---
+
+    def observe(self, stations: List[Dict[str, Any]]) -> float:
+        """记录一次快照并更新波动率，返回本次快照中发生变化的站点比例（过期站点不计入）"""
+        changed = 0
+        compared = 0
+        fresh = [station for station in stations if not station.get("stale")]
+
+        for station in fresh:
+            station_id = station.get("hash_id") or station.get("id")
+            if not station_id:
+                continue
+
+            if station.get("unchanged") and station_id in self._last_counts:
+                # 原始响应与上一轮相同，计数必然未变，无需再比较
+                is_changed = False
+            else:
+                counts = (
+                    int(station.get("free", 0) or 0),
+                    int(station.get("used", 0) or 0),
+                    int(station.get("total", 0) or 0),
+                    int(station.get("error", 0) or 0),
+                )
+                previous = self._last_counts.get(station_id)
+                self._last_counts[station_id] = counts
+                if previous is None:
+                    continue
+                is_changed = previous != counts
+
+            history = self._change_history.get(station_id)
+            if history is None:
+                history = self._change_history[station_id] = deque(maxlen=self.window)
+            history.append(is_changed)
+
+            compared += 1
+            changed += is_changed
+
+        ratio = changed / compared if compared else 0.0
+        if stations and len(fresh) < len(stations) * self.min_fresh_ratio:
+            logger.info(
+                "本次快照仅 %d/%d 个站点为最新数据，不调整抓取间隔", len(fresh), len(stations)
+            )
+        elif compared:
+            self._adjust(self.volatility())
+        logger.debug("本次快照变化站点 %d/%d，波动率 %.3f", changed, compared, self.volatility())
+        return ratio
+
+    def volatility(self) -> float:
+        """所有站点最近若干次快照的平均变化率（0~1）"""
+        rates = [
+            sum(history) / len(history) for history in self._change_history.values() if history
+        ]
+        if not rates:
+            return 0.0
+        return sum(rates) / len(rates)
+
+    def station_change_rate(self, station_id: str) -> Optional[float]:
+        """单个站点最近若干次快照的变化率，无历史时返回 None"""
+        history = self._change_history.get(station_id)
+        if not history:
+            return None
+        return sum(history) / len(history)
+
+    def _adjust(self, volatility: float):
+        """按波动率与目标变化率之比缩放日间间隔
+
+        使用比值的平方根做阻尼，避免窗口统计滞后导致间隔来回震荡；单步缩放不超过 MAX_STEP_FACTOR。
+        """
+        if volatility <= 0:
+            factor = MAX_STEP_FACTOR
+        else:
+            factor = (self.target_change_ratio / volatility) ** 0.5
+            factor = min(MAX_STEP_FACTOR, max(1 / MAX_STEP_FACTOR, factor))
+        self._interval = float(self._clamp(self._interval * factor))
+
+    # --- 间隔计算 ---
+
+    def _clamp(self, interval: float) -> int:
+        return int(min(self.max_interval, max(self.min_interval, round(interval))))
+
+    def next_interval(self, now: Optional[datetime] = None) -> int:
+        """计算下一次抓取前的等待秒数"""
+        if not self.enabled:
+            return self.fixed_interval
+
+        interval = self._interval
+        if self.is_night_time(now):
+            interval *= self.night_factor
+        if self.is_holiday(now):
+            interval *= self.holiday_factor
+        return self._clamp(interval)
+
+    def describe(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """返回当前控制器状态，便于日志与排查"""
+        return {
+            "enabled": self.enabled,
+            "interval": self.next_interval(now),
+            "base_interval": self.base_interval,
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "volatility": round(self.volatility(), 4),
+            "night": self.is_night_time(now),
+            "holiday": self.is_holiday(now),
+        }
@@ -0,0 +1,103 @@
+"""fetcher/catalog_cache.py：站点目录编译缓存的命中与失效"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from fetcher.catalog_cache import StationCatalogCache
+from fetcher.station import load_stations_from_csv
+
+HEADER = "name,provider,campus,lon,lat,device_ids\n"
+ROWS = [
+    '玉泉出版社楼南侧,neptune,1,120.12,30.26,"[101,102]"\n',
+    "紫金港东四北侧,neptune,2,120.08,30.30,[201]\n",
+]
+
+
+def _fields(stations):
+    return [(s.name, s.provider, s.campus_id, s.device_ids, s.hash_id) for s in stations]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "stations.csv"
+    path.write_text(HEADER + "".join(ROWS), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "station_catalog.json")
+
+
+def test_hit_matches_direct_parse(csv_path, cache_path):
+    cache = StationCatalogCache(cache_path)
+    first = cache.load(csv_path)
+    second = cache.load(csv_path)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert _fields(first) == _fields(second) == _fields(load_stations_from_csv(csv_path))
+    # 每次加载都构建独立的对象
+    second[0].usage.free = 5
+    assert cache.load(csv_path)[0].usage.free == 0
+
+    # 另一个进程（新的缓存实例）直接读缓存文件
+    other = StationCatalogCache(cache_path)
+    assert _fields(other.load(csv_path)) == _fields(first)
+    assert (other.hits, other.misses) == (1, 0)
+
+
+def test_touched_file_with_same_content_still_hits(csv_path, cache_path):
+    cache = StationCatalogCache(cache_path)
+    cache.load(csv_path)
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.load(csv_path)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_content_is_reparsed(csv_path, cache_path):
+    cache = StationCatalogCache(cache_path)
+    cache.load(csv_path)
+    csv_path.write_text(HEADER + ROWS[1], encoding="utf-8")
+    stations = cache.load(csv_path)
+    assert [s.name for s in stations] == ["紫金港东四北侧"]
+    assert cache.misses == 2
+
+
+def test_invalidate_rereads_cache_file(csv_path, cache_path):
+    cache = StationCatalogCache(cache_path)
+    cache.load(csv_path)
+    # 其他 worker 重写了缓存文件：invalidate 之前仍使用进程内已读入的缓存
+    os.remove(cache_path)
+    cache.load(csv_path)
+    assert cache.hits == 1
+    cache.invalidate()
+    cache.load(csv_path)
+    assert cache.misses == 2
+
+
+def test_disabled_cache_parses_csv(csv_path):
+    cache = StationCatalogCache(None)
+    assert _fields(cache.load(csv_path)) == _fields(load_stations_from_csv(csv_path))
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_cache_file_is_data_only_and_malformed_entries_miss(csv_path, cache_path):
+    cache = StationCatalogCache(cache_path)
+    cache.load(csv_path)
+    data = json.loads(Path(cache_path).read_text(encoding="utf-8"))
+    entry = data["entries"][str(csv_path.resolve())]
+    assert entry["stations"][0][:2] == ["玉泉出版社楼南侧", "neptune"]
+
+    # 条目被改成不符合预期结构的内容：按未命中处理，重新解析 CSV
+    entry["stations"] = [["x"]]
+    Path(cache_path).write_text(json.dumps(data), encoding="utf-8")
+    other = StationCatalogCache(cache_path)
+    assert _fields(other.load(csv_path)) == _fields(load_stations_from_csv(csv_path))
+    assert other.misses == 1
+
+    # 非 JSON 的缓存文件（如旧版 pickle）同样直接忽略
+    Path(cache_path).write_bytes(b"\x80\x05\x95 not json")
+    assert len(StationCatalogCache(cache_path).load(csv_path)) == 2
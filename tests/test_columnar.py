@@ -0,0 +1,93 @@
+"""fetcher/columnar.py：列式快照的汇总与逐条遍历字典的结果一致"""
+
+import random
+from collections import defaultdict
+
+import pytest
+
+from fetcher.columnar import ColumnarSnapshot
+from fetcher.station import CAMPUS_NAME_MAP, Station, StationStatus
+
+PROVIDERS = ("neptune", "neptune_junior", "dlmm", "其他")
+
+
+def _records(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        station = Station(
+            name=f"站点{i}", provider=PROVIDERS[i % len(PROVIDERS)], campus_id=rng.randint(1, 5)
+        )
+        station.index = i
+        total = rng.randint(0, 20)
+        error = rng.randint(0, total)
+        used = rng.randint(0, total - error)
+        records.append(
+            StationStatus(station, total - error - used, used, total, error, stale=i % 9 == 0)
+        )
+    return records
+
+
+def _dict_groups(records, key: str):
+    """旧实现：逐条遍历字典累加"""
+    groups = defaultdict(lambda: {"free": 0, "used": 0, "total": 0, "error": 0, "stations": 0})
+    for record in records:
+        data = record.to_dict()
+        group = groups[data[key]]
+        for name in ("free", "used", "total", "error"):
+            group[name] += data[name]
+        group["stations"] += 1
+        group["stale_stations"] = group.get("stale_stations", 0) + bool(data.get("stale"))
+    for group in groups.values():
+        usable = group["total"] - group["error"]
+        group["usage_rate"] = round(group["used"] / usable, 4) if usable > 0 else 0.0
+    return dict(groups)
+
+
+@pytest.fixture
+def records():
+    return _records(500)
+
+
+def test_campus_aggregates_match_dict_path(records):
+    snapshot = ColumnarSnapshot.from_records(records)
+    expected = _dict_groups(records, "campus_id")
+    groups = snapshot.aggregate_by_campus()
+    assert len(groups) == len(expected)
+    for group in groups:
+        campus_id = group.pop("campus_id")
+        assert group.pop("campus_name") == CAMPUS_NAME_MAP[campus_id]
+        assert group == expected[campus_id]
+
+
+def test_provider_aggregates_match_dict_path(records):
+    snapshot = ColumnarSnapshot.from_records(records)
+    expected = _dict_groups(records, "provider")
+    groups = {group.pop("provider"): group for group in snapshot.aggregate_by_provider()}
+    assert groups == expected
+
+
+def test_totals_match_dict_path(records):
+    snapshot = ColumnarSnapshot.from_records(records)
+    totals = snapshot.totals()
+    for name in ("free", "used", "total", "error"):
+        assert totals[name] == sum(record[name] for record in records)
+    assert totals["stations"] == len(records)
+
+
+def test_records_without_index_and_catalog_gaps():
+    records = _records(3)
+    records[1].station.index = -1
+    snapshot = ColumnarSnapshot.from_records(records, size=10)
+    # 目录中有 10 个站点、只抓到 3 个：未抓到的下标不计入汇总
+    assert snapshot.totals()["stations"] == 3
+    # 没有下标的记录追加在目录之后
+    assert snapshot.hash_ids[10] == records[1].hash_id
+    assert not snapshot.present[1]
+
+
+def test_plain_dict_records_are_accepted(records):
+    dicts = [record.to_dict() | {"index": record.index} for record in records]
+    from_dicts = ColumnarSnapshot.from_records(dicts)
+    from_records = ColumnarSnapshot.from_records(records)
+    assert from_dicts.aggregate_by_campus() == from_records.aggregate_by_campus()
@@ -0,0 +1,130 @@
+"""fetcher/device_cache.py：TTL 过期、失败结果不缓存与进行中请求去重"""
+
+import asyncio
+
+from fetcher import device_cache as device_cache_module
+from fetcher.device_cache import DeviceResultCache
+
+KEY = ("neptune", "1001")
+
+
+class FakeFetch:
+    """记录调用次数的设备请求，可指定返回结果与延迟"""
+
+    def __init__(self, result=None, delay: float = 0.0):
+        self.calls = 0
+        self.result = result if result is not None else ({"free": 1}, None)
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_hit_within_ttl_and_refetch_after_expiry(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(device_cache_module.time, "monotonic", lambda: clock[0])
+    cache = DeviceResultCache(ttl=30)
+    fetch = FakeFetch()
+
+    async def scenario():
+        assert await cache.get_or_fetch(KEY, fetch) == ({"free": 1}, None)
+        clock[0] += 29
+        await cache.get_or_fetch(KEY, fetch)
+        assert fetch.calls == 1
+        clock[0] += 2
+        await cache.get_or_fetch(KEY, fetch)
+        assert fetch.calls == 2
+
+    asyncio.run(scenario())
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_failures_are_not_cached():
+    cache = DeviceResultCache(ttl=30)
+    failed = FakeFetch(result=(None, RuntimeError("timeout")))
+    raising = FakeFetch(result=ValueError("bad json"))
+
+    async def scenario():
+        data, exc = await cache.get_or_fetch(KEY, failed)
+        assert data is None and isinstance(exc, RuntimeError)
+        await cache.get_or_fetch(KEY, failed)
+        # fetch 抛出的异常转换为 (None, exc)，同样不缓存
+        data, exc = await cache.get_or_fetch(("neptune", "1002"), raising)
+        assert data is None and isinstance(exc, ValueError)
+
+    asyncio.run(scenario())
+    assert failed.calls == 2
+    assert cache.get(KEY) is None
+
+
+def test_concurrent_requests_share_one_fetch():
+    cache = DeviceResultCache(ttl=0)
+    fetch = FakeFetch(delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_fetch(KEY, fetch) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert fetch.calls == 1
+    assert all(result == ({"free": 1}, None) for result in results)
+    assert (cache.misses, cache.coalesced) == (1, 4)
+    # ttl <= 0 时只合并同一时刻的请求，不保留结果
+    assert cache.get(KEY) is None
+
+
+def test_cancelled_caller_does_not_cancel_other_waiters():
+    cache = DeviceResultCache(ttl=30)
+    fetch = FakeFetch(delay=0.02)
+
+    async def scenario():
+        first = asyncio.ensure_future(cache.get_or_fetch(KEY, fetch))
+        second = asyncio.ensure_future(cache.get_or_fetch(KEY, fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == ({"free": 1}, None)
+    assert fetch.calls == 1
+
+
+def test_invalidate_and_eviction():
+    cache = DeviceResultCache(ttl=30, max_entries=2)
+    for device_id in ("1", "2", "3"):
+        cache.put(("dlmm", device_id), ({"free": 0}, None))
+    # 超过 max_entries 时淘汰最早写入的条目
+    assert cache.get(("dlmm", "1")) is None
+    assert cache.get(("dlmm", "3")) is not None
+
+    cache.invalidate(("dlmm", "3"))
+    assert cache.get(("dlmm", "3")) is None
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_closing_owner_session_cancels_its_requests():
+    cache = DeviceResultCache(ttl=30)
+    slow = FakeFetch(delay=10)
+    own = FakeFetch(result=({"free": 2}, None))
+    closed_session, live_session = object(), object()
+
+    async def scenario():
+        # 超时服务商的请求仍在 closed_session 上进行，另一个会话的调用方加入了它
+        first = asyncio.ensure_future(cache.get_or_fetch(KEY, slow, owner=closed_session))
+        await asyncio.sleep(0)
+        joined = asyncio.ensure_future(cache.get_or_fetch(KEY, own, owner=live_session))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert cache.cancel_inflight(closed_session) == 1
+        assert cache.cancel_inflight(closed_session) == 0
+        # 加入者不收到取消或会话关闭的错误，而是用自己的 fetch 重新请求
+        return await joined
+
+    assert asyncio.run(scenario()) == ({"free": 2}, None)
+    assert (slow.calls, own.calls) == (1, 1)
+    assert cache.stats()["inflight"] == 0
+    assert cache.get(KEY) == ({"free": 2}, None)
@@ -0,0 +1,95 @@
+"""fetcher/providers/else_vendors.py 与 ElseProvider：子服务商失败的上报与站点聚合"""
+
+import asyncio
+
+import aiohttp
+import pytest
+
+from fetcher.device_cache import device_cache
+from fetcher.providers.else_provider import ElseProvider
+from fetcher.providers.else_vendors import LetfungoVendor, PlaceholderVendor
+from fetcher.station import Station
+
+
+@pytest.fixture
+def provider():
+    prov = ElseProvider()
+    yield prov
+    device_cache.invalidate()
+    asyncio.run(prov.close())
+
+
+def _station(vendor: str, *device_ids: str) -> Station:
+    return Station(
+        name=f"测试站点-{vendor}", provider=vendor, campus_id=2, device_ids=list(device_ids)
+    )
+
+
+def test_letfungo_failure_is_reported():
+    adapter = LetfungoVendor("电动车充电网")
+
+    async def unreachable(session, device_id):
+        raise aiohttp.ClientConnectionError("connection refused")
+
+    adapter.request_payload = unreachable
+    data, exc = asyncio.run(adapter.request(None, "880001"))
+    # 失败必须作为异常返回，否则全 0 结果会被设备结果缓存当作成功结果保存
+    assert isinstance(exc, aiohttp.ClientConnectionError)
+
+
+def test_placeholder_result_is_never_unchanged():
+    data, exc = asyncio.run(PlaceholderVendor("待补充").fetch("1"))
+    assert exc is None
+    assert data == {"total": 0, "free": 0, "used": 0, "error": 0, "unchanged": False}
+
+
+def test_station_with_all_devices_failed_is_an_error(provider):
+    adapter = provider.adapters["电动车充电网"]
+
+    async def failing(device_id):
+        return {"total": 0, "free": 0, "used": 0, "error": 0}, RuntimeError("HTTP 500")
+
+    adapter.fetch = failing
+    status, exc = asyncio.run(
+        provider.fetch_station_status(_station("电动车充电网", "990001", "990002"), None)
+    )
+    assert status is None
+    assert isinstance(exc, RuntimeError)
+
+
+def test_partially_failed_station_sums_answered_devices(provider):
+    adapter = provider.adapters["电动车充电网"]
+
+    async def half(device_id):
+        if device_id == "990011":
+            return {"total": 4, "free": 1, "used": 3, "error": 0, "unchanged": False}, None
+        return None, RuntimeError("timeout")
+
+    adapter.fetch = half
+    status, exc = asyncio.run(
+        provider.fetch_station_status(_station("电动车充电网", "990011", "990012"), None)
+    )
+    assert exc is None
+    assert (status["total"], status["free"], status["used"]) == (4, 1, 3)
+    assert status["unchanged"] is False
+
+
+def test_session_and_semaphore_follow_the_event_loop():
+    adapter = LetfungoVendor("电动车充电网")
+    seen = []
+
+    async def record(session, device_id):
+        seen.append((session, adapter._semaphore))
+        return {"total": 1, "free": 1, "used": 0, "error": 0, "unchanged": False}, None
+
+    adapter.request = record
+    # 每次 asyncio.run 都是新的事件循环：不能沿用绑定在上一个循环上的会话与信号量
+    asyncio.run(adapter.fetch("1"))
+    asyncio.run(adapter.fetch("2"))
+    (first_session, first_semaphore), (second_session, second_semaphore) = seen
+    assert first_session is not second_session
+    assert first_semaphore is not second_semaphore
+
+    asyncio.run(adapter.close())
+    assert (adapter._session, adapter._semaphore) == (None, None)
+    assert second_session.closed
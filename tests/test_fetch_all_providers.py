@@ -0,0 +1,80 @@
+"""fetcher/provider_manager.py：逐个发布、服务商超时与保留上一轮结果"""
+
+import asyncio
+
+import pytest
+
+from fetcher.provider_manager import ProviderManager
+from fetcher.station import Station, StationStatus
+from server.config import Config
+
+
+class FakeProvider:
+    """按设定的延迟返回固定空闲数的服务商"""
+
+    def __init__(self, provider: str, delay: float = 0.0):
+        self.provider = provider
+        self.delay = delay
+        self.free = 1
+        self.station = Station(
+            name=f"{provider}站点", provider=provider, campus_id=2, device_ids=["1"]
+        )
+        self.station_list = [self.station]
+
+    async def fetch_status(self, session):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return [StationStatus(self.station, free=self.free, used=0, total=self.free)]
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def manager():
+    pm = ProviderManager(enabled="")
+    pm.providers = [FakeProvider("slow"), FakeProvider("fast")]
+    return pm
+
+
+def test_slow_provider_keeps_previous_result_as_stale(manager, monkeypatch):
+    slow, fast = manager.providers
+    first = asyncio.run(manager.fetch_all_providers(streaming=True))
+    assert all(entry["status"] == "success" for entry in first.values())
+
+    # 第二轮：slow 超过 PROVIDER_FETCH_TIMEOUT
+    monkeypatch.setattr(Config, "PROVIDER_FETCH_TIMEOUT", 0.05)
+    slow.delay = 1.0
+    slow.free = fast.free = 2
+    results = asyncio.run(manager.fetch_all_providers(streaming=True))
+
+    # 先完成的先发布
+    assert list(results) == ["fast", "slow"]
+    assert results["fast"]["stale"] is False
+    assert results["fast"]["data"][0].free == 2
+    assert results["slow"]["stale"] is True
+    assert results["slow"]["data"][0].free == 1
+    assert results["slow"]["status"] == "success"
+
+    merged = {status.provider: status for status in manager._merged_stations()}
+    assert (merged["fast"].free, merged["fast"].stale) == (2, False)
+    assert (merged["slow"].free, merged["slow"].stale) == (1, True)
+
+
+def test_timeout_without_previous_result_is_an_error(manager, monkeypatch):
+    slow, _ = manager.providers
+    monkeypatch.setattr(Config, "PROVIDER_FETCH_TIMEOUT", 0.05)
+    slow.delay = 1.0
+    results = asyncio.run(manager.fetch_all_providers(streaming=True))
+    assert results["slow"]["status"] == "error"
+    assert results["slow"]["data"] is None
+    assert results["fast"]["status"] == "success"
+
+
+def test_non_streaming_waits_for_all_providers(manager):
+    slow, _ = manager.providers
+    slow.delay = 0.05
+    results = asyncio.run(manager.fetch_all_providers(streaming=False))
+    # 全部完成后按注册顺序发布，不设超时
+    assert list(results) == ["slow", "fast"]
+    assert all(entry["status"] == "success" for entry in results.values())
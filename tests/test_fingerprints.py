@@ -0,0 +1,93 @@
+"""fetcher/fingerprints.py：响应指纹按抓取周期判定「未变化」"""
+
+import pytest
+
+from fetcher import fingerprints as fingerprints_module
+from fetcher.fingerprints import PayloadFingerprints, results_unchanged
+
+SCOPE = "neptune"
+
+
+class CountingParse:
+    """记录调用次数的解析函数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, payload, device_id):
+        self.calls += 1
+        return {"free": payload["free"], "total": 10}
+
+
+@pytest.fixture
+def fingerprints(monkeypatch):
+    prints = PayloadFingerprints()
+    # results_unchanged 读取的是模块级的共享实例
+    monkeypatch.setattr(fingerprints_module, "payload_fingerprints", prints)
+    return prints
+
+
+def test_same_payload_next_cycle_is_unchanged(fingerprints):
+    parse = CountingParse()
+    fingerprints.begin_cycle()
+    first = fingerprints.parse(SCOPE, "1", {"free": 3}, parse)
+    assert first == {"free": 3, "total": 10, "unchanged": False, "cycle": 1}
+
+    fingerprints.begin_cycle()
+    second = fingerprints.parse(SCOPE, "1", {"free": 3}, parse)
+    assert second["unchanged"] is True and second["cycle"] == 2
+    # 指纹相同时复用上一次的解析结果
+    assert parse.calls == 1
+
+    fingerprints.begin_cycle()
+    third = fingerprints.parse(SCOPE, "1", {"free": 2}, parse)
+    assert third["unchanged"] is False and third["free"] == 2
+    assert fingerprints.stats()["unchanged"] == 1
+
+
+def test_shared_device_gets_same_flag_within_cycle(fingerprints):
+    parse = CountingParse()
+    fingerprints.begin_cycle()
+    fingerprints.parse(SCOPE, "1", {"free": 3}, parse)
+
+    # 本轮设备被两个站点共用，解析两次：两次都与上一轮比较
+    fingerprints.begin_cycle()
+    flags = [fingerprints.parse(SCOPE, "1", {"free": 3}, parse)["unchanged"] for _ in range(2)]
+    assert flags == [True, True]
+
+    fingerprints.begin_cycle()
+    fingerprints.parse(SCOPE, "1", {"free": 1}, parse)
+    # 同一轮内响应又变回 free=3：仍与上一轮（free=3）比较
+    assert fingerprints.parse(SCOPE, "1", {"free": 3}, parse)["unchanged"] is True
+    assert fingerprints.parse(SCOPE, "1", {"free": 1}, parse)["unchanged"] is False
+
+
+def test_scopes_are_independent(fingerprints):
+    parse = CountingParse()
+    fingerprints.begin_cycle()
+    fingerprints.parse("neptune", "1", {"free": 3}, parse)
+    fingerprints.begin_cycle()
+    assert fingerprints.parse("dlmm", "1", {"free": 3}, parse)["unchanged"] is False
+
+
+def test_results_from_previous_cycle_are_not_unchanged(fingerprints):
+    parse = CountingParse()
+    fingerprints.begin_cycle()
+    fingerprints.parse(SCOPE, "1", {"free": 3}, parse)
+    fingerprints.begin_cycle()
+    cached = fingerprints.parse(SCOPE, "1", {"free": 3}, parse)
+    assert results_unchanged([(cached, None)])
+
+    # 设备结果缓存在下一轮命中上一轮的结果：不算未变化
+    fingerprints.begin_cycle()
+    assert not results_unchanged([(cached, None)])
+    assert not results_unchanged([])
+    assert not results_unchanged([(None, RuntimeError("timeout"))])
+
+
+def test_disabled_always_parses():
+    parse = CountingParse()
+    fingerprints = PayloadFingerprints(enabled=False)
+    for _ in range(2):
+        assert fingerprints.parse(SCOPE, "1", {"free": 3}, parse)["unchanged"] is False
+    assert parse.calls == 2
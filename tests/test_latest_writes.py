@@ -0,0 +1,104 @@
+"""db/pipeline.py：latest 只写入变化的行、心跳确认其余行与退回完整写入"""
+
+import pytest
+
+from db import pipeline
+from db.pipeline import LatestWriteState, _write_latest
+
+T1 = "2025-01-01T12:00:00+08:00"
+T2 = "2025-01-01T12:05:00+08:00"
+
+
+class FakeLatest:
+    """记录 upsert_latest / write_latest_heartbeat 调用，可分别指定是否成功"""
+
+    def __init__(self):
+        self.upserts = []
+        self.heartbeats = []
+        self.upsert_ok = True
+        self.heartbeat_ok = True
+
+    def upsert(self, rows):
+        self.upserts.append([row["hash_id"] for row in rows])
+        return self.upsert_ok
+
+    def heartbeat(self, snapshot_time, station_count):
+        self.heartbeats.append((snapshot_time, station_count))
+        return self.heartbeat_ok
+
+
+@pytest.fixture
+def latest(monkeypatch):
+    fake = FakeLatest()
+    monkeypatch.setattr(pipeline, "upsert_latest", fake.upsert)
+    monkeypatch.setattr(pipeline, "write_latest_heartbeat", fake.heartbeat)
+    monkeypatch.setattr(pipeline, "latest_state", LatestWriteState())
+    return fake
+
+
+def _records(snapshot_time: str, **free):
+    return [
+        {"hash_id": h, "snapshot_time": snapshot_time, "free": f, "used": 0, "total": 5, "error": 0}
+        for h, f in free.items()
+    ]
+
+
+def test_only_changed_rows_are_sent(latest):
+    assert _write_latest(_records(T1, a=1, b=2, c=3), T1, True, 3600)
+    # 第一轮（进程刚启动）完整写入
+    assert latest.upserts == [["a", "b", "c"]]
+
+    assert _write_latest(_records(T2, a=1, b=4, c=3), T2, True, 3600)
+    assert latest.upserts[-1] == ["b"]
+    # 其余行由心跳确认，站点数为本轮全部站点
+    assert latest.heartbeats[-1] == (T2, 3)
+
+    assert _write_latest(_records(T2, a=1, b=4, c=3), T2, True, 3600)
+    assert latest.upserts[-1] == []
+
+
+def test_failed_heartbeat_falls_back_to_full_write(latest):
+    _write_latest(_records(T1, a=1, b=2), T1, True, 3600)
+    latest.heartbeat_ok = False
+    assert _write_latest(_records(T2, a=1, b=3), T2, True, 3600)
+    # 先写变化的行，心跳失败后整表重写，保证每行的 snapshot_time 都是最新的
+    assert latest.upserts[-2:] == [["b"], ["a", "b"]]
+
+
+def test_failed_upsert_does_not_commit_state(latest):
+    _write_latest(_records(T1, a=1, b=2), T1, True, 3600)
+    latest.upsert_ok = False
+    assert not _write_latest(_records(T2, a=1, b=3), T2, True, 3600)
+    # 失败时不写心跳，也不记录 b 的新计数
+    assert latest.heartbeats == [(T1, 2)]
+    assert pipeline.latest_state.counts["b"] == (2, 0, 5, 0)
+
+    latest.upsert_ok = True
+    assert _write_latest(_records(T2, a=1, b=3), T2, True, 3600)
+    assert latest.upserts[-1] == ["b"]
+
+
+def test_failed_fallback_write_is_reported(latest, monkeypatch):
+    _write_latest(_records(T1, a=1, b=2), T1, True, 3600)
+    latest.heartbeat_ok = False
+    # 变化的行写入成功，心跳失败后的整表重写失败
+    results = iter([True, False])
+    monkeypatch.setattr(pipeline, "upsert_latest", lambda rows: next(results))
+    assert not _write_latest(_records(T2, a=1, b=3), T2, True, 3600)
+    # 已成功写入的变化行仍记录，整表重写未完成，下次仍按原间隔判断是否完整写入
+    assert pipeline.latest_state.counts["b"] == (3, 0, 5, 0)
+
+
+def test_full_write_when_interval_elapsed_or_change_only_disabled(latest, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(pipeline.time, "monotonic", lambda: clock[0])
+    _write_latest(_records(T1, a=1, b=2), T1, True, 600)
+    clock[0] += 599
+    _write_latest(_records(T2, a=1, b=2), T2, True, 600)
+    assert latest.upserts[-1] == []
+    clock[0] += 1
+    _write_latest(_records(T2, a=1, b=2), T2, True, 600)
+    assert latest.upserts[-1] == ["a", "b"]
+
+    _write_latest(_records(T2, a=1, b=2), T2, False, 600)
+    assert latest.upserts[-1] == ["a", "b"]
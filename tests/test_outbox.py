@@ -0,0 +1,128 @@
+"""db/outbox.py：批次追加、确认、压缩、重放与 stations 批次合并"""
+
+import json
+
+import pytest
+
+from db import outbox as outbox_module
+from db.outbox import WriteOutbox
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "outbox.jsonl")
+
+
+def _open(path: str) -> WriteOutbox:
+    outbox = WriteOutbox()
+    outbox.open(path)
+    return outbox
+
+
+def _lines(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _usage(*hash_ids: str):
+    return [{"hash_id": h, "snapshot_time": "2025-01-01T12:00:00+08:00"} for h in hash_ids]
+
+
+class Recorder:
+    """记录重放的批次，可指定从第几次开始失败"""
+
+    def __init__(self, fail_from: int = -1):
+        self.batches = []
+        self.fail_from = fail_from
+
+    def __call__(self, rows):
+        if len(self.batches) == self.fail_from:
+            return False
+        self.batches.append(rows)
+        return True
+
+
+def test_disabled_outbox_rejects_batches():
+    outbox = WriteOutbox()
+    assert not outbox.enabled
+    assert outbox.append("usage", _usage("a")) is False
+
+
+def test_pending_batches_survive_restart(path):
+    outbox = _open(path)
+    assert outbox.append("usage", _usage("a", "b"))
+    assert outbox.append("usage", _usage("c"))
+    assert not outbox.append("usage", [])
+
+    reopened = _open(path)
+    assert (reopened.depth(), reopened.rows()) == (2, 3)
+
+
+def test_replay_acks_in_order_and_stops_at_first_failure(path):
+    outbox = _open(path)
+    for hash_id in ("a", "b", "c"):
+        outbox.append("usage", _usage(hash_id))
+
+    writer = Recorder(fail_from=1)
+    assert outbox.replay({"usage": writer}) is False
+    assert [rows[0]["hash_id"] for rows in writer.batches] == ["a"]
+    assert {"ack": 1} in _lines(path)
+    # 重启后只剩未确认的批次
+    assert _open(path).depth() == 2
+
+    writer = Recorder()
+    assert outbox.replay({"usage": writer}) is True
+    assert [rows[0]["hash_id"] for rows in writer.batches] == ["b", "c"]
+    # 全部确认后文件被压缩为空
+    assert outbox.depth() == 0 and _lines(path) == []
+
+
+def test_compaction_after_many_acks(path, monkeypatch):
+    monkeypatch.setattr(outbox_module, "COMPACT_AFTER", 2)
+    outbox = _open(path)
+    for hash_id in ("a", "b", "c"):
+        outbox.append("usage", _usage(hash_id))
+    outbox.replay({"usage": Recorder(fail_from=2)})
+    # 两条确认行触发压缩，文件中只剩未确认的批次
+    assert [entry.get("id") for entry in _lines(path)] == [3]
+
+
+def test_torn_last_line_is_skipped(path):
+    outbox = _open(path)
+    outbox.append("usage", _usage("a"))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": 2, "table": "usa')
+    reopened = _open(path)
+    assert reopened.depth() == 1
+    # 打开时压缩，损坏的行被清除
+    assert len(_lines(path)) == 1
+
+
+def test_unknown_table_is_discarded(path):
+    outbox = _open(path)
+    outbox.append("gone", [{"x": 1}])
+    assert outbox.replay({}) is True
+    assert outbox.depth() == 0
+
+
+def test_stations_batches_coalesce_into_earliest(path):
+    outbox = _open(path)
+    outbox.append("stations", [{"hash_id": "s1", "v": 1}, {"hash_id": "s2", "v": 1}])
+    outbox.append("usage", _usage("s1"))
+    outbox.append("stations", [{"hash_id": "s1", "v": 2}, {"hash_id": "s3", "v": 2}])
+
+    assert outbox.depth() == 2
+    assert len(_lines(path)) == 2
+    reopened = _open(path)
+    assert reopened.depth() == 2
+
+    order = []
+    reopened.replay(
+        {
+            "stations": lambda rows: order.append(("stations", rows)) or True,
+            "usage": lambda rows: order.append(("usage", rows)) or True,
+        }
+    )
+    # stations 仍先于 usage 重放，同一主键后写入的行覆盖先写入的
+    assert [table for table, _ in order] == ["stations", "usage"]
+    assert {row["hash_id"]: row["v"] for row in order[0][1]} == {"s1": 2, "s2": 1, "s3": 2}
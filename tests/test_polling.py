@@ -0,0 +1,91 @@
+"""server/polling.py：自适应抓取间隔的夹取、阻尼与过期站点处理"""
+
+from datetime import datetime
+
+from server.polling import MAX_STEP_FACTOR, AdaptiveIntervalController
+
+DAYTIME = datetime(2025, 3, 4, 12, 0)
+
+
+def _station(hash_id: str, free: int, stale: bool = False) -> dict:
+    return {
+        "hash_id": hash_id,
+        "free": free,
+        "used": 10 - free,
+        "total": 10,
+        "error": 0,
+        "stale": stale,
+    }
+
+
+def _snapshot(values, stale_from: int = -1) -> list:
+    return [_station(str(i), value, stale=0 <= stale_from <= i) for i, value in enumerate(values)]
+
+
+def _controller(**kwargs) -> AdaptiveIntervalController:
+    options = {"base_interval": 300, "min_interval": 60, "max_interval": 1800}
+    options.update(kwargs)
+    return AdaptiveIntervalController(**options)
+
+
+def test_interval_is_clamped_to_bounds():
+    controller = _controller()
+    # 计数从不变化：间隔逐步拉长，但不超过上限
+    for _ in range(20):
+        controller.observe(_snapshot([5] * 10))
+    assert controller.next_interval(DAYTIME) == 1800
+
+    # 每次都变化：逐步缩短到下限
+    for cycle in range(20):
+        controller.observe(_snapshot([(cycle + i) % 10 for i in range(10)]))
+    assert controller.next_interval(DAYTIME) == 60
+
+
+def test_base_interval_outside_bounds_is_clamped():
+    assert _controller(base_interval=10).next_interval(DAYTIME) == 60
+    assert _controller(base_interval=99999).next_interval(DAYTIME) == 1800
+    # 上下限写反时自动交换
+    controller = _controller(min_interval=1800, max_interval=60)
+    assert (controller.min_interval, controller.max_interval) == (60, 1800)
+
+
+def test_single_adjustment_is_damped():
+    controller = _controller(base_interval=600, target_change_ratio=0.2)
+    controller.observe(_snapshot([5] * 10))
+    controller.observe(_snapshot([(i + 1) % 10 for i in range(10)]))
+    # 波动率 1.0 是目标的 5 倍：按平方根阻尼缩短约 2.24 倍，再受单步上限 MAX_STEP_FACTOR 限制
+    assert controller.next_interval(DAYTIME) == round(600 / MAX_STEP_FACTOR)
+
+
+def test_night_and_holiday_factors_stay_within_bounds():
+    controller = _controller(holidays=[DAYTIME.date()], night_factor=4, holiday_factor=2)
+    night = datetime(2025, 3, 4, 3, 0)
+    assert controller.next_interval(night) == 1800
+    assert controller.next_interval(DAYTIME) == 600
+
+
+def test_disabled_controller_uses_fixed_interval():
+    controller = _controller(base_interval=30, enabled=False)
+    for _ in range(5):
+        controller.observe(_snapshot([5] * 10))
+    assert controller.next_interval(DAYTIME) == 30
+
+
+def test_stale_stations_do_not_enter_volatility():
+    controller = _controller()
+    controller.observe(_snapshot([5] * 10))
+    for cycle in range(1, 4):
+        # 前两个站点是最新数据且每轮都在变化，其余为过期保留数据
+        values = [cycle, cycle + 1] + [5] * 8
+        controller.observe(_snapshot(values, stale_from=5))
+    assert controller.station_change_rate("0") == 1.0
+    assert controller.station_change_rate("9") is None
+
+
+def test_adjustment_skipped_when_most_stations_are_stale():
+    controller = _controller(min_fresh_ratio=0.5)
+    controller.observe(_snapshot([5] * 10))
+    for _ in range(5):
+        # 服务商故障：八成站点为过期数据，计数不变不应被当作低谷而拉长间隔
+        controller.observe(_snapshot([5] * 10, stale_from=2))
+    assert controller.next_interval(DAYTIME) == 300
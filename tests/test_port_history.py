@@ -0,0 +1,159 @@
+"""fetcher/port_history.py：端口状态 2 bit 打包、故障掩码、变化时追加的历史与长期损坏端口"""
+
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server.api as api
+from fetcher.port_history import (
+    PORT_ERROR,
+    PORT_FREE,
+    PORT_UNKNOWN,
+    PORT_USED,
+    PortHistory,
+    error_mask,
+    pack_states,
+    unpack_states,
+)
+from fetcher.provider_manager import ProviderManager
+
+DAY = 86400
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 4, 5, 7, 10, 13])
+def test_pack_unpack_roundtrip(count):
+    rng = random.Random(count)
+    for _ in range(20):
+        states = [rng.randrange(4) for _ in range(count)]
+        packed = pack_states(states)
+        assert len(packed) == (count + 3) // 4
+        assert unpack_states(packed, count) == states
+
+
+def test_pack_layout():
+    # 第 i 个端口位于第 i // 4 字节的第 (i % 4) * 2 位
+    packed = pack_states([PORT_USED, PORT_ERROR, PORT_UNKNOWN, PORT_FREE, PORT_ERROR])
+    assert packed == bytes([0b00_11_10_01, 0b10])
+
+
+@pytest.mark.parametrize("count", [1, 5, 10, 13])
+def test_error_mask_marks_only_error_ports(count):
+    rng = random.Random(count)
+    for _ in range(20):
+        states = [rng.randrange(4) for _ in range(count)]
+        mask = error_mask(pack_states(states), count)
+        expected = sum(1 << (2 * port) for port, s in enumerate(states) if s == PORT_ERROR)
+        assert mask == expected
+    assert error_mask(b"", 0) == 0
+
+
+def test_history_appends_only_on_change():
+    history = PortHistory(enabled=True, history_size=3)
+    history.record("neptune", "1", [0, 1, 0], ts=100)
+    history.record("neptune", "1", [0, 1, 0], ts=200)
+    device = history.get("neptune", "1")
+    assert len(device.history) == 1
+    assert (device.changed_at, device.checked_at) == (100, 200)
+
+    for ts, states in ((300, [1, 1, 0]), (400, [1, 1, 1]), (500, [0, 0, 0])):
+        history.record("neptune", "1", states, ts=ts)
+    # 每个设备最多保留 history_size 条，最旧的被淘汰
+    assert [entry[0] for entry in device.history] == [300, 400, 500]
+    assert device.states() == [0, 0, 0]
+
+    # 端口数变化（如 4 口的设备只回报 3 口）同样视为变化
+    history.record("neptune", "2", [0, 0, 0, 0], ts=100)
+    history.record("neptune", "2", [0, 0, 0], ts=200)
+    assert len(history.get("neptune", "2").history) == 2
+
+
+def test_disabled_history_records_nothing():
+    history = PortHistory(enabled=False)
+    history.record("neptune", "1", [0, 1])
+    history.observe("neptune", "1", False, lambda: [0, 1])
+    assert len(history) == 0
+
+
+def test_observe_skips_parsing_unchanged_payload():
+    history = PortHistory(enabled=True)
+    history.observe("dlmm", "9", False, lambda: [0, 2])
+    checked = history.get("dlmm", "9").checked_at
+
+    def must_not_parse():
+        raise AssertionError("未变化的响应不应再解析端口")
+
+    time.sleep(0.001)
+    history.observe("dlmm", "9", True, must_not_parse)
+    assert history.get("dlmm", "9").checked_at > checked
+
+
+def test_broken_ports_track_continuous_error():
+    history = PortHistory(enabled=True, broken_after=DAY)
+    now = time.time()
+    history.record("neptune", "1", [PORT_ERROR, PORT_FREE, PORT_ERROR], ts=now - 2 * DAY)
+    # 端口 1 恢复后故障起始时间被清除；端口 3 持续故障，起始时间不随其他端口的变化而更新
+    history.record("neptune", "1", [PORT_FREE, PORT_USED, PORT_ERROR], ts=now - DAY / 2)
+    history.record("neptune", "2", [PORT_ERROR], ts=now - 60)
+
+    assert history.broken() == [(("neptune", "1"), 2, now - 2 * DAY)]
+    assert {(key[1], port) for key, port, _ in history.broken(min_duration=0)} == {
+        ("1", 2),
+        ("2", 0),
+    }
+
+    described = history.describe("neptune", "1", history_limit=5)
+    assert [port["state"] for port in described["ports"]] == ["free", "used", "error"]
+    assert described["ports"][2]["broken"] is True
+    assert "error_since" not in described["ports"][0]
+    # 历史按时间倒序，状态按端口顺序拼成字符串
+    assert [entry["states"] for entry in described["history"]] == ["012", "202"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    manager = ProviderManager(enabled="neptune_junior")
+    history = PortHistory(enabled=True, broken_after=DAY)
+    monkeypatch.setattr(api, "provider_manager", manager)
+    monkeypatch.setattr(api, "port_history", history)
+    test_client = TestClient(api.app)
+    test_client.manager, test_client.history = manager, history
+    return test_client
+
+
+def test_ports_api(client):
+    prov = client.manager.providers[0]
+    station = next(s for s in prov.station_list if len(s.device_ids) >= 2)
+    first, second = station.device_ids[:2]
+    client.history.record(prov.device_scope(station), first, [PORT_FREE, PORT_USED, PORT_FREE])
+
+    response = client.get("/api/ports", params={"hash_id": station.hash_id, "history": 1})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["free_ports"] == 2
+    devices = {device["device_id"]: device for device in body["devices"]}
+    assert len(devices[first]["history"]) == 1
+    # 尚无记录的设备返回空端口列表
+    assert devices[second]["ports"] == []
+
+    assert client.get("/api/ports", params={"hash_id": "missing"}).status_code == 404
+
+
+def test_broken_ports_api(client, monkeypatch):
+    prov = client.manager.providers[0]
+    station = next(s for s in prov.station_list if s.device_ids)
+    device_id = station.device_ids[0]
+    client.history.record(
+        prov.device_scope(station), device_id, [PORT_ERROR], ts=time.time() - 3 * DAY
+    )
+
+    body = client.get("/api/ports/broken").json()
+    assert body["count"] == 1
+    [port] = body["ports"]
+    assert (port["device_id"], port["port"]) == (str(device_id), 1)
+    assert station.hash_id in [s["hash_id"] for s in port["stations"]]
+    assert client.get("/api/ports/broken", params={"min_hours": 100}).json()["count"] == 0
+
+    monkeypatch.setattr(api, "port_history", PortHistory(enabled=False))
+    assert client.get("/api/ports/broken").status_code == 503
@@ -0,0 +1,81 @@
+"""fetcher/provider_registry.py：按部署配置启用服务商、按需导入与 entry point 发现"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from fetcher import provider_registry
+from fetcher.provider_registry import (
+    BUILTIN_PROVIDERS,
+    discover_provider_specs,
+    load_provider_class,
+    select_provider_specs,
+)
+from fetcher.providers.provider_base import ProviderBase
+
+
+def test_enabled_list_selects_subset_in_order():
+    specs = select_provider_specs(BUILTIN_PROVIDERS, enabled="dlmm, neptune")
+    assert list(specs) == ["dlmm", "neptune"]
+    assert specs["dlmm"] == BUILTIN_PROVIDERS["dlmm"]
+
+
+def test_disabled_list_wins_over_enabled():
+    assert list(select_provider_specs(BUILTIN_PROVIDERS, disabled="neptune,dlmm")) == [
+        "neptune_junior",
+        "else_provider",
+    ]
+    assert select_provider_specs(BUILTIN_PROVIDERS, enabled="dlmm", disabled="dlmm") == {}
+
+
+def test_unknown_provider_is_rejected(caplog):
+    specs = select_provider_specs(BUILTIN_PROVIDERS, enabled="dlmm,no_such_provider")
+    assert list(specs) == ["dlmm"]
+    assert "no_such_provider" in caplog.text
+
+
+def test_entry_points_extend_and_override_builtins(monkeypatch):
+    plugins = [
+        SimpleNamespace(name="campus_x", value="campus_x.provider:CampusXProvider"),
+        SimpleNamespace(name="dlmm", value="custom_dlmm:DlmmProvider"),
+    ]
+    monkeypatch.setattr(provider_registry, "entry_points", lambda group: plugins)
+    specs = discover_provider_specs()
+    assert specs["campus_x"] == "campus_x.provider:CampusXProvider"
+    assert specs["dlmm"] == "custom_dlmm:DlmmProvider"
+    assert specs["neptune"] == BUILTIN_PROVIDERS["neptune"]
+
+
+def test_load_provider_class():
+    cls = load_provider_class(BUILTIN_PROVIDERS["dlmm"])
+    assert issubclass(cls, ProviderBase)
+    with pytest.raises(TypeError):
+        load_provider_class("fetcher.station:Station")
+    with pytest.raises(ImportError):
+        load_provider_class("no_such_module:Provider")
+
+
+def test_disabled_provider_modules_are_never_imported():
+    # 在新进程中检查，避免受其他测试已导入的模块影响
+    script = (
+        "import json, sys\n"
+        "from fetcher.provider_manager import ProviderManager\n"
+        "manager = ProviderManager(enabled='neptune_junior')\n"
+        "[prov.provider for prov in manager.providers]\n"
+        "print(json.dumps(sorted(m for m in sys.modules if m.startswith('fetcher.providers.'))))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    modules = json.loads(output.strip().splitlines()[-1])
+    assert "fetcher.providers.neptune_junior" in modules
+    for name in ("neptune", "dlmm", "else_provider", "else_vendors"):
+        assert f"fetcher.providers.{name}" not in modules
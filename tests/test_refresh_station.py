@@ -0,0 +1,107 @@
+"""fetcher/provider_manager.py：单站点刷新失败不改动快照，过期条目中刷新过的站点不标记为过期"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server.api as api
+from fetcher.device_cache import device_cache
+from fetcher.provider_manager import ProviderManager
+from fetcher.station import StationStatus
+
+
+@pytest.fixture
+def manager():
+    pm = ProviderManager()
+    yield pm
+    device_cache.invalidate()
+
+
+@pytest.fixture
+def target(manager):
+    """neptune_junior 的一个站点，已发布一轮成功结果"""
+    prov = next(p for p in manager.providers if p.provider == "neptune_junior")
+    station = next(s for s in prov.station_list if s.device_ids)
+    published = StationStatus(station, free=3, used=4, total=7, error=0)
+    manager._publish(prov.provider, {"status": "success", "data": [published], "error": None})
+    return prov, station
+
+
+def _fail_devices(prov):
+    async def unreachable(*args, **kwargs):
+        return None, RuntimeError("connection refused")
+
+    prov.fetch_device_status = unreachable
+
+
+def _answer_devices(prov, free: int):
+    async def answered(*args, **kwargs):
+        return {"total": free, "free": free, "used": 0, "error": 0, "booking": 0}, None
+
+    prov.fetch_device_status = answered
+
+
+def test_failed_refresh_keeps_snapshot(manager, target):
+    prov, station = target
+    _fail_devices(prov)
+    version = manager._snapshot_version
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(manager.refresh_station(station.hash_id, min_age=0))
+    # 设备全部失败：不合并 0 计数、不记录刷新时间
+    assert manager._snapshot_version == version
+    assert station.hash_id not in manager._station_refreshed_at
+    assert manager._published_status(prov.provider, station.hash_id).free == 3
+
+
+def test_refreshed_station_in_stale_entry_is_fresh_until_next_publish(manager, target):
+    prov, station = target
+    manager._publish(prov.provider, {"status": "error", "data": None, "error": "timeout"})
+    assert manager._published_status(prov.provider, station.hash_id).stale
+
+    _answer_devices(prov, free=5)
+    status, refreshed = asyncio.run(manager.refresh_station(station.hash_id, min_age=0))
+    assert refreshed and status.free == 5
+    current = manager._published_status(prov.provider, station.hash_id)
+    assert (current.free, current.stale) == (5, False)
+    merged = [s for s in manager._merged_stations() if s.hash_id == station.hash_id]
+    assert [s.stale for s in merged] == [False]
+
+    # 服务商下一次发布仍失败：刷新过的站点同样早于本轮，重新标记为过期
+    manager._publish(prov.provider, {"status": "error", "data": None, "error": "timeout"})
+    assert manager._published_status(prov.provider, station.hash_id).stale
+
+
+def test_recent_station_is_served_from_snapshot(manager, target):
+    prov, station = target
+    _fail_devices(prov)
+    status, refreshed = asyncio.run(manager.refresh_station(station.hash_id, min_age=3600))
+    assert not refreshed and status.free == 3
+    assert asyncio.run(manager.refresh_station("no-such-station")) is None
+
+
+def test_refresh_api_survives_station_removed_during_refresh(manager, target, monkeypatch):
+    prov, station = target
+    refresh = manager.refresh_station
+
+    async def refresh_then_reload(hash_id, min_age=None):
+        result = await refresh(hash_id, min_age=0)
+        # 刷新期间热重载删除了该站点
+        prov.station_list = [s for s in prov.station_list if s.hash_id != hash_id]
+        return result
+
+    _answer_devices(prov, free=6)
+    monkeypatch.setattr(manager, "refresh_station", refresh_then_reload)
+    monkeypatch.setattr(api, "provider_manager", manager)
+    client = TestClient(api.app)
+
+    response = client.post("/api/status/refresh", params={"hash_id": station.hash_id})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["refreshed"] is True and body["station"]["free"] == 6
+    assert body["age"] is not None
+
+    # 站点已不存在：404 而不是未处理的异常
+    response = client.post("/api/status/refresh", params={"hash_id": station.hash_id})
+    assert response.status_code == 404
@@ -0,0 +1,154 @@
+"""站点 CSV 热重载：ProviderManager.reload_stations、已发布快照的重新绑定与管理接口"""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server.api as api
+from fetcher.catalog_cache import station_catalog
+from fetcher.provider_manager import ProviderManager
+from fetcher.station import StationStatus
+from server.config import Config
+
+HEADER = "name,provider,campus,lon,lat,device_ids\n"
+ROWS = {
+    "A": "紫金港A区,neptune_junior,2,120.09,30.30,[35]\n",
+    "B": 'B区,neptune_junior,2,120.09,30.30,"[36,37]"\n',
+    "B2": 'B区,neptune_junior,2,120.09,30.30,"[36,37,38]"\n',
+    "C": "玉泉C区,neptune_junior,1,120.12,30.26,[40]\n",
+}
+
+
+def _write(path, *keys):
+    """重写站点 CSV 并推进 mtime，保证签名变化"""
+    path.write_text(HEADER + "".join(ROWS[key] for key in keys), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "STATION_DATA_DIR", str(tmp_path))
+    # 不经编译缓存，直接解析临时目录中的 CSV
+    monkeypatch.setattr(station_catalog, "path", None)
+    path = tmp_path / "neptune_junior_stations.csv"
+    _write(path, "A", "B")
+    return path
+
+
+@pytest.fixture
+def manager(csv_path):
+    pm = ProviderManager(enabled="neptune_junior")
+    assert len(pm.providers[0].station_list) == 2
+    return pm
+
+
+def _by_name(stations):
+    return {station.name: station for station in stations}
+
+
+def _publish(manager, unchanged=True):
+    prov = manager.providers[0]
+    data = [
+        StationStatus(station, free=1, used=1, total=2, unchanged=unchanged)
+        for station in prov.station_list
+    ]
+    manager._publish(prov.provider, {"status": "success", "data": data, "error": None})
+
+
+def test_unchanged_file_is_skipped(manager):
+    assert manager.reload_stations() == []
+
+
+def test_added_removed_and_changed_stations(manager, csv_path):
+    prov = manager.providers[0]
+    before = _by_name(prov.station_list)
+    _write(csv_path, "B2", "C")
+
+    [changes] = manager.reload_stations()
+    stations = _by_name(prov.station_list)
+    assert [s.name for s in changes.added] == ["玉泉C区"]
+    assert [s.name for s in changes.removed] == ["紫金港A区"]
+    assert [s.name for s in changes.changed] == ["B区"]
+    assert [s.name for s in changes.upserts] == ["玉泉C区", "B区"]
+
+    # 变化的站点换成新对象并沿用原下标，新增站点分配新下标
+    assert stations["B区"] is not before["B区"]
+    assert stations["B区"].device_ids == ["36", "37", "38"]
+    assert stations["B区"].index == before["B区"].index
+    assert stations["玉泉C区"].index == 2
+    assert manager.find_station(before["紫金港A区"].hash_id) is None
+    assert manager.find_station(stations["玉泉C区"].hash_id)[1] is stations["玉泉C区"]
+
+
+def test_unchanged_station_keeps_its_object(manager, csv_path):
+    prov = manager.providers[0]
+    before = _by_name(prov.station_list)
+    _write(csv_path, "A", "B", "C")
+    [changes] = manager.reload_stations()
+    assert changes.changed == [] and changes.removed == []
+    assert _by_name(prov.station_list)["B区"] is before["B区"]
+
+
+def test_published_snapshot_follows_reload(manager, csv_path):
+    _publish(manager)
+    _write(csv_path, "B2", "C")
+    manager.reload_stations()
+
+    merged = _by_name(status.station for status in manager._merged_stations())
+    # 删除的站点从快照中移除；新增站点要等下一轮抓取才有状态
+    assert set(merged) == {"B区"}
+    status = manager._merged_stations()[0]
+    assert status.station is _by_name(manager.providers[0].station_list)["B区"]
+    assert status["device_ids"] == ["36", "37", "38"]
+    assert (status.free, status.total) == (1, 2)
+    assert status.unchanged is True
+
+
+def test_stale_flag_survives_rebind(manager, csv_path):
+    _publish(manager, unchanged=False)
+    manager._publish("neptune_junior", {"status": "error", "data": None, "error": "timeout"})
+    _write(csv_path, "A", "B2")
+    manager.reload_stations()
+    assert all(status.stale for status in manager._merged_stations())
+    assert not any(status.unchanged for status in manager._merged_stations())
+
+
+@pytest.fixture
+def client(manager, monkeypatch):
+    upserts = []
+    monkeypatch.setattr(api, "provider_manager", manager)
+    monkeypatch.setattr(
+        api, "batch_upsert_stations", lambda stations: upserts.append(list(stations)) or True
+    )
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "secret")
+    test_client = TestClient(api.app)
+    test_client.upserts = upserts
+    return test_client
+
+
+def test_admin_reload_upserts_only_changed_rows(client, csv_path):
+    _write(csv_path, "A", "B2", "C")
+    response = client.post("/api/admin/reload-stations", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    [summary] = response.json()["providers"]
+    assert summary["provider"] == "neptune_junior"
+    assert (len(summary["added"]), len(summary["changed"]), summary["removed"]) == (1, 1, [])
+    # 只写入新增 / 变化的站点，未变化的 A 区不写
+    assert [[s.name for s in batch] for batch in client.upserts] == [["玉泉C区", "B区"]]
+
+    # 文件未再变化：没有差异，也不写数据库
+    response = client.post("/api/admin/reload-stations", headers={"X-Admin-Token": "secret"})
+    assert response.json()["providers"] == []
+    assert len(client.upserts) == 1
+
+
+def test_admin_reload_requires_token(client, monkeypatch):
+    assert client.post("/api/admin/reload-stations").status_code == 403
+    response = client.post("/api/admin/reload-stations", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "")
+    response = client.post("/api/admin/reload-stations", headers={"X-Admin-Token": ""})
+    assert response.status_code == 403
+    assert client.upserts == []
@@ -0,0 +1,92 @@
+"""fetcher/providers/scan_search.py：自适应搜索补全成簇的设备号并剪枝空号段"""
+
+import random
+
+from fetcher.providers.scan_search import AdaptiveSearch
+from fetcher.providers.scan_state import DeviceInfo, ScanState
+
+
+def _cluster(block: str, start: int, stop: int):
+    return {f"{block}{suffix:03d}" for suffix in range(start, stop)}
+
+
+# 合成的有效设备号：
+# - 50359：两个长于粗扫间隔的簇（中间隔一个空号），以及只能由细扫找到的短簇；
+# - 50459：不在初始块中，需从 50359 的命中学习得到；
+# - 50362：孤立设备，只在 must_probe 中出现。
+VALID = (
+    _cluster("50359", 100, 121)
+    | _cluster("50359", 122, 160)
+    | _cluster("50359", 600, 610)
+    | _cluster("50459", 0, 40)
+    | {"50362500"}
+)
+INITIAL_BLOCKS = ["50359", "50360", "50361", "50362"]
+
+
+def _info(device_id: str) -> DeviceInfo:
+    return DeviceInfo(device_id, f"站点{device_id[:-3]}", 1, 1, 2)
+
+
+def _run(search: AdaptiveSearch, valid=VALID):
+    """按 scan.pattern_scan 的方式驱动搜索：取设备号、请求、回报结果，直到无事可做"""
+    requested = []
+    while (device_id := search.next_id()) is not None:
+        requested.append(device_id)
+        search.observe(device_id, _info(device_id) if device_id in valid else None, True)
+    search.finish()
+    return requested
+
+
+def test_finds_every_clustered_device_and_prunes_empty_blocks():
+    search = AdaptiveSearch(
+        INITIAL_BLOCKS, must_probe={"50362500"}, max_blocks=20, rng=random.Random(42)
+    )
+    requested = _run(search)
+    found = {device_id for device_id in requested if device_id in VALID}
+
+    assert found == VALID
+    # 每个设备号最多请求一次
+    assert len(requested) == len(set(requested))
+    # 有命中的块只有 50359 / 50459 / 50362，其余（包括学习到的块）都被剪枝
+    assert search.stats.pruned == search.stats.blocks - 3
+    assert search.stats.learned > 0
+    # 空块只做粗扫抽样，远少于逐个请求全部号段
+    assert len(requested) < search.stats.blocks * 1000 // 8
+
+
+def test_same_seed_gives_same_request_order():
+    orders = [
+        _run(AdaptiveSearch(INITIAL_BLOCKS, max_blocks=20, rng=random.Random(7))) for _ in range(2)
+    ]
+    assert orders[0] == orders[1]
+
+
+def test_failed_requests_do_not_expand_or_prune():
+    search = AdaptiveSearch(["50359"], max_blocks=1, rng=random.Random(1))
+    requested = []
+    while (device_id := search.next_id()) is not None:
+        requested.append(device_id)
+        search.observe(device_id, None, False)
+    search.finish()
+    # 全部请求失败：只有粗扫抽样，没有扩展、细扫或学习
+    strides = {int(b[-3:]) - int(a[-3:]) for a, b in zip(requested, requested[1:])}
+    assert strides == {search.coarse_stride}
+    assert len(requested) <= -(-1000 // search.coarse_stride)
+    assert search.stats.learned == 0
+
+
+def test_resumed_scan_skips_devices_already_done():
+    state = ScanState()
+    state.begin()
+    for device_id in sorted(_cluster("50359", 100, 121)):
+        state.record(device_id, _info(device_id), probed=True)
+
+    search = AdaptiveSearch(
+        ["50359"], state=state, max_blocks=1, recheck_ratio=0.0, rng=random.Random(3)
+    )
+    requested = _run(search)
+    # 已完成的设备号按扫描状态直接得出结果，不再请求，但仍参与扩展
+    assert not set(requested) & _cluster("50359", 100, 121)
+    assert search.stats.resolved > 0
+    assert _cluster("50359", 122, 160) <= set(requested)
@@ -0,0 +1,108 @@
+"""fetcher/providers/scan_state.py：设备号位图、断点续扫与站点目录 diff"""
+
+import random
+
+from fetcher.providers.scan_state import (
+    DeviceInfo,
+    IdBitmap,
+    ScanState,
+    diff_against_catalog,
+    plan_ids,
+    should_probe,
+)
+from fetcher.station import Station
+
+
+def _info(device_id: str, name: str) -> DeviceInfo:
+    return DeviceInfo(device_id, name, 1, 1, 2, "120.08", "30.30")
+
+
+def test_bitmap_operations_and_roundtrip():
+    bitmap = IdBitmap()
+    for device_id in ("50000001", "50000999", "50001000", "50000001"):
+        bitmap.add(device_id)
+    assert "50000001" in bitmap and "50001000" in bitmap
+    assert "50000002" not in bitmap and "49999001" not in bitmap
+    assert len(bitmap) == 3
+
+    bitmap.discard("50001000")
+    bitmap.discard("70000000")
+    assert "50001000" not in bitmap
+    # 全部清空的块不写入 JSON
+    assert list(bitmap.to_json()) == ["50000"]
+
+    restored = IdBitmap.from_json(bitmap.to_json())
+    assert len(restored) == 2
+    assert "50000999" in restored
+    assert IdBitmap.from_json(None).to_json() == {}
+
+
+def test_interrupted_scan_resumes_from_saved_state(tmp_path):
+    path = tmp_path / "scan_state.json"
+    state = ScanState.load(path)
+    assert state.begin() is False
+    state.record("50000001", _info("50000001", "站点A"), probed=True)
+    state.record("50000002", None, probed=True)
+    # 请求失败的设备号不计入已完成
+    state.record("50000003", None, probed=False)
+    state.save()
+
+    resumed = ScanState.load(path)
+    assert resumed.begin() is True
+    assert "50000001" in resumed.run.done and "50000002" in resumed.run.done
+    assert "50000003" not in resumed.run.done
+    assert "50000002" in resumed.invalid
+    assert resumed.run.found["50000001"] == _info("50000001", "站点A")
+
+    found = resumed.finish()
+    assert list(found) == ["50000001"]
+    assert resumed.known == {"50000001": "站点A"}
+    assert resumed.run is None
+
+
+def test_unreadable_or_outdated_state_starts_over(tmp_path):
+    path = tmp_path / "scan_state.json"
+    path.write_text("{", encoding="utf-8")
+    assert ScanState.load(path).run is None
+    path.write_text('{"version": 0, "known": {"1": "x"}}', encoding="utf-8")
+    assert ScanState.load(path).known == {}
+
+
+def test_plan_skips_done_and_samples_invalid():
+    state = ScanState()
+    state.begin()
+    state.record("50000001", None, probed=True)
+    state.invalid.add("50000002")
+    state.invalid.add("50000003")
+    rng = random.Random(0)
+
+    assert not should_probe("50000001", state, {"50000001"}, 1.0, rng)
+    # 目录中已有的设备号即使已知无效也总是请求
+    assert should_probe("50000002", state, {"50000002"}, 0.0, rng)
+    assert not should_probe("50000003", state, set(), 0.0, rng)
+    assert should_probe("50000003", state, set(), 1.0, rng)
+
+    candidates = [f"5000000{i}" for i in range(1, 6)]
+    planned = list(plan_ids(candidates, state, {"50000002", "60000001"}, 0.0, rng))
+    # 号段外的目录设备号追加在最后
+    assert planned == ["50000002", "50000004", "50000005", "60000001"]
+
+
+def test_diff_against_catalog():
+    stations = [
+        Station(name="站点A", provider="neptune", campus_id=1, device_ids=["50000001"]),
+        Station(name="站点B", provider="neptune", campus_id=1, device_ids=["50000002"]),
+    ]
+    found = {
+        "50000001": _info("50000001", "站点A-新名"),
+        "50000009": _info("50000009", "新站点"),
+    }
+    previous = {"50000001": "站点A", "50000002": "站点B"}
+    changes = diff_against_catalog(found, stations, {"50000002"}, previous)
+    assert [(c.change, c.devid, c.previous, c.station) for c in changes] == [
+        ("renamed", "50000001", "站点A", "站点A"),
+        ("new", "50000009", "", ""),
+        ("vanished", "50000002", "站点B", "站点B"),
+    ]
+    # 请求失败（不在 probed_invalid 中）的目录设备不算消失
+    assert diff_against_catalog({}, stations, set(), previous) == []
@@ -0,0 +1,101 @@
+"""db/sqlite_store.py：SQLite 作为主存储与作为 Supabase 前的本地缓存"""
+
+import importlib
+
+import pytest
+
+from db import station_repo, usage_repo
+from db.sqlite_store import SQLiteStore, sqlite_store
+
+T1 = "2025-01-01T12:00:00+08:00"
+T2 = "2025-01-01T12:05:00+08:00"
+
+
+def _usage(hash_id: str, snapshot_time: str, free: int):
+    return {
+        "hash_id": hash_id,
+        "snapshot_time": snapshot_time,
+        "free": free,
+        "used": 10 - free,
+        "total": 10,
+        "error": 0,
+    }
+
+
+def _station(hash_id: str, provider: str = "neptune"):
+    return {
+        "hash_id": hash_id,
+        "provider": provider,
+        "name": f"站点{hash_id}",
+        "campus_id": 2,
+        "campus_name": "紫金港校区",
+        "lat": 30.30,
+        "lon": 120.08,
+        "device_ids": ["101", "102"],
+        "updated_at": T1,
+    }
+
+
+@pytest.fixture
+def no_supabase(monkeypatch):
+    """Supabase 未配置（离线）"""
+    monkeypatch.setattr(usage_repo, "get_supabase_client", lambda: None)
+    monkeypatch.setattr(station_repo, "get_supabase_client", lambda: None)
+
+
+@pytest.fixture
+def open_store(tmp_path, no_supabase):
+    def _open(primary: bool):
+        assert sqlite_store.open(str(tmp_path / "db" / "charger.sqlite3"), primary=primary)
+        return sqlite_store
+
+    yield _open
+    sqlite_store.close()
+
+
+def test_primary_mode_serves_reads_and_writes_offline(open_store):
+    open_store(primary=True)
+    assert usage_repo.insert_usage([_usage("a", T1, 3), _usage("b", T1, 5)])
+    # 重复的 (hash_id, snapshot_time) 被忽略
+    assert usage_repo.insert_usage([_usage("a", T1, 9)])
+    assert sqlite_store._query("SELECT free FROM usage WHERE hash_id = 'a'")[0]["free"] == 3
+
+    assert usage_repo.upsert_latest([_usage("a", T1, 3), _usage("b", T1, 5)])
+    assert usage_repo.upsert_latest([_usage("a", T1, 4)])
+    assert usage_repo.write_latest_heartbeat(T2, 2)
+    latest = usage_repo.load_latest()
+    assert latest["updated_at"] == T2
+    assert {row["hash_id"]: row["free"] for row in latest["rows"]} == {"a": 4, "b": 5}
+
+    assert station_repo.upsert_station_rows([_station("a"), _station("b", "dlmm")])
+    metadata = station_repo.fetch_station_metadata(provider="dlmm")
+    assert list(metadata) == ["b"]
+    assert metadata["b"]["device_ids"] == ["101", "102"]
+
+
+def test_primary_mode_empty_tables_do_not_fall_back(open_store):
+    open_store(primary=True)
+    assert usage_repo.load_latest() is None
+    assert station_repo.fetch_station_metadata() == {}
+
+
+def test_cache_mode_writes_locally_and_still_reports_supabase_result(open_store):
+    open_store(primary=False)
+    # 本地写入成功，但 Supabase 写入结果才是调用方看到的结果
+    assert usage_repo.upsert_latest([_usage("a", T1, 3)]) is False
+    assert usage_repo.load_latest()["rows"][0]["free"] == 3
+    assert station_repo.upsert_station_rows([_station("a")]) is False
+    assert list(station_repo.fetch_station_metadata(["a"])) == ["a"]
+
+
+def test_metadata_lookup_is_chunked(tmp_path, monkeypatch):
+    # db 包导出的 sqlite_store 是实例，与同名模块重名
+    sqlite_store_module = importlib.import_module("db.sqlite_store")
+    monkeypatch.setattr(sqlite_store_module, "QUERY_CHUNK", 2)
+    store = SQLiteStore()
+    assert store.open(str(tmp_path / "charger.sqlite3"))
+    store.upsert_station_rows([_station(str(i)) for i in range(5)])
+    assert sorted(store.fetch_station_metadata(["0", "2", "4", "missing"])) == ["0", "2", "4"]
+    store.close()
+    assert not store.enabled
+    assert store.insert_usage([_usage("a", T1, 1)]) is False
@@ -0,0 +1,54 @@
+"""fetcher/station.py：StationStatus 与旧字典格式的兼容"""
+
+import pytest
+
+from db.usage_repo import build_usage_records
+from fetcher.station import Station, StationStatus, status_to_dict
+
+
+@pytest.fixture
+def station():
+    return Station(
+        name="玉泉出版社楼南侧", provider="neptune", campus_id=1, device_ids=[101, "102"]
+    )
+
+
+def test_dict_style_reads(station):
+    status = StationStatus(station, free=3, used=5, total=10, error=2)
+    assert status["free"] == 3
+    assert status.get("total") == 10
+    assert status["hash_id"] == status["id"] == station.hash_id
+    assert status["devids"] == status["device_ids"] == ["101", "102"]
+    assert status.get("campus_name") == "玉泉校区"
+    assert status.get("stale") is False
+    assert status.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        status["missing"]
+
+
+def test_to_dict_matches_legacy_format(station):
+    data = StationStatus(station, free=3, used=5, total=10, error=2).to_dict()
+    assert data["id"] == data["hash_id"] == station.hash_id
+    assert data["devids"] == data["device_ids"]
+    assert (data["free"], data["used"], data["total"], data["error"]) == (3, 5, 10, 2)
+    # 未过期的记录不带 stale 字段
+    assert "stale" not in data
+    assert status_to_dict(data) == data
+    assert status_to_dict(data) is not data
+
+
+def test_with_stale_shares_station(station):
+    status = StationStatus(station, free=1, used=2, total=3, unchanged=True)
+    stale = status.with_stale()
+    assert stale.stale and not status.stale
+    assert stale.station is station
+    assert stale.to_dict()["stale"] is True
+    assert (stale.free, stale.used, stale.total) == (1, 2, 3)
+
+
+def test_usage_rows_match_dict_path(station):
+    status = StationStatus(station, free=3, used=5, total=10, error=2)
+    snapshot_time = "2025-01-01T12:00:00+08:00"
+    from_record = build_usage_records([status], snapshot_time)
+    from_dict = build_usage_records([status.to_dict()], snapshot_time)
+    assert from_record == from_dict == [status.to_usage_row(snapshot_time)]
@@ -0,0 +1,151 @@
+"""fetcher/token_manager.py：token 持久化、作废与静态配置 token 的轮换"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from fetcher.token_manager import AuthError, TokenManager, TokenStore, jwt_expiry
+
+FAR_FUTURE = time.time() + 86400
+
+
+class TokenSource:
+    """按顺序返回 token 的鉴权接口"""
+
+    def __init__(self, *tokens: str):
+        self.tokens = list(tokens)
+        self.calls = 0
+
+    async def __call__(self, session):
+        self.calls += 1
+        return self.tokens.pop(0), FAR_FUTURE
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TokenStore(str(tmp_path / "tokens.json"))
+
+
+def _file(store: TokenStore) -> dict:
+    return json.loads(store.path.read_text(encoding="utf-8"))
+
+
+def test_save_keeps_other_providers(store):
+    store.save("neptune_junior", "A", FAR_FUTURE)
+    store.save("dlmm", "B", FAR_FUTURE)
+    store.save("neptune_junior", "C", FAR_FUTURE)
+    assert {name: entry["token"] for name, entry in _file(store).items()} == {
+        "neptune_junior": "C",
+        "dlmm": "B",
+    }
+    assert store.load("dlmm")["token"] == "B"
+    assert store.load("missing") is None
+
+
+def test_delete_only_removes_the_expected_token(store):
+    store.save("dlmm", "NEW", FAR_FUTURE)
+    # 其他 worker 已写入新 token 时，作废旧 token 不能把新 token 删掉
+    store.delete("dlmm", "OLD")
+    assert store.load("dlmm")["token"] == "NEW"
+    store.delete("dlmm", "NEW")
+    assert "dlmm" not in _file(store)
+
+
+def test_token_is_persisted_and_reused(store):
+    source = TokenSource("T1")
+    first = TokenManager("dlmm", source, store=store)
+    assert asyncio.run(first.get_token(None)) == "T1"
+
+    # 新进程（新的管理器）直接复用文件中的 token，不再请求鉴权接口
+    second_source = TokenSource("T2")
+    second = TokenManager("dlmm", second_source, store=store)
+    assert asyncio.run(second.get_token(None)) == "T1"
+    assert second_source.calls == 0
+
+
+def test_expiring_token_is_refreshed(store):
+    store.save("dlmm", "OLD", time.time() + 10)
+    manager = TokenManager("dlmm", TokenSource("NEW"), store=store, refresh_margin=300)
+    assert asyncio.run(manager.get_token(None)) == "NEW"
+    assert store.load("dlmm")["token"] == "NEW"
+
+
+def test_auth_error_invalidates_and_retries_once(store):
+    source = TokenSource("BAD", "GOOD")
+    manager = TokenManager("neptune_junior", source, store=store)
+    used = []
+
+    async def request(token):
+        used.append(token)
+        if token == "BAD":
+            raise AuthError("401")
+        return "ok"
+
+    assert asyncio.run(manager.call_with_auth(None, request)) == "ok"
+    assert used == ["BAD", "GOOD"]
+    assert store.load("neptune_junior")["token"] == "GOOD"
+
+
+def test_rejected_token_is_deleted_not_blanked(store):
+    manager = TokenManager("neptune_junior", TokenSource("BAD"), store=store)
+    asyncio.run(manager.get_token(None))
+    manager.invalidate("BAD")
+
+    async def unavailable(session):
+        raise RuntimeError("auth endpoint down")
+
+    manager.fetch_token = unavailable
+    with pytest.raises(RuntimeError):
+        asyncio.run(manager.get_token(None))
+    # 刷新失败时被拒绝的 token 已从文件删除，而不是留下空 token 记录
+    assert "neptune_junior" not in _file(store)
+
+
+def test_invalidate_ignores_superseded_token(store):
+    manager = TokenManager("dlmm", TokenSource("T1"), store=store)
+    asyncio.run(manager.get_token(None))
+    manager.invalidate("T0")
+    assert manager.token == "T1"
+
+
+def test_rotated_configured_token_overrides_store(store):
+    configured = {"token": "ENV1"}
+
+    async def from_env(session):
+        return configured["token"], None
+
+    first = TokenManager(
+        "dlmm", from_env, store=store, configured_token=lambda: configured["token"]
+    )
+    assert asyncio.run(first.get_token(None)) == "ENV1"
+
+    configured["token"] = "ENV2"
+    second = TokenManager(
+        "dlmm", from_env, store=store, configured_token=lambda: configured["token"]
+    )
+    assert asyncio.run(second.get_token(None)) == "ENV2"
+    assert store.load("dlmm")["token"] == "ENV2"
+
+
+def test_jwt_expiry():
+    assert jwt_expiry("not-a-jwt") is None
+    # {"exp": 1700000000}
+    assert jwt_expiry("x.eyJleHAiOiAxNzAwMDAwMDAwfQ.y") == 1700000000.0
+
+
+def test_auth_error_is_not_retried_with_the_same_token(store):
+    # dlmm 的 token 只能从配置读取，刷新得到的还是被拒绝的 token
+    source = TokenSource("ENV", "ENV")
+    manager = TokenManager("dlmm", source, store=store)
+    used = []
+
+    async def request(token):
+        used.append(token)
+        raise AuthError("401")
+
+    with pytest.raises(AuthError):
+        asyncio.run(manager.call_with_auth(None, request))
+    assert used == ["ENV"]
+    assert source.calls == 2
@@ -0,0 +1,127 @@
+"""db/pipeline.py：usage 后写缓冲的批量写入、队列溢出与关闭时写出"""
+
+import asyncio
+
+import pytest
+
+from db import pipeline
+from db.outbox import WriteOutbox
+from db.pipeline import UsageWriteBuffer
+
+
+class FakeInsert:
+    """记录每次批量插入的行数，可指定是否成功"""
+
+    def __init__(self, ok: bool = True):
+        self.ok = ok
+        self.batches = []
+
+    def __call__(self, rows, spool=True):
+        self.batches.append(len(rows))
+        return self.ok
+
+
+@pytest.fixture
+def insert(monkeypatch):
+    fake = FakeInsert()
+    monkeypatch.setattr(pipeline, "insert_usage", fake)
+    return fake
+
+
+def _rows(count: int, cycle: int = 0):
+    return [{"hash_id": str(i), "snapshot_time": f"t{cycle}"} for i in range(count)]
+
+
+def test_full_batches_are_written_and_rest_flushed_on_close(insert):
+    buffer = UsageWriteBuffer()
+
+    async def scenario():
+        buffer.start(batch_rows=10, flush_interval=600)
+        for cycle in range(3):
+            assert buffer.submit(_rows(4, cycle))
+        await asyncio.sleep(0.05)
+        # 累积 12 行：写出一批 10 行，余下 2 行等待
+        assert insert.batches == [10]
+        assert buffer.stats()["pending_rows"] == 2
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert insert.batches == [10, 2]
+    assert buffer.stats()["flushed_rows"] == 12
+    assert not buffer.running
+    assert buffer.submit(_rows(1)) is False
+
+
+def test_flush_interval_writes_partial_batch(insert):
+    buffer = UsageWriteBuffer()
+
+    async def scenario():
+        buffer.start(batch_rows=100, flush_interval=0.01)
+        buffer.submit(_rows(3))
+        await asyncio.sleep(0.1)
+        assert insert.batches == [3]
+        await buffer.close()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_oldest_cycle(insert):
+    buffer = UsageWriteBuffer()
+
+    async def scenario():
+        buffer.start(batch_rows=1000, flush_interval=600, queue_size=2)
+        # 写入任务尚未运行，三轮都留在队列中：第一轮被丢弃
+        for cycle, count in enumerate((1, 2, 3)):
+            buffer.submit(_rows(count, cycle))
+        assert buffer.stats()["queued_cycles"] == 2
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert buffer.dropped_rows == 1
+    assert insert.batches == [5]
+
+
+def test_submit_from_worker_thread(insert):
+    buffer = UsageWriteBuffer()
+
+    async def scenario():
+        buffer.start(batch_rows=1000, flush_interval=600)
+        # record_usage_data 在线程中执行，行数据交回事件循环入队
+        accepted = await asyncio.to_thread(buffer.submit, _rows(7))
+        await asyncio.sleep(0.05)
+        assert accepted and buffer.stats()["pending_rows"] == 7
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert insert.batches == [7]
+
+
+def test_failed_flush_on_close_is_spooled(insert, monkeypatch, tmp_path):
+    insert.ok = False
+    outbox = WriteOutbox()
+    outbox.open(str(tmp_path / "outbox.jsonl"))
+    monkeypatch.setattr(pipeline, "write_outbox", outbox)
+    buffer = UsageWriteBuffer()
+
+    async def scenario():
+        buffer.start(batch_rows=1000, flush_interval=600)
+        buffer.submit(_rows(5))
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert (buffer.spooled_rows, buffer.dropped_rows) == (5, 0)
+    assert outbox.rows() == 5
+
+
+def test_failed_flush_without_outbox_is_dropped_on_close(insert, monkeypatch):
+    insert.ok = False
+    monkeypatch.setattr(pipeline, "write_outbox", WriteOutbox())
+    buffer = UsageWriteBuffer()
+
+    async def scenario():
+        buffer.start(batch_rows=1000, flush_interval=600)
+        buffer.submit(_rows(5))
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert buffer.dropped_rows == 5